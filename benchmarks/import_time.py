@@ -0,0 +1,123 @@
+"""Benchmark of the cold-start import time and peak memory of the entry points of qLEET.
+
+Every entry point is imported in a fresh interpreter, so nothing is cached between the
+measurements except the compiled bytecode on disk. The first repeat is run to warm the
+bytecode and filesystem caches, and is not reported.
+
+Usage:
+    python benchmarks/import_time.py [--repeats 5] [--json results.json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import typing
+
+ENTRY_POINTS = [
+    "import qleet",
+    "from qleet import CircuitDescriptor",
+    "from qleet import CircuitSimulator",
+    "from qleet import Expressibility",
+    "from qleet import EntanglementCapability",
+    "from qleet import LossLandscapePlotter",
+    "from qleet import PQCSimulatedTrainer",
+]
+
+FRAMEWORKS = [
+    "cirq",
+    "qiskit",
+    "pyquil",
+    "tensorflow",
+    "tensorflow_quantum",
+    "sklearn",
+    "plotly",
+    "matplotlib",
+    "seaborn",
+]
+
+# Run in the child interpreter, reports the import time, the peak resident set size
+# and which of the heavy frameworks the statement ended up importing.
+_CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec({statement!r})
+seconds = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+scale = 1 if sys.platform == "darwin" else 1024
+print(json.dumps({{
+    "seconds": seconds,
+    "peak_rss_mb": peak * scale / 2 ** 20,
+    "frameworks": [name for name in {frameworks!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(statement: str) -> typing.Dict[str, typing.Any]:
+    """Imports the entry point in a fresh interpreter and measures it.
+
+    :type statement: str
+    :param statement: The import statement to run
+    :returns: The import time in seconds, the peak RSS in MiB and the loaded frameworks
+    :rtype: dict
+    :raises RuntimeError: if the statement fails in the child interpreter
+    """
+    child = _CHILD.format(statement=statement, frameworks=FRAMEWORKS)
+    process = subprocess.run(
+        [sys.executable, "-c", child], capture_output=True, text=True, check=False
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def benchmark(repeats: int) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """Measures every entry point, reporting the median over the repeats.
+
+    :type repeats: int
+    :param repeats: Number of measured imports of each entry point
+    :returns: The measurements keyed by the import statement
+    :rtype: dict
+    """
+    results: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    for statement in ENTRY_POINTS:
+        try:
+            measure(statement)
+            runs = [measure(statement) for _ in range(repeats)]
+        except RuntimeError as error:
+            results[statement] = {"error": str(error)}
+            continue
+        results[statement] = {
+            "seconds": statistics.median(run["seconds"] for run in runs),
+            "peak_rss_mb": statistics.median(run["peak_rss_mb"] for run in runs),
+            "frameworks": runs[-1]["frameworks"],
+        }
+    return results
+
+
+def main() -> None:
+    """Runs the benchmark and prints a table of the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = benchmark(args.repeats)
+    width = max(len(statement) for statement in results)
+    print(f"{'entry point':<{width}}  {'time (s)':>9}  {'peak RSS (MiB)':>14}  loaded")
+    for statement, result in results.items():
+        if "error" in result:
+            print(f"{statement:<{width}}  failed: {result['error']}")
+            continue
+        print(
+            f"{statement:<{width}}  {result['seconds']:>9.3f}  "
+            f"{result['peak_rss_mb']:>14.1f}  {', '.join(result['frameworks'])}"
+        )
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""Benchmark suite for the runtime and memory of the simulators and analyzers of qLEET.
+
+Every benchmark is swept over a grid of its parameters, among the number of qubits, the
+depth of the circuit, the number of samples and whether the simulation is noisy. A case
+is timed over a few repeats, after one untimed run, and its peak memory is traced on a
+separate run so the tracing does not slow down the timed ones.
+
+The results are written as a JSON baseline, and a new run is compared with the
+`compare` command against the reference baseline, `benchmarks/baseline.json` unless
+another one is given. It exits with a non-zero status if any case got slower or used
+more memory than the baseline by more than the threshold.
+
+Timings only compare on the same machine, so the reference baseline is produced by the
+full suite on the machine the comparisons run on, from the commit they are relative to,
+and committed as `benchmarks/baseline.json`; the metadata of the baseline records the
+machine and the versions it was run with. It is regenerated the same way when that
+machine changes, or when a slowdown is accepted.
+
+Usage, with qLEET and its dependencies installed:
+    python benchmarks/suite.py run --output benchmarks/baseline.json
+    python benchmarks/suite.py run --output current.json [--quick] [--only simulate]
+    python benchmarks/suite.py compare current.json [--baseline other.json]
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import typing
+
+import numpy as np
+
+Sweep = typing.Dict[str, typing.List[typing.Any]]
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def hardware_efficient_circuit(qubits: int, depth: int):
+    """Layers of parametrized Y rotations on every qubit followed by a ladder of CZs.
+
+    :type qubits: int
+    :param qubits: Number of qubits of the circuit
+    :type depth: int
+    :param depth: Number of layers
+    :returns: The circuit, with the sum of the Z operators as the cost
+    :rtype: CircuitDescriptor
+    """
+    import cirq
+    import sympy
+    from qleet import CircuitDescriptor
+
+    qubit_list = cirq.LineQubit.range(qubits)
+    params = sympy.symbols(f"theta_0:{qubits * depth}")
+    circuit = cirq.Circuit()
+    for layer in range(depth):
+        circuit += [
+            cirq.ry(params[layer * qubits + idx]).on(qubit)
+            for idx, qubit in enumerate(qubit_list)
+        ]
+        circuit += [cirq.CZ(a, b) for a, b in zip(qubit_list, qubit_list[1:])]
+    cost = cirq.PauliSum.from_pauli_strings([cirq.Z(qubit) for qubit in qubit_list])
+    return CircuitDescriptor(circuit, list(params), cost)
+
+
+def noise_model(noise: bool):
+    """A weak depolarizing noise model, or None for noiseless simulations.
+
+    :type noise: bool
+    :param noise: Whether the simulation is noisy
+    :returns: The noise model
+    :rtype: cirq.NoiseModel or None
+    """
+    import cirq
+
+    if not noise:
+        return None
+    return cirq.NoiseModel.from_noise_model_like(cirq.depolarize(p=0.01))
+
+
+def qaoa_problem(qubits: int, depth: int):
+    """A QAOA max-cut circuit on a random graph, along with its metric.
+
+    :type qubits: int
+    :param qubits: Number of nodes of the graph, one qubit per node
+    :type depth: int
+    :param depth: Number of QAOA layers
+    :returns: The circuit and the max-cut metric of the graph
+    :rtype: tuple of CircuitDescriptor and MaxCutMetric
+    """
+    import networkx as nx
+    from qleet import CircuitDescriptor, QAOACircuitMaxCut, MaxCutMetric
+
+    graph = nx.gnm_random_graph(n=qubits, m=2 * qubits, seed=0)
+    qaoa = QAOACircuitMaxCut(graph, p=depth)
+    circuit = CircuitDescriptor(qaoa.qaoa_circuit, qaoa.params, qaoa.qaoa_cost)
+    return circuit, MaxCutMetric(graph)
+
+
+def bench_simulate(qubits: int, depth: int, noise: bool) -> typing.Callable[[], None]:
+    """Simulation of a single parameter assignment by `CircuitSimulator.simulate`."""
+    from qleet import CircuitSimulator
+
+    circuit = hardware_efficient_circuit(qubits, depth)
+    simulator = CircuitSimulator(circuit, noise_model(noise))
+    resolver = dict(zip(circuit.parameters, np.linspace(0, np.pi, qubits * depth)))
+    return lambda: simulator.simulate(resolver)
+
+
+def bench_expressibility(
+    qubits: int, depth: int, samples: int, noise: bool
+) -> typing.Callable[[], None]:
+    """Expressibility of the circuit by `Expressibility.expressibility`."""
+    from qleet import Expressibility
+
+    circuit = hardware_efficient_circuit(qubits, depth)
+    analyzer = Expressibility(circuit, noise_model(noise), samples=samples)
+    return lambda: analyzer.expressibility()
+
+
+def bench_entanglement_capability(
+    qubits: int, depth: int, samples: int, noise: bool
+) -> typing.Callable[[], None]:
+    """Meyer-Wallach entangling capability by `entanglement_capability`."""
+    from qleet import EntanglementCapability
+
+    circuit = hardware_efficient_circuit(qubits, depth)
+    analyzer = EntanglementCapability(circuit, noise_model(noise), samples=samples)
+    return lambda: analyzer.entanglement_capability()
+
+
+def bench_entanglement_spectrum(
+    qubits: int, depth: int, samples: int, noise: bool
+) -> typing.Callable[[], None]:
+    """Entanglement spectrum by `EntanglementSpectrum.entanglement_spectrum`."""
+    from qleet import EntanglementSpectrum
+
+    circuit = hardware_efficient_circuit(qubits, depth)
+    analyzer = EntanglementSpectrum(circuit, noise_model(noise), samples=samples)
+    return lambda: analyzer.entanglement_spectrum()
+
+
+def bench_scan(qubits: int, depth: int, points: int) -> typing.Callable[[], None]:
+    """Loss landscape scan around the origin by `LossLandscapePlotter.scan`."""
+    from qleet import PQCSimulatedTrainer, LossLandscapePlotter
+
+    circuit, metric = qaoa_problem(qubits, depth)
+    plotter = LossLandscapePlotter(PQCSimulatedTrainer(circuit, seed=0), metric)
+    origin = np.zeros(len(circuit.parameters))
+    return lambda: plotter.scan(points, np.pi, origin)
+
+
+def bench_train(qubits: int, depth: int, steps: int) -> typing.Callable[[], None]:
+    """Training steps of the QAOA circuit by `PQCSimulatedTrainer.train`."""
+    from qleet import PQCSimulatedTrainer
+
+    circuit, _metric = qaoa_problem(qubits, depth)
+    trainer = PQCSimulatedTrainer(circuit, seed=0)
+    return lambda: trainer.train(n_samples=steps)
+
+
+def bench_maxcut_metric(qubits: int, samples: int) -> typing.Callable[[], None]:
+    """Max-cut metric of sampled bitstrings by `MaxCutMetric.from_samples_vector`."""
+    _circuit, metric = qaoa_problem(qubits, 1)
+    bitstrings = np.random.default_rng(0).integers(0, 2, size=(samples, qubits))
+    return lambda: metric.from_samples_vector(bitstrings)
+
+
+BENCHMARKS: typing.Dict[str, typing.Tuple[typing.Callable, Sweep, Sweep]] = {
+    # name: (benchmark, full sweep, quick sweep)
+    "simulate": (
+        bench_simulate,
+        {"qubits": [4, 8, 12], "depth": [2, 8], "noise": [False, True]},
+        {"qubits": [4, 6], "depth": [2], "noise": [False, True]},
+    ),
+    "expressibility": (
+        bench_expressibility,
+        {
+            "qubits": [2, 4, 6],
+            "depth": [2, 4],
+            "samples": [100, 500],
+            "noise": [False, True],
+        },
+        {"qubits": [2, 4], "depth": [2], "samples": [50], "noise": [False]},
+    ),
+    "entanglement_capability": (
+        bench_entanglement_capability,
+        {
+            "qubits": [2, 4, 6],
+            "depth": [2, 4],
+            "samples": [100, 500],
+            "noise": [False, True],
+        },
+        {"qubits": [2, 4], "depth": [2], "samples": [50], "noise": [False]},
+    ),
+    "entanglement_spectrum": (
+        bench_entanglement_spectrum,
+        {
+            "qubits": [4, 6],
+            "depth": [2, 4],
+            "samples": [100, 500],
+            "noise": [False, True],
+        },
+        {"qubits": [4], "depth": [2], "samples": [50], "noise": [False]},
+    ),
+    "scan": (
+        bench_scan,
+        {"qubits": [4, 8], "depth": [1, 2], "points": [5, 10]},
+        {"qubits": [4], "depth": [1], "points": [3]},
+    ),
+    "train": (
+        bench_train,
+        {"qubits": [4, 8], "depth": [1, 2], "steps": [50]},
+        {"qubits": [4], "depth": [1], "steps": [10]},
+    ),
+    "maxcut_metric": (
+        bench_maxcut_metric,
+        {"qubits": [8, 16], "samples": [1000, 10000]},
+        {"qubits": [8], "samples": [1000]},
+    ),
+}
+
+
+def case_name(benchmark: str, params: typing.Dict[str, typing.Any]) -> str:
+    """The identifier of a case in the baselines, e.g. `simulate[qubits=4,depth=2]`.
+
+    :type benchmark: str
+    :param benchmark: Name of the benchmark
+    :type params: dict
+    :param params: The parameters of the case
+    :returns: The name of the case
+    :rtype: str
+    """
+    return f"{benchmark}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+def measure(
+    factory: typing.Callable, params: typing.Dict[str, typing.Any], repeats: int
+) -> typing.Dict[str, float]:
+    """Times a case and traces its peak memory.
+
+    :type factory: Callable
+    :param factory: The benchmark, builds the function to be measured from the params
+    :type params: dict
+    :param params: The parameters of the case
+    :type repeats: int
+    :param repeats: Number of timed runs
+    :returns: Median and minimum time in seconds, and peak traced memory in MiB
+    :rtype: dict
+    """
+    function = factory(**params)
+    function()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def run(
+    only: typing.Optional[typing.List[str]] = None,
+    quick: bool = False,
+    repeats: int = 3,
+) -> typing.Dict[str, typing.Any]:
+    """Runs the sweeps of the benchmarks.
+
+    :type only: list of str, optional
+    :param only: Names of the benchmarks to run, None to run all of them
+    :type quick: bool
+    :param quick: Whether to run the small sweeps, as a smoke test
+    :type repeats: int
+    :param repeats: Number of timed runs of each case
+    :returns: The baseline, metadata about the machine and the results of every case
+    :rtype: dict
+    """
+    import qleet
+
+    results: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    for name, (factory, full_sweep, quick_sweep) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        sweep = quick_sweep if quick else full_sweep
+        for values in itertools.product(*sweep.values()):
+            params = dict(zip(sweep.keys(), values))
+            case = case_name(name, params)
+            try:
+                results[case] = measure(factory, params, repeats)
+            except ImportError as error:
+                results[case] = {"error": f"{type(error).__name__}: {error}"}
+            print(case, results[case], file=sys.stderr)
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "qleet": qleet.__version__,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: typing.Dict[str, typing.Any],
+    current: typing.Dict[str, typing.Any],
+    threshold: float = 0.2,
+) -> typing.List[str]:
+    """Compares the results against a baseline, case by case.
+
+    A case regressed if its median time or its peak memory grew by more than the
+    threshold, relative to the baseline. Cases missing from either side are skipped.
+
+    :type baseline: dict
+    :param baseline: The reference results, as written by `run`
+    :type current: dict
+    :param current: The new results, as written by `run`
+    :type threshold: float
+    :param threshold: The tolerated relative increase, 0.2 for 20%
+    :returns: Descriptions of the regressions, empty if there were none
+    :rtype: list of str
+    """
+    regressions = []
+    for case, new in current["results"].items():
+        old = baseline["results"].get(case)
+        if old is None or "error" in old or "error" in new:
+            continue
+        for key in ("seconds", "peak_mb"):
+            ratio = new[key] / old[key] if old[key] > 0 else 1.0
+            flag = "REGRESSED" if ratio > 1 + threshold else ""
+            print(
+                f"{case:<70} {key:>8} {old[key]:>10.4f} {new[key]:>10.4f} {ratio:>6.2f}x {flag}"
+            )
+            if flag:
+                regressions.append(f"{case} {key}: {old[key]:.4g} -> {new[key]:.4g}")
+    return regressions
+
+
+def main() -> None:
+    """Entry point of the command line interface of the suite."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and save a baseline")
+    run_parser.add_argument("--output", required=True, help="JSON file to write")
+    run_parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    run_parser.add_argument("--quick", action="store_true", help="small sweeps only")
+    run_parser.add_argument("--repeats", type=int, default=3)
+    compare_parser = commands.add_parser("compare", help="flag regressions")
+    compare_parser.add_argument("current", help="JSON file of the new run")
+    compare_parser.add_argument(
+        "--baseline", default=BASELINE, help="JSON file of the reference run"
+    )
+    compare_parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args.only, args.quick, args.repeats)
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        if not os.path.exists(args.baseline):
+            parser.error(
+                f"no baseline at {args.baseline}, produce it with "
+                f"`python benchmarks/suite.py run --output {args.baseline}`"
+            )
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.threshold:.0%}:")
+            print("\n".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
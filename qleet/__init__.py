@@ -1,25 +1,52 @@
-"""The qLEET Package for visualizing quantum circuit behavior"""
+"""The qLEET Package for visualizing quantum circuit behavior
+
+The subpackages and the classes exported here are imported on first use, so importing
+qLEET does not pull in the quantum frameworks which the code at hand does not need.
+"""
 import os
+import typing
+
+from qleet._lazy import lazy_package
+from qleet._version import __version__
 
-import qleet.examples
-import qleet.analyzers
-import qleet.simulators
-import qleet.interface
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 
-from qleet.interface.metas import AnalyzerList
-from qleet.interface.circuit import CircuitDescriptor
+__getattr__, __dir__ = lazy_package(
+    __name__,
+    submodules=["examples", "analyzers", "simulators", "interface"],
+    exports={
+        "AnalyzerList": "qleet.interface.metas",
+        "CircuitDescriptor": "qleet.interface.circuit",
+        "OptimizationPathPlotter": "qleet.analyzers.training_path",
+        "LossLandscapePlotter": "qleet.analyzers.loss_landscape",
+        "Expressibility": "qleet.analyzers.expressibility",
+        "EntanglementCapability": "qleet.analyzers.entanglement",
+        "EntanglementSpectrum": "qleet.analyzers.entanglement_spectrum",
+        "ParameterHistograms": "qleet.analyzers.histogram",
+        "CircuitSimulator": "qleet.simulators.circuit_simulators",
+        "SimulationCache": "qleet.simulators.cache",
+        "SimulationPlanner": "qleet.simulators.planner",
+        "PQCSimulatedTrainer": "qleet.simulators.pqc_trainer",
+        "MultiStartTrainer": "qleet.simulators.pqc_trainer",
+        "QAOACircuitMaxCut": "qleet.examples.qaoa_maxcut",
+        "MaxCutMetric": "qleet.examples.qaoa_maxcut",
+    },
+)
 
-from qleet.analyzers.training_path import OptimizationPathPlotter
-from qleet.analyzers.loss_landscape import LossLandscapePlotter
-from qleet.analyzers.expressibility import Expressibility
-from qleet.analyzers.entanglement import EntanglementCapability
-from qleet.analyzers.entanglement_spectrum import EntanglementSpectrum
-from qleet.analyzers.histogram import ParameterHistograms
+if typing.TYPE_CHECKING:
+    from qleet.interface.metas import AnalyzerList
+    from qleet.interface.circuit import CircuitDescriptor
 
-from qleet.simulators.circuit_simulators import CircuitSimulator
-from qleet.simulators.pqc_trainer import PQCSimulatedTrainer
+    from qleet.analyzers.training_path import OptimizationPathPlotter
+    from qleet.analyzers.loss_landscape import LossLandscapePlotter
+    from qleet.analyzers.expressibility import Expressibility
+    from qleet.analyzers.entanglement import EntanglementCapability
+    from qleet.analyzers.entanglement_spectrum import EntanglementSpectrum
+    from qleet.analyzers.histogram import ParameterHistograms
 
-from qleet.examples.qaoa_maxcut import QAOACircuitMaxCut, MaxCutMetric
-from qleet._version import __version__
+    from qleet.simulators.circuit_simulators import CircuitSimulator
+    from qleet.simulators.cache import SimulationCache
+    from qleet.simulators.planner import SimulationPlanner
+    from qleet.simulators.pqc_trainer import PQCSimulatedTrainer, MultiStartTrainer
 
-os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+    from qleet.examples.qaoa_maxcut import QAOACircuitMaxCut, MaxCutMetric
@@ -0,0 +1,106 @@
+"""Helpers to defer importing subpackages and the quantum frameworks until they are used.
+
+Importing tensorflow, qiskit, pyquil and cirq takes seconds and a lot of memory, and most
+uses of qLEET only need one of them. The packages resolve their submodules and exported
+names on first attribute access, and modules refer to the frameworks through
+`LazyModule` proxies which import the framework when one of its attributes is first used.
+
+Objects are checked against framework classes with `isinstance_of`, which never imports a
+framework, an object can only be an instance of a class from an already imported module.
+"""
+
+import importlib
+import sys
+import types
+import typing
+
+if typing.TYPE_CHECKING:
+    from typing_extensions import TypeGuard
+
+
+class LazyModule(types.ModuleType):
+    """Proxy for a module which is imported on the first access of one of its attributes."""
+
+    def __init__(self, name: str) -> None:
+        """Constructs the proxy without importing the module.
+
+        :type name: str
+        :param name: The fully qualified name of the module
+        """
+        super().__init__(name)
+        self._module: typing.Optional[types.ModuleType] = None
+
+    def __getattr__(self, attr: str) -> typing.Any:
+        """Imports the module if needed, and returns the attribute from it.
+
+        :type attr: str
+        :param attr: Name of the attribute
+        :returns: The attribute of the proxied module
+        """
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return getattr(self._module, attr)
+
+
+def lazy_module(name: str) -> typing.Any:
+    """Creates a proxy which imports the module when it is first used.
+
+    :type name: str
+    :param name: The fully qualified name of the module
+    :returns: The module proxy
+    :rtype: LazyModule
+    """
+    return LazyModule(name)
+
+
+def isinstance_of(
+    obj: typing.Any, module: str, class_name: str
+) -> "TypeGuard[typing.Any]":
+    """Checks if an object is an instance of a class, without importing its module.
+
+    :type obj: Any
+    :param obj: The object to check
+    :type module: str
+    :param module: The fully qualified name of the module which defines the class
+    :type class_name: str
+    :param class_name: The name of the class in that module
+    :returns: Whether the object is an instance of the class
+    :rtype: bool
+    """
+    loaded = sys.modules.get(module)
+    return loaded is not None and isinstance(obj, getattr(loaded, class_name))
+
+
+def lazy_package(
+    package: str,
+    submodules: typing.Iterable[str],
+    exports: typing.Optional[typing.Dict[str, str]] = None,
+) -> typing.Tuple[
+    typing.Callable[[str], typing.Any], typing.Callable[[], typing.List[str]]
+]:
+    """Builds the module level `__getattr__` and `__dir__` of a lazily loaded package.
+
+    :type package: str
+    :param package: The name of the package, the `__name__` of its `__init__`
+    :type submodules: Iterable of str
+    :param submodules: Names of the submodules, imported when first accessed
+    :type exports: dict mapping str to str, optional
+    :param exports: Names exported by the package, mapped to the modules defining them
+    :returns: The `__getattr__` and `__dir__` functions for the package
+    """
+    submodules = tuple(submodules)
+    exports = dict(exports or {})
+
+    def __getattr__(name: str) -> typing.Any:
+        if name in submodules:
+            return importlib.import_module(f"{package}.{name}")
+        if name in exports:
+            value = getattr(importlib.import_module(exports[name]), name)
+            setattr(sys.modules[package], name, value)
+            return value
+        raise AttributeError(f"module '{package}' has no attribute '{name}'")
+
+    def __dir__() -> typing.List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(submodules) | set(exports))
+
+    return __getattr__, __dir__
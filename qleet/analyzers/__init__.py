@@ -1,6 +1,16 @@
-import qleet.analyzers.loss_landscape
-import qleet.analyzers.training_path
-import qleet.analyzers.entanglement
-import qleet.analyzers.expressibility
-import qleet.analyzers.histogram
-import qleet.analyzers.entanglement_spectrum
+"""Analyzers of the loss landscape, training paths, expressibility and entanglement."""
+
+from .._lazy import lazy_package
+
+__getattr__, __dir__ = lazy_package(
+    __name__,
+    submodules=[
+        "loss_landscape",
+        "training_path",
+        "entanglement",
+        "expressibility",
+        "histogram",
+        "entanglement_spectrum",
+        "adaptive",
+    ],
+)
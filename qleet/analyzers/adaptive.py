@@ -0,0 +1,259 @@
+"""Module to estimate the measures of the analyzers to a requested precision.
+
+The expressibility, the entangling capability and the entanglement spectrum are estimated
+from a number of sampled parameters which is otherwise fixed up front, and reported
+without an error bar. In the adaptive mode the samples are instead drawn in growing
+batches, and after every batch a confidence interval on the measure is computed by
+resampling the samples drawn so far, with the bootstrap or the jackknife. The sampling
+stops as soon as the interval is narrower than the requested tolerance, or when the
+largest number of samples is reached. Given a `Budget`, the sampling is anytime: the
+batches are shrunk to what the remaining budget affords, at the rate of the previous
+batch, and the estimate of the samples drawn so far is returned once it runs out, with
+the interval it reached. Under a deadline the sampling starts with a small pilot batch,
+so that even the first full batch is sized from the measured cost of a sample. A budget
+which cannot afford the two samples of an interval draws none, and the estimate is NaN.
+
+The analyzers describe their measure as a statistic of the indices of the samples it is
+computed from, so the resampling only recomputes the statistic from quantities which are
+already simulated, like the fidelities or the purities of the states, and never simulates
+the circuit again.
+"""
+
+import time
+import typing
+
+import numpy as np
+from scipy.stats import norm
+
+from ..interface.budget import Budget
+from ..interface.instrumentation import count, span
+from ..simulators.sampling import Seed
+
+INTERVAL_METHODS = ("bootstrap", "jackknife")
+DEFAULT_RESAMPLES = 200
+# Number of samples of the batch which times a sample before a deadline
+PILOT_SAMPLES = 2
+
+
+class Estimate(typing.NamedTuple):
+    """A measure estimated from samples, with its confidence interval."""
+
+    value: typing.Any
+    low: typing.Any
+    high: typing.Any
+    samples: int
+    converged: bool
+
+    @property
+    def width(self) -> float:
+        """The width of the confidence interval, the largest one for vector measures"""
+        return float(np.max(np.asarray(self.high) - np.asarray(self.low)))
+
+
+def bootstrap_interval(
+    statistic: typing.Callable[[np.ndarray], typing.Any],
+    num_samples: int,
+    confidence: float = 0.95,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: Seed = None,
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Percentile bootstrap confidence interval of a statistic of samples.
+
+    :type statistic: Callable
+    :param statistic: The statistic, a function of the indices of the samples it is
+        computed from, which may repeat
+    :type num_samples: int
+    :param num_samples: The number of samples
+    :type confidence: float
+    :param confidence: The confidence level of the interval
+    :type resamples: int
+    :param resamples: The number of bootstrap resamples
+    :type seed: int or np.random.Generator, optional
+    :param seed: The seed or the generator of the resamples, if None it is drawn from
+        the global numpy random state
+    :returns: the lower and the upper bounds of the interval
+    :rtype: tuple of np.ndarray
+    """
+    if seed is None:
+        seed = np.random.randint(2**31)
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, num_samples, size=(resamples, num_samples))
+    values = np.array([statistic(row) for row in indices])
+    tail = 50 * (1 - confidence)
+    return (
+        np.percentile(values, tail, axis=0),
+        np.percentile(values, 100 - tail, axis=0),
+    )
+
+
+def jackknife_interval(
+    statistic: typing.Callable[[np.ndarray], typing.Any],
+    num_samples: int,
+    confidence: float = 0.95,
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Jackknife confidence interval of a statistic of samples, from the normal
+    approximation with the jackknife estimate of its standard error.
+
+    :type statistic: Callable
+    :param statistic: The statistic, a function of the indices of the samples it is
+        computed from
+    :type num_samples: int
+    :param num_samples: The number of samples, at least two
+    :type confidence: float
+    :param confidence: The confidence level of the interval
+    :returns: the lower and the upper bounds of the interval
+    :rtype: tuple of np.ndarray
+    """
+    assert num_samples > 1, "The jackknife needs at least two samples"
+    everything = np.arange(num_samples)
+    values = np.array(
+        [statistic(np.delete(everything, idx)) for idx in range(num_samples)]
+    )
+    variance = (num_samples - 1) * np.mean(
+        (values - np.mean(values, axis=0)) ** 2, axis=0
+    )
+    center = np.asarray(statistic(everything))
+    half_width = norm.ppf(0.5 + confidence / 2) * np.sqrt(variance)
+    return center - half_width, center + half_width
+
+
+def confidence_interval(
+    statistic: typing.Callable[[np.ndarray], typing.Any],
+    num_samples: int,
+    method: str = "bootstrap",
+    confidence: float = 0.95,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: Seed = None,
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Confidence interval of a statistic of samples, see `bootstrap_interval` and
+    `jackknife_interval`.
+
+    :type statistic: Callable
+    :param statistic: The statistic, a function of the indices of the samples it is
+        computed from, which may repeat
+    :type num_samples: int
+    :param num_samples: The number of samples, at least two for the jackknife
+    :type method: str
+    :param method: The resampling method, one of `INTERVAL_METHODS`
+    :type confidence: float
+    :param confidence: The confidence level of the interval
+    :type resamples: int
+    :param resamples: The number of bootstrap resamples, unused by the jackknife
+    :type seed: int or np.random.Generator, optional
+    :param seed: The seed or the generator of the bootstrap resamples, unused by the
+        jackknife
+    :returns: the lower and the upper bounds of the interval
+    :rtype: tuple of np.ndarray
+    :raises ValueError: if the method is not known
+    """
+    if method == "bootstrap":
+        return bootstrap_interval(statistic, num_samples, confidence, resamples, seed)
+    if method == "jackknife":
+        return jackknife_interval(statistic, num_samples, confidence)
+    raise ValueError(
+        f"Unknown interval method {method}, expected one of {INTERVAL_METHODS}"
+    )
+
+
+def adaptive_estimate(
+    sample: typing.Callable[[int], None],
+    statistic: typing.Callable[[np.ndarray], typing.Any],
+    tolerance: float,
+    initial_samples: int,
+    max_samples: int,
+    growth: float = 2.0,
+    method: str = "bootstrap",
+    confidence: float = 0.95,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: Seed = None,
+    budget: typing.Optional[Budget] = None,
+) -> Estimate:
+    """Draws samples in growing batches until the confidence interval of the statistic
+    is narrower than the tolerance.
+
+    :type sample: Callable
+    :param sample: Draws and simulates the given number of additional samples
+    :type statistic: Callable
+    :param statistic: The measure, a function of the indices of the samples drawn so
+        far which it is computed from
+    :type tolerance: float
+    :param tolerance: The largest width of the confidence interval
+    :type initial_samples: int
+    :param initial_samples: The number of samples of the first batch, at least two
+    :type max_samples: int
+    :param max_samples: The number of samples after which the sampling stops, whether
+        the interval is narrow enough or not
+    :type growth: float
+    :param growth: The factor by which the number of samples grows after every batch
+    :type method: str
+    :param method: The resampling method of the interval, one of `INTERVAL_METHODS`
+    :type confidence: float
+    :param confidence: The confidence level of the interval
+    :type resamples: int
+    :param resamples: The number of bootstrap resamples
+    :type seed: int or np.random.Generator, optional
+    :param seed: The seed or the generator of the bootstrap resamples
+    :type budget: Budget, optional
+    :param budget: The time and the number of samples available, the first batch is a
+        pilot batch of `PILOT_SAMPLES` samples if the budget has a deadline, and no
+        sample is drawn if the budget cannot afford two of them
+    :returns: the measure of all the samples, its interval, the number of samples drawn
+        and whether the interval is narrower than the tolerance, the measure and its
+        interval are NaN if no sample is drawn
+    :rtype: Estimate
+    :raises ValueError: if the method is not known, or the numbers of samples are invalid
+    """
+    if method not in INTERVAL_METHODS:
+        raise ValueError(
+            f"Unknown interval method {method}, expected one of {INTERVAL_METHODS}"
+        )
+    if not 2 <= initial_samples <= max_samples or growth <= 1:
+        raise ValueError(
+            "Expected 2 <= initial_samples <= max_samples and a growth larger than 1"
+        )
+    if seed is None:
+        seed = np.random.randint(2**31)
+    rng = np.random.default_rng(seed)
+    num_samples, target = 0, initial_samples
+    if budget is not None and budget.seconds is not None:
+        target = min(PILOT_SAMPLES, initial_samples)
+    clock = time.perf_counter
+    if budget is not None:
+        clock = budget.clock
+        target = budget.affordable(target)
+        if target < 2:
+            # No interval without two samples, and the budget affords no more
+            return Estimate(float("nan"), float("nan"), float("nan"), 0, False)
+    while True:
+        started = clock()
+        sample(target - num_samples)
+        count("adaptive.batches")
+        with span("adaptive.interval"):
+            low, high = confidence_interval(
+                statistic, target, method, confidence, resamples, rng
+            )
+        seconds_each = (clock() - started) / (target - num_samples)
+        if budget is not None:
+            budget.spend(target - num_samples)
+        num_samples = target
+        estimate = Estimate(
+            statistic(np.arange(num_samples)),
+            low,
+            high,
+            num_samples,
+            float(np.max(high - low)) <= tolerance,
+        )
+        if num_samples >= max_samples:
+            return estimate
+        if num_samples < initial_samples:
+            # The pilot batch is followed by the first full batch
+            target = initial_samples
+        elif estimate.converged:
+            return estimate
+        else:
+            target = min(max(int(growth * num_samples), num_samples + 1), max_samples)
+        if budget is not None:
+            affordable = budget.affordable(target - num_samples, seconds_each)
+            if affordable == 0:
+                return estimate
+            target = num_samples + affordable
@@ -1,26 +1,34 @@
 """Module to evaluate the achievable entanglement in circuits."""
 
+from __future__ import annotations
+
 import itertools
 import typing
 
-from qiskit.providers.aer.noise import NoiseModel as qiskitNoiseModel
-from cirq.devices.noise_model import NoiseModel as cirqNoiseModel
-from pyquil.noise import NoiseModel as pyquilNoiseModel
-
-from qiskit.quantum_info import partial_trace
 from scipy.special import comb
 
 import numpy as np
 
+from .adaptive import DEFAULT_RESAMPLES, Estimate, adaptive_estimate
 from ..interface.metas import MetaExplorer
 from ..interface.circuit import CircuitDescriptor
-from ..simulators.circuit_simulators import CircuitSimulator
+from ..interface.budget import Budget
+from ..interface.checkpoint import Checkpointer
+from ..interface.instrumentation import span
+from ..simulators.cache import SimulationCache
+from ..simulators.circuit_simulators import CircuitSimulator, is_noise_model_of
+from ..simulators.mps_simulator import MPS
+from ..simulators.parameters import PARAMETER_SAMPLERS, sample_parameters
+from ..simulators.planner import SimulationPlanner
+from ..simulators.sampling import Seed
+from ..simulators.stabilizer import StabilizerState
+from ..simulators.state_store import stream_purities
+from ..simulators.trajectories import TrajectoryEnsemble
 
-NOISE_MODELS = {
-    "cirq": cirqNoiseModel,
-    "pyquil": pyquilNoiseModel,
-    "qiskit": qiskitNoiseModel,
-}
+if typing.TYPE_CHECKING:
+    from qiskit.providers.aer.noise import NoiseModel as qiskitNoiseModel
+    from cirq.devices.noise_model import NoiseModel as cirqNoiseModel
+    from pyquil.noise import NoiseModel as pyquilNoiseModel
 
 
 class EntanglementCapability(MetaExplorer):
@@ -33,6 +41,11 @@ class EntanglementCapability(MetaExplorer):
             cirqNoiseModel, qiskitNoiseModel, pyquilNoiseModel, None
         ] = None,
         samples: int = 1000,
+        checkpoint: typing.Optional[Checkpointer] = None,
+        cache: typing.Optional[SimulationCache] = None,
+        planner: typing.Optional[SimulationPlanner] = None,
+        seed: Seed = None,
+        sampler: str = "random",
     ):
         """Constructor for entanglement capability plotter
 
@@ -40,27 +53,25 @@ class EntanglementCapability(MetaExplorer):
         :param noise_model:  (dict, NoiseModel) initialization noise-model dictionary for
             generating noise model
         :param samples: number of samples for the experiment
+        :param checkpoint: checkpointer to save the sampled states to, and resume from
+        :param cache: cache to look the sampled states up in, and store them to
+        :param planner: planner of the simulations, which can choose to simulate wide
+            circuits with little entanglement as matrix product states, noisy circuits
+            with Monte Carlo trajectories, and Clifford samples with stabilizer tableaus
+        :param seed: seed or generator of the sampled parameters, if None they are
+            drawn from the global numpy random state
+        :param sampler: how the parameters are sampled, independently at "random",
+            or as the points of a scrambled "sobol" or "halton" sequence, which
+            converge with fewer samples
         :returns Entanglement object instance
         :raises ValueError: If circuit and noise model does not correspond to same framework
+        :raises ValueError: If the sampler is not known
         """
         super().__init__()
         self.circuit = circuit
 
         if noise_model is not None:
-            if (
-                (
-                    circuit.default_backend == "cirq"
-                    and isinstance(noise_model, cirqNoiseModel)
-                )
-                or (
-                    circuit.default_backend == "qiskit"
-                    and isinstance(noise_model, qiskitNoiseModel)
-                )
-                or (
-                    circuit.default_backend == "pyquil"
-                    and isinstance(noise_model, pyquilNoiseModel)
-                )
-            ):
+            if is_noise_model_of(noise_model, circuit.default_backend):
                 self.noise_model = noise_model
             else:
                 raise ValueError(
@@ -72,31 +83,70 @@ class EntanglementCapability(MetaExplorer):
             self.noise_model = None
 
         self.num_samples = samples
+        self.checkpoint = checkpoint
+        self.cache = cache
+        self.planner = planner
+        if sampler not in PARAMETER_SAMPLERS:
+            raise ValueError(
+                f"Unknown sampler {sampler}, expected one of {PARAMETER_SAMPLERS}"
+            )
+        self.sampler = sampler
+        self.rng = None if seed is None else np.random.default_rng(seed)
+        # Checked when resuming from a checkpoint, generators can not be compared
+        self.seed = seed if isinstance(seed, (int, np.integer)) else None
 
-    def gen_params(self) -> typing.Tuple[typing.List, typing.List]:
+    def gen_params(
+        self, num_samples: typing.Optional[int] = None
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
         """Generate parameters for the calculation of expressibility
 
-        :return theta (np.array): first list of parameters for the parameterized quantum circuit
-        :return phi (np.array): second list of parameters for the parameterized quantum circuit
+        :param num_samples: number of samples, `samples` by default
+        :returns theta (np.array): first set of parameters for the parameterized quantum
+            circuit, one row per sample in the order of `circuit.parameters`
+        :returns phi (np.array): second set of parameters for the parameterized quantum
+            circuit, one row per sample in the order of `circuit.parameters`
         """
-        theta = [
-            {p: 2 * np.random.random() * np.pi for p in self.circuit.parameters}
-            for _ in range(self.num_samples)
-        ]
-        phi = [
-            {p: 2 * np.random.random() * np.pi for p in self.circuit.parameters}
-            for _ in range(self.num_samples)
-        ]
+        if num_samples is None:
+            num_samples = self.num_samples
+        num_params = len(self.circuit.parameters)
+        theta = sample_parameters(num_samples, num_params, self.rng, self.sampler)
+        phi = sample_parameters(num_samples, num_params, self.rng, self.sampler)
         return theta, phi
 
     @staticmethod
     def scott_helper(state, perms):
         """Helper function for entanglement measure. It gives trace of the output state"""
-        dems = np.linalg.matrix_power(
-            [partial_trace(state, list(qb)).data for qb in perms], 2
-        )
-        trace = np.trace(dems, axis1=1, axis2=2)
-        return np.sum(trace).real
+        if isinstance(state, (MPS, TrajectoryEnsemble, StabilizerState)):
+            qubits = set(range(state.num_qubits))
+            return sum(state.purity(sorted(qubits - set(qb))) for qb in perms)
+        state = np.asarray(state)
+        return EntanglementCapability.purity_sums(state[np.newaxis], perms)[0]
+
+    @staticmethod
+    def purity_sums(states: np.ndarray, perms) -> np.ndarray:
+        """Sums of the purities of the reduced states left by tracing out the qubits of
+        every permutation, streamed over a stack of dense states block by block.
+        The qubits are numbered like in `qiskit.quantum_info.partial_trace`, from the least
+        significant bit of the index of an amplitude.
+
+        :param states: stack of state vectors or density matrices, possibly memory-mapped
+        :param perms: the sets of qubits traced out
+        :returns: the sum of the purities for every state
+        """
+        num_qubits = int(np.log2(states.shape[-1]))
+        subsystems = [
+            sorted(
+                num_qubits - 1 - qubit for qubit in range(num_qubits) if qubit not in qb
+            )
+            for qb in perms
+        ]
+        return np.sum(stream_purities(states, subsystems), axis=1)
+
+    def _purity_sums(self, states, perms) -> np.ndarray:
+        """Sums of the purities of every state, see `scott_helper`"""
+        if isinstance(states, np.ndarray):
+            return self.purity_sums(states, perms)
+        return np.array([self.scott_helper(state, perms) for state in states])
 
     def meyer_wallach_measure(self, states, num_qubits):
         r"""Returns the meyer-wallach entanglement measure for the given circuit.
@@ -106,14 +156,12 @@ class EntanglementCapability(MetaExplorer):
             \Bigg(1-\frac{1}{n}\sum_{k=1}^{n}Tr(\rho_{k}^{2}(\theta_{i}))\Bigg)
 
         """
+        return np.sum(self.meyer_wallach_values(states, num_qubits)).real
+
+    def meyer_wallach_values(self, states, num_qubits) -> np.ndarray:
+        """Returns the terms of the meyer-wallach measure of every state"""
         permutations = list(itertools.combinations(range(num_qubits), num_qubits - 1))
-        ns = 2 * sum(
-            [
-                1 - 1 / num_qubits * self.scott_helper(state, permutations)
-                for state in states
-            ]
-        )
-        return ns.real
+        return 2 * (1 - 1 / num_qubits * self._purity_sums(states, permutations))
 
     def scott_measure(self, states, num_qubits):
         r"""Returns the scott entanglement measure for the given circuit.
@@ -124,6 +172,10 @@ class EntanglementCapability(MetaExplorer):
             \quad m= 1, \ldots, \lfloor n/2 \rfloor
 
         """
+        return np.sum(self.scott_values(states, num_qubits), axis=0)
+
+    def scott_values(self, states, num_qubits) -> np.ndarray:
+        """Returns the terms of the scott measures of every state, one column per m"""
         m = range(1, num_qubits // 2 + 1)
         permutations = [
             list(itertools.combinations(range(num_qubits), num_qubits - idx))
@@ -136,15 +188,40 @@ class EntanglementCapability(MetaExplorer):
         for ind, perm in enumerate(permutations):
             ns.append(
                 contributions[ind]
-                * sum(
-                    [
-                        1 - combinations[ind] * self.scott_helper(state, perm)
-                        for state in states
-                    ]
-                )
+                * (1 - combinations[ind] * self._purity_sums(states, perm))
             )
 
-        return np.array(ns)
+        return np.stack(ns, axis=-1)
+
+    def _state_values(
+        self,
+        simulator: CircuitSimulator,
+        params: np.ndarray,
+        measure: str,
+        shots: int,
+        name: str,
+        checkpoint: typing.Optional[Checkpointer] = None,
+    ) -> np.ndarray:
+        """Simulates the circuit for every set of parameters, and returns the terms of
+        the measure of every state, see `meyer_wallach_values` and `scott_values`"""
+        states: typing.Union[typing.List[typing.Any], np.ndarray]
+        with span("entanglement.simulate"):
+            if self.planner is not None:
+                states = simulator.simulate_compact(params, shots, checkpoint, name)
+            else:
+                # The stack may be memory-mapped, it is measured block by block
+                states = simulator.simulate_batch(params, shots, checkpoint, name)
+
+        num_qubits = self.circuit.num_qubits
+
+        with span("entanglement.measure"):
+            if measure == "meyer-wallach":
+                return self.meyer_wallach_values(states, num_qubits).real
+            if measure == "scott":
+                return self.scott_values(states, num_qubits)
+            raise ValueError(
+                "Invalid measure provided, choose from 'meyer-wallach' or 'scott'"
+            )
 
     def entanglement_capability(
         self, measure: str = "meyer-wallach", shots: int = 1024
@@ -156,30 +233,120 @@ class EntanglementCapability(MetaExplorer):
         :returns pqc_entangling_capability (float): entanglement measure value
         :raises ValueError: if invalid measure is specified
         """
-        thetas, phis = self.gen_params()
+        if self.checkpoint is None:
+            thetas, phis = self.gen_params()
+        else:
+            thetas, phis = self.checkpoint.load_or_create(
+                "parameters",
+                self.gen_params,
+                {
+                    "samples": self.num_samples,
+                    "sampler": self.sampler,
+                    "seed": self.seed,
+                },
+            )
 
-        theta_circuits = [
-            CircuitSimulator(self.circuit, self.noise_model).simulate(theta, shots)
-            for theta in thetas
-        ]
-        phi_circuits = [
-            CircuitSimulator(self.circuit, self.noise_model).simulate(phi, shots)
-            for phi in phis
+        simulator = CircuitSimulator(
+            self.circuit, self.noise_model, self.cache, self.planner
+        )
+        values = [
+            self._state_values(simulator, params, measure, shots, name, self.checkpoint)
+            for params, name in ((thetas, "theta_states"), (phis, "phi_states"))
         ]
+        pqc_entanglement_capability = np.sum(np.concatenate(values), axis=0) / (
+            2 * self.num_samples
+        )
 
-        num_qubits = self.circuit.num_qubits
+        return pqc_entanglement_capability
 
-        if measure == "meyer-wallach":
-            pqc_entanglement_capability = self.meyer_wallach_measure(
-                theta_circuits + phi_circuits, num_qubits
-            ) / (2 * self.num_samples)
-        elif measure == "scott":
-            pqc_entanglement_capability = self.scott_measure(
-                theta_circuits + phi_circuits, num_qubits
-            ) / (2 * self.num_samples)
-        else:
+    def estimate(
+        self,
+        budget: typing.Optional[Budget] = None,
+        tolerance: float = 0.0,
+        **options: typing.Any,
+    ) -> Estimate:
+        """Estimates the entanglement capability in anytime mode, see
+        `MetaExplorer.estimate`.
+
+        :param budget: time and number of samples available
+        :param tolerance: largest width of the confidence interval of the measure, 0 to
+            refine it for as long as the budget allows
+        :param options: the measure, shots and interval options of
+            `estimate_entanglement_capability`
+        :returns estimate (Estimate): entanglement measure value, its interval, and the
+            number of samples drawn
+        """
+        return self.estimate_entanglement_capability(
+            tolerance=tolerance, budget=budget, **options
+        )
+
+    def estimate_entanglement_capability(
+        self,
+        measure: str = "meyer-wallach",
+        tolerance: float = 1e-2,
+        shots: int = 1024,
+        max_samples: typing.Optional[int] = None,
+        interval: str = "bootstrap",
+        confidence: float = 0.95,
+        resamples: int = DEFAULT_RESAMPLES,
+        budget: typing.Optional[Budget] = None,
+    ) -> Estimate:
+        """Estimates the entanglement measure adaptively, from batches of samples growing
+        from `samples` until the width of its confidence interval is below the tolerance.
+        Every sample is a pair of parameters, whose states contribute to the measure
+        together, and the measure of all the samples drawn is the entanglement measure
+        of that many samples. The states are not checkpointed.
+
+        :param measure: specification for the measure used in the entangling capability
+        :param tolerance: largest width of the confidence interval of the measure
+        :param shots: number of shots for circuit execution
+        :param max_samples: number of samples after which the sampling stops, 16 times
+            `samples` by default
+        :param interval: resampling method of the interval, "bootstrap" or "jackknife"
+        :param confidence: confidence level of the interval
+        :param resamples: number of bootstrap resamples
+        :param budget: time and number of samples available, in anytime mode the
+            estimate of the samples drawn so far is returned once it runs out
+        :returns estimate (Estimate): entanglement measure value, its interval, and the
+            number of samples drawn
+        :raises ValueError: if invalid measure is specified
+        """
+        if measure not in ("meyer-wallach", "scott"):
             raise ValueError(
                 "Invalid measure provided, choose from 'meyer-wallach' or 'scott'"
             )
+        simulator = CircuitSimulator(
+            self.circuit, self.noise_model, self.cache, self.planner
+        )
+        # The mean of the terms of the two states of every sample drawn so far
+        sample_values = np.zeros(0)
 
-        return pqc_entanglement_capability
+        def sample(num_samples: int) -> None:
+            nonlocal sample_values
+            thetas, phis = self.gen_params(num_samples)
+            theta_values, phi_values = (
+                self._state_values(simulator, params, measure, shots, name)
+                for params, name in ((thetas, "theta_states"), (phis, "phi_states"))
+            )
+            new_values = (theta_values + phi_values) / 2
+            if len(sample_values) == 0:
+                sample_values = new_values
+            else:
+                sample_values = np.concatenate([sample_values, new_values])
+
+        def statistic(indices: np.ndarray) -> np.ndarray:
+            return np.mean(sample_values[indices], axis=0)
+
+        estimate = adaptive_estimate(
+            sample,
+            statistic,
+            tolerance,
+            self.num_samples,
+            max_samples or 16 * self.num_samples,
+            method=interval,
+            confidence=confidence,
+            resamples=resamples,
+            seed=self.rng,
+            budget=budget,
+        )
+        return estimate
@@ -1,28 +1,38 @@
 """Module to evaluate the entanglement spectrum of circuits."""
 
-import typing
+from __future__ import annotations
 
-from qiskit.providers.aer.noise import NoiseModel as qiskitNoiseModel
-from cirq.devices.noise_model import NoiseModel as cirqNoiseModel
-from pyquil.noise import NoiseModel as pyquilNoiseModel
+import typing
 
-from qiskit.quantum_info import partial_trace
 from scipy.spatial.distance import jensenshannon
 
-import matplotlib
-import matplotlib.pyplot as plt
 import numpy as np
 import scipy as sp
 
+from .adaptive import DEFAULT_RESAMPLES, Estimate, adaptive_estimate
+from .._lazy import lazy_module
 from ..interface.metas import MetaExplorer
 from ..interface.circuit import CircuitDescriptor
-from ..simulators.circuit_simulators import CircuitSimulator
-
-NOISE_MODELS = {
-    "cirq": cirqNoiseModel,
-    "pyquil": pyquilNoiseModel,
-    "qiskit": qiskitNoiseModel,
-}
+from ..interface.budget import Budget
+from ..interface.checkpoint import Checkpointer
+from ..interface.instrumentation import span, timed
+from ..simulators.cache import SimulationCache
+from ..simulators.circuit_simulators import CircuitSimulator, is_noise_model_of
+from ..simulators.mps_simulator import MPS
+from ..simulators.parameters import PARAMETER_SAMPLERS, sample_parameters
+from ..simulators.planner import SimulationPlanner
+from ..simulators.sampling import Seed
+from ..simulators.stabilizer import StabilizerState
+from ..simulators.trajectories import TrajectoryEnsemble
+
+if typing.TYPE_CHECKING:
+    from qiskit.providers.aer.noise import NoiseModel as qiskitNoiseModel
+    from cirq.devices.noise_model import NoiseModel as cirqNoiseModel
+    from pyquil.noise import NoiseModel as pyquilNoiseModel
+
+quantum_info = lazy_module("qiskit.quantum_info")
+plt = lazy_module("matplotlib.pyplot")
+mcolors = lazy_module("matplotlib.colors")
 
 
 class EntanglementSpectrum(MetaExplorer):
@@ -37,6 +47,11 @@ class EntanglementSpectrum(MetaExplorer):
         samples: int = 1000,
         tapered_indices: tuple = tuple(),
         cutoff: int = -30,
+        checkpoint: typing.Optional[Checkpointer] = None,
+        cache: typing.Optional[SimulationCache] = None,
+        planner: typing.Optional[SimulationPlanner] = None,
+        seed: Seed = None,
+        sampler: str = "random",
     ):
         """Constructor the the Expresssibility analyzer
 
@@ -45,26 +60,24 @@ class EntanglementSpectrum(MetaExplorer):
         :param samples: number of samples for the experiment
         :param tapered_indices: qubits to be tapered for bipartiting the system
         :param cutoff: minimum cutoff value for the eigenvalues
+        :param checkpoint: checkpointer to save the sampled states to, and resume from
+        :param cache: cache to look the sampled states up in, and store them to
+        :param planner: planner of the simulations, which can choose to simulate wide
+            circuits with little entanglement as matrix product states, noisy circuits
+            with Monte Carlo trajectories, and Clifford samples with stabilizer tableaus
+        :param seed: seed or generator of the sampled parameters, if None they are
+            drawn from the global numpy random state
+        :param sampler: how the parameters are sampled, independently at "random",
+            or as the points of a scrambled "sobol" or "halton" sequence, which
+            converge with fewer samples
         :raises ValueError: If circuit and noise model does not correspond to same framework
+        :raises ValueError: If the sampler is not known
         """
         super().__init__()
         self.circuit = circuit
 
         if noise_model is not None:
-            if (
-                (
-                    circuit.default_backend == "cirq"
-                    and isinstance(noise_model, cirqNoiseModel)
-                )
-                or (
-                    circuit.default_backend == "qiskit"
-                    and isinstance(noise_model, qiskitNoiseModel)
-                )
-                or (
-                    circuit.default_backend == "pyquil"
-                    and isinstance(noise_model, pyquilNoiseModel)
-                )
-            ):
+            if is_noise_model_of(noise_model, circuit.default_backend):
                 self.noise_model = noise_model
             else:
                 raise ValueError(
@@ -76,6 +89,17 @@ class EntanglementSpectrum(MetaExplorer):
             self.noise_model = None
 
         self.num_samples = samples
+        self.checkpoint = checkpoint
+        self.cache = cache
+        self.planner = planner
+        if sampler not in PARAMETER_SAMPLERS:
+            raise ValueError(
+                f"Unknown sampler {sampler}, expected one of {PARAMETER_SAMPLERS}"
+            )
+        self.sampler = sampler
+        self.rng = None if seed is None else np.random.default_rng(seed)
+        # Checked when resuming from a checkpoint, generators can not be compared
+        self.seed = seed if isinstance(seed, (int, np.integer)) else None
         self.ent_spec = 0.0
         self.cutoff = cutoff
         if tapered_indices:
@@ -117,16 +141,71 @@ class EntanglementSpectrum(MetaExplorer):
         cum_values[1:] = np.cumsum(hist * np.diff(bin_edges))
         return sp.interpolate.interp1d(cum_values, bin_edges)(np.random.rand(n_samples))
 
-    def gen_params(self) -> typing.List[typing.Dict[typing.Any, typing.Any]]:
+    def gen_params(self, num_samples: typing.Optional[int] = None) -> np.ndarray:
         """Generate parameters for the calculation of expressibility
 
-        :returns theta: first list of parameters for the parameterized quantum circuit
+        :param num_samples: number of samples, `samples` by default
+        :returns theta: parameters for the parameterized quantum circuit, one row per
+            sample in the order of `circuit.parameters`
         """
-        theta = [
-            {p: 2 * np.random.random() * np.pi for p in self.circuit.parameters}
-            for _ in range(self.num_samples)
-        ]
-        return theta
+        if num_samples is None:
+            num_samples = self.num_samples
+        return sample_parameters(
+            num_samples, len(self.circuit.parameters), self.rng, self.sampler
+        )
+
+    def entanglement_energies(
+        self,
+        state: typing.Union[np.ndarray, MPS, TrajectoryEnsemble, StabilizerState],
+        size: typing.Optional[int] = None,
+    ) -> np.ndarray:
+        """Returns the spectrum of the entanglement hamiltonian -log(rho) of the kept qubits.
+        It is read off the Schmidt coefficients of a matrix product state if the tapered
+        qubits are at one end of the chain, off the entanglement entropy of a stabilizer
+        state, whose spectrum is flat, and off the reduced density matrix otherwise.
+        Vanishing eigenvalues of rho are clipped to exp(cutoff), and the spectrum is padded
+        with them, or cut to its largest eigenvalues, to a common size.
+
+        :param state: the simulated state vector or density matrix, or compact state
+        :param size: the number of eigenvalues, 2^k for k kept qubits by default, capped
+            by the bond dimension of the planner for matrix product states
+        :returns: the sorted entanglement energies
+        """
+        if isinstance(state, np.ndarray):
+            rho = -sp.linalg.logm(
+                quantum_info.partial_trace(state, self.tapered_indices).data
+            )
+            return np.round(np.sort(np.linalg.eigvals(rho)), 5)
+        num_qubits = state.num_qubits
+        # The tapered indices follow qiskit, which numbers the qubits of cirq in reverse
+        if self.circuit.default_backend == "qiskit":
+            tapered = set(self.tapered_indices)
+        else:
+            tapered = {num_qubits - 1 - idx for idx in self.tapered_indices}
+        kept = sorted(set(range(num_qubits)) - tapered)
+        if size is None:
+            size = 2 ** len(kept)
+            if (
+                isinstance(state, MPS)
+                and self.planner is not None
+                and self.planner.max_bond_dimension is not None
+            ):
+                size = min(size, self.planner.max_bond_dimension)
+        if isinstance(state, StabilizerState):
+            entropy = state.entanglement_entropy(kept)
+            probabilities = np.full(min(2**entropy, size), 2.0**-entropy)
+        elif isinstance(state, MPS) and (
+            kept == list(range(len(kept)))
+            or kept == list(range(num_qubits - len(kept), num_qubits))
+        ):
+            cut = len(kept) if kept[0] == 0 else num_qubits - len(kept)
+            probabilities = state.schmidt_values(cut) ** 2
+        else:
+            probabilities = np.linalg.eigvalsh(state.reduced_density_matrix(kept))
+        probabilities = np.sort(probabilities)[::-1][:size]
+        padded = np.full(size, np.exp(self.cutoff))
+        padded[: len(probabilities)] = np.maximum(probabilities, np.exp(self.cutoff))
+        return np.round(np.sort(-np.log(padded)), 5)
 
     def prob_pqc(self, shots: int = 1024) -> typing.Tuple[np.ndarray, np.ndarray]:
         """Return probability density function of fidelities for PQC
@@ -135,20 +214,112 @@ class EntanglementSpectrum(MetaExplorer):
         :returns eigvals (np.array): np.array of all eigenvalues
         :returns mean_eigvals (np.array): np.array of sample-wise mean of all eigenvalues
         """
-        thetas = self.gen_params()
-        theta_circuits = [
-            CircuitSimulator(self.circuit, self.noise_model).simulate(theta, shots)
-            for theta in thetas
-        ]
-        rho_circs = [
-            -sp.linalg.logm(partial_trace(rho, self.tapered_indices).data)
-            for rho in theta_circuits
-        ]
-        eigvals = [np.round(np.sort(np.linalg.eigvals(rho)), 5) for rho in rho_circs]
+        if self.checkpoint is None:
+            thetas = self.gen_params()
+        else:
+            thetas = self.checkpoint.load_or_create(
+                "parameters",
+                self.gen_params,
+                {
+                    "samples": self.num_samples,
+                    "sampler": self.sampler,
+                    "seed": self.seed,
+                },
+            )
+        simulator = CircuitSimulator(
+            self.circuit, self.noise_model, self.cache, self.planner
+        )
+        eigvals = self._eigvals(simulator, thetas, shots, checkpoint=self.checkpoint)
         mean_eigvals = -np.mean(eigvals, axis=0)
         mean_eigvals[np.where(mean_eigvals < self.cutoff)[0]] = self.cutoff
         self.eigvals_sample = mean_eigvals
-        return np.array(eigvals), mean_eigvals
+        return eigvals, mean_eigvals
+
+    def _eigvals(
+        self,
+        simulator: CircuitSimulator,
+        thetas: np.ndarray,
+        shots: int,
+        size: typing.Optional[int] = None,
+        checkpoint: typing.Optional[Checkpointer] = None,
+    ) -> np.ndarray:
+        """Return the entanglement energies of the states of every set of parameters
+
+        :param simulator: simulator of the circuit
+        :param thetas: parameters of the samples, one row per sample
+        :param shots: number of shots for circuit execution
+        :param size: number of energies of every sample, see `entanglement_energies`
+        :param checkpoint: checkpointer of the dense states
+        :returns eigvals (np.array): energies of every sample, one row per sample
+        """
+        if self.planner is not None:
+            with span("entanglement_spectrum.simulate"):
+                states = simulator.simulate_compact(
+                    thetas, shots, checkpoint, "theta_states"
+                )
+            # The spectra of all the samples are padded to the same size, which is capped
+            # by the bond dimension if some are matrix product states
+            if size is None:
+                size = 2 ** (self.circuit.num_qubits - len(self.tapered_indices))
+                if self.planner.max_bond_dimension is not None and any(
+                    isinstance(state, MPS) for state in states
+                ):
+                    size = min(size, self.planner.max_bond_dimension)
+            with span("entanglement_spectrum.eigvals"):
+                return np.array(
+                    [self.entanglement_energies(state, size) for state in states]
+                )
+
+        with span("entanglement_spectrum.simulate"):
+            theta_circuits = simulator.simulate_batch(
+                thetas, shots, checkpoint, "theta_states"
+            )
+        with span("entanglement_spectrum.partial_trace"):
+            rho_circs = [
+                -sp.linalg.logm(
+                    quantum_info.partial_trace(rho, self.tapered_indices).data
+                )
+                for rho in theta_circuits
+            ]
+        with span("entanglement_spectrum.eigvals"):
+            return np.array(
+                [np.round(np.sort(np.linalg.eigvals(rho)), 5) for rho in rho_circs]
+            )
+
+    def _divergence(
+        self, eigvals: np.ndarray, measure: str
+    ) -> typing.Tuple[float, np.ndarray, np.ndarray]:
+        """Returns the divergence of the distribution of the entanglement energies from
+        the Marchenko-Pastur distribution
+
+        :param eigvals: energies of the samples, one row per sample
+        :param measure: specifies measure used in the entanglement spectrum divergence calculation
+        :returns: the divergence, the Marchenko-Pastur distribution, and the bin edges
+        :raises ValueError: if invalid measure is specified
+        """
+        gamma = 1
+        x_min = np.power(1 - np.sqrt(1 / gamma), 2)
+        x_min = 1e-1 if x_min < 1e-1 else x_min
+        x_max = np.power(1 + np.sqrt(1 / gamma), 2)
+        x = np.linspace(x_min, x_max, 1000)
+
+        haar_prob = self.marchenko_pastur_pdf(x, gamma)
+        haar_prob /= np.sum(haar_prob)
+
+        bin_edges: np.ndarray
+        pqc_hist, bin_edges = np.histogram(eigvals.real, 1000, density=True)
+        pqc_prob: np.ndarray = pqc_hist / float(pqc_hist.sum())
+
+        pqc_prob[np.where(pqc_prob == 0.0)[0]] = 1e-9
+        haar_prob[np.where(haar_prob == 0.0)[0]] = 1e-9
+
+        if measure == "kld":
+            pqc_esd = self.kl_divergence(pqc_prob, haar_prob)
+        elif measure == "jsd":
+            pqc_esd = jensenshannon(pqc_prob, haar_prob, 2.0)
+        else:
+            raise ValueError("Invalid measure provided, choose from 'kld' or 'jsd'")
+        return pqc_esd, haar_prob, bin_edges
 
     def entanglement_spectrum(
         self, measure: str = "kld", shots: int = 1024
@@ -178,28 +349,7 @@ class EntanglementSpectrum(MetaExplorer):
             mean_eigvals = -np.mean(eigvals, axis=0)
             mean_eigvals[np.where(mean_eigvals < self.cutoff)[0]] = self.cutoff
 
-        gamma = 1
-        x_min = np.power(1 - np.sqrt(1 / gamma), 2)
-        x_min = 1e-1 if x_min < 1e-1 else x_min
-        x_max = np.power(1 + np.sqrt(1 / gamma), 2)
-        x = np.linspace(x_min, x_max, 1000)
-
-        haar_prob = self.marchenko_pastur_pdf(x, gamma)
-        haar_prob /= np.sum(haar_prob)
-
-        bin_edges: np.ndarray
-        pqc_hist, bin_edges = np.histogram(eigvals.real, 1000, density=True)
-        pqc_prob: np.ndarray = pqc_hist / float(pqc_hist.sum())
-
-        pqc_prob[np.where(pqc_prob == 0.0)[0]] = 1e-9
-        haar_prob[np.where(haar_prob == 0.0)[0]] = 1e-9
-
-        if measure == "kld":
-            pqc_esd = self.kl_divergence(pqc_prob, haar_prob)
-        elif measure == "jsd":
-            pqc_esd = jensenshannon(pqc_prob, haar_prob, 2.0)
-        else:
-            raise ValueError("Invalid measure provided, choose from 'kld' or 'jsd'")
+        pqc_esd, haar_prob, bin_edges = self._divergence(eigvals, measure)
 
         mpd = np.array(self.inverse_transform_sampling(haar_prob, 10000, 256)).astype(
             float
@@ -209,6 +359,101 @@ class EntanglementSpectrum(MetaExplorer):
 
         return pqc_esd, mean_eigvals
 
+    def estimate(
+        self,
+        budget: typing.Optional[Budget] = None,
+        tolerance: float = 0.0,
+        **options: typing.Any,
+    ) -> Estimate:
+        """Estimates the entanglement spectrum divergence in anytime mode, see
+        `MetaExplorer.estimate`.
+
+        :param budget: time and number of samples available
+        :param tolerance: largest width of the confidence interval of the divergence, 0
+            to refine it for as long as the budget allows
+        :param options: the measure, shots and interval options of
+            `estimate_entanglement_spectrum`
+        :returns estimate (Estimate): entanglement spectrum divergence value, its
+            interval, and the number of samples drawn
+        """
+        return self.estimate_entanglement_spectrum(
+            tolerance=tolerance, budget=budget, **options
+        )
+
+    def estimate_entanglement_spectrum(
+        self,
+        measure: str = "kld",
+        tolerance: float = 1e-2,
+        shots: int = 1024,
+        max_samples: typing.Optional[int] = None,
+        interval: str = "bootstrap",
+        confidence: float = 0.95,
+        resamples: int = DEFAULT_RESAMPLES,
+        budget: typing.Optional[Budget] = None,
+    ) -> Estimate:
+        """Estimates the entanglement spectrum divergence adaptively, from batches of
+        samples growing from `samples` until the width of its confidence interval is
+        below the tolerance. The states are not checkpointed.
+
+        :param measure: specifies measure used in the entanglement spectrum divergence calculation
+        :param tolerance: largest width of the confidence interval of the divergence
+        :param shots: number of shots for circuit execution
+        :param max_samples: number of samples after which the sampling stops, 16 times
+            `samples` by default
+        :param interval: resampling method of the interval, "bootstrap" or "jackknife"
+        :param confidence: confidence level of the interval
+        :param resamples: number of bootstrap resamples
+        :param budget: time and number of samples available, in anytime mode the
+            estimate of the samples drawn so far is returned once it runs out
+        :returns estimate (Estimate): entanglement spectrum divergence value, its
+            interval, and the number of samples drawn
+        :raises ValueError: if invalid measure is specified
+        """
+        if measure not in ("kld", "jsd"):
+            raise ValueError("Invalid measure provided, choose from 'kld' or 'jsd'")
+        if len(self.circuit.parameters) == 0:
+            # The spectrum of a circuit without parameters is not sampled
+            pqc_esd, _mean_eigvals = self.entanglement_spectrum(measure, shots)
+            return Estimate(pqc_esd, pqc_esd, pqc_esd, self.num_samples, True)
+        simulator = CircuitSimulator(
+            self.circuit, self.noise_model, self.cache, self.planner
+        )
+        eigvals = np.zeros((0, 0))
+
+        def sample(num_samples: int) -> None:
+            nonlocal eigvals
+            thetas = self.gen_params(num_samples)
+            if len(eigvals) == 0:
+                eigvals = self._eigvals(simulator, thetas, shots)
+            else:
+                # Every sample keeps the number of energies of the first batch
+                new_eigvals = self._eigvals(simulator, thetas, shots, eigvals.shape[1])
+                eigvals = np.concatenate([eigvals, new_eigvals])
+
+        def statistic(indices: np.ndarray) -> float:
+            return self._divergence(eigvals[indices], measure)[0]
+
+        estimate = adaptive_estimate(
+            sample,
+            statistic,
+            tolerance,
+            self.num_samples,
+            max_samples or 16 * self.num_samples,
+            method=interval,
+            confidence=confidence,
+            resamples=resamples,
+            seed=self.rng,
+            budget=budget,
+        )
+        if estimate.samples == 0:
+            return estimate
+        mean_eigvals = -np.mean(eigvals, axis=0)
+        mean_eigvals[np.where(mean_eigvals < self.cutoff)[0]] = self.cutoff
+        self.eigvals_sample = mean_eigvals
+        self.ent_spec = estimate.value
+        return estimate
+
+    @timed("entanglement_spectrum.plot")
     def plot(self, data, figsize=(6, 4), dpi=300, **kwargs):
         """Returns plot for expressibility visualization"""
 
@@ -228,7 +473,7 @@ class EntanglementSpectrum(MetaExplorer):
 
         ticks = np.arange(1, len(data) + 1)
         cmap = plt.get_cmap("turbo", len(data))
-        norm = matplotlib.colors.BoundaryNorm(np.arange(len(data) + 1) + 0.5, len(data))
+        norm = mcolors.BoundaryNorm(np.arange(len(data) + 1) + 0.5, len(data))
         smap = plt.cm.ScalarMappable(norm=norm, cmap=cmap)
 
         fig = plt.figure(figsize=(12, 8), facecolor="white")
@@ -1,31 +1,50 @@
 """Module to evaluate the expressibility of circuits."""
 
+from __future__ import annotations
+
 import itertools
 import typing
 
-from qiskit.providers.aer.noise import NoiseModel as qiskitNoiseModel
-from cirq.devices.noise_model import NoiseModel as cirqNoiseModel
-from pyquil.noise import NoiseModel as pyquilNoiseModel
-
-from qiskit.quantum_info import state_fidelity
 from scipy.spatial.distance import jensenshannon
 
-import matplotlib.pyplot as plt
 import numpy as np
 
+from .adaptive import DEFAULT_RESAMPLES, Estimate, adaptive_estimate
+from .._lazy import lazy_module
 from ..interface.metas import MetaExplorer
 from ..interface.circuit import CircuitDescriptor
-from ..simulators.circuit_simulators import CircuitSimulator
+from ..interface.budget import Budget
+from ..interface.checkpoint import Checkpointer
+from ..interface.instrumentation import span, timed
+from ..simulators.cache import SimulationCache
+from ..simulators.circuit_simulators import CircuitSimulator, is_noise_model_of
+from ..simulators.parameters import PARAMETER_SAMPLERS, sample_parameters
+from ..simulators.planner import SimulationPlanner
+from ..simulators.sampling import Seed
+from ..simulators.state_store import stream_fidelities
+from ..simulators.trajectories import ensemble_fidelities
+
+if typing.TYPE_CHECKING:
+    from qiskit.providers.aer.noise import NoiseModel as qiskitNoiseModel
+    from cirq.devices.noise_model import NoiseModel as cirqNoiseModel
+    from pyquil.noise import NoiseModel as pyquilNoiseModel
 
-NOISE_MODELS = {
-    "cirq": cirqNoiseModel,
-    "pyquil": pyquilNoiseModel,
-    "qiskit": qiskitNoiseModel,
-}
+quantum_info = lazy_module("qiskit.quantum_info")
+plt = lazy_module("matplotlib.pyplot")
+
+# Default largest number of samples of the adaptive estimate, whose fidelities are held
+DEFAULT_MAX_SAMPLES = 2048
 
 
 class Expressibility(MetaExplorer):
-    """Calculates expressibility of a parameterized quantum circuit"""
+    """Calculates expressibility of a parameterized quantum circuit
+
+    The fidelities of pure states are |<a|b>|^2, and those of noisy states are their
+    Uhlmann fidelities (Tr sqrt(sqrt(rho) sigma sqrt(rho)))^2, like in
+    `qiskit.quantum_info`. Only with a planner which can not simulate density matrices
+    are noisy circuits simulated as trajectory ensembles, whose fidelities are then the
+    overlaps Tr(rho sigma) of the states.
+    """
 
     def __init__(
         self,
@@ -34,32 +53,35 @@ class Expressibility(MetaExplorer):
             cirqNoiseModel, qiskitNoiseModel, pyquilNoiseModel, None
         ] = None,
         samples: int = 1000,
+        checkpoint: typing.Optional[Checkpointer] = None,
+        cache: typing.Optional[SimulationCache] = None,
+        planner: typing.Optional[SimulationPlanner] = None,
+        seed: Seed = None,
+        sampler: str = "random",
     ):
         """Constructor the the Expressibility analyzer
 
         :param circuit: input circuit as a CircuitDescriptor object
         :param noise_model:  (dict, NoiseModel) initialization noise-model dictionary
         :param samples: number of samples for the experiment
+        :param checkpoint: checkpointer to save the sampled states to, and resume from
+        :param cache: cache to look the sampled states up in, and store them to
+        :param planner: planner of the simulations, which can choose to simulate wide
+            circuits with little entanglement as matrix product states, and noisy circuits
+            with Monte Carlo trajectories
+        :param seed: seed or generator of the sampled parameters, if None they are
+            drawn from the global numpy random state
+        :param sampler: how the parameters are sampled, independently at "random",
+            or as the points of a scrambled "sobol" or "halton" sequence, which
+            converge with fewer samples
         :raises ValueError: If circuit and noise model does not correspond to same framework
+        :raises ValueError: If the sampler is not known
         """
         super().__init__()
         self.circuit = circuit
 
         if noise_model is not None:
-            if (
-                (
-                    circuit.default_backend == "cirq"
-                    and isinstance(noise_model, cirqNoiseModel)
-                )
-                or (
-                    circuit.default_backend == "qiskit"
-                    and isinstance(noise_model, qiskitNoiseModel)
-                )
-                or (
-                    circuit.default_backend == "pyquil"
-                    and isinstance(noise_model, pyquilNoiseModel)
-                )
-            ):
+            if is_noise_model_of(noise_model, circuit.default_backend):
                 self.noise_model = noise_model
             else:
                 raise ValueError(
@@ -71,6 +93,17 @@ class Expressibility(MetaExplorer):
             self.noise_model = None
 
         self.num_samples = samples
+        self.checkpoint = checkpoint
+        self.cache = cache
+        self.planner = planner
+        if sampler not in PARAMETER_SAMPLERS:
+            raise ValueError(
+                f"Unknown sampler {sampler}, expected one of {PARAMETER_SAMPLERS}"
+            )
+        self.sampler = sampler
+        self.rng = None if seed is None else np.random.default_rng(seed)
+        # Checked when resuming from a checkpoint, generators can not be compared
+        self.seed = seed if isinstance(seed, (int, np.integer)) else None
         self.expr = 0.0
         self.plot_data: typing.List[np.ndarray] = []
 
@@ -81,27 +114,39 @@ class Expressibility(MetaExplorer):
         kl_div = np.sum(np.where(prob_a != 0, prob_a * np.log(prob_a / prob_b), 0))
         return typing.cast(float, kl_div)
 
-    def gen_params(self) -> typing.Tuple[typing.List, typing.List]:
+    def gen_params(
+        self, num_samples: typing.Optional[int] = None
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
         """Generate parameters for the calculation of expressibility
 
-        :returns theta (np.array): first list of parameters for the parameterized quantum circuit
-        :returns phi (np.array): second list of parameters for the parameterized quantum circuit
+        :param num_samples: number of samples, `samples` by default
+        :returns theta (np.array): first set of parameters for the parameterized quantum
+            circuit, one row per sample in the order of `circuit.parameters`
+        :returns phi (np.array): second set of parameters for the parameterized quantum
+            circuit, one row per sample in the order of `circuit.parameters`
         """
-        theta = [
-            {p: 2 * np.random.random() * np.pi for p in self.circuit.parameters}
-            for _ in range(self.num_samples)
-        ]
-        phi = [
-            {p: 2 * np.random.random() * np.pi for p in self.circuit.parameters}
-            for _ in range(self.num_samples)
-        ]
+        if num_samples is None:
+            num_samples = self.num_samples
+        num_params = len(self.circuit.parameters)
+        theta = sample_parameters(num_samples, num_params, self.rng, self.sampler)
+        phi = sample_parameters(num_samples, num_params, self.rng, self.sampler)
         return theta, phi
 
-    def prob_haar(self) -> np.ndarray:
-        """Returns probability density function of fidelities for Haar Random States"""
-        fidelity = np.linspace(0, 1, self.num_samples)
+    def prob_haar(self, num_samples: typing.Optional[int] = None) -> np.ndarray:
+        """Returns probability density function of fidelities for Haar Random States
+        For wide circuits the density overflows, it is then scaled down as a whole, which
+        does not change the normalized distribution the expressibility is computed from.
+
+        :param num_samples: number of samples, and of bins, `samples` by default
+        """
+        if num_samples is None:
+            num_samples = self.num_samples
+        fidelity = np.linspace(0, 1, num_samples)
         num_qubits = self.circuit.num_qubits
-        return (2**num_qubits - 1) * (1 - fidelity + 1e-8) ** (2**num_qubits - 2)
+        log_density = np.log(2.0**num_qubits - 1) + (2.0**num_qubits - 2) * np.log(
+            1 - fidelity + 1e-8
+        )
+        return np.exp(log_density - max(0.0, np.max(log_density) - 700))
 
     def prob_pqc(self, shots: int = 1024) -> np.ndarray:
         """Return probability density function of fidelities for PQC
@@ -109,23 +154,115 @@ class Expressibility(MetaExplorer):
         :param shots: number of shots for circuit execution
         :returns fidelities (np.array): np.array of fidelities
         """
-        thetas, phis = self.gen_params()
+        if self.checkpoint is None:
+            thetas, phis = self.gen_params()
+        else:
+            thetas, phis = self.checkpoint.load_or_create(
+                "parameters",
+                self.gen_params,
+                {
+                    "samples": self.num_samples,
+                    "sampler": self.sampler,
+                    "seed": self.seed,
+                },
+            )
 
-        theta_circuits = [
-            CircuitSimulator(self.circuit, self.noise_model).simulate(theta, shots)
-            for theta in thetas
-        ]
-        phi_circuits = [
-            CircuitSimulator(self.circuit, self.noise_model).simulate(phi, shots)
-            for phi in phis
-        ]
-        fidelity = np.array(
-            [
-                state_fidelity(rho_a, rho_b)
-                for rho_a, rho_b in itertools.product(theta_circuits, phi_circuits)
-            ]
+        simulator = CircuitSimulator(
+            self.circuit, self.noise_model, self.cache, self.planner
         )
-        return np.array(fidelity)
+        engine = None
+        if self.planner is not None:
+            engine = simulator.plan(
+                2 * self.num_samples, dense=False, mixed_fidelities=True
+            ).engine
+        theta_states = self._simulate(
+            simulator, thetas, shots, engine, "theta_states", self.checkpoint
+        )
+        phi_states = self._simulate(
+            simulator, phis, shots, engine, "phi_states", self.checkpoint
+        )
+        return self._fidelities(theta_states, phi_states, engine).ravel()
+
+    @staticmethod
+    def _simulate(
+        simulator: CircuitSimulator,
+        params: np.ndarray,
+        shots: int,
+        engine: typing.Optional[str],
+        name: str,
+        checkpoint: typing.Optional[Checkpointer] = None,
+    ) -> typing.Any:
+        """Simulates the circuit for every set of parameters with the planned engine
+
+        :returns states: list of matrix product states or of trajectory ensembles, or
+            stack of dense states which may be memory-mapped
+        """
+        with span("expressibility.simulate"):
+            if engine == "mps":
+                return simulator.simulate_mps(params)
+            if engine == "trajectories":
+                return simulator.simulate_trajectories(params)
+            return simulator.simulate_batch(params, shots, checkpoint, name)
+
+    @staticmethod
+    def _fidelities(
+        states_a: typing.Any, states_b: typing.Any, engine: typing.Optional[str]
+    ) -> np.ndarray:
+        """Returns the fidelities between every state of `states_a` and every state of
+        `states_b`, simulated by `_simulate`, of shape (len(states_a), len(states_b))"""
+        with span("expressibility.fidelities"):
+            if engine == "mps":
+                return np.array(
+                    [
+                        abs(state_a.overlap(state_b)) ** 2
+                        for state_a, state_b in itertools.product(states_a, states_b)
+                    ]
+                ).reshape(len(states_a), len(states_b))
+            if engine == "trajectories":
+                return ensemble_fidelities(states_a, states_b)
+            # The stacks may be memory-mapped, the fidelities are streamed block by block
+            return stream_fidelities(states_a, states_b).reshape(
+                len(states_a), len(states_b)
+            )
+
+    def _divergence(
+        self, fidelity: np.ndarray, measure: str, num_samples: int
+    ) -> typing.Tuple[float, np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the divergence of the distribution of the fidelities from the Haar one
+
+        :param fidelity: fidelities of the pairs of sampled states
+        :param measure: specification for the measure used in the expressibility calculation
+        :param num_samples: number of samples, which is the number of bins
+        :returns: the divergence, the Haar and the PQC distributions, and the bin edges
+        :raises ValueError: if invalid measure is specified
+        """
+        haar = self.prob_haar(num_samples)
+        haar_prob: np.ndarray = haar / float(haar.sum())
+
+        bin_edges: np.ndarray
+        pqc_hist, bin_edges = np.histogram(
+            fidelity, num_samples, range=(0, 1), density=True
+        )
+        pqc_prob: np.ndarray = pqc_hist / float(pqc_hist.sum())
+        pqc_expressibility = self._distance(pqc_prob, haar_prob, measure)
+        return pqc_expressibility, haar_prob, pqc_prob, bin_edges
+
+    def _distance(
+        self, pqc_prob: np.ndarray, haar_prob: np.ndarray, measure: str
+    ) -> float:
+        """Returns the divergence of the distribution of the fidelities from the Haar one
+
+        :param pqc_prob: distribution of the fidelities of the sampled states
+        :param haar_prob: distribution of the fidelities of Haar random states
+        :param measure: specification for the measure used in the expressibility calculation
+        :returns: the divergence
+        :raises ValueError: if invalid measure is specified
+        """
+        if measure == "kld":
+            return self.kl_divergence(pqc_prob, haar_prob)
+        if measure == "jsd":
+            return jensenshannon(pqc_prob, haar_prob, 2.0)
+        raise ValueError("Invalid measure provided, choose from 'kld' or 'jsd'")
 
     def expressibility(self, measure: str = "kld", shots: int = 1024) -> float:
         r"""Returns expressibility for the circuit
@@ -139,32 +276,170 @@ class Expressibility(MetaExplorer):
         :returns pqc_expressibility: float, expressibility value
         :raises ValueError: if invalid measure is specified
         """
-        haar = self.prob_haar()
-        haar_prob: np.ndarray = haar / float(haar.sum())
-
         if len(self.circuit.parameters) > 0:
             fidelity = self.prob_pqc(shots)
         else:
             fidelity = np.ones(self.num_samples**2)
 
-        bin_edges: np.ndarray
-        pqc_hist, bin_edges = np.histogram(
-            fidelity, self.num_samples, range=(0, 1), density=True
-        )
-        pqc_prob: np.ndarray = pqc_hist / float(pqc_hist.sum())
-
-        if measure == "kld":
-            pqc_expressibility = self.kl_divergence(pqc_prob, haar_prob)
-        elif measure == "jsd":
-            pqc_expressibility = jensenshannon(pqc_prob, haar_prob, 2.0)
-        else:
-            raise ValueError("Invalid measure provided, choose from 'kld' or 'jsd'")
+        with span("expressibility.divergence"):
+            pqc_expressibility, haar_prob, pqc_prob, bin_edges = self._divergence(
+                fidelity, measure, self.num_samples
+            )
         self.plot_data = [haar_prob, pqc_prob, bin_edges]
         self.expr = pqc_expressibility
 
         return pqc_expressibility
 
-    def compare_expressibility(self, circuit: typing.Union(CircuitDescriptor, typing.List[CircuitDescriptor]), measure: str = "kld", shots: int = 1024) -> typing.List[float]:
+    def estimate(
+        self,
+        budget: typing.Optional[Budget] = None,
+        tolerance: float = 0.0,
+        **options: typing.Any,
+    ) -> Estimate:
+        """Estimates the expressibility in anytime mode, see `MetaExplorer.estimate`.
+
+        :param budget: time and number of samples available
+        :param tolerance: largest width of the confidence interval of the
+            expressibility, 0 to refine it for as long as the budget allows
+        :param options: the measure, shots and interval options of
+            `estimate_expressibility`
+        :returns estimate (Estimate): expressibility value, its interval, and the number
+            of samples drawn
+        """
+        return self.estimate_expressibility(
+            tolerance=tolerance, budget=budget, **options
+        )
+
+    def estimate_expressibility(
+        self,
+        measure: str = "kld",
+        tolerance: float = 1e-2,
+        shots: int = 1024,
+        max_samples: typing.Optional[int] = None,
+        interval: str = "bootstrap",
+        confidence: float = 0.95,
+        resamples: int = DEFAULT_RESAMPLES,
+        budget: typing.Optional[Budget] = None,
+    ) -> Estimate:
+        """Estimates the expressibility adaptively, from batches of samples growing from
+        `samples` until the width of its confidence interval is below the tolerance.
+        Every sample is a pair of parameters, and only the fidelities of the states of
+        new samples are computed after every batch. The measure is resampled with the
+        number of bins of all the samples drawn, so the estimate is the expressibility
+        of that many samples. The states are not checkpointed.
+
+        :param measure: specification for the measure used in the expressibility calculation
+        :param tolerance: largest width of the confidence interval of the expressibility
+        :param shots: number of shots for circuit execution
+        :param max_samples: number of samples after which the sampling stops, 16 times
+            `samples` by default, and at most `DEFAULT_MAX_SAMPLES` unless `samples` is
+            larger, as the fidelities of all the pairs of samples are held
+        :param interval: resampling method of the interval, "bootstrap" or "jackknife",
+            whose cost grows with the cube of the number of samples
+        :param confidence: confidence level of the interval
+        :param resamples: number of bootstrap resamples
+        :param budget: time and number of samples available, in anytime mode the
+            estimate of the samples drawn so far is returned once it runs out
+        :returns estimate (Estimate): expressibility value, its interval, and the number
+            of samples drawn
+        :raises ValueError: if invalid measure is specified
+        """
+        if measure not in ("kld", "jsd"):
+            raise ValueError("Invalid measure provided, choose from 'kld' or 'jsd'")
+        if max_samples is None:
+            max_samples = max(
+                self.num_samples, min(16 * self.num_samples, DEFAULT_MAX_SAMPLES)
+            )
+        simulator = CircuitSimulator(
+            self.circuit, self.noise_model, self.cache, self.planner
+        )
+        engine = None
+        if self.planner is not None:
+            engine = simulator.plan(
+                2 * max_samples, dense=False, mixed_fidelities=True
+            ).engine
+        # The batches of states are kept apart, as the stacks may be memory-mapped
+        theta_batches: typing.List[typing.Any] = []
+        phi_batches: typing.List[typing.Any] = []
+        fidelities = np.ones((0, 0))
+        size = 0
+        bins: np.ndarray = np.zeros((0, 0), dtype=np.int32)
+        haar_prob: np.ndarray = np.zeros(0)
+
+        def sample(num_samples: int) -> None:
+            nonlocal fidelities, size, bins, haar_prob
+            done, size = size, size + num_samples
+            if size > len(fidelities):
+                # Grown geometrically, so the fidelities are copied only a few times
+                grown = np.ones((min(max(size, 2 * len(fidelities)), max_samples),) * 2)
+                grown[:done, :done] = fidelities[:done, :done]
+                fidelities = grown
+            if len(self.circuit.parameters) > 0:
+                thetas, phis = self.gen_params(num_samples)
+                theta_states = self._simulate(
+                    simulator, thetas, shots, engine, "theta_states"
+                )
+                phi_states = self._simulate(
+                    simulator, phis, shots, engine, "phi_states"
+                )
+                start = 0
+                for theta_batch, phi_batch in zip(theta_batches, phi_batches):
+                    stop = start + len(theta_batch)
+                    fidelities[start:stop, done:size] = self._fidelities(
+                        theta_batch, phi_states, engine
+                    )
+                    fidelities[done:size, start:stop] = self._fidelities(
+                        theta_states, phi_batch, engine
+                    )
+                    start = stop
+                fidelities[done:size, done:size] = self._fidelities(
+                    theta_states, phi_states, engine
+                )
+                theta_batches.append(theta_states)
+                phi_batches.append(phi_states)
+            # Binned once per batch into as many bins as samples, like `np.histogram`
+            # does, the fidelities out of [0, 1] fall in an extra bin which is dropped
+            sampled = fidelities[:size, :size]
+            edges = np.linspace(0, 1, size + 1)
+            bins = np.searchsorted(edges, sampled, side="right").astype(np.int32) - 1
+            bins[sampled == 1] = size - 1
+            bins[(sampled < 0) | (sampled > 1)] = size
+            haar = self.prob_haar(size)
+            haar_prob = haar / float(haar.sum())
+
+        def statistic(indices: np.ndarray) -> float:
+            counts = np.bincount(
+                bins[np.ix_(indices, indices)].ravel(), minlength=size + 1
+            )[:size]
+            return self._distance(counts / float(counts.sum()), haar_prob, measure)
+
+        with span("expressibility.adaptive"):
+            estimate = adaptive_estimate(
+                sample,
+                statistic,
+                tolerance,
+                self.num_samples,
+                max_samples,
+                method=interval,
+                confidence=confidence,
+                resamples=resamples,
+                seed=self.rng,
+                budget=budget,
+            )
+        if estimate.samples == 0:
+            return estimate
+        self.expr, haar_prob, pqc_prob, bin_edges = self._divergence(
+            fidelities[:size, :size].ravel(), measure, size
+        )
+        self.plot_data = [haar_prob, pqc_prob, bin_edges]
+        return estimate
+
+    def compare_expressibility(
+        self,
+        circuit: typing.Union[CircuitDescriptor, typing.List[CircuitDescriptor]],
+        measure: str = "kld",
+        shots: int = 1024,
+    ) -> typing.List[float]:
         r"""Compares expressibility against the provided circuit
 
         .. math::
@@ -197,7 +472,7 @@ class Expressibility(MetaExplorer):
                 ]
                 fidelity = np.array(
                     [
-                        state_fidelity(rho_a, rho_b)
+                        quantum_info.state_fidelity(rho_a, rho_b)
                         for rho_a, rho_b in itertools.product(theta_circuits, phi_circuits)
                     ]
                 )
@@ -224,6 +499,7 @@ class Expressibility(MetaExplorer):
 
         return pqc_expressibilities
 
+    @timed("expressibility.plot")
     def plot(self, figsize=(6, 4), dpi=300, **kwargs):
         """Returns plot for expressibility visualization"""
         if not self.plot_data:
@@ -10,16 +10,23 @@ We hope that these visualizations can help improve the choice of optimizers and
 ansatz we have for these quantum circuits.
 """
 
+from __future__ import annotations
+
 import typing as ty
 
 import numpy as np
 import tqdm.auto as tqdm
 import plotly.graph_objects as pg
 
-from ..simulators.pqc_trainer import PQCSimulatedTrainer
-from ..interface.metric_spec import MetricSpecifier
+from ..interface.budget import Budget
+from ..interface.instrumentation import span
 from ..interface.metas import MetaExplorer
 
+if ty.TYPE_CHECKING:
+    from ..simulators.pqc_trainer import PQCSimulatedTrainer
+    from ..interface.metric_spec import MetricSpecifier
+    from ..simulators.cache import SimulationCache
+
 
 class LossLandscapePlotter(MetaExplorer):
     """This class plots the loss landscape for a given PQC trainer object.
@@ -34,7 +41,12 @@ class LossLandscapePlotter(MetaExplorer):
     """
 
     def __init__(
-        self, solver: PQCSimulatedTrainer, metric: MetricSpecifier, dim: int = 2
+        self,
+        solver: PQCSimulatedTrainer,
+        metric: MetricSpecifier,
+        dim: int = 2,
+        cache: ty.Optional[SimulationCache] = None,
+        seed: ty.Optional[int] = None,
     ) -> None:
         """Initializes the Loss Landscape plotter.
         The plotter takes a PQC trainer, which will expose the it's present parameters
@@ -50,13 +62,22 @@ class LossLandscapePlotter(MetaExplorer):
         :type dim: int
         :param dim: The number of dimensions of the subspace to be sampled,
             necessarily 2 to get a contour plot
+        :type cache: SimulationCache, optional
+        :param cache: cache to look the scanned landscapes up in, and store them to, only
+            the scans with a seed, of metrics which have a `cache_token`, are cached
+        :type seed: int, optional
+        :param seed: Seed of the samples the metric is computed from, the scans are only
+            reproducible, and cached, with a seed
         """
         super().__init__()
         self.n = len(solver.circuit.parameters)
         self.metric = metric
         self.solver = solver
         self.dim = dim
+        self.cache = cache
+        self.seed = seed
         self.axes = self.__random_subspace(dim=self.dim)
+        self.scanned_points: ty.Optional[int] = None
 
     def __random_subspace(self, dim: int) -> np.ndarray:
         """Generates basis vectors for a random subspace
@@ -79,12 +100,78 @@ class LossLandscapePlotter(MetaExplorer):
             axes.append(axis)
         return np.stack(axes, axis=0)
 
-    def scan(
+    def grid(self, points: int, distance: float) -> np.ndarray:
+        """The coordinates in the subspace at which the scan samples the metric.
+
+        :type points: int
+        :param points: Number of points to sample along each axis
+        :type distance: float
+        :param distance: The range of parameters around the current value to scan over
+        :returns: The coordinates of the grid points
+        :rtype: np.array of shape (points ** dims, dims)
+        """
+        chained_range = [
+            np.linspace(-distance, distance, points) for _i in range(self.dim)
+        ]
+        return np.reshape(
+            np.stack(np.meshgrid(*chained_range), axis=-1), (-1, self.dim)
+        )
+
+    def iter_scan(
         self, points: int, distance: float, origin: np.ndarray
+    ) -> ty.Iterator[ty.Tuple[int, float]]:
+        """Scans the target vector-subspace, yielding the values of the metric as they are
+        computed, so that partial results can be shown while the scan is running.
+
+        :type points: int
+        :param points: Number of points to sample along each axis
+        :type distance: float
+        :param distance: The range of parameters around the current value to scan over
+        :type origin: np.ndarray
+        :param origin: The value of the current parameter to be used as origin of our plot
+        :returns: generator of the index of the grid point and the metric value there
+        :rtype: Iterator of tuples of int and float
+        """
+        coords = self.grid(points, distance)
+        with tqdm.trange(len(coords)) as iterator:
+            iterator.set_description("Contour Plot Scan")
+            for i in iterator:
+                yield i, self._metric_at(coords[i], origin)
+
+    def _metric_at(self, coord: np.ndarray, origin: np.ndarray) -> float:
+        """Computes the metric at a point of the subspace
+
+        :type coord: np.ndarray
+        :param coord: The coordinates of the point in the subspace
+        :type origin: np.ndarray
+        :param origin: The value of the current parameter to be used as origin of our plot
+        :returns: the metric value at that point
+        :rtype: float
+        """
+        with span("loss_landscape.metric"):
+            return float(
+                self.metric.from_circuit(
+                    circuit_descriptor=self.solver.circuit,
+                    parameters=coord @ self.axes + origin,
+                    mode="samples",
+                    seed=self.seed,
+                )
+            )
+
+    def scan(
+        self,
+        points: int,
+        distance: float,
+        origin: np.ndarray,
+        budget: ty.Optional[Budget] = None,
     ) -> ty.Tuple[np.ndarray, np.ndarray]:
         """Scans the target vector-subspace for values of the metric
         Returns the sampled coordinates in the grid and the values of the metric at those
         coordinates. The sampling of the subspace is done uniformly, and evenly in all directions.
+        With a budget the scan is anytime, it refines the grid progressively up to `points`
+        points per axis, see `_refine_scan`, and returns the finest grid completed when
+        the budget runs out. The number of points per axis reached is kept in
+        `scanned_points`.
 
         :type points: int
         :param points: Number of points to sample
@@ -92,26 +179,130 @@ class LossLandscapePlotter(MetaExplorer):
         :param distance: The range of parameters around the current value to scan over
         :type origin: np.ndarray
         :param origin: The value of the current parameter to be used as origin of our plot
+        :type budget: Budget, optional
+        :param budget: The time and the number of metric evaluations available
         :returns: tuple of the coordinates and the metric values at those coordinates
         :rtype: a tuple of np.array, shapes being (n, dims) and (n,)
         """
-        chained_range = [
-            np.linspace(-distance, distance, points) for _i in range(self.dim)
-        ]
-        coords = np.reshape(
-            np.stack(np.meshgrid(*chained_range), axis=-1), (-1, self.dim)
-        )
-        values = np.zeros(len(coords), dtype=np.float64)
-        with tqdm.trange(len(coords)) as iterator:
-            iterator.set_description("Contour Plot Scan")
-            for i in iterator:
-                # TODO: Incorporate state vector and density matrix modes for higher speed
-                values[i] = self.metric.from_circuit(
+        coords = self.grid(points, distance)
+        self.scanned_points = points
+        key = None
+        token = self.metric.cache_token
+        if self.cache is not None and self.seed is not None and token is not None:
+            # The anytime scan samples the grid level by level, the complete one samples
+            # all of it at once, so they draw different samples
+            anytime = ":anytime" if budget is not None else ""
+            key = self.cache.key(
+                self.solver.circuit,
+                np.concatenate(
+                    [origin, self.axes.ravel(), [points, distance, self.seed]]
+                ),
+                engine=f"loss_landscape.scan{anytime}:{token}",
+            )
+            values = self.cache.get(key)
+            if values is not None:
+                return values, coords
+        if budget is None:
+            values = self._scan(points, distance, origin)
+        else:
+            values, self.scanned_points = self._refine_scan(
+                points, distance, origin, budget
+            )
+            if self.scanned_points < points:
+                # Only the complete scans are cached
+                return values, self.grid(self.scanned_points, distance)
+        if self.cache is not None and key is not None:
+            values = self.cache.put(key, values)
+        return values, coords
+
+    def _scan(self, points: int, distance: float, origin: np.ndarray) -> np.ndarray:
+        """Computes the values of the metric on the grid, see `scan`
+
+        :type points: int
+        :param points: Number of points to sample
+        :type distance: float
+        :param distance: The range of parameters around the current value to scan over
+        :type origin: np.ndarray
+        :param origin: The value of the current parameter to be used as origin of our plot
+        :returns: the metric values at the coordinates of the grid
+        :rtype: np.ndarray
+        """
+        return self._metrics_at(self.grid(points, distance), origin)
+
+    def _metrics_at(self, coords: np.ndarray, origin: np.ndarray) -> np.ndarray:
+        """Computes the metric at many points of the subspace, the circuit is simulated,
+        and sampled, for all of them at once.
+
+        :type coords: np.ndarray
+        :param coords: The coordinates of the points in the subspace, one row per point
+        :type origin: np.ndarray
+        :param origin: The value of the current parameter to be used as origin of our plot
+        :returns: the metric values at those points
+        :rtype: np.ndarray
+        """
+        with span("loss_landscape.scan"):
+            return np.asarray(
+                self.metric.from_circuit(
                     circuit_descriptor=self.solver.circuit,
-                    parameters=coords[i] @ self.axes + origin,
+                    parameters=coords @ self.axes + np.asarray(origin)[np.newaxis],
                     mode="samples",
+                    seed=self.seed,
+                ),
+                dtype=np.float64,
+            )
+
+    def _refine_scan(
+        self, points: int, distance: float, origin: np.ndarray, budget: Budget
+    ) -> ty.Tuple[np.ndarray, int]:
+        """Computes the values of the metric on grids of 3, 5, 9, ... and finally `points`
+        points per axis, until the budget runs out. The grids of 2^k + 1 points per axis
+        hold the points of the coarser ones, whose values are not computed again, and
+        only those whose points are all on the finest grid are scanned. The new points
+        of every grid are computed at once, see `_metrics_at`. The coarsest grid is
+        always completed, and a finer one is only started while the budget affords all
+        its new points at the rate of the previous ones.
+
+        :type points: int
+        :param points: Number of points to sample along each axis of the finest grid
+        :type distance: float
+        :param distance: The range of parameters around the current value to scan over
+        :type origin: np.ndarray
+        :param origin: The value of the current parameter to be used as origin of our plot
+        :type budget: Budget
+        :param budget: The time and the number of metric evaluations available
+        :returns: the metric values on the finest grid completed, and its number of
+            points per axis
+        :rtype: tuple of np.ndarray and int
+        """
+        levels: ty.List[int] = []
+        level = 3
+        while level < points:
+            if (points - 1) % (level - 1) == 0:
+                levels.append(level)
+            level = 2 * level - 1
+        levels.append(points)
+        known: ty.Dict[ty.Tuple[float, ...], float] = {}
+        best: ty.Tuple[np.ndarray, int] = (np.zeros(0), 0)
+        budget.start()
+        evaluations, seconds = 0, 0.0
+        for level in levels:
+            coords = self.grid(level, distance)
+            grid_points = [tuple(np.round(coord, 9)) for coord in coords]
+            new = [i for i, point in enumerate(grid_points) if point not in known]
+            if new:
+                affordable = budget.affordable(
+                    len(new), seconds / evaluations if evaluations else None
                 )
-        return values, coords
+                if best[1] and affordable < len(new):
+                    return best
+                started = budget.elapsed
+                values = self._metrics_at(coords[new], origin)
+                budget.spend(len(new))
+                evaluations += len(new)
+                seconds += budget.elapsed - started
+                known.update(zip((grid_points[i] for i in new), values))
+            best = (np.array([known[point] for point in grid_points]), level)
+        return best
 
     def plot(
         self, mode: str = "surface", points: int = 25, distance: float = np.pi
@@ -144,7 +335,7 @@ class LossLandscapePlotter(MetaExplorer):
             assert (
                 self.dim == 2
             ), "Contour plots can only be drawn with 2-dimensional axes"
-            origin = self.solver.model.trainable_variables[0]
+            origin = self.solver.parameters
             data, _coords = self.scan(points, distance, origin)
             data = np.reshape(data, (points, points))
             scan_range = np.linspace(-distance, +distance, points)
@@ -154,7 +345,7 @@ class LossLandscapePlotter(MetaExplorer):
             assert (
                 self.dim == 2
             ), "Contour plots can only be drawn with 2-dimensional axes"
-            origin = self.solver.model.trainable_variables[0]
+            origin = self.solver.parameters
             data, _coords = self.scan(points, distance, origin)
             data = np.reshape(data, (points, points))
             scan_range = np.linspace(-distance, +distance, points)
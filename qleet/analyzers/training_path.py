@@ -10,17 +10,60 @@ If many of the models converge to the same path and start mixing, then they like
 are optimal, if not they they are more likely to be just random chance solutions.
 """
 
+from __future__ import annotations
+
 import typing as ty
 
 import numpy as np
-from sklearn.manifold import TSNE
-from sklearn.decomposition import PCA
+from sklearn.manifold import TSNE, SpectralEmbedding
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.neighbors import NearestNeighbors
 import plotly.express as px
 import plotly.graph_objects as pg
 
 from .loss_landscape import LossLandscapePlotter
 from ..interface.metas import MetaLogger
-from ..simulators.pqc_trainer import PQCSimulatedTrainer
+
+if ty.TYPE_CHECKING:
+    from ..simulators.pqc_trainer import PQCSimulatedTrainer
+
+
+def downsample(
+    item: np.ndarray, max_points: ty.Optional[int], keep_last: int = 5
+) -> np.ndarray:
+    """Chooses the logged points to draw when there are too many of them to plot.
+    Evenly strides over the points, but always keeps the last steps of the runs, which
+    are drawn with the large markers.
+
+    :type item: np.ndarray
+    :param item: The step index of every logged point
+    :type max_points: int, optional
+    :param max_points: Approximate number of points to draw, None to draw all of them
+    :type keep_last: int
+    :param keep_last: Number of final steps of the runs which are always drawn
+    :returns: Indices of the points to draw
+    :rtype: np.ndarray
+    """
+    if max_points is None or len(item) <= max_points:
+        return np.arange(len(item))
+    stride = int(np.ceil(len(item) / max_points))
+    keep = (np.arange(len(item)) % stride == 0) | (item > np.max(item) - keep_last)
+    return np.nonzero(keep)[0]
+
+
+def _padded(data: np.ndarray) -> np.ndarray:
+    """The first two coordinates of the points, padded with zeros, which stand in for
+    the embedding while there are too few points to fit it.
+
+    :type data: np.ndarray
+    :param data: The logged points
+    :returns: Their first two coordinates
+    :rtype: np.ndarray
+    """
+    embedding = np.zeros((len(data), 2))
+    columns = min(2, data.shape[1]) if data.ndim == 2 else 0
+    embedding[:, :columns] = data[:, :columns]
+    return embedding
 
 
 class OptimizationPathPlotter(MetaLogger):
@@ -34,56 +77,227 @@ class OptimizationPathPlotter(MetaLogger):
     when plotting the training properties of a circuit.
     """
 
-    def __init__(self, mode: str = "tSNE"):
+    def __init__(
+        self,
+        mode: str = "tSNE",
+        stride: int = 1,
+        capacity: ty.Optional[int] = None,
+        subsample: ty.Optional[int] = None,
+        n_neighbors: int = 10,
+        batch_size: int = 64,
+        seed: ty.Optional[int] = None,
+    ):
         """Constructs the Path Plotter object.
 
         :type mode: str
-        :param mode: The type of projection we use to show the plots in lower dimensions
+        :param mode: The type of projection we use to show the plots in lower dimensions,
+            one of tSNE, PCA, IncrementalPCA, random or graph
+        :type stride: int
+        :param stride: Only every `stride`-th step of each run is logged
+        :type capacity: int, optional
+        :param capacity: Keep only the latest `capacity` logged steps, None to keep all
+        :type subsample: int, optional
+        :param subsample: Fit tSNE, PCA and graph embeddings on at most this many randomly
+            chosen points, and place the rest by their nearest neighbours
+        :type n_neighbors: int
+        :param n_neighbors: Number of neighbours used to build the neighbour graph and to
+            place the points which the embedding was not fit on
+        :type batch_size: int
+        :param batch_size: Number of logged points per update of the IncrementalPCA
+        :type seed: int, optional
+        :param seed: Seed for the subsampling and the random projection
+
+        The IncrementalPCA mode is updated while the points are being logged, and the
+        random mode uses a fixed projection, so neither has to revisit old points. The
+        tSNE, PCA and graph embeddings are cached after plotting, and only the points
+        logged since then are placed on the cached embedding when plotting again, use
+        `refit` to fit them from scratch on all the points.
+
+        The graph mode builds the exact nearest neighbour graph of the points it is fit
+        on, which is quadratic in their number, so on long runs `subsample` is what keeps
+        it tractable: the graph only spans the subsampled landmarks, and the other points
+        are placed by their nearest landmarks.
         """
-        super().__init__()
+        super().__init__(stride=stride, capacity=capacity)
         assert mode in [
             "tSNE",
             "PCA",
-        ], "Mode of Dimensionality Reduction is not implemented, use PCA or tSNE."
-        self.dimensionality_reduction = TSNE if mode == "tSNE" else PCA
+            "IncrementalPCA",
+            "random",
+            "graph",
+        ], (
+            "Mode of Dimensionality Reduction is not implemented, use one of tSNE, PCA, "
+            "IncrementalPCA, random or graph."
+        )
+        self.mode = mode
+        self.dimensionality_reduction: ty.Any = {
+            "tSNE": TSNE,
+            "PCA": PCA,
+            "graph": SpectralEmbedding,
+        }.get(mode)
+        self.subsample = subsample
+        self.n_neighbors = n_neighbors
+        self.batch_size = batch_size
+        self._rng = np.random.default_rng(seed)
+        self._incremental = IncrementalPCA(n_components=2)
+        self._incremental_rows = 0
+        self._reducer: ty.Any = None
+        self._landmarks: np.ndarray = np.zeros((0, 0))
+        self._landmark_embedding = np.zeros((0, 2))
+        self._projection: ty.Optional[np.ndarray] = None
+        self._embedding = np.zeros((0, 2))
 
-    def log(self, solver: PQCSimulatedTrainer, _loss: float) -> None:
+    def log(self, solver: PQCSimulatedTrainer, loss: float) -> None:
         """Logs the value of the parameters that the circuit currently has.
         The parameter values should be a numpy vector.
 
         :type solver: PQCSimulatedTrainer
         :param solver: The trainer module which has the parameters to be plotted
-        :type _loss: float
-        :param _loss: The loss value at that epoch, not used by this class
+        :type loss: float
+        :param loss: The loss value at that epoch, stored but not plotted by this class
         """
-        self.data.append(solver.model.trainable_variables[0].numpy())
-        self.runs.append(self.trial)
-        self.item.append(self.counter)
-        self.counter += 1
+        self.record(solver.parameters, loss)
+        if self.mode == "IncrementalPCA":
+            self._partial_fit(self.batch_size)
 
-    def plot(self, large_marker_size=5) -> pg.Figure:
+    def _partial_fit(self, min_rows: int) -> None:
+        """Updates the IncrementalPCA with the points logged since its last update.
+
+        :type min_rows: int
+        :param min_rows: Update only if at least these many points are pending
+        """
+        pending = min(self.store.appended - self._incremental_rows, len(self.store))
+        if self.data.shape[1] < 2:
+            # A single parameter can not be projected to two components
+            return
+        if pending >= max(min_rows, 2):
+            newest = self.store.chronological_order()[-pending:]
+            self._incremental.partial_fit(self.data[newest])
+            self._incremental_rows = self.store.appended
+
+    def _fit(self, data: np.ndarray) -> np.ndarray:
+        """Fits the tSNE, PCA or graph embedding on all, or a subsample of, the points.
+
+        :type data: np.ndarray
+        :param data: All the logged points
+        :returns: The embedding of all the points
+        :rtype: np.ndarray
+        """
+        if self.subsample is not None and len(data) > self.subsample:
+            chosen = np.sort(self._rng.choice(len(data), self.subsample, replace=False))
+        else:
+            chosen = np.arange(len(data))
+        self._landmarks = data[chosen].copy()
+        if self.mode == "graph":
+            self._reducer = SpectralEmbedding(
+                n_components=2,
+                affinity="nearest_neighbors",
+                n_neighbors=min(self.n_neighbors, len(chosen) - 1),
+                random_state=int(self._rng.integers(2**31)),
+            )
+        else:
+            self._reducer = self.dimensionality_reduction(n_components=2)
+        self._landmark_embedding = self._reducer.fit_transform(self._landmarks)
+        if len(chosen) == len(data):
+            return self._landmark_embedding
+        embedding = self._extend(data)
+        embedding[chosen] = self._landmark_embedding
+        return embedding
+
+    def _extend(self, points: np.ndarray) -> np.ndarray:
+        """Places new points on the fitted embedding.
+        PCA projects them exactly, the other embeddings cannot be updated, so every point
+        is placed at the inverse distance weighted mean of its nearest fitted neighbours.
+
+        :type points: np.ndarray
+        :param points: The points to be embedded
+        :returns: Their 2-D embedding
+        :rtype: np.ndarray
+        """
+        if len(points) == 0:
+            return np.zeros((0, 2))
+        if self.mode == "PCA":
+            return self._reducer.transform(points)
+        neighbours = NearestNeighbors(
+            n_neighbors=min(self.n_neighbors, len(self._landmarks))
+        ).fit(self._landmarks)
+        distances, indices = neighbours.kneighbors(points)
+        weights = 1.0 / (distances + 1e-12)
+        weights /= np.sum(weights, axis=1, keepdims=True)
+        return np.einsum("nk,nkd->nd", weights, self._landmark_embedding[indices])
+
+    def embed(self, refit: bool = False) -> np.ndarray:
+        """Reduces all the logged parameter vectors to 2 dimensions.
+
+        :type refit: bool
+        :param refit: Discard the cached embedding and fit it again on all the points
+        :returns: The 2-D embedding of every logged point, in storage order, the first
+            two coordinates of the points while fewer than two points are logged, or
+            if the circuit has a single parameter and the mode is PCA or IncrementalPCA
+        :rtype: np.ndarray
+        """
+        data = self.data
+        if self.mode == "IncrementalPCA":
+            self._partial_fit(1)
+            if self._incremental_rows == 0:
+                # Fewer than two points or parameters, too few to fit the projection
+                return _padded(data)
+            return self._incremental.transform(data)
+        # The cache only holds when rows were appended, and none overwritten, since
+        cached = (
+            not refit
+            and self.store.appended == len(self.store)
+            and len(self._embedding) <= len(data)
+        )
+        if self.mode == "random":
+            if self._projection is None:
+                projection = self._rng.normal(size=(data.shape[1], 2))
+                self._projection = projection / np.sqrt(2)
+            start = len(self._embedding) if cached else 0
+            self._embedding = np.concatenate(
+                [self._embedding[:start], data[start:] @ self._projection]
+            )
+        elif cached and len(self._landmarks) > 0:
+            self._embedding = np.concatenate(
+                [self._embedding, self._extend(data[len(self._embedding) :])]
+            )
+        elif len(data) < 2 or (self.mode == "PCA" and data.shape[1] < 2):
+            self._embedding = _padded(data)
+        else:
+            self._embedding = self._fit(data)
+        return self._embedding
+
+    def plot(
+        self,
+        large_marker_size=5,
+        refit: bool = False,
+        max_points: ty.Optional[int] = None,
+    ) -> pg.Figure:
         """Plots the 2D parameter projections.
         For the entire set of runs, the class has logged the parameter values.
-        Now it reduces the dimensionality of those parameter vectors using PCA or tSNE
-        and then plots them on a 2D plane.
+        Now it reduces the dimensionality of those parameter vectors using the
+        chosen mode and then plots them on a 2D plane.
 
+        :type large_marker_size: int
+        :param large_marker_size: Size of the markers for the last steps of the runs
+        :type refit: bool
+        :param refit: Fit the embedding again on all the points instead of reusing it
+        :type max_points: int, optional
+        :param max_points: Downsample the drawn points to about this many, all the points
+            are still used to fit the embedding
         :returns: The figure on which the parameter projections are plotted
         :rtype: Plotly figure
         """
-        raw_params = np.stack(self.data)
-        final_params = self.dimensionality_reduction(n_components=2).fit_transform(
-            raw_params
-        )
-        max_number_of_runs = max(self.item)
-        size_values = [
-            large_marker_size if size > max_number_of_runs - 5 else 1
-            for size in self.item
-        ]
+        final_params = self.embed(refit=refit)
+        max_number_of_runs = np.max(self.item)
+        size_values = np.where(self.item > max_number_of_runs - 5, large_marker_size, 1)
+        shown = downsample(self.item, max_points)
         fig = px.scatter(
-            x=final_params[:, 0],
-            y=final_params[:, 1],
-            color=self.runs,
-            size=size_values,
+            x=final_params[shown, 0],
+            y=final_params[shown, 1],
+            color=self.runs[shown],
+            size=size_values[shown],
+            render_mode="webgl",
         )
         return fig
 
@@ -96,17 +310,25 @@ class LossLandscapePathPlotter(MetaLogger):
     ended us at different parts of the loss landscape.
     """
 
-    def __init__(self, base_plotter: LossLandscapePlotter):
+    def __init__(
+        self,
+        base_plotter: LossLandscapePlotter,
+        stride: int = 1,
+        capacity: ty.Optional[int] = None,
+    ):
         """Constructor for the LossLandscapePathPlotter.
 
         :type base_plotter: LossLandscapePlotter
         :param base_plotter: The loss landscape plotter to plot the training path on top of
+        :type stride: int
+        :param stride: Only every `stride`-th step of each run is logged
+        :type capacity: int, optional
+        :param capacity: Keep only the latest `capacity` logged steps, None to keep all
         """
-        super().__init__()
-        self.loss: ty.List[float] = []
+        super().__init__(stride=stride, capacity=capacity)
         self.plotter = base_plotter
 
-    def log(self, solver: "PQCSimulatedTrainer", loss: float):
+    def log(self, solver: PQCSimulatedTrainer, loss: float):
         """Logs the value of the parameters that the circuit currently has.
         The parameter values should be a numpy vector.
 
@@ -115,15 +337,9 @@ class LossLandscapePathPlotter(MetaLogger):
         :type loss: float
         :param loss: The value of the loss at the current epoch
         """
-        self.data.append(
-            self.plotter.axes @ solver.model.trainable_variables[0].numpy()
-        )
-        self.loss.append(loss)
-        self.runs.append(self.trial)
-        self.item.append(self.counter)
-        self.counter += 1
+        self.record(self.plotter.axes @ solver.parameters, loss)
 
-    def plot(self):
+    def plot(self, max_points: ty.Optional[int] = None):
         """Plots the 2D parameter projections with the loss value on the 3rd dimension.
         For the entire set of runs, the class has logged the parameter values.
         Now it reduces the dimensionality of those parameter vectors using PCA or tSNE
@@ -131,24 +347,24 @@ class LossLandscapePathPlotter(MetaLogger):
         the third dimension. This output is coupled with the actual loss landscape drawing
         and returned.
 
+        :type max_points: int, optional
+        :param max_points: Downsample the drawn points to about this many
         :returns: The figure on which the parameter projections are plotted
         :rtype: Plotly figure
         """
 
-        data = np.array(self.data)
-        loss = np.array(self.loss)
-        max_number_of_runs = max(self.item)
-        size_values = np.array(
-            [12 if size > max_number_of_runs - 5 else 5 for size in self.item]
-        )
+        shown = downsample(self.item, max_points)
+        data = self.data[shown]
+        max_number_of_runs = np.max(self.item)
+        size_values = np.where(self.item[shown] > max_number_of_runs - 5, 12, 5)
         fig = pg.Figure(
             data=[
                 pg.Scatter3d(
                     x=data[:, 0],
                     y=data[:, 1],
-                    z=-loss,
+                    z=-self.loss[shown],
                     mode="markers",
-                    marker=dict(color=self.runs, size=size_values),
+                    marker=dict(color=self.runs[shown], size=size_values),
                 )
             ]
         )
@@ -1 +1,5 @@
-import qleet.examples.qaoa_maxcut
+"""Example problems which are ready to be analyzed."""
+
+from .._lazy import lazy_package
+
+__getattr__, __dir__ = lazy_package(__name__, submodules=["qaoa_maxcut"])
@@ -11,6 +11,7 @@ import sympy
 import cirq
 
 from ..interface.metric_spec import MetricSpecifier
+from ..simulators import sampling
 
 
 class QAOACircuitMaxCut:
@@ -81,6 +82,15 @@ class MaxCutMetric(MetricSpecifier):
         super().__init__("samples")
         self.graph = graph
 
+    @property
+    def cache_token(self) -> str:
+        """Identifies the metric by the nodes and the edges of its graph.
+        :returns: the token of the metric
+        :rtype: str
+        """
+        edges = sorted(tuple(sorted(edge)) for edge in self.graph.edges())
+        return f"{type(self).__qualname__}:{sorted(self.graph.nodes())}:{edges}"
+
     def from_samples_vector(self, samples_vector: np.ndarray) -> float:
         """Computes the vector from the samples vector output from the quantum circuit.
         :type samples_vector: np.array, 2-D matrix of size (num_samples, n)
@@ -98,6 +108,25 @@ class MaxCutMetric(MetricSpecifier):
             ),
         )
 
+    def from_histogram(
+        self, bitstrings: np.ndarray, counts: np.ndarray, num_qubits: int
+    ) -> float:
+        """Computes the metric from the histogram of the samples, the size of the cut is
+        computed once for every distinct bitstring.
+        :type bitstrings: np.array, 1-D
+        :param bitstrings: The distinct measured bitstrings, packed into integers
+        :type counts: np.array, 1-D
+        :param counts: How many times each bitstring was measured
+        :type num_qubits: int
+        :param num_qubits: Number of qubits measured, one per node of the graph
+        :returns: The value of the max-cut
+        :rtype: float
+        """
+        cuts = sampling.unpack_bitstrings(bitstrings, num_qubits)
+        edges = np.array(list(self.graph.edges()), dtype=np.int64).reshape(-1, 2)
+        sizes = np.count_nonzero(cuts[:, edges[:, 0]] != cuts[:, edges[:, 1]], axis=1)
+        return float(np.sum(sizes * counts) / np.sum(counts))
+
     def from_density_matrix(self, density_matrix: np.ndarray) -> float:
         """Computes the vector from the samples vector output from the quantum circuit.
         :type density_matrix: np.array, 2-D matrix of size (2^n, 2^n)
@@ -1,5 +1,19 @@
-import qleet.interface.circuit
-import qleet.interface.metas
-import qleet.interface.metric_spec
+"""Interfaces to the user provided circuits, metrics and analyzers."""
 
-# import qleet.interface.dashboard  FIXME: Try to get a default import on this
+from .._lazy import lazy_package
+
+__getattr__, __dir__ = lazy_package(
+    __name__,
+    submodules=[
+        "circuit",
+        "compiler",
+        "pauli",
+        "metas",
+        "metric_spec",
+        "checkpoint",
+        "log_store",
+        "dashboard",
+        "instrumentation",
+        "budget",
+    ],
+)
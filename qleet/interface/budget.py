@@ -0,0 +1,110 @@
+"""This module bounds the time and the work of anytime analyzers.
+
+An anytime analyzer refines its estimate progressively, over more samples or a finer
+grid, and returns the best estimate it has when its `Budget` runs out. A budget holds a
+wall-clock deadline, a number of evaluations, like simulated samples or metric values,
+or both, and is exhausted as soon as either runs out.
+
+The clock starts at the first use of the budget rather than at its construction, so a
+budget created up front and shared by several analyzers bounds their total time. The
+clock is `time.perf_counter` unless another one is given, which the analyzers also use
+to time their evaluations.
+"""
+
+import time
+import typing
+
+
+class Budget:
+    """A wall-clock and evaluation budget of an anytime computation."""
+
+    def __init__(
+        self,
+        seconds: typing.Optional[float] = None,
+        evaluations: typing.Optional[int] = None,
+        clock: typing.Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """Constructs the budget.
+
+        :type seconds: float, optional
+        :param seconds: The wall-clock time available, unlimited if None
+        :type evaluations: int, optional
+        :param evaluations: The number of evaluations available, unlimited if None
+        :type clock: Callable
+        :param clock: The clock the time is read from, in seconds
+        """
+        self.seconds = seconds
+        self.evaluations = evaluations
+        self.clock = clock
+        self.spent = 0
+        self._start: typing.Optional[float] = None
+
+    def start(self) -> None:
+        """Starts the clock, if it has not started yet."""
+        if self._start is None:
+            self._start = self.clock()
+
+    @property
+    def elapsed(self) -> float:
+        """The seconds elapsed since the clock started
+        :returns: the elapsed time, starting the clock if needed
+        :rtype: float
+        """
+        self.start()
+        return self.clock() - typing.cast(float, self._start)
+
+    @property
+    def remaining_seconds(self) -> float:
+        """The seconds left before the deadline
+        :returns: the remaining time, infinite without a deadline
+        :rtype: float
+        """
+        if self.seconds is None:
+            return float("inf")
+        return max(0.0, self.seconds - self.elapsed)
+
+    @property
+    def remaining_evaluations(self) -> float:
+        """The evaluations left
+        :returns: the number of remaining evaluations, infinite without a limit
+        :rtype: float
+        """
+        if self.evaluations is None:
+            return float("inf")
+        return max(0, self.evaluations - self.spent)
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the time or the evaluations have run out
+        :rtype: bool
+        """
+        return self.remaining_evaluations <= 0 or self.remaining_seconds <= 0
+
+    def spend(self, evaluations: int = 1) -> None:
+        """Records evaluations done.
+
+        :type evaluations: int
+        :param evaluations: The number of evaluations done
+        """
+        self.start()
+        self.spent += evaluations
+
+    def affordable(
+        self, evaluations: int, seconds_each: typing.Optional[float] = None
+    ) -> int:
+        """The number of evaluations out of the next ones which fit in the budget.
+
+        :type evaluations: int
+        :param evaluations: The number of evaluations wanted
+        :type seconds_each: float, optional
+        :param seconds_each: The expected duration of an evaluation, usually measured
+            on the previous ones, the deadline is not anticipated if None
+        :returns: the number of evaluations which can be done, at most `evaluations`
+        :rtype: int
+        """
+        affordable = min(evaluations, self.remaining_evaluations)
+        if self.exhausted:
+            return 0
+        if seconds_each is not None and seconds_each > 0:
+            affordable = min(affordable, self.remaining_seconds / seconds_each)
+        return int(affordable)
@@ -0,0 +1,194 @@
+"""This module lets long running trainers and analyzers checkpoint their progress.
+
+A `Checkpointer` owns a local directory, every named piece of state is pickled into
+its own file in that directory. Files are written to a temporary file first and then
+atomically moved into place, so a process killed in the middle of writing never leaves
+a corrupt checkpoint behind, the previous checkpoint stays intact instead.
+
+Stacks of simulated states grow by a chunk at a time and can be larger than the memory.
+They are checkpointed with `append_rows` instead, which only writes the new rows to the
+end of a raw file and then atomically saves how many rows are valid, and they are read
+back with `load_rows` as a read-only memory map.
+
+Running the same computation again with a checkpointer on the same directory resumes
+from the last saved state rather than starting over. Use a separate directory for each
+independent run.
+"""
+
+import os
+import pickle
+import tempfile
+import typing
+
+import numpy as np
+
+
+class Checkpointer:
+    """Saves and restores named states of a computation in a local directory."""
+
+    def __init__(self, directory: str, interval: int = 100) -> None:
+        """Constructs the checkpointer, creating the directory if needed.
+
+        :type directory: str
+        :param directory: The directory in which the checkpoints are stored
+        :type interval: int
+        :param interval: Number of steps or samples between consecutive checkpoints
+        """
+        self.directory = directory
+        self.interval = interval
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        """The path of the file which stores the named checkpoint.
+
+        :type name: str
+        :param name: The name of the checkpoint
+        :returns: The path of the checkpoint file
+        :rtype: str
+        """
+        return os.path.join(self.directory, f"{name}.ckpt")
+
+    def rows_path(self, name: str) -> str:
+        """The path of the file which stores the rows of the named array checkpoint.
+
+        :type name: str
+        :param name: The name of the checkpoint
+        :returns: The path of the raw file of the rows
+        :rtype: str
+        """
+        return os.path.join(self.directory, f"{name}.rows")
+
+    def save(self, name: str, state: typing.Dict[str, typing.Any]) -> None:
+        """Atomically writes the state as the named checkpoint.
+
+        :type name: str
+        :param name: The name of the checkpoint
+        :type state: dict
+        :param state: The picklable state to be saved
+        """
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f".{name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path(name))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def load(self, name: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """Reads the named checkpoint back.
+
+        :type name: str
+        :param name: The name of the checkpoint
+        :returns: The saved state, or None if no such checkpoint was saved yet
+        :rtype: dict or None
+        """
+        if not os.path.exists(self.path(name)):
+            return None
+        with open(self.path(name), "rb") as file:
+            return pickle.load(file)
+
+    def append_rows(self, name: str, rows: np.ndarray) -> None:
+        """Appends rows to the named array checkpoint, writing only the new rows.
+
+        The rows are written to the end of a raw file, and the number of valid rows is
+        then saved atomically, so rows left over by an interrupted append are ignored
+        and overwritten by the next one.
+
+        :type name: str
+        :param name: The name of the checkpoint
+        :type rows: np.ndarray
+        :param rows: The rows to append, stacked along the first axis
+        :raises ValueError: if the rows do not have the shape and dtype of the saved ones
+        """
+        rows = np.ascontiguousarray(rows)
+        header = self.load(name)
+        if header is None:
+            header = {"count": 0, "shape": rows.shape[1:], "dtype": rows.dtype.str}
+        elif (
+            tuple(header["shape"]) != rows.shape[1:]
+            or header["dtype"] != rows.dtype.str
+        ):
+            raise ValueError(
+                f"Rows of shape {rows.shape[1:]} and dtype {rows.dtype} can not be "
+                f"appended to the checkpoint {name} of rows of shape {header['shape']} "
+                f"and dtype {header['dtype']}"
+            )
+        offset = header["count"] * int(np.prod(rows.shape[1:])) * rows.dtype.itemsize
+        mode = "r+b" if os.path.exists(self.rows_path(name)) else "wb"
+        with open(self.rows_path(name), mode) as file:
+            file.truncate(offset)
+            file.seek(offset)
+            file.write(rows.tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        self.save(name, dict(header, count=header["count"] + len(rows)))
+
+    def load_rows(self, name: str) -> typing.Optional[np.ndarray]:
+        """Reads the named array checkpoint back, without loading it into memory.
+
+        :type name: str
+        :param name: The name of the checkpoint
+        :returns: The rows appended so far as a read-only memory map, or None if no rows
+            were appended yet
+        :rtype: np.ndarray or None
+        """
+        header = self.load(name)
+        if header is None:
+            return None
+        shape = (header["count"],) + tuple(header["shape"])
+        if header["count"] == 0:
+            return np.zeros(shape, dtype=header["dtype"])
+        return np.memmap(
+            self.rows_path(name), dtype=header["dtype"], mode="r", shape=shape
+        )
+
+    def load_or_create(
+        self,
+        name: str,
+        factory: typing.Callable[[], typing.Any],
+        metadata: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    ) -> typing.Any:
+        """Loads the named value, or creates it with the factory and checkpoints it.
+
+        The state of NumPy's global random number generator after the factory ran is
+        saved along with the value, and restored when the value is loaded back, so the
+        random draws following a resumed computation are the same as the original ones.
+
+        :type name: str
+        :param name: The name of the checkpoint
+        :type factory: Callable
+        :param factory: Function with no arguments which generates the value
+        :type metadata: dict, optional
+        :param metadata: The settings the value is generated from, like the number of
+            samples and the seed, saved along with the value and checked when loading it
+        :returns: The saved or the freshly created value
+        :raises ValueError: if the value was saved with different metadata
+        """
+        state = self.load(name)
+        if state is None:
+            state = {"value": factory(), "rng": np.random.get_state()}
+            state["metadata"] = metadata
+            self.save(name, state)
+        elif state.get("metadata") != metadata:
+            raise ValueError(
+                f"The checkpoint {name} was created with {state.get('metadata')}, not "
+                f"{metadata}, clear it or use another directory"
+            )
+        else:
+            np.random.set_state(state["rng"])
+        return state["value"]
+
+    def clear(self, name: str) -> None:
+        """Deletes the named checkpoint if it exists.
+
+        :type name: str
+        :param name: The name of the checkpoint
+        """
+        for path in (self.path(name), self.rows_path(name)):
+            if os.path.exists(path):
+                os.remove(path)
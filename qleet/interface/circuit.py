@@ -12,21 +12,52 @@ supported on QASM cannot be converted directly, please provide your circuit in a
 Cirq or Qiskit backend in that case.
 """
 
+from __future__ import annotations
+
 import typing
 
-import numpy as np
-import sympy
+from .._lazy import lazy_module, isinstance_of
+from .compiler import CompiledCircuit, compile_circuit
+from .pauli import PauliSumOperator, compile_pauli_sum
+from .instrumentation import timed
+
+if typing.TYPE_CHECKING:
+    import sympy
+    import cirq
+    import qiskit
+    import qiskit.quantum_info
+    import pyquil
+    import pyquil.paulis
+else:
+    cirq = lazy_module("cirq")
+    qiskit = lazy_module("qiskit")
+    pyquil = lazy_module("pyquil")
+
+qasm_import = lazy_module("cirq.contrib.qasm_import")
+quil_import = lazy_module("cirq.contrib.quil_import")
+
+
+def circuit_from_qasm(qasm_str: str) -> cirq.Circuit:
+    """Parses an OpenQASM string into a cirq circuit
+    :type qasm_str: str
+    :param qasm_str: The OpenQASM program
+    :return: circuit in cirq
+    :rtype: cirq.Circuit
+    """
+    return qasm_import.circuit_from_qasm(qasm_str)
 
-import cirq
-import qiskit
-import pyquil
 
-from cirq.contrib.qasm_import import circuit_from_qasm
-from cirq.contrib.quil_import import circuit_from_quil
-import qiskit.quantum_info
-import pyquil.paulis
+def circuit_from_quil(quil_str: str) -> cirq.Circuit:
+    """Parses a Quil program into a cirq circuit
+    :type quil_str: str
+    :param quil_str: The Quil program
+    :return: circuit in cirq
+    :rtype: cirq.Circuit
+    """
+    return quil_import.circuit_from_quil(quil_str)
 
 
+@timed("circuit.to_cirq")
 def convert_to_cirq(
     circuit: typing.Union[qiskit.QuantumCircuit, cirq.Circuit, pyquil.Program]
 ) -> cirq.Circuit:
@@ -37,11 +68,11 @@ def convert_to_cirq(
     :rtype: cirq.Circuit
     :raises ValueError: if the circuit is not from one of the supported frameworks
     """
-    if isinstance(circuit, cirq.Circuit):
+    if isinstance_of(circuit, "cirq", "Circuit"):
         return circuit
-    elif isinstance(circuit, qiskit.QuantumCircuit):
+    elif isinstance_of(circuit, "qiskit", "QuantumCircuit"):
         return circuit_from_qasm(circuit.qasm())
-    elif isinstance(circuit, pyquil.Program):
+    elif isinstance_of(circuit, "pyquil", "Program"):
         return circuit_from_quil(str(circuit))
     else:
         raise ValueError(
@@ -49,6 +80,7 @@ def convert_to_cirq(
         )
 
 
+@timed("circuit.to_qiskit")
 def convert_to_qiskit(
     circuit: typing.Union[qiskit.QuantumCircuit, cirq.Circuit, pyquil.Program]
 ) -> qiskit.QuantumCircuit:
@@ -59,11 +91,11 @@ def convert_to_qiskit(
     :return: circuit in qiskit
     :rtype: qiskit.QuantumCircuit
     """
-    if isinstance(circuit, cirq.Circuit):
+    if isinstance_of(circuit, "cirq", "Circuit"):
         return qiskit.QuantumCircuit.from_qasm_str(circuit.to_qasm())
-    elif isinstance(circuit, qiskit.QuantumCircuit):
+    elif isinstance_of(circuit, "qiskit", "QuantumCircuit"):
         return circuit
-    elif isinstance(circuit, pyquil.Program):
+    elif isinstance_of(circuit, "pyquil", "Program"):
         return convert_to_qiskit(convert_to_cirq(circuit))
     else:
         raise ValueError(
@@ -71,6 +103,7 @@ def convert_to_qiskit(
         )
 
 
+@timed("circuit.to_pyquil")
 def convert_to_pyquil(
     circuit: typing.Union[qiskit.QuantumCircuit, cirq.Circuit, pyquil.Program]
 ) -> qiskit.QuantumCircuit:
@@ -81,11 +114,11 @@ def convert_to_pyquil(
     :return: circuit in pyquil
     :rtype: pyquil.Program
     """
-    if isinstance(circuit, cirq.Circuit):
+    if isinstance_of(circuit, "cirq", "Circuit"):
         return pyquil.Program(circuit.to_quil())
-    elif isinstance(circuit, qiskit.QuantumCircuit):
+    elif isinstance_of(circuit, "qiskit", "QuantumCircuit"):
         return pyquil.Program(convert_to_cirq(circuit).to_quil())
-    elif isinstance(circuit, pyquil.Program):
+    elif isinstance_of(circuit, "pyquil", "Program"):
         return circuit
     else:
         raise ValueError(
@@ -131,6 +164,9 @@ class CircuitDescriptor:
         self._circuit = circuit
         self._params = params
         self._cost = cost_function
+        self._compiled: typing.Optional[CompiledCircuit] = None
+        self._cost_operator: typing.Optional[PauliSumOperator] = None
+        self._has_channels: typing.Optional[bool] = None
 
     @property
     def default_backend(self) -> str:
@@ -139,11 +175,11 @@ class CircuitDescriptor:
         :rtype: str
         :raises ValueError: if the given circuit is not from a supported library
         """
-        if isinstance(self._circuit, cirq.Circuit):
+        if isinstance_of(self._circuit, "cirq", "Circuit"):
             return "cirq"
-        if isinstance(self._circuit, qiskit.QuantumCircuit):
+        if isinstance_of(self._circuit, "qiskit", "QuantumCircuit"):
             return "qiskit"
-        if isinstance(self._circuit, pyquil.Program):
+        if isinstance_of(self._circuit, "pyquil", "Program"):
             return "pyquil"
         raise ValueError("Unsupported framework of circuit")
 
@@ -231,11 +267,11 @@ class CircuitDescriptor:
         :rtype: int
         :raises ValueError: if unsupported circuit framework is given
         """
-        if isinstance(self._circuit, cirq.Circuit):
+        if isinstance_of(self._circuit, "cirq", "Circuit"):
             return len(self._circuit.all_qubits())
-        elif isinstance(self._circuit, qiskit.QuantumCircuit):
+        elif isinstance_of(self._circuit, "qiskit", "QuantumCircuit"):
             return self._circuit.num_qubits
-        elif isinstance(self._circuit, pyquil.Program):
+        elif isinstance_of(self._circuit, "pyquil", "Program"):
             return len(self._circuit.get_qubits())
         else:
             raise ValueError("Unsupported framework of circuit")
@@ -244,27 +280,109 @@ class CircuitDescriptor:
     def cirq_cost(self) -> cirq.PauliSum:
         """Returns the cost function, which is a function that takes in the state vector or the
         density matrix and returns the loss value of the solution envisioned by the Quantum Circuit.
-        :raises ValueError: if the circuit is not from one of the supported frameworks
-        :raises NotImplementedError: Long as qiskit and pyquil ports of pauli-string aren't written
+        Costs given in qiskit or pyquil are converted to act on the qubits of `cirq_circuit`.
+        :raises ValueError: if the cost is not a Pauli-Sum from one of the supported frameworks
         :return: cost function
-        TODO: Implement conversions into Cirq PauliSum
         """
-        if isinstance(self._cost, cirq.PauliSum):
+        if isinstance_of(self._cost, "cirq", "PauliSum"):
             return self._cost
-        elif isinstance(self._cost, qiskit.quantum_info.PauliList):
-            raise NotImplementedError("Qiskit PauliString support is not implemented")
-        elif isinstance(self._cost, pyquil.paulis.PauliSum):
-            raise NotImplementedError("PyQuil PauliString support is not implemented")
-        else:
-            raise ValueError("Cost object should be a Pauli-Sum object")
+        return self.cost_operator.to_cirq(sorted(self.cirq_circuit.all_qubits()))
+
+    @property
+    def cost_operator(self) -> PauliSumOperator:
+        """The cost function compiled into X and Z bitmasks over the qubits of the circuit,
+        indexed like the states simulated in the framework of the circuit.
+        :raises ValueError: if the cost is not a Pauli-Sum from one of the supported frameworks
+        :return: the compiled cost function
+        :rtype: PauliSumOperator
+        """
+        if self._cost_operator is None:
+            qubits: typing.List[typing.Any]
+            if isinstance_of(self._circuit, "cirq", "Circuit"):
+                qubits = sorted(self._circuit.all_qubits())
+            elif isinstance_of(self._circuit, "pyquil", "Program"):
+                qubits = sorted(self._circuit.get_qubits())
+            else:
+                qubits = list(range(self.num_qubits))
+            self._cost_operator = compile_pauli_sum(
+                self._cost, qubits, big_endian=self.default_backend != "qiskit"
+            )
+        return self._cost_operator
+
+    @property
+    def compiled(self) -> CompiledCircuit:
+        """The canonical gate stream of the circuit, compiled on first use.
+        The circuit is treated as immutable, it is compiled only once.
+
+        :returns: the compiled circuit
+        :rtype: CompiledCircuit
+        """
+        if self._compiled is None:
+            circuit = self._circuit
+            if isinstance_of(circuit, "pyquil", "Program"):
+                circuit = self.cirq_circuit
+            self._compiled = compile_circuit(circuit, self._params)
+        return self._compiled
+
+    @property
+    def has_channels(self) -> bool:
+        """Whether the circuit has noise channels, operations which are neither unitary
+        nor measurements, so that it has to be simulated as density matrices.
+        The circuit is treated as immutable, it is inspected only once.
+
+        :returns: whether any operation of the cirq circuit is a noise channel
+        :rtype: bool
+        """
+        if self._has_channels is None:
+            self._has_channels = any(
+                not cirq.is_measurement(operation)
+                and not cirq.is_parameterized(operation)
+                and not cirq.has_unitary(operation)
+                and cirq.has_kraus(operation)
+                for operation in self.cirq_circuit.all_operations()
+            )
+        return self._has_channels
+
+    @property
+    def fingerprint(self) -> str:
+        """Structural hash of the circuit, computed from the compiled gate stream.
+        It depends only on the gates, the qubits they act on and the position of the
+        parameters in the list of parameters, so the same circuit written in any of the
+        frameworks, or with differently named parameters, has the same fingerprint.
+
+        :returns: hex digest of the gate stream
+        :rtype: str
+        """
+        return self.compiled.fingerprint
+
+    def _key(self) -> typing.Tuple[str, str]:
+        """The framework and the structure the descriptor is hashed and compared by.
+        Circuits which can not be compiled fall back to their type and to the
+        representation of the circuit and its parameters, so that hashing and
+        comparing them never raises.
+
+        :returns: the framework and the fingerprint, or the fallback
+        :rtype: tuple of str
+        """
+        try:
+            return self.default_backend, self.fingerprint
+        except ValueError:
+            return type(self._circuit).__name__, repr((self._circuit, self._params))
+
+    def __hash__(self) -> int:
+        """Hashes the circuit by its framework and its structure
+        :returns: the hash
+        :rtype: int
+        """
+        return hash(self._key())
 
     def __eq__(self, other: typing.Any) -> bool:
-        """Checks equality between a CircuitDescriptor and another object"""
+        """Checks equality between a CircuitDescriptor and another object.
+        Descriptors are equal if they have the same structure in the same framework, as
+        different frameworks order the amplitudes of the simulated states differently.
+        """
         if isinstance(other, CircuitDescriptor):
-            return (
-                np.array_equal(self.parameters, other.parameters)
-                and self.cirq_circuit == other.cirq_circuit
-            )
+            return self._key() == other._key()
         return False
 
     def __repr__(self) -> str:
@@ -0,0 +1,557 @@
+"""This module compiles the circuits of every framework into one canonical gate stream.
+
+The gate stream is the list of gates of the circuit in the order they are applied. The
+qubits are numbered from 0 in a canonical order, which is the sorted order of the qubits
+for cirq and the register order for qiskit. Gates are named from a small set of standard
+gates with a known matrix, and every other gate carries its own matrix. The parameters of
+the circuit are renamed `p0, p1, ...` after their position in the list of parameters of
+the circuit descriptor, so the angles of the gates are numbers or sympy expressions in
+those symbols.
+
+Gates of the standard set and their parameters:
+
+    * `h`, `cx`, `swap`, `ccx`, without parameters
+    * `rx`, `ry`, `rz`, rotations by the angle theta
+    * `xpow`, `ypow`, the Pauli X and Y raised to the exponent t, `x` is `xpow(1)`
+    * `p`, the phase gate diag(1, exp(i lambda)), `z` is `p(pi)` and `s` is `p(pi/2)`
+    * `cp`, the controlled phase gate, `cz` is `cp(pi)`
+    * `u`, the generic single qubit gate u(theta, phi, lambda) of OpenQASM
+    * `unitary`, any other gate given by its matrix, and `channel`, a noise channel
+      given by its stacked Kraus operators
+    * `measure`, a measurement, which is ignored when simulating states
+    * `opaque:<description>`, a parametrized gate of the framework with no equivalent
+      in the standard set, described in the canonical parameters, which only the
+      framework itself can simulate
+
+The same circuit written in cirq and in qiskit compiles into the same gate stream, so the
+fingerprint hashed from it is independent of the framework the circuit is written in.
+Matrices act on the qubits of a gate in big-endian order, the first qubit of the gate is
+the most significant one.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import typing
+
+import numpy as np
+
+from .._lazy import lazy_module, isinstance_of
+
+if typing.TYPE_CHECKING:
+    import sympy
+    import cirq
+    import qiskit
+else:
+    sympy = lazy_module("sympy")
+    cirq = lazy_module("cirq")
+
+Param = typing.Union[float, "sympy.Expr"]
+
+STANDARD_GATES = {
+    # name: (number of qubits, number of parameters)
+    "h": (1, 0),
+    "rx": (1, 1),
+    "ry": (1, 1),
+    "rz": (1, 1),
+    "xpow": (1, 1),
+    "ypow": (1, 1),
+    "p": (1, 1),
+    "u": (1, 3),
+    "cx": (2, 0),
+    "cp": (2, 1),
+    "swap": (2, 0),
+    "ccx": (3, 0),
+}
+
+QISKIT_GATES: typing.Dict[str, typing.Tuple[str, typing.Callable[[list], list]]] = {
+    # qiskit name: (standard name, parameters of the standard gate from qiskit's)
+    "h": ("h", lambda params: []),
+    "x": ("xpow", lambda params: [1.0]),
+    "y": ("ypow", lambda params: [1.0]),
+    "z": ("p", lambda params: [np.pi]),
+    "s": ("p", lambda params: [np.pi / 2]),
+    "sdg": ("p", lambda params: [-np.pi / 2]),
+    "t": ("p", lambda params: [np.pi / 4]),
+    "tdg": ("p", lambda params: [-np.pi / 4]),
+    "sx": ("xpow", lambda params: [0.5]),
+    "sxdg": ("xpow", lambda params: [-0.5]),
+    "rx": ("rx", lambda params: params),
+    "ry": ("ry", lambda params: params),
+    "rz": ("rz", lambda params: params),
+    "p": ("p", lambda params: params),
+    "u1": ("p", lambda params: params),
+    "u": ("u", lambda params: params),
+    "u3": ("u", lambda params: params),
+    "cx": ("cx", lambda params: []),
+    "cz": ("cp", lambda params: [np.pi]),
+    "cp": ("cp", lambda params: params),
+    "cu1": ("cp", lambda params: params),
+    "swap": ("swap", lambda params: []),
+    "ccx": ("ccx", lambda params: []),
+}
+
+# Instructions which do not act on the state
+IGNORED_INSTRUCTIONS = {"id", "barrier", "delay", "snapshot"}
+
+# Prefix of the names of the gates which have no standard form
+OPAQUE_PREFIX = "opaque:"
+
+
+class Gate(typing.NamedTuple):
+    """One gate of the gate stream."""
+
+    name: str
+    qubits: typing.Tuple[int, ...]
+    params: typing.Tuple[Param, ...] = ()
+    matrix: typing.Optional[np.ndarray] = None
+
+
+class CompiledCircuit:
+    """The canonical gate stream of a circuit, which can be bound to parameter values."""
+
+    def __init__(self, num_qubits: int, num_params: int, gates: typing.List[Gate]):
+        """Constructs the compiled circuit.
+
+        :type num_qubits: int
+        :param num_qubits: Number of qubits of the circuit
+        :type num_params: int
+        :param num_params: Number of parameters of the circuit, named `p0, p1, ...`
+        :type gates: list of Gate
+        :param gates: The gate stream, reordered into the canonical order
+        """
+        self.num_qubits = num_qubits
+        self.num_params = num_params
+        self.gates = canonical_order(gates)
+        self._fingerprint: typing.Optional[str] = None
+        self._evaluators: typing.Optional[typing.List[list]] = None
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        """The state pickled, to send the circuit to other processes. The evaluators of
+        the angles are generated functions, which are built again when needed instead.
+        :returns: the attributes of the circuit without its evaluators
+        :rtype: dict
+        """
+        state = self.__dict__.copy()
+        state["_evaluators"] = None
+        return state
+
+    @property
+    def symbols(self) -> typing.List[sympy.Symbol]:
+        """The symbols which stand for the parameters in the gate stream
+        :return: the symbols `p0, p1, ...`
+        """
+        return [sympy.Symbol(f"p{idx}") for idx in range(self.num_params)]
+
+    @property
+    def opaque(self) -> bool:
+        """Whether some gates have no standard form, so that the circuit can only be
+        simulated by its framework
+        :rtype: bool
+        """
+        return any(gate.name.startswith(OPAQUE_PREFIX) for gate in self.gates)
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the gate stream, the same for the same circuit in every framework
+        :return: hex digest of the canonical form of the gate stream
+        :rtype: str
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            digest.update(f"{self.num_qubits};{self.num_params}".encode())
+            for gate in self.gates:
+                digest.update(_gate_token(gate).encode())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def bind(self, values: np.ndarray) -> typing.List[typing.Tuple[Gate, np.ndarray]]:
+        """Computes the matrices of the gates for the values of the parameters.
+
+        :type values: np.ndarray
+        :param values: The values of the parameters, shape (num_params,) for a single
+            assignment or (batch, num_params) for a batch of them
+        :returns: every gate along with its matrix, or its stacked Kraus operators for
+            channels, the matrices of the parametrized gates have a leading batch axis
+            if the values were batched
+        :rtype: list of tuples of Gate and np.ndarray
+        """
+        bound = []
+        for gate, params in self.bind_params(values):
+            if gate.name == "measure":
+                continue
+            if gate.matrix is not None:
+                bound.append((gate, gate.matrix))
+                continue
+            bound.append((gate, gate_matrix(gate.name, params)))
+        return bound
+
+    def bind_params(
+        self, values: np.ndarray
+    ) -> typing.List[typing.Tuple[Gate, typing.List[typing.Any]]]:
+        """Evaluates the angles of the gates for the values of the parameters.
+
+        :type values: np.ndarray
+        :param values: The values of the parameters, shape (num_params,) for a single
+            assignment or (batch, num_params) for a batch of them
+        :returns: every gate along with the values of its angles, numbers for the fixed
+            angles and arrays over the batch for the parametrized ones
+        :rtype: list of tuples of Gate and list
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self._evaluators is None:
+            self._evaluators = [
+                [_evaluator(param, self.symbols) for param in gate.params]
+                for gate in self.gates
+            ]
+        columns = [values[..., idx] for idx in range(self.num_params)]
+        return [
+            (gate, [evaluate(*columns) for evaluate in evaluators])
+            for gate, evaluators in zip(self.gates, self._evaluators)
+        ]
+
+
+def canonical_order(gates: typing.List[Gate]) -> typing.List[Gate]:
+    """Reorders the gates layer by layer, so the order does not depend on how the
+    circuit was written down. Every gate is put in the earliest layer after all the
+    gates before it on the same qubits, and the gates of a layer, which act on disjoint
+    qubits, are sorted by their qubits.
+
+    :type gates: list of Gate
+    :param gates: The gates in the order they are applied
+    :returns: the same gates in the canonical order
+    :rtype: list of Gate
+    """
+    depth: typing.Dict[int, int] = {}
+    layered = []
+    for gate in gates:
+        layer = 1 + max((depth.get(qubit, 0) for qubit in gate.qubits), default=0)
+        for qubit in gate.qubits:
+            depth[qubit] = layer
+        layered.append((layer, min(gate.qubits, default=0), gate))
+    return [gate for _layer, _qubit, gate in sorted(layered, key=lambda x: x[:2])]
+
+
+def _evaluator(param: Param, symbols: typing.List[sympy.Symbol]) -> typing.Callable:
+    """Builds a function of the parameter values which evaluates an angle of a gate.
+
+    :type param: float or sympy.Expr
+    :param param: The angle, a number or an expression in the parameters
+    :type symbols: list of sympy.Symbol
+    :param symbols: The symbols of the parameters
+    :returns: the function, vectorized over batches of values
+    :rtype: Callable
+    """
+    if isinstance(param, (int, float)):
+        return lambda *columns: float(param)
+    return sympy.lambdify(symbols, param, "numpy")
+
+
+def _number_token(value: typing.Any) -> str:
+    """Textual form of a number which is the same for values equal up to rounding.
+
+    :param value: The number
+    :returns: the rounded number
+    :rtype: str
+    """
+    return f"{round(float(value), 10) + 0.0:.10g}"
+
+
+def _gate_token(gate: Gate) -> str:
+    """Canonical textual form of a gate which the fingerprint is hashed from.
+
+    :type gate: Gate
+    :param gate: The gate
+    :returns: the textual form
+    :rtype: str
+    """
+    params = [
+        (
+            _number_token(param)
+            if isinstance(param, (int, float))
+            else str(sympy.sympify(param).evalf(10))
+        )
+        for param in gate.params
+    ]
+    token = f"{gate.name}{list(gate.qubits)}({','.join(params)})"
+    if gate.matrix is not None:
+        matrix = np.round(np.asarray(gate.matrix, dtype=np.complex128), 10) + 0.0
+        token += hashlib.sha256(matrix.tobytes()).hexdigest()
+    return token + ";"
+
+
+def gate_matrix(name: str, params: typing.Sequence[typing.Any]) -> np.ndarray:
+    """The matrix of a standard gate, vectorized over batches of parameter values.
+
+    :type name: str
+    :param name: The name of the standard gate
+    :type params: list of floats or np.ndarray
+    :param params: The angles of the gate, arrays of shape (batch,) for batches
+    :returns: the unitary matrix, of shape (batch, d, d) if the angles are batched
+    :rtype: np.ndarray
+    :raises ValueError: if the gate is not in the standard set
+    """
+    params = [np.asarray(param, dtype=np.float64) for param in params]
+    if name == "h":
+        return np.array([[1, 1], [1, -1]], dtype=np.complex128) / np.sqrt(2)
+    if name == "cx":
+        return np.eye(4, dtype=np.complex128)[[0, 1, 3, 2]]
+    if name == "swap":
+        return np.eye(4, dtype=np.complex128)[[0, 2, 1, 3]]
+    if name == "ccx":
+        return np.eye(8, dtype=np.complex128)[[0, 1, 2, 3, 4, 5, 7, 6]]
+    if name in ("rx", "ry", "rz"):
+        cos, sin = np.cos(params[0] / 2), np.sin(params[0] / 2)
+        zero = np.zeros_like(cos)
+        if name == "rx":
+            rows = [[cos, -1j * sin], [-1j * sin, cos]]
+        elif name == "ry":
+            rows = [[cos, -sin], [sin, cos]]
+        else:
+            phase = np.exp(-0.5j * params[0])
+            rows = [[phase, zero], [zero, np.conj(phase)]]
+        return _stack(rows)
+    if name in ("xpow", "ypow"):
+        phase = np.exp(1j * np.pi * params[0])
+        diagonal, off_diagonal = (1 + phase) / 2, (1 - phase) / 2
+        if name == "xpow":
+            return _stack([[diagonal, off_diagonal], [off_diagonal, diagonal]])
+        return _stack([[diagonal, -1j * off_diagonal], [1j * off_diagonal, diagonal]])
+    if name == "p":
+        phase = np.exp(1j * params[0])
+        one, zero = np.ones_like(phase), np.zeros_like(phase)
+        return _stack([[one, zero], [zero, phase]])
+    if name == "cp":
+        phase = np.exp(1j * params[0])
+        matrix = np.zeros(phase.shape + (4, 4), dtype=np.complex128)
+        matrix[..., 0, 0] = matrix[..., 1, 1] = matrix[..., 2, 2] = 1
+        matrix[..., 3, 3] = phase
+        return matrix
+    if name == "u":
+        theta, phi, lam = np.broadcast_arrays(*params)
+        cos, sin = np.cos(theta / 2), np.sin(theta / 2)
+        return _stack(
+            [
+                [cos, -np.exp(1j * lam) * sin],
+                [np.exp(1j * phi) * sin, np.exp(1j * (phi + lam)) * cos],
+            ]
+        )
+    raise ValueError(f"{name} is not a standard gate")
+
+
+def _stack(rows: typing.List[typing.List[typing.Any]]) -> np.ndarray:
+    """Stacks the entries of a matrix, which may be batched arrays, into the matrix.
+
+    :type rows: nested list of arrays
+    :param rows: The entries of the matrix, row by row
+    :returns: the matrix, with the batch axes first
+    :rtype: np.ndarray
+    """
+    entries = np.broadcast_arrays(*[entry for row in rows for entry in row])
+    matrix = np.stack(entries, axis=-1).astype(np.complex128)
+    return matrix.reshape(entries[0].shape + (len(rows), len(rows)))
+
+
+def reverse_qubit_order(matrix: np.ndarray) -> np.ndarray:
+    """Converts a matrix between the big-endian and the little-endian qubit orders.
+
+    :type matrix: np.ndarray
+    :param matrix: The matrix on k qubits, of shape (..., 2^k, 2^k)
+    :returns: The same operator with the order of its qubits reversed
+    :rtype: np.ndarray
+    """
+    size = matrix.shape[-1]
+    num_qubits = size.bit_length() - 1
+    batch = matrix.shape[:-2]
+    tensor = matrix.reshape(batch + (2,) * (2 * num_qubits))
+    axes = list(range(len(batch)))
+    axes += [len(batch) + num_qubits - 1 - idx for idx in range(num_qubits)]
+    axes += [len(batch) + 2 * num_qubits - 1 - idx for idx in range(num_qubits)]
+    return tensor.transpose(axes).reshape(batch + (size, size))
+
+
+def compile_circuit(circuit: typing.Any, params: typing.Sequence[typing.Any]):
+    """Compiles a cirq or qiskit circuit into its canonical gate stream.
+
+    :type circuit: cirq.Circuit or qiskit.QuantumCircuit
+    :param circuit: The circuit, pyquil programs are to be converted to cirq first
+    :type params: list of sympy.Symbol or qiskit.circuit.Parameter
+    :param params: The parameters of the circuit, in the order of the descriptor
+    :returns: the compiled circuit
+    :rtype: CompiledCircuit
+    :raises ValueError: if the circuit is not from a supported framework
+    """
+    if isinstance_of(circuit, "cirq", "Circuit"):
+        return _compile_cirq(circuit, params)
+    if isinstance_of(circuit, "qiskit", "QuantumCircuit"):
+        return _compile_qiskit(circuit, params)
+    raise ValueError(f"Expected a circuit in cirq or qiskit, got {type(circuit)}")
+
+
+def _canonical_param(value: typing.Any, substitutions: typing.Dict) -> Param:
+    """Converts a gate parameter into a number or an expression in `p0, p1, ...`.
+
+    :param value: The parameter, a number or a symbolic expression
+    :type substitutions: dict
+    :param substitutions: Map from the symbols of the circuit to the canonical ones
+    :returns: the canonical parameter
+    :rtype: float or sympy.Expr
+    """
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    # Replaced simultaneously, as the symbols of the circuit can be called `p0, p1, ...`
+    expression = sympy.sympify(value).xreplace(substitutions)
+    if expression.free_symbols:
+        return expression
+    return float(expression)
+
+
+def _canonical_qiskit_param(
+    value: typing.Any, symbols: typing.Dict[str, sympy.Symbol]
+) -> Param:
+    """Converts a parameter of a qiskit instruction into a number or an expression in
+    `p0, p1, ...`. The qiskit parameters are mapped to the canonical symbols by their
+    name, and never parsed, as their names, like `θ[0]`, are no valid sympy expressions.
+
+    :param value: The parameter, a number, a qiskit Parameter or ParameterExpression
+    :type symbols: dict
+    :param symbols: Map from the names of the parameters of the circuit to the
+        canonical symbols
+    :returns: the canonical parameter
+    :rtype: float or sympy.Expr
+    """
+    if not isinstance_of(value, "qiskit.circuit", "ParameterExpression"):
+        return float(value)
+    if not value.parameters:
+        return float(value)
+    if isinstance_of(value, "qiskit.circuit", "Parameter"):
+        return symbols.get(value.name, sympy.Symbol(value.name))
+    if hasattr(value, "sympify"):
+        expression = value.sympify()
+    else:
+        # pylint: disable=protected-access
+        expression = sympy.sympify(value._symbol_expr)
+    return expression.xreplace(
+        {symbol: symbols.get(symbol.name, symbol) for symbol in expression.free_symbols}
+    )
+
+
+def _compile_cirq(circuit: cirq.Circuit, params: typing.Sequence[typing.Any]):
+    """Compiles a cirq circuit, see `compile_circuit`.
+
+    :type circuit: cirq.Circuit
+    :param circuit: The circuit
+    :type params: list of sympy.Symbol
+    :param params: The parameters of the circuit, in the order of the descriptor
+    :returns: the compiled circuit
+    :rtype: CompiledCircuit
+    :raises ValueError: if the circuit contains an operation which can not be simulated
+    """
+    qubits = {qubit: idx for idx, qubit in enumerate(sorted(circuit.all_qubits()))}
+    substitutions = {
+        sympy.sympify(param): sympy.Symbol(f"p{idx}")
+        for idx, param in enumerate(params)
+    }
+    gates = []
+    for operation in circuit.all_operations():
+        gate = operation.gate
+        targets = tuple(qubits[qubit] for qubit in operation.qubits)
+
+        def standard(name: str, *values: typing.Any) -> Gate:
+            return Gate(
+                name,
+                targets,
+                tuple(_canonical_param(value, substitutions) for value in values),
+            )
+
+        exponent = getattr(gate, "exponent", None)
+        shift = getattr(gate, "global_shift", None)
+        angle = None
+        if exponent is not None:
+            angle = exponent * (sympy.pi if cirq.is_parameterized(gate) else np.pi)
+        if isinstance(gate, cirq.MeasurementGate):
+            gates.append(Gate("measure", targets))
+        elif isinstance(gate, cirq.IdentityGate):
+            continue
+        elif isinstance(gate, (cirq.Rx, cirq.Ry, cirq.Rz)):
+            gates.append(standard(type(gate).__name__.lower(), angle))
+        elif isinstance(gate, cirq.HPowGate) and exponent == 1:
+            gates.append(standard("h"))
+        elif isinstance(gate, cirq.XPowGate) and shift == 0:
+            gates.append(standard("xpow", exponent))
+        elif isinstance(gate, cirq.YPowGate) and shift == 0:
+            gates.append(standard("ypow", exponent))
+        elif isinstance(gate, cirq.ZPowGate) and shift == 0:
+            gates.append(standard("p", angle))
+        elif isinstance(gate, cirq.CXPowGate) and exponent == 1:
+            gates.append(standard("cx"))
+        elif isinstance(gate, cirq.CZPowGate) and shift == 0:
+            gates.append(standard("cp", angle))
+        elif isinstance(gate, cirq.SwapPowGate) and exponent == 1:
+            gates.append(standard("swap"))
+        elif isinstance(gate, cirq.CCXPowGate) and exponent == 1:
+            gates.append(standard("ccx"))
+        elif cirq.is_parameterized(operation):
+            # Described by its representation in the canonical parameters
+            resolved = cirq.resolve_parameters(
+                gate if gate is not None else operation,
+                cirq.ParamResolver(substitutions),
+                recursive=False,
+            )
+            gates.append(Gate(f"{OPAQUE_PREFIX}{resolved!r}", targets))
+        elif cirq.has_unitary(operation):
+            gates.append(Gate("unitary", targets, matrix=cirq.unitary(operation)))
+        elif cirq.has_kraus(operation):
+            kraus = np.stack(cirq.kraus(operation))
+            gates.append(Gate("channel", targets, matrix=kraus))
+        else:
+            raise ValueError(f"Operation {operation} can not be simulated")
+    return CompiledCircuit(len(qubits), len(params), gates)
+
+
+def _compile_qiskit(
+    circuit: qiskit.QuantumCircuit, params: typing.Sequence[typing.Any]
+):
+    """Compiles a qiskit circuit, see `compile_circuit`.
+
+    :type circuit: qiskit.QuantumCircuit
+    :param circuit: The circuit
+    :type params: list of qiskit.circuit.Parameter
+    :param params: The parameters of the circuit, in the order of the descriptor
+    :returns: the compiled circuit
+    :rtype: CompiledCircuit
+    :raises ValueError: if the circuit contains an operation which can not be simulated
+    """
+    symbols = {param.name: sympy.Symbol(f"p{idx}") for idx, param in enumerate(params)}
+    gates = []
+    for item in circuit.data:
+        if hasattr(item, "operation"):
+            operation, qargs = item.operation, item.qubits
+        else:
+            operation, qargs = item[0], item[1]
+        targets = tuple(circuit.qubits.index(qubit) for qubit in qargs)
+        if operation.name in IGNORED_INSTRUCTIONS or operation.name.startswith("save_"):
+            continue
+        if operation.name == "measure":
+            gates.append(Gate("measure", targets))
+        elif operation.name in QISKIT_GATES:
+            name, convert = QISKIT_GATES[operation.name]
+            canonical = [
+                _canonical_qiskit_param(value, symbols) for value in operation.params
+            ]
+            gates.append(Gate(name, targets, tuple(convert(canonical))))
+        elif any(
+            isinstance_of(value, "qiskit.circuit", "ParameterExpression")
+            and value.parameters
+            for value in operation.params
+        ):
+            canonical = [
+                _canonical_qiskit_param(value, symbols) for value in operation.params
+            ]
+            gates.append(
+                Gate(f"{OPAQUE_PREFIX}{operation.name}", targets, tuple(canonical))
+            )
+        else:
+            matrix = lazy_module("qiskit.quantum_info").Operator(operation).data
+            gates.append(Gate("unitary", targets, matrix=reverse_qubit_order(matrix)))
+    return CompiledCircuit(circuit.num_qubits, len(params), gates)
@@ -1,27 +1,214 @@
+"""Module which serves the interactive dashboard of the loss landscape and training paths.
+
+The loss landscape scan and the training of the runs happen in background threads, the
+Dash page is served right away and its graphs are refreshed from the partial results by
+an interval callback, until both the workers are done. The landscape fills in point by
+point, while the training paths appear one whole run at a time, as the runs are trained
+in separate processes and only logged once they finish. The graphs are drawn from copies
+of the logged values, taken under the lock of the loggers, so the workers are never held
+up by the plotting. The errors of the workers are shown on the page, which then stops
+refreshing. Large traces are drawn with WebGL and downsampled on the server, so the page
+stays responsive for very long training logs.
+"""
+
+import copy
+import threading
+import traceback
+import typing
+
+import numpy as np
 import networkx as nx
+import plotly.graph_objects as pg
 
 import dash
 import dash_core_components as dash_core
 import dash_html_components as dash_html
+from dash.dependencies import Input, Output
 
-from qleet.interface.metas import AnalyzerList
+from qleet.interface.metas import AnalyzerList, MetaLogger
 from qleet.analyzers.loss_landscape import LossLandscapePlotter
 from qleet.analyzers.training_path import OptimizationPathPlotter
 from qleet.analyzers.training_path import LossLandscapePathPlotter
+from qleet.simulators.pqc_trainer import MultiStartTrainer
 
 
-def launch_dashboard(trainer, plottable_metric):
-    plot = LossLandscapePlotter(trainer, plottable_metric, dim=2)
+class _LockedAnalyzerList(AnalyzerList):
+    """Analyzer list whose loggers are only written to while holding a lock, so that the
+    Dash callbacks never read a logger halfway through an update."""
+
+    def __init__(self, lock: threading.Lock, *args):
+        """Constructs the analyzer list guarded by the lock.
+
+        :type lock: threading.Lock
+        :param lock: The lock shared with the readers of the loggers
+        :type args: MetaLogger or MetaExplorer
+        :param args: The analyzers in the list
+        """
+        super().__init__(*args)
+        self.lock = lock
+
+    def log(self, solver, loss: float) -> None:
+        """Logs the current state of the model in all the loggers, under the lock.
+
+        :type solver: PQCSimulatedTrainer
+        :param solver: The PQC trainer whose parameters are to be logged
+        :type loss: float
+        :param loss: Loss value on the current epoch
+        """
+        with self.lock:
+            super().log(solver, loss)
+
+    def next(self) -> None:
+        """Moves the loggers to the next model, under the lock."""
+        with self.lock:
+            super().next()
+
+
+class _DashboardState:
+    """Partial results shared between the background workers and the Dash callbacks."""
+
+    def __init__(self, points: int, distance: float):
+        """Constructs the state of an empty dashboard.
+
+        :type points: int
+        :param points: Number of points along each axis of the landscape scan
+        :type distance: float
+        :param distance: The range around the trained parameters that is scanned
+        """
+        self.lock = threading.Lock()
+        self.points = points
+        self.scan_range = np.linspace(-distance, distance, points)
+        self.landscape = np.full(points * points, np.nan)
+        self.landscape_done = threading.Event()
+        self.paths_done = threading.Event()
+        self.landscape_plotted = False
+        self.runs_plotted = 0
+        self.errors: typing.List[str] = []
+
+
+def _run_worker(
+    state: _DashboardState,
+    done: threading.Event,
+    target: typing.Callable[..., None],
+    *args,
+) -> None:
+    """Runs a background worker, recording its error in the state if it fails.
+
+    :type state: _DashboardState
+    :param state: The shared state the error is recorded in
+    :type done: threading.Event
+    :param done: The event set once the worker has finished, whether it failed or not
+    :type target: Callable
+    :param target: The worker
+    :type args: Any
+    :param args: The arguments of the worker
+    """
+    try:
+        target(*args)
+    except Exception:  # pylint: disable=broad-except
+        with state.lock:
+            state.errors.append(traceback.format_exc())
+    finally:
+        done.set()
+
+
+def _snapshot(logger: MetaLogger) -> MetaLogger:
+    """Copies the logger along with its logged values, so that the copy can be plotted
+    without the lock while the workers keep logging.
+
+    :type logger: MetaLogger
+    :param logger: The logger, only to be read under the lock of its writers
+    :returns: The copy of the logger
+    :rtype: MetaLogger
+    """
+    snapshot = copy.copy(logger)
+    snapshot.store = copy.deepcopy(logger.store)
+    return snapshot
+
+
+def _scan_landscape(
+    state: _DashboardState, trainer, plotter: LossLandscapePlotter
+) -> None:
+    """Background worker which trains the base model and scans the landscape around it.
+
+    :type state: _DashboardState
+    :param state: The shared state the scanned values are written to
+    :type trainer: PQCSimulatedTrainer
+    :param trainer: The trainer whose trained parameters are the origin of the scan
+    :type plotter: LossLandscapePlotter
+    :param plotter: The plotter which scans the landscape
+    """
     trainer.train(n_samples=50)
-    fig_loss_surface = plot.plot("surface", points=5)
+    distance = state.scan_range[-1]
+    for idx, value in plotter.iter_scan(state.points, distance, trainer.parameters):
+        state.landscape[idx] = value
+
+
+def _train_paths(trainer, trackers: AnalyzerList, n_runs: int) -> None:
+    """Background worker which trains the runs whose paths are plotted.
+    The runs are trained by new trainers of the same class, constructed from the circuit
+    and seeds derived from the seed of the trainer, any other configuration of the trainer
+    is not carried over. They are trained in parallel processes by `MultiStartTrainer`,
+    which only replays a run into the trackers once it and the runs before it are done,
+    so the paths are updated a whole run at a time rather than at every training step.
+
+    :type trainer: PQCSimulatedTrainer
+    :param trainer: The trainer of the circuit to be trained
+    :type trackers: AnalyzerList
+    :param trackers: The loggers which track the paths
+    :type n_runs: int
+    :param n_runs: Number of independent runs to train
+    """
+    MultiStartTrainer(
+        trainer.circuit,
+        n_starts=n_runs,
+        seed=trainer.seed,
+        trainer_class=type(trainer),
+    ).train(loggers=trackers)
 
-    trackers = AnalyzerList(
-        LossLandscapePathPlotter(plot),
-        OptimizationPathPlotter(mode="tSNE"),
-    )
-    for _i in range(5):
-        trainer.train(loggers=trackers)
-        trackers.next()
+
+def launch_dashboard(
+    trainer,
+    plottable_metric,
+    points: int = 5,
+    distance: float = np.pi,
+    n_runs: int = 5,
+    refresh_interval: int = 1000,
+    max_points: typing.Optional[int] = 5000,
+):
+    """Serves the dashboard, the plots fill in while the computation runs in the background.
+
+    :type trainer: PQCSimulatedTrainer
+    :param trainer: The trainer of the circuit to be analyzed
+    :type plottable_metric: MetricSpecifier
+    :param plottable_metric: The metric which is plotted on the loss landscape
+    :type points: int
+    :param points: Number of points along each axis of the landscape scan
+    :type distance: float
+    :param distance: The range around the trained parameters that is scanned
+    :type n_runs: int
+    :param n_runs: Number of independent training runs whose paths are plotted
+    :type refresh_interval: int
+    :param refresh_interval: Milliseconds between refreshes of the graphs
+    :type max_points: int, optional
+    :param max_points: Approximate number of points drawn per path plot, None for all
+    """
+    plot = LossLandscapePlotter(trainer, plottable_metric, dim=2)
+    state = _DashboardState(points, distance)
+    loss_traversal = LossLandscapePathPlotter(plot)
+    training_trace = OptimizationPathPlotter(mode="tSNE", subsample=2000)
+    trackers = _LockedAnalyzerList(state.lock, loss_traversal, training_trace)
+
+    threading.Thread(
+        target=_run_worker,
+        args=(state, state.landscape_done, _scan_landscape, state, trainer, plot),
+        daemon=True,
+    ).start()
+    threading.Thread(
+        target=_run_worker,
+        args=(state, state.paths_done, _train_paths, trainer, trackers, n_runs),
+        daemon=True,
+    ).start()
 
     # Make the app to plot all of this
 
@@ -31,38 +218,77 @@ def launch_dashboard(trainer, plottable_metric):
     ]
     app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
-    fig_loss_traversal = trackers[0].plot()
-    fig_training_trace = trackers[1].plot()
-
-    fig_loss_surface.layout.update(
-        height=800,
-        width=1200,
-    )
-    fig_loss_traversal.layout.update(
-        height=800,
-        width=1200,
-    )
-
     app.layout = dash_html.Div(
         className="container",
         id="mainApp",
         children=[
             dash_html.H1(children="Variational Quantum Circuit Analyzer"),
             dash_html.H3(children="Visualizing QAOA Landscapes and Plotting Paths."),
+            dash_html.Pre(id="worker-errors", className="text-danger"),
             dash_html.H2(children="tSNE of Optimization Path"),
-            dash_core.Graph(id="training-path", figure=fig_training_trace),
+            dash_core.Graph(id="training-path"),
             dash_html.H2(children="Loss Landscape along random 2-D subspace"),
-            dash_core.Graph(
-                id="loss-landscape",
-                figure=fig_loss_surface,
-            ),
+            dash_core.Graph(id="loss-landscape"),
             dash_html.H2(children="Traversal on the Loss Landscape above"),
-            dash_core.Graph(
-                id="loss-traversal",
-                figure=fig_loss_traversal,
-            ),
+            dash_core.Graph(id="loss-traversal"),
+            dash_core.Interval(id="refresh", interval=refresh_interval),
         ],
     )
+
+    @app.callback(
+        Output("loss-landscape", "figure"),
+        [Input("refresh", "n_intervals")],
+    )
+    def refresh_landscape(_n_intervals):
+        # Checked before copying the values, so a completed scan is drawn in full
+        with state.lock:
+            if state.landscape_plotted:
+                return dash.no_update
+            done = state.landscape_done.is_set()
+        landscape = state.landscape.copy()
+        fig_loss_surface = pg.Figure(
+            data=pg.Surface(
+                z=np.reshape(landscape, (points, points)),
+                x=state.scan_range,
+                y=state.scan_range,
+            )
+        )
+        fig_loss_surface.layout.update(height=800, width=1200)
+        if done:
+            with state.lock:
+                state.landscape_plotted = True
+        return fig_loss_surface
+
+    @app.callback(
+        [Output("training-path", "figure"), Output("loss-traversal", "figure")],
+        [Input("refresh", "n_intervals")],
+    )
+    def refresh_paths(_n_intervals):
+        # The paths change only when another run is replayed into the loggers
+        with state.lock:
+            if training_trace.trial in (0, state.runs_plotted):
+                return dash.no_update, dash.no_update
+            state.runs_plotted = training_trace.trial
+            trace, traversal = _snapshot(training_trace), _snapshot(loss_traversal)
+        fig_training_trace = trace.plot(refit=True, max_points=max_points)
+        fig_loss_traversal = traversal.plot(max_points=max_points)
+        fig_loss_traversal.layout.update(height=800, width=1200)
+        return fig_training_trace, fig_loss_traversal
+
+    @app.callback(
+        [Output("refresh", "disabled"), Output("worker-errors", "children")],
+        [Input("refresh", "n_intervals")],
+    )
+    def stop_refreshing(_n_intervals):
+        # Refreshing stops once the results of both the finished workers are drawn
+        with state.lock:
+            finished = (
+                state.landscape_plotted
+                and state.paths_done.is_set()
+                and state.runs_plotted == training_trace.trial
+            )
+            return finished, "\n".join(state.errors)
+
     app.run_server(debug=False)
 
 
@@ -0,0 +1,257 @@
+"""This module times the hot paths of the library, to find out where a slow run spends time.
+
+Code is instrumented with named spans and counters, the conversions of circuits between
+frameworks, the simulations, the stages of the analyzers and the steps of the trainer
+all open a span, and the simulator counts the simulations it ran and the bytes of the
+states it returned. Everything is disabled by default, a disabled span is a shared no-op
+context manager and a disabled counter returns right away, so instrumented code runs at
+practically the same speed as before.
+
+Recording is enabled for a block of code with `recording`, the aggregated timings are
+then printed with `summary`, and the individual spans can be opened on a timeline in
+`chrome://tracing` or Perfetto after writing them with `export_chrome_trace`::
+
+    with instrumentation.recording():
+        Expressibility(circuit, samples=100).expressibility()
+    print(instrumentation.summary())
+    instrumentation.export_chrome_trace("expressibility.json")
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import typing
+
+_enabled = False
+_lock = threading.Lock()
+_origin = time.perf_counter_ns()
+# Raw events for the trace, (name, start, duration, thread) for spans in nanoseconds
+_span_events: typing.List[typing.Tuple[str, int, int, int]] = []
+_counter_events: typing.List[typing.Tuple[str, int, float]] = []
+# Aggregates for the summary, name -> [calls, total, max] and name -> value
+_span_stats: typing.Dict[str, typing.List[int]] = {}
+_counters: typing.Dict[str, float] = {}
+
+F = typing.TypeVar("F", bound=typing.Callable[..., typing.Any])
+
+
+class _Span:
+    """Context manager which records the time spent inside it under a name."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str) -> None:
+        """Constructs the span, the clock starts when the span is entered.
+
+        :type name: str
+        :param name: The name the time is recorded under
+        """
+        self.name = name
+        self.start = 0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        duration = time.perf_counter_ns() - self.start
+        with _lock:
+            _span_events.append(
+                (self.name, self.start, duration, threading.get_ident())
+            )
+            stats = _span_stats.setdefault(self.name, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+
+
+class _NullSpan:
+    """Context manager which does nothing, handed out while recording is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def is_enabled() -> bool:
+    """Whether spans and counters are being recorded
+    :return: the recording status
+    """
+    return _enabled
+
+
+def enable() -> None:
+    """Starts recording spans and counters, in addition to what was recorded before."""
+    global _enabled  # pylint: disable=global-statement
+    _enabled = True
+
+
+def disable() -> None:
+    """Stops recording, the recorded data is kept until `reset`."""
+    global _enabled  # pylint: disable=global-statement
+    _enabled = False
+
+
+def reset() -> None:
+    """Discards everything recorded so far."""
+    global _origin  # pylint: disable=global-statement
+    with _lock:
+        _span_events.clear()
+        _counter_events.clear()
+        _span_stats.clear()
+        _counters.clear()
+        _origin = time.perf_counter_ns()
+
+
+@contextlib.contextmanager
+def recording(clear: bool = True) -> typing.Iterator[None]:
+    """Records the spans and counters of the code run inside the block.
+
+    :type clear: bool
+    :param clear: Whether to discard the previously recorded data first
+    :returns: context manager which enables recording for its block
+    """
+    if clear:
+        reset()
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+
+
+def span(name: str) -> typing.ContextManager:
+    """Times the block of code run inside the returned context manager.
+
+    :type name: str
+    :param name: The name the time is recorded under, dotted as `component.stage`
+    :returns: context manager timing its block, a no-op one if recording is disabled
+    """
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def timed(name: str) -> typing.Callable[[F], F]:
+    """Decorator which times every call to the function as a span.
+
+    :type name: str
+    :param name: The name the time is recorded under, dotted as `component.stage`
+    :returns: the decorator
+    """
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(name):
+                return function(*args, **kwargs)
+
+        return typing.cast(F, wrapper)
+
+    return decorator
+
+
+def count(name: str, value: float = 1) -> None:
+    """Adds to a counter, like the number of simulations or bytes allocated.
+
+    :type name: str
+    :param name: The name of the counter
+    :type value: float
+    :param value: The amount to add to the counter
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+        _counter_events.append((name, time.perf_counter_ns(), _counters[name]))
+
+
+def stats() -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """The aggregated timings of the spans and the values of the counters.
+
+    :returns: dict with the per span `calls`, `total`, `mean` and `max` times in seconds
+        under "spans", and the counter values under "counters"
+    :rtype: dict
+    """
+    with _lock:
+        spans = {
+            name: {
+                "calls": calls,
+                "total": total / 1e9,
+                "mean": total / calls / 1e9,
+                "max": longest / 1e9,
+            }
+            for name, (calls, total, longest) in _span_stats.items()
+        }
+        return {"spans": spans, "counters": dict(_counters)}
+
+
+def summary() -> str:
+    """Formats the aggregated timings and counters as a table, slowest spans first.
+
+    :returns: the table
+    :rtype: str
+    """
+    recorded = stats()
+    spans = sorted(recorded["spans"].items(), key=lambda item: -item[1]["total"])
+    width = max([len(name) for name in recorded["spans"]] + [len("span")])
+    lines = [
+        f"{'span':<{width}}  {'calls':>8}  {'total (s)':>10}  "
+        f"{'mean (ms)':>10}  {'max (ms)':>10}"
+    ]
+    for name, entry in spans:
+        lines.append(
+            f"{name:<{width}}  {entry['calls']:>8}  {entry['total']:>10.4f}  "
+            f"{entry['mean'] * 1e3:>10.3f}  {entry['max'] * 1e3:>10.3f}"
+        )
+    if recorded["counters"]:
+        lines.append("")
+        width = max(len(name) for name in recorded["counters"])
+        lines.append(f"{'counter':<{width}}  {'value':>14}")
+        for name, value in sorted(recorded["counters"].items()):
+            lines.append(f"{name:<{width}}  {value:>14,.0f}")
+    return "\n".join(lines)
+
+
+def export_chrome_trace(path: str) -> None:
+    """Writes the recorded spans and counters in the Chrome trace event format.
+
+    :type path: str
+    :param path: The JSON file to write, can be loaded in chrome://tracing or Perfetto
+    """
+    pid = os.getpid()
+    with _lock:
+        events: typing.List[typing.Dict[str, typing.Any]] = [
+            {
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": (start - _origin) / 1e3,
+                "dur": duration / 1e3,
+                "pid": pid,
+                "tid": thread,
+            }
+            for name, start, duration, thread in _span_events
+        ]
+        events.extend(
+            {
+                "name": name,
+                "ph": "C",
+                "ts": (timestamp - _origin) / 1e3,
+                "pid": pid,
+                "args": {name: value},
+            }
+            for name, timestamp, value in _counter_events
+        )
+    with open(path, "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
@@ -0,0 +1,146 @@
+"""This module houses the columnar storage which backs the data logged by the loggers.
+
+Loggers record one row per training step, the row holds the logged parameter vector
+(or any projection of it), the loss, the run index and the step index. The rows are
+stored in preallocated NumPy columns which grow geometrically, so logging a step does
+not allocate a new array and plotting reads the columns as views without stacking them.
+
+A store with a fixed capacity acts as a ring buffer instead, once full the newest row
+overwrites the oldest one, which bounds the memory of very long training sessions.
+"""
+
+import typing
+
+import numpy as np
+
+
+class LogStore:
+    """Growable or fixed-capacity columnar store for parameters, loss, run and step."""
+
+    def __init__(
+        self,
+        capacity: typing.Optional[int] = None,
+        stride: int = 1,
+        initial_size: int = 256,
+    ) -> None:
+        """Constructs the empty store.
+
+        :type capacity: int, optional
+        :param capacity: The fixed number of rows to keep as a ring buffer, None to grow
+            the store without bound
+        :type stride: int
+        :param stride: Only every `stride`-th step of a run is stored
+        :type initial_size: int
+        :param initial_size: Number of rows preallocated for a growable store
+        """
+        assert stride >= 1, "The logging stride should be a positive integer"
+        assert capacity is None or capacity > 0, "The capacity should be positive"
+        self.capacity = capacity
+        self.stride = stride
+        self._allocated = capacity if capacity is not None else initial_size
+        self._params: typing.Optional[np.ndarray] = None
+        self._loss = np.zeros(self._allocated, dtype=np.float64)
+        self._run = np.zeros(self._allocated, dtype=np.int64)
+        self._step = np.zeros(self._allocated, dtype=np.int64)
+        self._size = 0
+        self._head = 0
+        self.appended = 0
+
+    def __len__(self) -> int:
+        """Number of rows presently held in the store
+        :return: the number of stored rows
+        """
+        return self._size
+
+    def append(
+        self,
+        params: np.ndarray,
+        loss: typing.Union[float, np.ndarray],
+        run: int,
+        step: int,
+    ) -> bool:
+        """Stores one logged step, unless the stride skips it.
+
+        :type params: np.ndarray
+        :param params: The parameter vector, or its projection, at this step
+        :type loss: float or np.ndarray
+        :param loss: The loss at this step, a loss given per sample or per term as an
+            array is stored as its mean
+        :type run: int
+        :param run: The index of the run the step belongs to
+        :type step: int
+        :param step: The index of the step within its run
+        :returns: Whether the step was stored
+        :rtype: bool
+        """
+        if step % self.stride != 0:
+            return False
+        params = np.asarray(params, dtype=np.float64).reshape(-1)
+        if self._params is None:
+            self._params = np.zeros((self._allocated, len(params)), dtype=np.float64)
+        if self._size == self._allocated:
+            if self.capacity is None:
+                self._grow()
+                row = self._size
+                self._size += 1
+            else:
+                row = self._head
+                self._head = (self._head + 1) % self._allocated
+        else:
+            row = self._size
+            self._size += 1
+        self._params[row] = params
+        self._loss[row] = np.mean(loss)
+        self._run[row] = run
+        self._step[row] = step
+        self.appended += 1
+        return True
+
+    def _grow(self) -> None:
+        """Doubles the number of rows allocated for every column."""
+        self._allocated *= 2
+        for name in ("_params", "_loss", "_run", "_step"):
+            column = getattr(self, name)
+            grown = np.zeros((self._allocated,) + column.shape[1:], dtype=column.dtype)
+            grown[: len(column)] = column
+            setattr(self, name, grown)
+
+    @property
+    def params(self) -> np.ndarray:
+        """View of the stored parameter vectors, shape (rows, n_params)
+        :return: the parameter column
+        """
+        if self._params is None:
+            return np.zeros((0, 0), dtype=np.float64)
+        return self._params[: self._size]
+
+    @property
+    def loss(self) -> np.ndarray:
+        """View of the stored losses, shape (rows,)
+        :return: the loss column
+        """
+        return self._loss[: self._size]
+
+    @property
+    def run(self) -> np.ndarray:
+        """View of the run index of every stored row, shape (rows,)
+        :return: the run column
+        """
+        return self._run[: self._size]
+
+    @property
+    def step(self) -> np.ndarray:
+        """View of the step index of every stored row, shape (rows,)
+        :return: the step column
+        """
+        return self._step[: self._size]
+
+    def chronological_order(self) -> np.ndarray:
+        """Indices which sort the stored rows from the oldest to the newest.
+        All the columns are views in storage order, once a ring buffer has wrapped
+        around that is no longer the order in which the rows were logged.
+
+        :return: the permutation of the rows
+        :rtype: np.ndarray
+        """
+        return np.roll(np.arange(self._size), -self._head)
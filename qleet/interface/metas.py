@@ -11,21 +11,74 @@
 import typing
 from abc import abstractmethod, ABC
 
+import numpy as np
+
+from .log_store import LogStore
+
 if typing.TYPE_CHECKING:
+    from ..analyzers.adaptive import Estimate
     from ..simulators.pqc_trainer import PQCSimulatedTrainer
+    from .budget import Budget
 
 
 class MetaLogger(ABC):
     """Abstract class to represent interface of logging.
     Logs the present state of the model during training.
+
+    The logged values are kept in a columnar `LogStore`, loggers add rows using `record`
+    and read them back through the `data`, `loss`, `runs` and `item` views.
     """
 
-    def __init__(self):
-        """Constructs the Logger object."""
+    def __init__(self, stride: int = 1, capacity: typing.Optional[int] = None):
+        """Constructs the Logger object.
+
+        :type stride: int
+        :param stride: Only every `stride`-th step of each run is logged
+        :type capacity: int, optional
+        :param capacity: Keep only the latest `capacity` logged steps, in a ring buffer,
+            None to keep all of them
+        """
         self.trial, self.counter = 0, 0
-        self.data = []
-        self.runs = []
-        self.item = []
+        self.store = LogStore(capacity=capacity, stride=stride)
+
+    @property
+    def data(self) -> np.ndarray:
+        """The logged values, one row per logged step
+        :return: view of the logged values, shape (rows, n_values)
+        """
+        return self.store.params
+
+    @property
+    def loss(self) -> np.ndarray:
+        """The loss at every logged step
+        :return: view of the logged losses, shape (rows,)
+        """
+        return self.store.loss
+
+    @property
+    def runs(self) -> np.ndarray:
+        """The trial to which every logged step belongs
+        :return: view of the run indices, shape (rows,)
+        """
+        return self.store.run
+
+    @property
+    def item(self) -> np.ndarray:
+        """The position of every logged step within its trial
+        :return: view of the step indices, shape (rows,)
+        """
+        return self.store.step
+
+    def record(self, values: np.ndarray, loss: float) -> None:
+        """Stores the values logged at the current step of the current trial.
+
+        :type values: np.ndarray
+        :param values: The vector to be logged, like the parameters or their projection
+        :type loss: float
+        :param loss: The loss at the current step
+        """
+        self.store.append(values, loss, self.trial, self.counter)
+        self.counter += 1
 
     @abstractmethod
     def log(self, solver: "PQCSimulatedTrainer", loss: float):
@@ -57,6 +110,32 @@ class MetaExplorer(ABC):
     def __init__(self):
         """Constructs the Explorer object."""
 
+    def estimate(
+        self,
+        budget: typing.Optional["Budget"] = None,
+        tolerance: float = 0.0,
+        **options: typing.Any,
+    ) -> "Estimate":
+        """Estimates the property in anytime mode, refining the estimate over more
+        samples until its confidence interval is narrower than the tolerance, or until
+        the budget runs out, and returning the best estimate reached. The batches are
+        shrunk to what the remaining budget affords, at the rate of the previous ones,
+        and if it does not afford the two samples of an interval none is drawn, and the
+        estimate is NaN with zero samples. The estimate is the measure of all the samples drawn,
+        with the confidence interval resampled from them.
+
+        :type budget: Budget, optional
+        :param budget: The time and the number of evaluations available
+        :type tolerance: float
+        :param tolerance: The largest width of the confidence interval, 0 to refine the
+            estimate for as long as the budget allows
+        :param options: Options of the estimation specific to the explorer
+        :returns: the estimate, with its interval and the number of samples drawn
+        :rtype: Estimate
+        :raises NotImplementedError: if the explorer has no anytime mode
+        """
+        raise NotImplementedError
+
 
 class AnalyzerList:
     """Container class, Stores a list of loggers.
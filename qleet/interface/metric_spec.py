@@ -4,17 +4,23 @@ Metrics are a useful abstraction which given the state of the circuit compute so
 classical value which we need to interpret or plot.
 """
 
+from __future__ import annotations
+
 import abc
 import typing
 import warnings
 
 import numpy as np
-import sympy
-
-import tensorflow_quantum as tfq
-import cirq
 
+from .._lazy import lazy_module
 from ..interface.circuit import CircuitDescriptor
+from ..simulators import sampling
+
+if typing.TYPE_CHECKING:
+    import sympy
+    import cirq
+else:
+    cirq = lazy_module("cirq")
 
 warnings.filterwarnings("ignore")
 
@@ -44,32 +50,60 @@ class MetricSpecifier(abc.ABC):
         self.default_call_mode = default_call_mode
         self.default_call_function = self.__mode_to_function_map[default_call_mode]
 
+    @property
+    def cache_token(self) -> typing.Optional[str]:
+        """A token which identifies the metric by its content, like the problem it
+        scores, so that cached values of the metric are only reused by equal metrics.
+        Metrics which do not provide one, like by default, are never cached.
+        :returns: the token of the metric, or None if it can not be cached
+        :rtype: str, optional
+        """
+        return None
+
     def from_circuit(
         self,
         circuit_descriptor: CircuitDescriptor,
         parameters: typing.Union[np.ndarray, typing.List],
         mode: str = "samples",
-    ) -> float:
+        seed: typing.Optional[int] = None,
+    ) -> typing.Union[float, np.ndarray]:
         """Computes the value of the metric from the circuit, by using the default mode
-        or metric computation.
+        or metric computation. The samples are drawn for all the rows of a matrix of
+        parameters at once, and counted into histograms, see `from_histogram`.
         :type circuit_descriptor: CircuitDescriptor
         :param circuit_descriptor: The provided circuit
         :type parameters: List or Numpy array
-        :param parameters: List of values of the parameters to sample the circuit at
+        :param parameters: List of values of the parameters to sample the circuit at, or
+            a 2-D matrix with one row of values per point to compute the metric at
         :type mode: str
         :param mode: From what to compute the metric, samples, state_vector, or density_matrix
-        :return: The value of the metric at those parameters
-        :rtype: float
+        :type seed: int, optional
+        :param seed: Seed of the random draws of the samples
+        :return: The value of the metric at those parameters, one value per row of a
+            matrix of parameters
+        :rtype: float or np.ndarray
         :raises NotImplementedError: if required mode of evaluating metric wasn't implemented
         :raises ValueError: if the mode specified wasn't valid
         """
         if mode == "samples":
-            samples = sample_solutions(
+            values = np.asarray(parameters, dtype=np.float64)
+            qubits = sorted(circuit_descriptor.cirq_circuit.all_qubits())
+            histograms = sample_solutions(
                 circuit=circuit_descriptor.cirq_circuit,
                 param_symbols=circuit_descriptor.parameters,
-                param_values=parameters,
+                param_values=np.atleast_2d(values),
+                seed=seed,
+                histogram=True,
+                qubits=qubits,
             )
-            return self.from_samples_vector(samples)
+            metrics = np.array(
+                [
+                    self.from_histogram(bitstrings, counts, len(qubits))
+                    for bitstrings, counts in histograms
+                ],
+                dtype=np.float64,
+            )
+            return metrics if values.ndim > 1 else float(metrics[0])
         elif mode == "state_vector":
             raise NotImplementedError
         elif mode == "density_matrix":
@@ -112,29 +146,90 @@ class MetricSpecifier(abc.ABC):
         """
         raise NotImplementedError
 
+    def from_histogram(
+        self, bitstrings: np.ndarray, counts: np.ndarray, num_qubits: int
+    ) -> float:
+        """Returns the value of the loss function from the histogram of the measurements
+        sampled from the circuit. By default the samples are unpacked and passed to
+        `from_samples_vector`, metrics can compute it from the distinct outcomes instead.
+        :type bitstrings: np.ndarray, 1-D
+        :param bitstrings: The distinct measured basis states, as packed bitstrings with
+            the first qubit as the most significant bit
+        :type counts: np.ndarray, 1-D
+        :param counts: How many times each bitstring was measured
+        :type num_qubits: int
+        :param num_qubits: Number of qubits measured
+        :return: value of the loss function
+        :rtype: float
+        """
+        samples = sampling.unpack_bitstrings(np.repeat(bitstrings, counts), num_qubits)
+        return self.from_samples_vector(samples)
+
 
 def sample_solutions(
     circuit: cirq.Circuit,
     param_symbols: typing.List[sympy.Symbol],
     param_values: typing.Iterable,
     samples: int = 1000,
-) -> np.ndarray:
+    seed: typing.Optional[int] = None,
+    histogram: bool = False,
+    qubits: typing.Optional[typing.List[cirq.Qid]] = None,
+) -> typing.Any:
     """Get the computed cuts for a given ansatz
+    The circuit is simulated once for every set of parameter values and the shots are
+    drawn from the probabilities of the simulated states, for the whole batch at once.
     :type circuit: cirq.Circuit
     :param circuit: Circuit to be sampled
     :type param_symbols: List of sympy.Symbols
     :param param_symbols: The symbols of model parameters
     :type param_values: List of floats
-    :param param_values: The value of model parameters to sample at, 1-D vector
+    :param param_values: The value of model parameters to sample at, 1-D vector, or a
+        2-D matrix with one row of values per circuit to sample
     :type samples: int
     :param samples: Number of times to sample the resulting quantum state
-    :return: 2-D matrix, n_samples rows of boolean vectors showing the cut
-    :rtype: np.array
+    :type seed: int, optional
+    :param seed: Seed of the random draws of the samples
+    :type histogram: bool
+    :param histogram: Whether to return the histograms of the samples instead, the
+        distinct measured bitstrings, packed into integers, and their counts
+    :type qubits: List of cirq.Qid, optional
+    :param qubits: The order of the measured qubits, the sorted qubits of the circuit
+        by default
+    :return: 2-D matrix, n_samples rows of boolean vectors showing the cut, with a
+        leading batch axis if a matrix of parameter values was given, or the histogram,
+        a list of them for a matrix of parameter values
+    :rtype: np.array, or tuple of np.array
     """
-    output = tfq.layers.Sample()(
-        circuit,
-        symbol_names=param_symbols,
-        symbol_values=[param_values],
-        repetitions=samples,
-    )
-    return output.numpy()[0]
+    values = np.asarray(param_values, dtype=np.float64)
+    resolvers = [
+        cirq.ParamResolver(dict(zip(param_symbols, row)))
+        for row in np.atleast_2d(values)
+    ]
+    if qubits is None:
+        qubits = sorted(circuit.all_qubits())
+    if not resolvers:
+        # An empty batch of parameter values has nothing to simulate
+        if histogram:
+            return []
+        return np.zeros((0, samples, len(qubits)), dtype=bool)
+    if cirq.has_unitary(cirq.resolve_parameters(circuit, resolvers[0])):
+        vectors = cirq.Simulator(dtype=np.complex128).simulate_sweep(
+            circuit, resolvers, qubit_order=qubits
+        )
+        probs = sampling.probabilities(
+            np.stack([result.final_state_vector for result in vectors])
+        )
+    else:
+        matrices = cirq.DensityMatrixSimulator(dtype=np.complex128).simulate_sweep(
+            circuit, resolvers, qubit_order=qubits
+        )
+        probs = sampling.probabilities(
+            np.stack([result.final_density_matrix for result in matrices]),
+            density_matrix=True,
+        )
+    if histogram:
+        histograms = sampling.sample_histograms(probs, samples, seed=seed)
+        return histograms if values.ndim > 1 else histograms[0]
+    bitstrings = sampling.sample_bitstrings(probs, samples, seed=seed)
+    cuts = sampling.unpack_bitstrings(bitstrings, len(qubits))
+    return cuts if values.ndim > 1 else cuts[0]
@@ -0,0 +1,350 @@
+"""This module compiles the cost functions of every framework into bitmasks of Paulis.
+
+A Pauli string on n qubits is written as `X^x Z^z` up to a phase, where the bits of the
+integer masks `x` and `z` say which qubits the X and the Z act on, a qubit with both
+bits set holds a Y. A sum of Pauli strings is then stored as two arrays of masks and one
+array of coefficients, whatever the framework it was written in, a cirq `PauliSum`, a
+qiskit `PauliList` or `SparsePauliOp`, or a pyquil `PauliSum`.
+
+A Pauli string maps the basis state `|j>` to `|j ^ x>` with the sign of the parity of
+`j & z`, so the expectation value of a sum of them is computed with bit operations on the
+indices of the amplitudes, for a whole batch of state vectors or density matrices at
+once. The terms which flip the same qubits are summed into one diagonal which is computed
+only once, and when every term is a product of Z, like in the QAOA cost functions, the
+whole operator is a single precomputed diagonal weighting the probabilities of the basis
+states.
+"""
+
+from __future__ import annotations
+
+import typing
+
+import numpy as np
+
+from .._lazy import lazy_module, isinstance_of
+
+if typing.TYPE_CHECKING:
+    import cirq
+    from numpy.typing import ArrayLike
+else:
+    cirq = lazy_module("cirq")
+
+# Bits (x, z) of the single qubit Paulis
+PAULI_BITS = {"I": (0, 0), "X": (1, 0), "Y": (1, 1), "Z": (0, 1)}
+
+
+class PauliSumOperator:
+    """A sum of Pauli strings stored as X and Z bitmasks along with their coefficients."""
+
+    def __init__(
+        self,
+        x_masks: ArrayLike,
+        z_masks: ArrayLike,
+        coefficients: ArrayLike,
+        num_qubits: int,
+        big_endian: bool = True,
+    ):
+        """Constructs the operator, merging repeated Pauli strings into one term.
+
+        :type x_masks: array_like of int
+        :param x_masks: The X bits of every term, bit `p` of the mask is the qubit `p`
+        :type z_masks: array_like of int
+        :param z_masks: The Z bits of every term, a qubit with both bits set holds a Y
+        :type coefficients: array_like of complex
+        :param coefficients: The coefficient of every term
+        :type num_qubits: int
+        :param num_qubits: The number of qubits the operator acts on
+        :type big_endian: bool
+        :param big_endian: Whether qubit 0 is the most significant bit of the indices
+            of the amplitudes, like in cirq, or the least significant one, like in qiskit
+        """
+        assert num_qubits < 63, "Masks of more than 62 qubits do not fit in an int64"
+        terms = np.stack(
+            [
+                np.asarray(x_masks, dtype=np.int64).reshape(-1),
+                np.asarray(z_masks, dtype=np.int64).reshape(-1),
+            ],
+            axis=1,
+        )
+        coefficients = np.asarray(coefficients, dtype=np.complex128).reshape(-1)
+        terms, inverse = np.unique(terms, axis=0, return_inverse=True)
+        merged = np.zeros(len(terms), dtype=np.complex128)
+        np.add.at(merged, inverse.reshape(-1), coefficients)
+        keep = merged != 0
+        self.x_masks = terms[keep, 0]
+        self.z_masks = terms[keep, 1]
+        self.coefficients = merged[keep]
+        self.num_qubits = num_qubits
+        self.big_endian = big_endian
+        self._groups: typing.Optional[typing.List[typing.Tuple[int, np.ndarray]]] = None
+
+    def __len__(self) -> int:
+        """The number of terms of the operator
+        :returns: the number of distinct Pauli strings with a non-zero coefficient
+        :rtype: int
+        """
+        return len(self.coefficients)
+
+    @property
+    def is_diagonal(self) -> bool:
+        """Whether every term is a product of Z, so the operator is diagonal
+        :returns: True if no term flips a qubit
+        :rtype: bool
+        """
+        return not np.any(self.x_masks)
+
+    @property
+    def is_hermitian(self) -> bool:
+        """Whether the operator is an observable, the Pauli strings being hermitian
+        :returns: True if all the coefficients are real
+        :rtype: bool
+        """
+        return not np.any(self.coefficients.imag)
+
+    def _index_masks(self, masks: np.ndarray) -> np.ndarray:
+        """Maps the masks over the qubits onto the bits of the indices of the amplitudes.
+
+        :type masks: np.ndarray
+        :param masks: Masks with bit `p` standing for the qubit `p`
+        :returns: the masks over the bits of the indices
+        :rtype: np.ndarray
+        """
+        if not self.big_endian:
+            return masks
+        reversed_masks = np.zeros_like(masks)
+        for qubit in range(self.num_qubits):
+            reversed_masks |= ((masks >> qubit) & 1) << (self.num_qubits - 1 - qubit)
+        return reversed_masks
+
+    @property
+    def groups(self) -> typing.List[typing.Tuple[int, np.ndarray]]:
+        """The terms grouped by the qubits they flip, each group summed into a diagonal.
+
+        The group of the flip mask `x` acts as `H_x |j> = d_x[j] |j ^ x>`, the diagonal
+        includes the coefficients, the signs of the Z and the phases of the Y.
+
+        :returns: the flip mask over the bits of the indices and the diagonal of every
+            group, the diagonal group first if there is one
+        :rtype: list of tuples of int and np.ndarray
+        """
+        if self._groups is None:
+            basis = np.arange(2**self.num_qubits, dtype=np.int64)
+            x_masks = self._index_masks(self.x_masks)
+            z_masks = self._index_masks(self.z_masks)
+            # Y = iXZ, so a string with k Y's is i^k X^x Z^z
+            phases = self.coefficients * 1j ** _popcount(x_masks & z_masks)
+            diagonals: typing.Dict[int, np.ndarray] = {}
+            for x_mask, z_mask, phase in zip(x_masks, z_masks, phases):
+                diagonal = diagonals.setdefault(
+                    int(x_mask), np.zeros(len(basis), dtype=np.complex128)
+                )
+                diagonal += phase * (1 - 2 * (_popcount(basis & z_mask) & 1))
+            self._groups = sorted(diagonals.items(), key=lambda group: group[0])
+        return self._groups
+
+    @property
+    def diagonal(self) -> np.ndarray:
+        """The diagonal of the operator, the value of the cost of every basis state
+        :returns: the diagonal, real for hermitian operators
+        :rtype: np.ndarray
+        :raises ValueError: if the operator has terms with X or Y
+        """
+        if not self.is_diagonal:
+            raise ValueError("The operator is not diagonal, some terms have X or Y")
+        diagonal = np.zeros(2**self.num_qubits, dtype=np.complex128)
+        for _x_mask, group in self.groups:
+            diagonal += group
+        return diagonal.real if self.is_hermitian else diagonal
+
+    def expectation(self, states: np.ndarray) -> np.ndarray:
+        """Computes <psi|H|psi> for a state vector or a batch of them.
+
+        :type states: np.ndarray
+        :param states: State vectors along the last axis, shape (..., 2**num_qubits)
+        :returns: the expectation values, shape (...,), real for hermitian operators
+        :rtype: np.ndarray
+        """
+        states = np.asarray(states)
+        flat = states.reshape(-1, states.shape[-1])
+        self._check_dimension(flat.shape[-1])
+        basis = np.arange(flat.shape[-1], dtype=np.int64)
+        values = np.zeros(len(flat), dtype=np.complex128)
+        for x_mask, diagonal in self.groups:
+            if x_mask == 0:
+                values += (flat.real**2 + flat.imag**2) @ diagonal
+            else:
+                values += (flat[:, basis ^ x_mask].conj() * flat) @ diagonal
+        return self._result(values, states.shape[:-1])
+
+    def density_expectation(self, density_matrices: np.ndarray) -> np.ndarray:
+        """Computes Tr(rho H) for a density matrix or a batch of them.
+
+        :type density_matrices: np.ndarray
+        :param density_matrices: Density matrices along the last two axes, shape
+            (..., 2**num_qubits, 2**num_qubits)
+        :returns: the expectation values, shape (...,), real for hermitian operators
+        :rtype: np.ndarray
+        """
+        density_matrices = np.asarray(density_matrices)
+        dimension = density_matrices.shape[-1]
+        flat = density_matrices.reshape(-1, dimension, dimension)
+        self._check_dimension(dimension)
+        basis = np.arange(dimension, dtype=np.int64)
+        values = np.zeros(len(flat), dtype=np.complex128)
+        for x_mask, diagonal in self.groups:
+            values += flat[:, basis, basis ^ x_mask] @ diagonal
+        return self._result(values, density_matrices.shape[:-2])
+
+    def _check_dimension(self, dimension: int) -> None:
+        """Checks that the states are over the qubits of the operator.
+
+        :type dimension: int
+        :param dimension: The number of amplitudes of the states
+        :raises ValueError: if it does not match the number of qubits
+        """
+        if dimension != 2**self.num_qubits:
+            raise ValueError(
+                f"Expected states of {2 ** self.num_qubits} amplitudes, got {dimension}"
+            )
+
+    def _result(self, values: np.ndarray, shape: typing.Tuple[int, ...]) -> np.ndarray:
+        """Shapes the expectation values like the batch of states.
+
+        :type values: np.ndarray
+        :param values: The flat expectation values
+        :type shape: tuple of int
+        :param shape: The batch shape of the states
+        :returns: the expectation values, real for hermitian operators
+        :rtype: np.ndarray
+        """
+        values = values.reshape(shape)
+        return values.real if self.is_hermitian else values
+
+    def to_cirq(self, qubits: typing.Sequence[cirq.Qid]) -> cirq.PauliSum:
+        """Converts the operator into a cirq PauliSum.
+
+        :type qubits: Sequence of cirq.Qid
+        :param qubits: The qubits the operator acts on, in the order of the masks
+        :returns: the operator in cirq
+        :rtype: cirq.PauliSum
+        """
+        paulis = {(1, 0): cirq.X, (1, 1): cirq.Y, (0, 1): cirq.Z}
+        pauli_sum = cirq.PauliSum()
+        for x_mask, z_mask, coefficient in zip(
+            self.x_masks, self.z_masks, self.coefficients
+        ):
+            pauli_string = {
+                qubit: paulis[(x_mask >> idx) & 1, (z_mask >> idx) & 1]
+                for idx, qubit in enumerate(qubits)
+                if ((x_mask | z_mask) >> idx) & 1
+            }
+            pauli_sum += cirq.PauliString(pauli_string, coefficient=coefficient)
+        return pauli_sum
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Counts the bits set in every integer.
+
+    :type values: np.ndarray
+    :param values: Non-negative integers
+    :returns: the number of bits set in each of them
+    :rtype: np.ndarray
+    """
+    values = np.asarray(values, dtype=np.int64)
+    counts = np.zeros_like(values)
+    while np.any(values):
+        counts += values & 1
+        values = values >> 1
+    return counts
+
+
+def compile_pauli_sum(
+    cost: typing.Any, qubits: typing.Sequence[typing.Any], big_endian: bool = True
+) -> PauliSumOperator:
+    """Compiles a sum of Pauli strings in any supported framework into bitmasks.
+
+    :type cost: PauliSum in any supported library
+    :param cost: The cost function, a cirq PauliSum, a qiskit PauliList or
+        SparsePauliOp, or a pyquil PauliSum
+    :type qubits: Sequence
+    :param qubits: The qubits of the circuit in the order of the amplitudes, cirq
+        qubits, or the integer indices for qiskit and pyquil
+    :type big_endian: bool
+    :param big_endian: Whether the first qubit is the most significant bit of the
+        indices of the amplitudes
+    :returns: the compiled operator
+    :rtype: PauliSumOperator
+    :raises ValueError: if the cost is not a sum of Paulis, or acts on other qubits
+    """
+    positions = {qubit: idx for idx, qubit in enumerate(qubits)}
+    terms: typing.List[
+        typing.Tuple[typing.Iterable[typing.Tuple[typing.Any, str]], complex]
+    ]
+    if isinstance_of(cost, "cirq", "PauliSum"):
+        terms = [
+            (
+                ((qubit, str(pauli)) for qubit, pauli in string.items()),
+                string.coefficient,
+            )
+            for string in cost
+        ]
+    elif isinstance_of(cost, "qiskit.quantum_info", "SparsePauliOp"):
+        return _compile_pauli_list(cost.paulis, cost.coeffs, len(qubits), big_endian)
+    elif isinstance_of(cost, "qiskit.quantum_info", "PauliList"):
+        return _compile_pauli_list(cost, np.ones(len(cost)), len(qubits), big_endian)
+    elif isinstance_of(cost, "pyquil.paulis", "PauliSum"):
+        terms = [
+            (((qubit, pauli) for qubit, pauli in term), term.coefficient)
+            for term in cost.terms
+        ]
+    else:
+        raise ValueError("Cost object should be a Pauli-Sum object")
+
+    x_masks, z_masks, coefficients = [], [], []
+    for string, coefficient in terms:
+        x_mask, z_mask = 0, 0
+        for qubit, pauli in string:
+            if qubit not in positions:
+                raise ValueError(
+                    f"The cost acts on {qubit}, which is not in the circuit"
+                )
+            x_bit, z_bit = PAULI_BITS[pauli]
+            x_mask |= x_bit << positions[qubit]
+            z_mask |= z_bit << positions[qubit]
+        x_masks.append(x_mask)
+        z_masks.append(z_mask)
+        coefficients.append(complex(coefficient))
+    return PauliSumOperator(x_masks, z_masks, coefficients, len(qubits), big_endian)
+
+
+def _compile_pauli_list(
+    paulis: typing.Any, coefficients: np.ndarray, num_qubits: int, big_endian: bool
+) -> PauliSumOperator:
+    """Compiles a qiskit PauliList, whose X and Z bits are indexed by the qubits.
+
+    :type paulis: qiskit.quantum_info.PauliList
+    :param paulis: The Pauli strings
+    :type coefficients: np.ndarray
+    :param coefficients: The coefficient of every Pauli string
+    :type num_qubits: int
+    :param num_qubits: The number of qubits of the circuit
+    :type big_endian: bool
+    :param big_endian: Whether qubit 0 is the most significant bit of the indices
+    :returns: the compiled operator
+    :rtype: PauliSumOperator
+    :raises ValueError: if the Pauli strings act on more qubits than the circuit has
+    """
+    if paulis.num_qubits > num_qubits:
+        raise ValueError(
+            f"The cost acts on {paulis.num_qubits} qubits, the circuit has {num_qubits}"
+        )
+    weights = 1 << np.arange(paulis.num_qubits, dtype=np.int64)
+    # qiskit stores (-i)^phase times the string of X, Y and Z
+    coefficients = np.asarray(coefficients) * (-1j) ** np.asarray(paulis.phase)
+    return PauliSumOperator(
+        np.asarray(paulis.x, dtype=np.int64) @ weights,
+        np.asarray(paulis.z, dtype=np.int64) @ weights,
+        coefficients,
+        num_qubits,
+        big_endian,
+    )
@@ -1,2 +1,22 @@
-import qleet.simulators.pqc_trainer
-import qleet.simulators.circuit_simulators
+"""Simulators of the circuits, and trainers of their parameters."""
+
+from .._lazy import lazy_package
+
+__getattr__, __dir__ = lazy_package(
+    __name__,
+    submodules=[
+        "pqc_trainer",
+        "circuit_simulators",
+        "cache",
+        "sampling",
+        "statevector",
+        "planner",
+        "mps_simulator",
+        "trajectories",
+        "stabilizer",
+        "fusion",
+        "state_store",
+        "parallel",
+        "parameters",
+    ],
+)
@@ -0,0 +1,237 @@
+"""Module to cache the results of simulations, so repeated analyses skip simulating.
+
+Results are addressed by their content, the key is a hash of the fingerprint of the
+circuit, the parameter values (or the seed they were drawn from), the noise model and
+the engine which simulated them. The same analysis of the same circuit therefore finds
+the states simulated earlier, by another analyzer, in another notebook or in another job.
+
+The cache has two tiers. The memory tier keeps the most recently used results up to a
+size limit. The disk tier, if a directory is given, stores every result as a `.npy` file
+which is memory-mapped when read back, so a large stack of states is paged in lazily
+instead of being loaded whole. When the directory grows over its size limit the least
+recently used files are deleted. Files are written atomically, several processes can
+share the same directory.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import typing
+
+import numpy as np
+
+from ..interface.circuit import CircuitDescriptor
+from ..interface.instrumentation import count
+
+
+def noise_token(noise_model: typing.Any) -> str:
+    """Stable textual form of a noise model, to tell noise models apart in the keys.
+
+    :type noise_model: Noise model in any supported library, or None
+    :param noise_model: The noise model to describe
+    :returns: the description of the noise model
+    :rtype: str
+    """
+    if noise_model is None:
+        return "noiseless"
+    if hasattr(noise_model, "to_dict"):
+        return json.dumps(noise_model.to_dict(), sort_keys=True, default=str)
+    return repr(noise_model)
+
+
+class SimulationCache:
+    """Two tier, content addressed cache of simulated state stacks."""
+
+    def __init__(
+        self,
+        directory: typing.Optional[str] = None,
+        memory_limit: int = 256 * 2**20,
+        disk_limit: int = 4 * 2**30,
+    ) -> None:
+        """Constructs the cache, creating the directory if needed.
+
+        :type directory: str, optional
+        :param directory: The directory of the disk tier, None for a memory only cache
+        :type memory_limit: int
+        :param memory_limit: Maximum number of bytes of results kept in memory
+        :type disk_limit: int
+        :param disk_limit: Maximum number of bytes of results kept in the directory
+        """
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._memory: "collections.OrderedDict[str, np.ndarray]" = (
+            collections.OrderedDict()
+        )
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(
+        circuit: CircuitDescriptor,
+        params: typing.Any,
+        noise_model: typing.Any = None,
+        engine: str = "",
+    ) -> str:
+        """Computes the key which addresses a result.
+
+        :type circuit: CircuitDescriptor
+        :param circuit: The simulated circuit
+        :type params: np.ndarray or int
+        :param params: The parameter values of every simulation, or the seed they were
+            generated from
+        :type noise_model: Noise model in any supported library, or None
+        :param noise_model: The noise model of the simulations
+        :type engine: str
+        :param engine: Name of the engine and anything else which changes the result
+        :returns: the hex digest addressing the result
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        digest.update(circuit.fingerprint.encode())
+        if isinstance(params, np.ndarray):
+            params = np.ascontiguousarray(params, dtype=np.float64)
+            digest.update(str(params.shape).encode())
+            digest.update(params.tobytes())
+        else:
+            digest.update(repr(params).encode())
+        digest.update(noise_token(noise_model).encode())
+        digest.update(engine.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """The path of the file which stores the result in the disk tier.
+
+        :type key: str
+        :param key: The key of the result
+        :returns: the path of the `.npy` file
+        :rtype: str
+        """
+        return os.path.join(typing.cast(str, self.directory), f"{key}.npy")
+
+    def get(self, key: str) -> typing.Optional[np.ndarray]:
+        """Looks the result up, in memory first and then on disk.
+
+        :type key: str
+        :param key: The key of the result
+        :returns: the read-only result, memory-mapped if it came from the disk, or None
+            if it is not cached
+        :rtype: np.ndarray or None
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                count("cache.hits")
+                return self._memory[key]
+        if self.directory is not None and os.path.exists(self._path(key)):
+            try:
+                states = np.load(self._path(key), mmap_mode="r")
+                os.utime(self._path(key))
+            except (OSError, ValueError):
+                # Evicted by another process in the meanwhile
+                count("cache.misses")
+                return None
+            self._remember(key, states)
+            count("cache.hits")
+            count("cache.disk_hits")
+            return states
+        count("cache.misses")
+        return None
+
+    def put(self, key: str, states: np.ndarray) -> np.ndarray:
+        """Stores the result in both the tiers.
+
+        :type key: str
+        :param key: The key of the result
+        :type states: np.ndarray
+        :param states: The result to store, it is made read-only as it will be shared
+        :returns: the stored result
+        :rtype: np.ndarray
+        """
+        states.setflags(write=False)
+        self._remember(key, states)
+        if self.directory is not None:
+            file_descriptor, temp_path = tempfile.mkstemp(
+                dir=self.directory, prefix=f".{key}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(file_descriptor, "wb") as file:
+                    np.save(file, states)
+                os.replace(temp_path, self._path(key))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            self._evict_disk()
+        return states
+
+    def get_or_compute(
+        self, key: str, compute: typing.Callable[[], np.ndarray]
+    ) -> np.ndarray:
+        """Looks the result up, computing and storing it if it is not cached.
+
+        :type key: str
+        :param key: The key of the result
+        :type compute: Callable
+        :param compute: Function with no arguments which computes the result
+        :returns: the read-only result
+        :rtype: np.ndarray
+        """
+        states = self.get(key)
+        if states is None:
+            states = self.put(key, np.asarray(compute()))
+        return states
+
+    def _remember(self, key: str, states: np.ndarray) -> None:
+        """Adds the result to the memory tier, evicting the least recently used ones.
+
+        :type key: str
+        :param key: The key of the result
+        :type states: np.ndarray
+        :param states: The result
+        """
+        if states.nbytes > self.memory_limit:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= self._memory.pop(key).nbytes
+            self._memory[key] = states
+            self._memory_size += states.nbytes
+            while self._memory_size > self.memory_limit:
+                _key, evicted = self._memory.popitem(last=False)
+                self._memory_size -= evicted.nbytes
+
+    def _evict_disk(self) -> None:
+        """Deletes the least recently used files until the disk tier fits its limit."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy"):
+                path = os.path.join(typing.cast(str, self.directory), name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in sorted(entries):
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Empties both the tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(self.directory, name))
@@ -2,17 +2,68 @@
 Used for computing properties of the circuit like Entanglability and Expressibility.
 """
 
+from __future__ import annotations
+
 import typing
 
-import cirq
 import numpy as np
-import qiskit
-
-from qiskit.providers.aer.noise import NoiseModel as qiskitNoiseModel
-from cirq.devices.noise_model import NoiseModel as cirqNoiseModel
-from pyquil.noise import NoiseModel as pyquilNoiseModel
 
+from .._lazy import lazy_module, isinstance_of
 from ..interface.circuit import CircuitDescriptor
+from ..interface.checkpoint import Checkpointer
+from ..interface.compiler import CompiledCircuit, compile_circuit
+from ..interface.instrumentation import count, span, timed
+from .cache import SimulationCache
+from .mps_simulator import MPS, simulate_mps
+from .parallel import sharding_available
+from .planner import Plan, SimulationPlanner
+from .sampling import Seed
+from .stabilizer import StabilizerState, clifford_samples, simulate_stabilizers
+from .state_store import allocate_states
+from .statevector import precision_dtype, reverse_state_order, simulate_states
+from .trajectories import (
+    DEFAULT_TRAJECTORIES,
+    TrajectoryEnsemble,
+    simulate_trajectories,
+)
+
+if typing.TYPE_CHECKING:
+    import cirq
+    import qiskit
+    from qiskit.providers.aer.noise import NoiseModel as qiskitNoiseModel
+    from cirq.devices.noise_model import NoiseModel as cirqNoiseModel
+    from pyquil.noise import NoiseModel as pyquilNoiseModel
+else:
+    cirq = lazy_module("cirq")
+    qiskit = lazy_module("qiskit")
+
+# The parameter values of a batch of simulations, as resolvers or as an array of shape
+# (batch, num_params) in the order of `CircuitDescriptor.parameters`
+ParameterValues = typing.Union[
+    typing.Sequence[typing.Dict["qiskit.circuit.Parameter", float]], np.ndarray
+]
+
+NOISE_MODELS = {
+    "cirq": ("cirq.devices.noise_model", "NoiseModel"),
+    "pyquil": ("pyquil.noise", "NoiseModel"),
+    "qiskit": ("qiskit.providers.aer.noise", "NoiseModel"),
+}
+
+
+def is_noise_model_of(noise_model: typing.Any, backend: str) -> bool:
+    """Checks if the noise model belongs to the framework of the backend, this does not
+    import the framework, a noise model can only come from an already imported one.
+
+    :type noise_model: Any
+    :param noise_model: The noise model to check
+    :type backend: str
+    :param backend: The backend of the circuit, one of the keys of `NOISE_MODELS`
+    :returns: Whether the noise model can be used to simulate circuits of the backend
+    :rtype: bool
+    """
+    return backend in NOISE_MODELS and isinstance_of(
+        noise_model, *NOISE_MODELS[backend]
+    )
 
 
 class CircuitSimulator:
@@ -24,6 +75,8 @@ class CircuitSimulator:
         noise_model: typing.Union[
             cirqNoiseModel, qiskitNoiseModel, pyquilNoiseModel, None
         ] = None,
+        cache: typing.Optional[SimulationCache] = None,
+        planner: typing.Optional[SimulationPlanner] = None,
     ) -> None:
         """Initialize the state simulator
         :type circuit: CircuitDescriptor
@@ -31,10 +84,20 @@ class CircuitSimulator:
         :type noise_model: Noise model as a dict or in the library format
         :param noise_model: the noise model as dict or empty dict for density matrix simulations,
             None if performing state vector simulations
+        :type cache: SimulationCache, optional
+        :param cache: cache which batches of simulations are looked up in and stored to
+        :type planner: SimulationPlanner, optional
+        :param planner: planner which chooses the engine that simulates every batch, and
+            splits the batch into chunks which fit in its memory budget, if None batches
+            are simulated one circuit at a time by the framework of the circuit
         """
         self.circuit = circuit
         self.noise_model = noise_model
-        self._result = None
+        self.cache = cache
+        self.planner = planner
+        self._result: typing.Optional[np.ndarray] = None
+        self._qiskit_job: typing.Optional[typing.Tuple[typing.Any, typing.Any]] = None
+        self._cirq_simulator: typing.Any = None
 
     @property
     def result(
@@ -46,13 +109,17 @@ class CircuitSimulator:
         """
         return self._result
 
+    @timed("simulator.simulate")
     def simulate(
         self,
-        param_resolver: typing.Dict[qiskit.circuit.Parameter, float],
+        param_resolver: typing.Union[
+            typing.Dict[qiskit.circuit.Parameter, float], np.ndarray
+        ],
         shots: int = 1024,
     ) -> np.ndarray:
         """Simulate to get the state vector or the density matrix
-        :type param_resolver: Dict to resolve all parameters to a static float value
+        :type param_resolver: Dict to resolve all parameters to a static float value, or
+            array of the values in the order of `circuit.parameters`
         :param param_resolver: a dictionary of all the symbols/parameters mapping to their values
         :type shots: int
         :param shots: number of times to run the qiskit density matrix simulator
@@ -60,56 +127,670 @@ class CircuitSimulator:
         :rtype: np.array
         :raises NotImplementedError: if circuit simulation is not supported for a backend
         """
+        if isinstance(param_resolver, np.ndarray):
+            (param_resolver,) = self.resolvers(param_resolver[np.newaxis])
         if self.circuit.default_backend == "qiskit":
-            circuit = self.circuit.qiskit_circuit.bind_parameters(param_resolver)
-            if self.noise_model is not None:
-                circuit.snapshot("final", snapshot_type="density_matrix")
-                result = qiskit.execute(
-                    circuit,
-                    qiskit.Aer.get_backend("qasm_simulator"),
-                    shots=shots,
-                    noise_model=self.noise_model,
-                    backend_options={"method": "density_matrix"},
-                ).result()
-                result_data = result.data(0)["snapshots"]["density_matrix"]["final"][0][
-                    "value"
-                ]
-            else:
-                circuit.snapshot("final", snapshot_type="statevector")
-                result = qiskit.execute(
-                    circuit, qiskit.Aer.get_backend("aer_simulator_statevector")
-                ).result()
-                result_data = result.data(0)["snapshots"]["statevector"]["final"][0]
+            result_data = self._simulate_qiskit([param_resolver], shots)[0]
 
         elif self.circuit.default_backend == "cirq":
-
-            circuit = self.circuit.cirq_circuit
-            non_unitary_flag = False
-            for op in circuit.all_operations():
-                op_name = str(op).split("(")[0]
-                if op_name in [
-                    "phase_flip",
-                    "phase_damp",
-                    "amplitude_damp",
-                    "depolarize",
-                    "asymmetric_depolarize",
-                ]:
-                    non_unitary_flag = True
-                    break
-
-            if self.noise_model is None and not non_unitary_flag:
-                simulator = cirq.Simulator()  # type: ignore
-                result = simulator.simulate(self.circuit.cirq_circuit, param_resolver)
-                result_data = result.final_state_vector
-            else:
-                simulator = cirq.DensityMatrixSimulator(noise=self.noise_model)  # type: ignore
-                result = simulator.simulate(self.circuit.cirq_circuit, param_resolver)
-                result_data = result.final_density_matrix
+            result_data = next(self._sweep_cirq(cirq.ListSweep([param_resolver])))
 
         else:
             raise NotImplementedError(
                 "Parametrized circuit simulation is not implemented for this backend."
             )
 
+        result_data = np.asarray(result_data)
+        count("simulator.simulations")
+        count("simulator.bytes_allocated", result_data.nbytes)
         self._result = result_data
         return result_data
+
+    def _qiskit_template(self) -> typing.Tuple[typing.Any, typing.Any]:
+        """The Aer backend, and the parametrized circuit saving its final state transpiled
+        for it, transpiled once and bound to every batch of parameter values
+        :returns: the backend and the transpiled circuit
+        :rtype: tuple
+        """
+        if self._qiskit_job is None:
+            if self.noise_model is None:
+                backend = qiskit.Aer.get_backend("aer_simulator_statevector")
+            else:
+                backend = qiskit.Aer.get_backend("aer_simulator_density_matrix")
+            circuit = self.circuit.qiskit_circuit.copy()
+            if self.noise_model is None:
+                circuit.save_statevector()
+            else:
+                circuit.save_density_matrix()
+            self._qiskit_job = (backend, qiskit.transpile(circuit, backend))
+        return self._qiskit_job
+
+    @timed("simulator.qiskit_job")
+    def _simulate_qiskit(
+        self,
+        param_resolvers: ParameterValues,
+        shots: int,
+    ) -> np.ndarray:
+        """Simulates the qiskit circuit for all the parameter resolvers in a single Aer
+        job, with one experiment per resolver
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :type shots: int
+        :param shots: number of shots of the density matrix simulations
+        :returns: the state vectors or density matrices, stacked along the first axis
+        :rtype: np.array
+        """
+        backend, template = self._qiskit_template()
+        circuits = [
+            template.bind_parameters(resolver)
+            for resolver in self.resolvers(param_resolvers)
+        ]
+        options = {} if self.noise_model is None else {"noise_model": self.noise_model}
+        result = backend.run(circuits, shots=shots, **options).result()
+        key = "statevector" if self.noise_model is None else "density_matrix"
+        return np.stack(
+            [np.asarray(result.data(idx)[key]) for idx in range(len(circuits))]
+        )
+
+    @property
+    def cirq_simulator(self) -> typing.Any:
+        """The cirq simulator of the circuit, created once and reused for every sweep.
+        Circuits with noise channels, or simulated with a noise model, are simulated as
+        density matrices and the others as state vectors, at the precision `dtype`.
+        :returns: the cirq.Simulator or cirq.DensityMatrixSimulator
+        :rtype: cirq.SimulatesFinalState
+        """
+        if self._cirq_simulator is None:
+            # The amplitudes have the precision reported in the cache keys
+            dtype = self.dtype.type
+            if self.noise_model is None and not self.circuit.has_channels:
+                self._cirq_simulator = cirq.Simulator(dtype=dtype)
+            else:
+                self._cirq_simulator = cirq.DensityMatrixSimulator(
+                    dtype=dtype, noise=self.noise_model
+                )
+        return self._cirq_simulator
+
+    def _sweep_cirq(self, sweep: typing.Any) -> typing.Iterator[np.ndarray]:
+        """Simulates the cirq circuit over a sweep of parameter values with one simulator
+        :type sweep: cirq.Sweepable
+        :param sweep: the parameter values of every simulation
+        :returns: the final state vector or density matrix of every simulation, in order
+        :rtype: Iterator of np.array
+        """
+        simulator = self.cirq_simulator
+        for result in simulator.simulate_sweep_iter(self.circuit.cirq_circuit, sweep):
+            if isinstance(simulator, cirq.DensityMatrixSimulator):
+                yield result.final_density_matrix
+            else:
+                yield result.final_state_vector
+
+    def _cirq_sweep(
+        self,
+        param_resolvers: ParameterValues,
+    ) -> typing.Any:
+        """The sweep of the parameter values of the resolvers, zipping one list of points
+        per parameter, or the list of resolvers for a circuit without parameters
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :returns: the sweep
+        :rtype: cirq.Sweep
+        """
+        if not self.circuit.parameters:
+            return cirq.ListSweep([{} for _ in param_resolvers])
+        values = self.parameter_matrix(param_resolvers)
+        return cirq.Zip(
+            *(
+                cirq.Points(param, values[:, idx].tolist())
+                for idx, param in enumerate(self.circuit.parameters)
+            )
+        )
+
+    @property
+    def engine(self) -> str:
+        """Name of the engine which simulates the circuit, part of the cache keys
+        :return: the backend, and whether states or density matrices are simulated
+        :rtype: str
+        """
+        method = "statevector" if self.noise_model is None else "density_matrix"
+        return f"{self.circuit.default_backend}.{method}"
+
+    @property
+    def precision(self) -> str:
+        """Precision of the amplitudes of the batched engines, part of the cache keys
+        :return: "single" or "double", that of the planner if there is one
+        :rtype: str
+        """
+        return "double" if self.planner is None else self.planner.precision
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Dtype of the amplitudes simulated by the batched engines
+        :return: complex64 or complex128
+        :rtype: np.dtype
+        """
+        return precision_dtype(self.precision)
+
+    def parameter_matrix(
+        self,
+        param_resolvers: ParameterValues,
+    ) -> np.ndarray:
+        """Collects the values of the parameters of the circuit from the resolvers
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :returns: the values, one row per resolver in the order of `circuit.parameters`
+        :rtype: np.array
+        """
+        num_params = len(self.circuit.parameters)
+        if isinstance(param_resolvers, np.ndarray) or not all(
+            isinstance(resolver, dict) for resolver in param_resolvers
+        ):
+            # Arrays of values, or rows of such an array
+            return np.asarray(param_resolvers, dtype=np.float64).reshape(
+                len(param_resolvers), num_params
+            )
+        return np.array(
+            [
+                [float(resolver[param]) for param in self.circuit.parameters]
+                for resolver in param_resolvers
+            ],
+            dtype=np.float64,
+        ).reshape(len(param_resolvers), num_params)
+
+    def resolvers(
+        self,
+        param_resolvers: ParameterValues,
+    ) -> typing.List[typing.Dict[typing.Any, float]]:
+        """Resolvers of the parameters of the circuit, for the frameworks which bind them
+        by name
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :returns: a dictionary of the parameters mapping to their values per simulation
+        :rtype: list of dict
+        """
+        if isinstance(param_resolvers, np.ndarray) or not all(
+            isinstance(resolver, dict) for resolver in param_resolvers
+        ):
+            return [
+                dict(zip(self.circuit.parameters, row))
+                for row in self.parameter_matrix(param_resolvers)
+            ]
+        return list(param_resolvers)
+
+    @timed("simulator.simulate_batch")
+    def simulate_batch(
+        self,
+        param_resolvers: ParameterValues,
+        shots: int = 1024,
+        checkpoint: typing.Optional[Checkpointer] = None,
+        name: str = "states",
+    ) -> np.ndarray:
+        """Simulate the circuit for each of the parameter resolvers
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :type shots: int
+        :param shots: number of times to run the qiskit density matrix simulator
+        :type checkpoint: Checkpointer, optional
+        :param checkpoint: saves the states simulated so far every `checkpoint.interval`
+            simulations, and resumes from the saved states if there are any
+        :type name: str
+        :param name: name of the checkpoint holding the simulated states
+        :returns: state vectors or density matrices stacked along the first axis, read-only
+            if they are shared with the cache, and memory-mapped to a temporary file if
+            they are over the spill threshold of the planner
+        :rtype: np.array
+        """
+        plan = None if self.planner is None else self.plan(len(param_resolvers))
+        engine = self.engine
+        if plan is not None:
+            engine = f"{self.circuit.default_backend}.{plan.engine}"
+
+        def compute() -> np.ndarray:
+            if plan is not None and plan.engine == "batched":
+                return self._simulate_chunks(
+                    param_resolvers, plan.chunk_size, checkpoint, name
+                )
+            return self._simulate_batch(param_resolvers, shots, checkpoint, name)
+
+        if self.cache is None:
+            return compute()
+        if self.precision != "double":
+            engine = f"{engine}:{self.precision}"
+        key = self.cache.key(
+            self.circuit,
+            self.parameter_matrix(param_resolvers),
+            self.noise_model,
+            f"{engine}:shots={shots}",
+        )
+        return self.cache.get_or_compute(key, compute)
+
+    def plan(
+        self, batch_size: int = 1, dense: bool = True, mixed_fidelities: bool = False
+    ) -> Plan:
+        """Plans the simulation of a batch of circuits with the planner of the simulator
+        :type batch_size: int
+        :param batch_size: the number of circuits to simulate
+        :type dense: bool
+        :param dense: whether the dense state vectors or density matrices are needed
+        :type mixed_fidelities: bool
+        :param mixed_fidelities: whether the Uhlmann fidelities of noisy states are
+            needed, see `SimulationPlanner.plan`
+        :returns: the engine to simulate with and its estimated memory and time
+        :rtype: Plan
+        :raises ValueError: if the simulator has no planner
+        """
+        if self.planner is None:
+            raise ValueError("The simulator was constructed without a planner")
+        return self.planner.plan(
+            self.circuit, batch_size, self.noise_model, dense, mixed_fidelities
+        )
+
+    def simulate_mps(
+        self,
+        param_resolvers: ParameterValues,
+    ) -> typing.List[MPS]:
+        """Simulate the circuit as a matrix product state for each of the parameter resolvers,
+        with the bond dimension and the cutoff of the planner if there is one
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :returns: the states, with the qubits in the order of the compiled circuit
+        :rtype: list of MPS
+        :raises ValueError: if the circuit is simulated with a noise model
+        """
+        if self.noise_model is not None:
+            raise ValueError("Matrix product states cannot be simulated with noise")
+        options: typing.Dict[str, typing.Any] = {}
+        if self.planner is not None:
+            options = {
+                "max_bond_dimension": self.planner.max_bond_dimension,
+                "cutoff": self.planner.cutoff,
+                "dtype": self.planner.dtype,
+            }
+        return simulate_mps(
+            self.circuit.compiled, self.parameter_matrix(param_resolvers), **options
+        )
+
+    def clifford_samples(
+        self,
+        param_resolvers: ParameterValues,
+    ) -> np.ndarray:
+        """Finds the parameter resolvers for which the circuit is a Clifford circuit
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :returns: whether every gate is a Clifford gate, for every resolver, never with noise
+        :rtype: np.array
+        """
+        if self.noise_model is not None or len(param_resolvers) == 0:
+            return np.zeros(len(param_resolvers), dtype=bool)
+        return clifford_samples(
+            self.circuit.compiled, self.parameter_matrix(param_resolvers)
+        )
+
+    def simulate_stabilizers(
+        self,
+        param_resolvers: ParameterValues,
+    ) -> typing.List[StabilizerState]:
+        """Simulate the circuit with stabilizer tableaus for each of the parameter resolvers
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation, for which the
+            circuit is a Clifford circuit
+        :returns: the states, with the qubits in the order of the compiled circuit
+        :rtype: list of StabilizerState
+        :raises ValueError: if the circuit is simulated with a noise model, or is not a
+            Clifford circuit for some of the resolvers
+        """
+        if self.noise_model is not None:
+            raise ValueError("Stabilizer states cannot be simulated with noise")
+        return simulate_stabilizers(
+            self.circuit.compiled, self.parameter_matrix(param_resolvers)
+        )
+
+    def simulate_compact(
+        self,
+        param_resolvers: ParameterValues,
+        shots: int = 1024,
+        checkpoint: typing.Optional[Checkpointer] = None,
+        name: str = "states",
+    ) -> typing.List[typing.Any]:
+        """Simulate the circuit for each of the parameter resolvers, in the most compact
+        representation of the states the planner allows. The resolvers for which the
+        circuit is a Clifford circuit are simulated with stabilizer tableaus, and the
+        others with the engine the planner chooses when the dense states are not needed.
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :type shots: int
+        :param shots: number of times to run the qiskit density matrix simulator
+        :type checkpoint: Checkpointer, optional
+        :param checkpoint: checkpointer of the dense states, see `simulate_batch`
+        :type name: str
+        :param name: name of the checkpoint holding the dense states
+        :returns: the state of every resolver, a state vector or a density matrix, or a
+            StabilizerState, an MPS or a TrajectoryEnsemble
+        :rtype: list
+        """
+        states: typing.List[typing.Any] = [None] * len(param_resolvers)
+        clifford = np.zeros(len(param_resolvers), dtype=bool)
+        if self.planner is not None and "stabilizer" in self.planner.engines:
+            clifford = self.clifford_samples(param_resolvers)
+        if clifford.any():
+            indices = np.flatnonzero(clifford)
+            stabilizers = self.simulate_stabilizers(
+                [param_resolvers[int(idx)] for idx in indices]
+            )
+            for idx, state in zip(indices, stabilizers):
+                states[idx] = state
+        indices = np.flatnonzero(~clifford)
+        if len(indices) == 0:
+            return states
+        resolvers = [param_resolvers[int(idx)] for idx in indices]
+        engine = None
+        if self.planner is not None:
+            engine = self.plan(len(resolvers), dense=False).engine
+        rest: typing.Sequence[typing.Any]
+        if engine == "mps":
+            rest = self.simulate_mps(resolvers)
+        elif engine == "trajectories":
+            rest = self.simulate_trajectories(resolvers)
+        else:
+            rest = list(self.simulate_batch(resolvers, shots, checkpoint, name))
+        for idx, other in zip(indices, rest):
+            states[idx] = other
+        return states
+
+    @property
+    def noisy_compiled(self) -> CompiledCircuit:
+        """The compiled circuit with the channels of the noise model inserted
+        :returns: the compiled circuit, with its noise channels
+        :rtype: CompiledCircuit
+        :raises ValueError: if the noise model is not a cirq noise model
+        """
+        if self.noise_model is None:
+            return self.circuit.compiled
+        if not is_noise_model_of(self.noise_model, "cirq"):
+            raise ValueError(
+                "Only the channels of cirq noise models can be inserted in the circuit"
+            )
+        return compile_circuit(
+            self.circuit.cirq_circuit.with_noise(self.noise_model),
+            self.circuit.parameters,
+        )
+
+    def simulate_trajectories(
+        self,
+        param_resolvers: ParameterValues,
+        trajectories: typing.Optional[int] = None,
+        seed: Seed = None,
+    ) -> typing.List[TrajectoryEnsemble]:
+        """Simulate Monte Carlo trajectories of the noisy circuit for each of the parameter
+        resolvers, which stand for the density matrices at the memory cost of state vectors
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :type trajectories: int, optional
+        :param trajectories: the number of trajectories per simulation, by default the one
+            of the planner if there is one
+        :type seed: int or np.random.Generator, optional
+        :param seed: seed of the random branches of the trajectories
+        :returns: the trajectories of every simulation, with the qubits in the order of the
+            compiled circuit
+        :rtype: list of TrajectoryEnsemble
+        :raises ValueError: if the noise model is not a cirq noise model
+        :raises MemoryError: if the trajectories of one simulation do not fit in the
+            memory budget of the planner
+        """
+        if trajectories is None:
+            trajectories = (
+                DEFAULT_TRAJECTORIES
+                if self.planner is None
+                else self.planner.trajectories
+            )
+        compiled = self.noisy_compiled
+        values = self.parameter_matrix(param_resolvers)
+        chunk_size = None
+        if self.planner is not None:
+            compiled = self.planner.fuse(compiled)
+        if (
+            self.planner is not None
+            and "trajectories" in self.planner.engines
+            and len(values) > 0
+        ):
+            plan = self.planner.plan(
+                self.circuit,
+                len(values),
+                self.noise_model,
+                dense=False,
+                pinned_engine="trajectories",
+            )
+            # The chunks are planned for the trajectories of the planner
+            chunk_size = max(
+                plan.chunk_size * self.planner.trajectories // trajectories, 1
+            )
+        states = simulate_trajectories(
+            compiled,
+            values,
+            trajectories,
+            seed,
+            self.dtype,
+            chunk_size,
+            self._allocate_states(
+                (len(values), trajectories, 2**compiled.num_qubits), self.dtype
+            ),
+        )
+        return [TrajectoryEnsemble(ensemble) for ensemble in states]
+
+    def expectation(
+        self,
+        param_resolvers: ParameterValues,
+        shots: int = 1024,
+    ) -> np.ndarray:
+        """Computes the expectation value of the cost function of the circuit for each of
+        the parameter resolvers, from the simulated state vectors or density matrices.
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :type shots: int
+        :param shots: number of times to run the qiskit density matrix simulator
+        :returns: the expectation value for every resolver, averaged over trajectories if
+            the planner chooses to simulate the noisy circuit with them
+        :rtype: np.array
+        """
+        operator = self.circuit.cost_operator
+        if (
+            self.planner is not None
+            and self.noise_model is not None
+            and self.plan(len(param_resolvers), dense=False).engine == "trajectories"
+        ):
+            return np.array(
+                [
+                    ensemble.expectation(operator).value
+                    for ensemble in self.simulate_trajectories(param_resolvers)
+                ]
+            )
+        states = self.simulate_batch(param_resolvers, shots)
+        if states.ndim == 3:
+            return operator.density_expectation(states)
+        return operator.expectation(states)
+
+    def _simulate_batch(
+        self,
+        param_resolvers: ParameterValues,
+        shots: int,
+        checkpoint: typing.Optional[Checkpointer],
+        name: str,
+    ) -> np.ndarray:
+        """Simulates the batch, see `simulate_batch`
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :type shots: int
+        :param shots: number of times to run the qiskit density matrix simulator
+        :type checkpoint: Checkpointer, optional
+        :param checkpoint: checkpointer of the simulated states
+        :type name: str
+        :param name: name of the checkpoint holding the simulated states
+        :returns: state vectors or density matrices stacked along the first axis
+        :rtype: np.array
+        """
+        saved = None if checkpoint is None else checkpoint.load_rows(name)
+        done = 0 if saved is None else len(saved)
+        states: typing.Optional[np.ndarray] = None
+        step = checkpoint.interval if checkpoint is not None else len(param_resolvers)
+        step = max(step, 1)
+        for start in range(done, len(param_resolvers), step):
+            stop = min(start + step, len(param_resolvers))
+            simulated = self._simulate_framework(param_resolvers[start:stop], shots)
+            for idx, state in enumerate(simulated, start):
+                if states is None:
+                    # The shape of the stack is known once the first state is simulated
+                    states = self._allocate_states(
+                        (len(param_resolvers),) + state.shape, state.dtype
+                    )
+                    if saved is not None:
+                        states[:done] = saved
+                states[idx] = state
+            if checkpoint is not None and states is not None:
+                checkpoint.append_rows(name, states[start:stop])
+        if states is None and saved is not None and done > 0:
+            # Every state was checkpointed, they are copied out of the checkpoint
+            states = self._allocate_states(saved.shape, saved.dtype)
+            states[:] = saved
+        if states is None:
+            # An empty batch, the stack has no states of the shape they would have
+            dimension = 2**self.circuit.num_qubits
+            if self.noise_model is None and not self.circuit.has_channels:
+                return np.empty((0, dimension), dtype=self.dtype)
+            return np.empty((0, dimension, dimension), dtype=self.dtype)
+        return states
+
+    def _simulate_framework(
+        self,
+        param_resolvers: ParameterValues,
+        shots: int,
+    ) -> typing.Iterator[np.ndarray]:
+        """Simulates the batch with the framework of the circuit, as one Aer job for
+        qiskit circuits and one sweep for cirq circuits
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :type shots: int
+        :param shots: number of times to run the qiskit density matrix simulator
+        :returns: the state vector or density matrix of every simulation, in order
+        :rtype: Iterator of np.array
+        :raises NotImplementedError: if circuit simulation is not supported for a backend
+        """
+        simulated: typing.Iterable[np.ndarray]
+        if self.circuit.default_backend == "qiskit":
+            simulated = self._simulate_qiskit(param_resolvers, shots)
+        elif self.circuit.default_backend == "cirq":
+            simulated = self._sweep_cirq(self._cirq_sweep(param_resolvers))
+        else:
+            raise NotImplementedError(
+                "Parametrized circuit simulation is not implemented for this backend."
+            )
+        # Every simulation is timed like a call of `simulate`, the framework simulates
+        # the states lazily as they are taken from the job or the sweep
+        iterator = iter(simulated)
+        for _ in range(len(param_resolvers)):
+            with span("simulator.simulate"):
+                state = np.asarray(next(iterator))
+            count("simulator.simulations")
+            count("simulator.bytes_allocated", state.nbytes)
+            self._result = state
+            yield state
+
+    def _simulate_chunks(
+        self,
+        param_resolvers: ParameterValues,
+        chunk_size: int,
+        checkpoint: typing.Optional[Checkpointer],
+        name: str,
+    ) -> np.ndarray:
+        """Simulates the batch with the batched numpy engine, a chunk of states at a time,
+        sharded across the worker processes of the planner if it has several
+        :type param_resolvers: List of dicts resolving all parameters to static float values,
+            or array of the values with one row per simulation
+        :param param_resolvers: the parameter values for every simulation
+        :type chunk_size: int
+        :param chunk_size: number of states simulated at once
+        :type checkpoint: Checkpointer, optional
+        :param checkpoint: checkpointer of the simulated states, saved after every chunk
+        :type name: str
+        :param name: name of the checkpoint holding the simulated states
+        :returns: state vectors stacked along the first axis, in the amplitude order of
+            the framework of the circuit
+        :rtype: np.array
+        """
+        values = self.parameter_matrix(param_resolvers)
+        compiled = self.circuit.compiled
+        if self.planner is not None:
+            compiled = self.planner.fuse(compiled)
+        states = self._allocate_states(
+            (len(values), 2**compiled.num_qubits), self.dtype
+        )
+        done = 0
+        if checkpoint is not None:
+            saved = checkpoint.load_rows(name)
+            if saved is not None:
+                done = len(saved)
+                states[:done] = saved
+        planner = self.planner
+        if (
+            planner is not None
+            and planner.workers > 1
+            and len(values) - done > chunk_size
+            and sharding_available()
+        ):
+            written = done
+
+            def save(stop: int) -> None:
+                nonlocal written
+                if checkpoint is not None:
+                    checkpoint.append_rows(name, states[written:stop])
+                    written = stop
+
+            pool = planner.shard_pool(
+                compiled, self.dtype, self.circuit.default_backend == "qiskit"
+            )
+            pool.simulate(
+                values[done:],
+                chunk_size,
+                states[done:],
+                lambda stop: save(done + stop),
+            )
+            return states
+        for start in range(done, len(values), chunk_size):
+            stop = min(start + chunk_size, len(values))
+            chunk = simulate_states(compiled, values[start:stop], self.dtype)
+            if self.circuit.default_backend == "qiskit":
+                chunk = reverse_state_order(chunk, compiled.num_qubits)
+            states[start:stop] = chunk
+            if checkpoint is not None:
+                checkpoint.append_rows(name, chunk)
+        return states
+
+    def _allocate_states(
+        self, shape: typing.Tuple[int, ...], dtype: typing.Any
+    ) -> np.ndarray:
+        """Allocates the stack of simulated states, memory-mapped to a temporary file if
+        it is over the spill threshold of the planner
+        :type shape: tuple of int
+        :param shape: the shape of the stack
+        :type dtype: np.dtype
+        :param dtype: the dtype of the amplitudes
+        :returns: the uninitialized stack
+        :rtype: np.array
+        """
+        if self.planner is None:
+            return allocate_states(shape, dtype)
+        return allocate_states(
+            shape, dtype, self.planner.spill_threshold, self.planner.spill_directory
+        )
@@ -0,0 +1,233 @@
+"""Module to fuse the gates of a compiled circuit into fewer, wider blocks.
+
+Simulating a gate on a batch of state vectors reads and writes every amplitude, whatever
+the size of the gate is, so a simulation costs about one pass over the memory of the
+states per gate. The fusion pass clusters the gates into blocks of at most `max_width`
+qubits, so that runs of single qubit rotations, and the single qubit gates around the
+two qubit gates, like the CNOT-Rz-CNOT sandwiches of QAOA, are applied in one pass.
+
+The gates are clustered greedily in the order of the gate stream. Every qubit points to
+the latest block acting on it, and a gate is added to the blocks of its qubits, merging
+them, as long as the merged block is not wider than `max_width` and none of the blocks
+has been overtaken by another block on one of its qubits. Such blocks can be moved up
+to the gate, because every gate in between acts on other qubits. Noise channels are
+never fused, they end the blocks on their qubits.
+
+The matrix of a block is the product of the matrices of its gates. The products of the
+gates without parameters are computed once, and the blocks with parametrized gates are
+rebuilt for every batch of parameter values from them, with one batched matrix product
+per parametrized gate.
+"""
+
+import typing
+
+import numpy as np
+
+from ..interface.compiler import CompiledCircuit, Gate
+from .statevector import apply_gate
+
+DEFAULT_FUSION_WIDTH = 2
+
+
+class FusedBlock(typing.NamedTuple):
+    """A cluster of gates, applied at once as a unitary on its qubits."""
+
+    qubits: typing.Tuple[int, ...]
+    indices: typing.Tuple[int, ...]
+
+
+def fuse_gates(gates: typing.Sequence[Gate], max_width: int) -> typing.List[FusedBlock]:
+    """Clusters the gates into blocks of at most `max_width` qubits.
+
+    :type gates: Sequence of Gate
+    :param gates: The gates in the order they are applied, without measurements
+    :type max_width: int
+    :param max_width: The largest number of qubits of a block, gates which are wider
+        are blocks of their own
+    :returns: the blocks in the order they are applied, holding the indices of their
+        gates in increasing order
+    :rtype: list of FusedBlock
+    """
+    blocks: typing.Dict[int, typing.Tuple[typing.Set[int], typing.List[int]]] = {}
+    # The latest block on every qubit, and the order of the blocks by their last gate
+    latest: typing.Dict[int, int] = {}
+    closed: typing.Set[int] = set()
+    order: typing.Dict[int, int] = {}
+    for idx, gate in enumerate(gates):
+        candidates = {latest[qubit] for qubit in gate.qubits if qubit in latest}
+        merged = set(gate.qubits).union(*(blocks[block][0] for block in candidates))
+        fusable = (
+            gate.name != "channel"
+            and len(merged) <= max_width
+            and all(
+                block not in closed
+                and all(latest[qubit] == block for qubit in blocks[block][0])
+                for block in candidates
+            )
+        )
+        if fusable and candidates:
+            indices = sorted(
+                index for block in candidates for index in blocks[block][1]
+            ) + [idx]
+            for block in candidates:
+                del blocks[block], order[block]
+        else:
+            merged, indices = set(gate.qubits), [idx]
+        blocks[idx] = (merged, indices)
+        order[idx] = idx
+        if gate.name == "channel":
+            closed.add(idx)
+        for qubit in merged:
+            latest[qubit] = idx
+    return [
+        FusedBlock(tuple(sorted(blocks[block][0])), tuple(blocks[block][1]))
+        for block in sorted(order, key=order.__getitem__)
+    ]
+
+
+def _local_product(
+    matrices: typing.Sequence[np.ndarray],
+    local_qubits: typing.Sequence[typing.Sequence[int]],
+    width: int,
+    product: typing.Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Multiplies gates into the transposed matrix of a block.
+
+    :type matrices: Sequence of np.ndarray
+    :param matrices: The matrices of the gates in the order they are applied, of shape
+        (2^k, 2^k) or (batch, 2^k, 2^k)
+    :type local_qubits: Sequence of Sequence of int
+    :param local_qubits: The qubits of every gate, numbered within the block
+    :type width: int
+    :param width: The number of qubits of the block
+    :type product: np.ndarray, optional
+    :param product: The transposed product of the gates applied before, the identity if
+        None
+    :returns: the transposed product U^T, of shape (2^w, 2^w) or (batch, 2^w, 2^w), whose
+        rows are the images of the basis states
+    :rtype: np.ndarray
+    """
+    dimension = 2**width
+    if product is None:
+        product = np.eye(dimension, dtype=np.complex128)
+    for matrix, qubits in zip(matrices, local_qubits):
+        if matrix.ndim == 3 and product.ndim == 2:
+            product = np.repeat(product[np.newaxis], len(matrix), axis=0)
+        if product.ndim == 3:
+            batch = len(product)
+            if matrix.ndim == 3:
+                matrix = np.repeat(matrix, dimension, axis=0)
+            rows = apply_gate(product.reshape(-1, dimension), matrix, qubits, width)
+            product = rows.reshape(batch, dimension, dimension)
+        else:
+            product = apply_gate(product, matrix, qubits, width)
+    return product
+
+
+class FusedCircuit(CompiledCircuit):
+    """A compiled circuit whose gates are bound into fused blocks.
+
+    It has the same gate stream and fingerprint as the circuit it fuses, only `bind`
+    returns the blocks instead of the gates, so it can be simulated by every engine
+    which applies the bound gates one after the other.
+    """
+
+    def __init__(
+        self, compiled: CompiledCircuit, max_width: int = DEFAULT_FUSION_WIDTH
+    ):
+        """Fuses the compiled circuit.
+
+        :type compiled: CompiledCircuit
+        :param compiled: The compiled circuit
+        :type max_width: int
+        :param max_width: The largest number of qubits of a fused block
+        """
+        super().__init__(compiled.num_qubits, compiled.num_params, compiled.gates)
+        self.max_width = max_width
+        self._stream = [gate for gate in self.gates if gate.name != "measure"]
+        self.blocks = fuse_gates(self._stream, max_width)
+        self._segments: typing.Optional[typing.List[list]] = None
+
+    @property
+    def num_passes(self) -> int:
+        """Number of passes over the states a simulation makes, one per block
+        :returns: the number of blocks
+        :rtype: int
+        """
+        return len(self.blocks)
+
+    def _plan_segments(
+        self, bound: typing.List[typing.Tuple[Gate, np.ndarray]]
+    ) -> typing.List[list]:
+        """Splits every block into the runs of gates without parameters, multiplied once,
+        and the parametrized gates, multiplied for every batch.
+
+        :type bound: list of tuples of Gate and np.ndarray
+        :param bound: The gates bound to some values of the parameters
+        :returns: for every block, its segments, either the transposed product of a run
+            of fixed gates, or the index of a parametrized gate and its local qubits
+        :rtype: list of lists
+        """
+        segments = []
+        for block in self.blocks:
+            position = {qubit: idx for idx, qubit in enumerate(block.qubits)}
+            width = len(block.qubits)
+            pieces: typing.List[typing.Any] = []
+            run: typing.List[int] = []
+            for index in block.indices + (None,):
+                if index is not None and all(
+                    isinstance(param, (int, float))
+                    for param in self._stream[index].params
+                ):
+                    run.append(index)
+                    continue
+                if run:
+                    pieces.append(
+                        _local_product(
+                            [bound[idx][1] for idx in run],
+                            [
+                                [position[qubit] for qubit in self._stream[idx].qubits]
+                                for idx in run
+                            ],
+                            width,
+                        )
+                    )
+                    run = []
+                if index is not None:
+                    qubits = self._stream[index].qubits
+                    pieces.append((index, [position[qubit] for qubit in qubits]))
+            segments.append(pieces)
+        return segments
+
+    def bind(self, values: np.ndarray) -> typing.List[typing.Tuple[Gate, np.ndarray]]:
+        """Computes the matrices of the fused blocks for the values of the parameters.
+
+        :type values: np.ndarray
+        :param values: The values of the parameters, shape (num_params,) for a single
+            assignment or (batch, num_params) for a batch of them
+        :returns: every block as a `unitary` gate on its qubits along with its matrix,
+            gates alone in their block and channels are returned as they are
+        :rtype: list of tuples of Gate and np.ndarray
+        """
+        bound = super().bind(values)
+        if self._segments is None:
+            self._segments = self._plan_segments(bound)
+        fused = []
+        for block, pieces in zip(self.blocks, self._segments):
+            if len(block.indices) == 1:
+                fused.append(bound[block.indices[0]])
+                continue
+            width = len(block.qubits)
+            product = None
+            for piece in pieces:
+                if isinstance(piece, np.ndarray):
+                    product = piece if product is None else product @ piece
+                else:
+                    index, qubits = piece
+                    product = _local_product(
+                        [bound[index][1]], [qubits], width, product
+                    )
+            # A block of several gates has at least one segment
+            matrix = np.swapaxes(typing.cast(np.ndarray, product), -1, -2)
+            fused.append((Gate("unitary", block.qubits), matrix))
+        return fused
@@ -0,0 +1,338 @@
+"""Module to simulate circuits as matrix product states.
+
+A matrix product state stores the state of n qubits as a chain of n tensors, one per
+qubit, linked by bonds whose dimension bounds the entanglement across every cut of the
+chain. Shallow circuits with nearest-neighbour gates create little entanglement, so they
+are simulated with memory and time linear in the number of qubits instead of exponential,
+which makes the analysis of circuits of 30 to 50 qubits possible.
+
+Gates on qubits which are not neighbours in the chain are applied by first moving the
+qubits next to each other with swaps. After every gate the bonds are truncated to the
+largest singular values, keeping at most `max_bond_dimension` of them and dropping those
+whose total weight is under the relative `cutoff`. The weight dropped is accumulated in
+`truncation_error`, which bounds how far the simulated state is from the exact one.
+
+The reduced density matrices of a few qubits, the Schmidt spectra across the cuts of the
+chain, and the overlaps between states are all computed directly from the tensors, the
+state vector is never built unless it is asked for.
+"""
+
+import typing
+
+import numpy as np
+
+from ..interface.compiler import CompiledCircuit
+from ..interface.instrumentation import count, timed
+
+DEFAULT_MAX_BOND_DIMENSION = 64
+DEFAULT_CUTOFF = 1e-12
+
+
+class MPS:
+    """Matrix product state of a chain of qubits, kept in mixed canonical form."""
+
+    def __init__(
+        self,
+        num_qubits: int,
+        max_bond_dimension: typing.Optional[int] = DEFAULT_MAX_BOND_DIMENSION,
+        cutoff: float = DEFAULT_CUTOFF,
+        dtype: typing.Any = np.complex128,
+    ) -> None:
+        """Constructs the state with every qubit in |0>.
+
+        :type num_qubits: int
+        :param num_qubits: The number of qubits
+        :type max_bond_dimension: int, optional
+        :param max_bond_dimension: Largest dimension of a bond, None to never truncate
+        :type cutoff: float
+        :param cutoff: Largest relative weight of the singular values dropped at a bond
+        :type dtype: np.dtype
+        :param dtype: The dtype of the tensors, complex64 or complex128
+        """
+        self.max_bond_dimension = max_bond_dimension
+        self.cutoff = cutoff
+        self.dtype = np.dtype(dtype)
+        self.tensors = []
+        for _site in range(num_qubits):
+            tensor = np.zeros((1, 2, 1), dtype=self.dtype)
+            tensor[0, 0, 0] = 1
+            self.tensors.append(tensor)
+        # The site holding every qubit, and the qubit held at every site
+        self.layout = list(range(num_qubits))
+        self.qubits = list(range(num_qubits))
+        # Sites left of the center are left-canonical, the ones right of it right-canonical
+        self.center = 0
+        self.truncation_error = 0.0
+
+    @property
+    def num_qubits(self) -> int:
+        """The number of qubits
+        :returns: the length of the chain
+        :rtype: int
+        """
+        return len(self.tensors)
+
+    @property
+    def bond_dimensions(self) -> typing.List[int]:
+        """The dimensions of the bonds between neighbouring sites
+        :returns: the n - 1 bond dimensions
+        :rtype: list of int
+        """
+        return [tensor.shape[2] for tensor in self.tensors[:-1]]
+
+    @property
+    def nbytes(self) -> int:
+        """The memory held by the tensors
+        :returns: the number of bytes
+        :rtype: int
+        """
+        return sum(tensor.nbytes for tensor in self.tensors)
+
+    def _move_center(self, site: int) -> None:
+        """Moves the orthogonality center to the site with QR decompositions.
+
+        :type site: int
+        :param site: The new center
+        """
+        while self.center < site:
+            tensor = self.tensors[self.center]
+            left, _, right = tensor.shape
+            q, r = np.linalg.qr(tensor.reshape(left * 2, right))
+            self.tensors[self.center] = q.reshape(left, 2, -1)
+            self.tensors[self.center + 1] = np.tensordot(
+                r, self.tensors[self.center + 1], axes=(1, 0)
+            )
+            self.center += 1
+        while self.center > site:
+            tensor = self.tensors[self.center]
+            left, _, right = tensor.shape
+            q, r = np.linalg.qr(tensor.reshape(left, 2 * right).T)
+            self.tensors[self.center] = q.T.reshape(-1, 2, right)
+            self.tensors[self.center - 1] = np.tensordot(
+                self.tensors[self.center - 1], r.T, axes=(2, 0)
+            )
+            self.center -= 1
+
+    def _truncate(self, singular_values: np.ndarray) -> int:
+        """Chooses how many singular values to keep, and records the weight dropped.
+
+        :type singular_values: np.ndarray
+        :param singular_values: The singular values, in decreasing order
+        :returns: the number of singular values to keep
+        :rtype: int
+        """
+        weights = singular_values.astype(np.float64) ** 2
+        # Weight dropped when keeping the first k values, for every k, summed over the
+        # tail rather than subtracted from the total, which would cancel in single
+        # precision
+        tails = np.cumsum(weights[::-1])[::-1]
+        dropped = np.append(tails[1:], 0.0) / tails[0]
+        keep = int(np.searchsorted(-dropped, -self.cutoff)) + 1
+        if self.max_bond_dimension is not None:
+            keep = min(keep, self.max_bond_dimension)
+        keep = min(keep, len(singular_values))
+        self.truncation_error += max(float(dropped[keep - 1]), 0.0)
+        return keep
+
+    def _apply_block(self, matrix: np.ndarray, start: int, size: int) -> None:
+        """Applies a gate to a block of neighbouring sites, and splits the block back.
+
+        :type matrix: np.ndarray
+        :param matrix: The matrix of the gate on the qubits of the block, in order
+        :type start: int
+        :param start: The first site of the block
+        :type size: int
+        :param size: The number of sites of the block
+        """
+        self._move_center(start)
+        block = self.tensors[start]
+        for site in range(start + 1, start + size):
+            block = np.tensordot(block, self.tensors[site], axes=(-1, 0))
+        left, right = block.shape[0], block.shape[-1]
+        block = np.einsum("ij,ajb->aib", matrix, block.reshape(left, 2**size, right))
+        for site in range(start, start + size - 1):
+            rows = block.reshape(left * 2, -1)
+            u, s, vh = np.linalg.svd(rows, full_matrices=False)
+            keep = self._truncate(s)
+            s = s[:keep] / np.linalg.norm(s[:keep])
+            self.tensors[site] = u[:, :keep].reshape(left, 2, keep)
+            block = (s[:, np.newaxis] * vh[:keep]).reshape(keep, -1, right)
+            left = keep
+        self.tensors[start + size - 1] = block.reshape(left, 2, right)
+        self.center = start + size - 1
+
+    def _swap(self, site: int) -> None:
+        """Swaps the qubits held at a site and the next one.
+
+        :type site: int
+        :param site: The first of the two sites
+        """
+        self._apply_block(np.eye(4, dtype=self.dtype)[[0, 2, 1, 3]], site, 2)
+        first, second = self.qubits[site], self.qubits[site + 1]
+        self.qubits[site], self.qubits[site + 1] = second, first
+        self.layout[first], self.layout[second] = site + 1, site
+
+    def apply_gate(self, matrix: np.ndarray, qubits: typing.Sequence[int]) -> None:
+        """Applies a gate, moving its qubits next to each other first if needed.
+
+        :type matrix: np.ndarray
+        :param matrix: The big-endian matrix of the gate on its qubits
+        :type qubits: Sequence of int
+        :param qubits: The qubits the gate acts on
+        """
+        matrix = matrix.astype(self.dtype, copy=False)
+        size = len(qubits)
+        if size == 1:
+            site = self.layout[qubits[0]]
+            self.tensors[site] = np.einsum("ij,ajb->aib", matrix, self.tensors[site])
+            return
+        start = min(min(self.layout[qubit] for qubit in qubits), self.num_qubits - size)
+        ordered = sorted(qubits, key=lambda qubit: self.layout[qubit])
+        for idx, qubit in enumerate(ordered):
+            while self.layout[qubit] > start + idx:
+                self._swap(self.layout[qubit] - 1)
+        positions = [list(qubits).index(qubit) for qubit in ordered]
+        matrix = (
+            matrix.reshape((2,) * 2 * size)
+            .transpose(positions + [size + position for position in positions])
+            .reshape(2**size, 2**size)
+        )
+        self._apply_block(matrix, start, size)
+
+    def restore_layout(self) -> None:
+        """Moves every qubit back to its own site, undoing the swaps of the gates."""
+        for end in range(self.num_qubits - 1, 0, -1):
+            for site in range(end):
+                if self.qubits[site] > self.qubits[site + 1]:
+                    self._swap(site)
+
+    def schmidt_values(self, cut: int) -> np.ndarray:
+        """The Schmidt coefficients of the bipartition of the chain at the cut.
+
+        :type cut: int
+        :param cut: The number of qubits on the left of the cut, 0 < cut < n
+        :returns: the Schmidt coefficients in decreasing order, whose squares are the
+            non-zero eigenvalues of the reduced density matrices of both sides
+        :rtype: np.ndarray
+        """
+        assert 0 < cut < self.num_qubits, "The cut must leave qubits on both sides"
+        self.restore_layout()
+        self._move_center(cut - 1)
+        tensor = self.tensors[cut - 1]
+        return np.linalg.svd(tensor.reshape(-1, tensor.shape[2]), compute_uv=False)
+
+    def reduced_density_matrix(self, qubits: typing.Sequence[int]) -> np.ndarray:
+        """The reduced density matrix of some of the qubits, tracing out the others.
+
+        :type qubits: Sequence of int
+        :param qubits: The qubits to keep
+        :returns: the big-endian density matrix of the qubits, in increasing order
+        :rtype: np.ndarray
+        """
+        self.restore_layout()
+        kept = set(qubits)
+        low, high = min(kept), max(kept)
+        self._move_center(low)
+        # Environment of the ket bond, the bra bond, and the open ket and bra legs, the
+        # sites left of the center are left-canonical so they contract to the identity
+        bond = self.tensors[low].shape[0]
+        environment = np.eye(bond, dtype=self.dtype).reshape(bond, bond, 1, 1)
+        for site in range(low, high + 1):
+            tensor = self.tensors[site]
+            if site in kept:
+                environment = np.einsum(
+                    "abkl,asc,btd->cdkslt", environment, tensor, tensor.conj()
+                )
+                shape = environment.shape
+                environment = environment.reshape(
+                    shape[0], shape[1], shape[2] * 2, shape[4] * 2
+                )
+            else:
+                environment = np.einsum(
+                    "abkl,asc,bsd->cdkl", environment, tensor, tensor.conj()
+                )
+        return np.einsum("cckl->kl", environment)
+
+    def purity(self, qubits: typing.Sequence[int]) -> float:
+        """The purity Tr(rho^2) of the reduced state of some of the qubits.
+        The state is pure, so the purity of the smaller of the two sides is computed.
+
+        :type qubits: Sequence of int
+        :param qubits: The qubits to keep
+        :returns: the purity
+        :rtype: float
+        """
+        qubits = list(qubits)
+        if 2 * len(qubits) > self.num_qubits:
+            qubits = sorted(set(range(self.num_qubits)) - set(qubits))
+        if not qubits:
+            return 1.0
+        rho = self.reduced_density_matrix(qubits)
+        return float(np.sum(np.abs(rho) ** 2))
+
+    def overlap(self, other: "MPS") -> complex:
+        """The inner product <self|other>.
+
+        :type other: MPS
+        :param other: The other state, on as many qubits
+        :returns: the inner product
+        :rtype: complex
+        """
+        self.restore_layout()
+        other.restore_layout()
+        environment = np.ones((1, 1), dtype=self.dtype)
+        for mine, theirs in zip(self.tensors, other.tensors):
+            environment = np.einsum("ab,asc,bsd->cd", environment, mine.conj(), theirs)
+        return complex(environment[0, 0])
+
+    def state_vector(self) -> np.ndarray:
+        """Contracts the chain into the state vector, only for a few qubits.
+
+        :returns: the big-endian state vector
+        :rtype: np.ndarray
+        """
+        self.restore_layout()
+        state = self.tensors[0]
+        for tensor in self.tensors[1:]:
+            state = np.tensordot(state, tensor, axes=(-1, 0))
+        return state.reshape(-1)
+
+
+@timed("mps.simulate")
+def simulate_mps(
+    compiled: CompiledCircuit,
+    values: np.ndarray,
+    max_bond_dimension: typing.Optional[int] = DEFAULT_MAX_BOND_DIMENSION,
+    cutoff: float = DEFAULT_CUTOFF,
+    dtype: typing.Any = np.complex128,
+) -> typing.List[MPS]:
+    """Simulates the circuit as a matrix product state for every row of parameter values.
+
+    :type compiled: CompiledCircuit
+    :param compiled: The compiled circuit, without noise channels
+    :type values: np.ndarray
+    :param values: The values of the parameters, shape (batch, num_params)
+    :type max_bond_dimension: int, optional
+    :param max_bond_dimension: Largest dimension of a bond, None to never truncate
+    :type cutoff: float
+    :param cutoff: Largest relative weight of the singular values dropped at a bond
+    :type dtype: np.dtype
+    :param dtype: The dtype of the tensors, complex64 or complex128
+    :returns: the states
+    :rtype: list of MPS
+    :raises ValueError: if the circuit has noise channels
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    bound = compiled.bind(values)
+    states = []
+    for idx in range(len(values)):
+        state = MPS(compiled.num_qubits, max_bond_dimension, cutoff, dtype)
+        for gate, matrix in bound:
+            if gate.name == "channel":
+                raise ValueError("Noise channels cannot be simulated on pure states")
+            state.apply_gate(matrix[idx] if matrix.ndim == 3 else matrix, gate.qubits)
+        state.restore_layout()
+        states.append(state)
+        count("simulator.simulations")
+        count("simulator.bytes_allocated", state.nbytes)
+    return states
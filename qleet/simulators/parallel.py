@@ -0,0 +1,220 @@
+"""Module to shard batched simulations across a pool of local worker processes.
+
+The batched engine spends most of its time in numpy, but the contractions of the small
+gates, the reshapes and the python loop over the gates run on a single core. A large
+batch is therefore split into chunks of `chunk_size` states which worker processes
+simulate independently. Every worker writes the states of its chunks straight into a
+`multiprocessing.shared_memory` buffer, so the states are never pickled back to the
+parent, which only copies the buffer into the stack of the results.
+
+The chunks always start at multiples of the chunk size, whatever the number of workers,
+and every chunk is simulated by the same code on the same parameter values, so the
+states are identical for every number of workers. The workers limit the threads of
+their BLAS library, by default to one, so that the pool does not oversubscribe the cores.
+Before Python 3.8 there is no shared memory, and the batches are simulated serially.
+"""
+
+import multiprocessing
+import os
+import typing
+
+import numpy as np
+
+from ..interface.compiler import CompiledCircuit
+from ..interface.instrumentation import count, timed
+from .statevector import reverse_state_order, simulate_states
+
+# The environment variables read by the usual BLAS and OpenMP runtimes at start up
+BLAS_THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+DEFAULT_START_METHOD = "spawn"
+
+
+def sharding_available() -> bool:
+    """Checks if the batches can be sharded, which needs the shared memory of Python 3.8.
+
+    :returns: whether `multiprocessing.shared_memory` can be imported
+    :rtype: bool
+    """
+    try:
+        # pylint: disable=import-outside-toplevel,unused-import
+        from multiprocessing import shared_memory  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# The circuit and the options of the worker process, set by its initializer
+_worker: typing.Dict[str, typing.Any] = {}
+
+
+def _init_worker(
+    compiled: CompiledCircuit,
+    dtype: str,
+    reverse: bool,
+    blas_threads: typing.Optional[int],
+) -> None:
+    """Stores the circuit in the worker process and limits its BLAS threads."""
+    _worker.update(compiled=compiled, dtype=np.dtype(dtype), reverse=reverse)
+    if blas_threads is None:
+        return
+    try:
+        import threadpoolctl  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return
+    # Kept alive for the lifetime of the worker, the limits are lifted when collected
+    _worker["limits"] = threadpoolctl.threadpool_limits(blas_threads)
+
+
+def _simulate_shard(
+    name: str, shape: typing.Tuple[int, ...], offset: int, values: np.ndarray
+) -> None:
+    """Simulates a chunk in a worker process, into the shared buffer of a round."""
+    # Only imported where the pool runs, it is missing before Python 3.8
+    # pylint: disable=import-outside-toplevel
+    from multiprocessing import shared_memory
+
+    buffer = shared_memory.SharedMemory(name=name)
+    try:
+        states: np.ndarray = np.ndarray(
+            shape, dtype=_worker["dtype"], buffer=buffer.buf
+        )
+        chunk = simulate_states(_worker["compiled"], values, _worker["dtype"])
+        if _worker["reverse"]:
+            chunk = reverse_state_order(chunk, _worker["compiled"].num_qubits)
+        states[offset : offset + len(chunk)] = chunk
+        del states
+    finally:
+        buffer.close()
+
+
+class ShardPool:
+    """A pool of worker processes which simulate the chunks of batches of a circuit."""
+
+    def __init__(
+        self,
+        compiled: CompiledCircuit,
+        workers: typing.Optional[int] = None,
+        dtype: typing.Any = np.complex128,
+        reverse: bool = False,
+        blas_threads: typing.Optional[int] = 1,
+        start_method: str = DEFAULT_START_METHOD,
+    ) -> None:
+        """Starts the worker processes.
+
+        :type compiled: CompiledCircuit
+        :param compiled: The compiled circuit, sent once to every worker
+        :type workers: int, optional
+        :param workers: The number of worker processes, the number of cores if None
+        :type dtype: np.dtype
+        :param dtype: The dtype of the amplitudes
+        :type reverse: bool
+        :param reverse: Whether the states are returned in the little-endian order of
+            qiskit rather than in the big-endian order of the compiled circuit
+        :type blas_threads: int, optional
+        :param blas_threads: The number of threads of the BLAS library of every worker,
+            None to leave it unlimited
+        :type start_method: str
+        :param start_method: How the processes are started, see `multiprocessing`
+        """
+        self.compiled = compiled
+        self.workers = workers or os.cpu_count() or 1
+        self.dtype = np.dtype(dtype)
+        self.num_qubits = compiled.num_qubits
+        context = multiprocessing.get_context(start_method)
+        saved = {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES}
+        if blas_threads is not None:
+            # Read by the BLAS of the spawned workers when numpy is imported
+            os.environ.update(
+                {name: str(blas_threads) for name in BLAS_THREAD_VARIABLES}
+            )
+        try:
+            self._pool = context.Pool(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(compiled, self.dtype.str, reverse, blas_threads),
+            )
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def __enter__(self) -> "ShardPool":
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops the worker processes."""
+        self._pool.terminate()
+        self._pool.join()
+
+    @timed("parallel.simulate")
+    def simulate(
+        self,
+        values: np.ndarray,
+        chunk_size: int,
+        out: typing.Optional[np.ndarray] = None,
+        callback: typing.Optional[typing.Callable[[int], None]] = None,
+    ) -> np.ndarray:
+        """Simulates the batch, in rounds of one chunk per worker.
+
+        :type values: np.ndarray
+        :param values: The values of the parameters, shape (batch, num_params)
+        :type chunk_size: int
+        :param chunk_size: The number of states simulated at once by a worker
+        :type out: np.ndarray, optional
+        :param out: The stack to write the states to, possibly memory-mapped, a new one
+            if None
+        :type callback: Callable, optional
+        :param callback: Called after every round with the number of states done
+        :returns: the states, of shape (batch, 2^num_qubits)
+        :rtype: np.ndarray
+        """
+        # pylint: disable=import-outside-toplevel
+        from multiprocessing import shared_memory
+
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        dimension = 2**self.num_qubits
+        if out is None:
+            out = np.empty((len(values), dimension), dtype=self.dtype)
+        round_size = min(self.workers * chunk_size, len(values))
+        if round_size == 0:
+            return out
+        shape = (round_size, dimension)
+        buffer = shared_memory.SharedMemory(
+            create=True, size=round_size * dimension * self.dtype.itemsize
+        )
+        try:
+            states: np.ndarray = np.ndarray(shape, dtype=self.dtype, buffer=buffer.buf)
+            for start in range(0, len(values), round_size):
+                stop = min(start + round_size, len(values))
+                tasks = [
+                    (
+                        buffer.name,
+                        shape,
+                        offset - start,
+                        values[offset : offset + chunk_size],
+                    )
+                    for offset in range(start, stop, chunk_size)
+                ]
+                self._pool.starmap(_simulate_shard, tasks)
+                out[start:stop] = states[: stop - start]
+                if callback is not None:
+                    callback(stop)
+            del states
+        finally:
+            buffer.close()
+            buffer.unlink()
+        count("simulator.simulations", len(values))
+        count("simulator.bytes_allocated", out.nbytes)
+        return out
@@ -0,0 +1,71 @@
+"""Module to draw the parameter values the analyzers simulate their circuits for.
+
+The values are drawn as a single array of shape (samples, num_params), one row per
+simulation in the order of `CircuitDescriptor.parameters`, which the simulators accept in
+place of a list of resolvers. Besides independent uniform draws, the values can be the
+points of a scrambled Sobol or Halton sequence. These low discrepancy points cover the
+parameter space more evenly than random ones, so the histograms of the fidelities and of
+the purities, and the divergences computed from them, converge with fewer samples, while
+the scrambling keeps them unbiased. Sobol sequences are best balanced for a number of
+samples which is a power of two.
+"""
+
+import warnings
+
+import numpy as np
+
+from .sampling import Seed
+
+PARAMETER_SAMPLERS = ("random", "sobol", "halton")
+
+
+def sample_parameters(
+    num_samples: int,
+    num_params: int,
+    seed: Seed = None,
+    method: str = "random",
+    scale: float = 2 * np.pi,
+) -> np.ndarray:
+    """Draws the values of the parameters of a batch of simulations.
+
+    :type num_samples: int
+    :param num_samples: The number of simulations
+    :type num_params: int
+    :param num_params: The number of parameters of the circuit
+    :type seed: int or np.random.Generator, optional
+    :param seed: The seed or the generator of the values, if None the values are drawn
+        from the global numpy random state, so that `np.random.seed` reproduces them
+    :type method: str
+    :param method: How the values are drawn, independently at "random", or as the
+        points of a scrambled "sobol" or "halton" sequence
+    :type scale: float
+    :param scale: The values are drawn in [0, scale)
+    :returns: the values, of shape (num_samples, num_params)
+    :rtype: np.ndarray
+    :raises ValueError: if the method is not one of `PARAMETER_SAMPLERS`
+    """
+    if method not in PARAMETER_SAMPLERS:
+        raise ValueError(
+            f"Unknown sampling method {method}, expected one of {PARAMETER_SAMPLERS}"
+        )
+    if method == "random":
+        if seed is None:
+            values = np.random.random((num_samples, num_params))
+        else:
+            values = np.random.default_rng(seed).random((num_samples, num_params))
+        return scale * values
+    if num_params == 0:
+        return np.zeros((num_samples, 0))
+    if seed is None:
+        seed = np.random.randint(2**31)
+    from scipy.stats import qmc  # pylint: disable=import-outside-toplevel
+
+    rng = np.random.default_rng(seed)
+    if method == "sobol":
+        engine = qmc.Sobol(num_params, scramble=True, seed=rng)
+    else:
+        engine = qmc.Halton(num_params, scramble=True, seed=rng)
+    with warnings.catch_warnings():
+        # Sobol warns for numbers of samples which are not powers of two
+        warnings.simplefilter("ignore", UserWarning)
+        return scale * engine.random(num_samples)
@@ -0,0 +1,460 @@
+"""Module to plan how to simulate a circuit, before any simulation is run.
+
+The planner profiles the compiled gate stream of the circuit, the number of qubits, the
+noise, whether every gate is a Clifford gate, and an upper bound on the entanglement
+across every cut of the chain of qubits. It then estimates the memory and the time each
+applicable engine would need for the batch of simulations, and picks the fastest engine
+which fits in the memory budget. The engines are:
+
+    * `dense`, the simulator of the framework of the circuit, one state vector at a time
+    * `batched`, the numpy simulator of a whole batch of state vectors at once
+    * `density_matrix`, the simulator of the framework with the noise model
+    * `trajectories`, Monte Carlo trajectories of state vectors for noisy circuits
+    * `mps`, matrix product states, for circuits with little entanglement
+    * `stabilizer`, stabilizer tableaus, for Clifford circuits
+
+The dense engines return the state vectors or density matrices, the other ones only
+return the measures computed from their own representation of the state. When the
+batch does not fit in the budget it is split into chunks which do, and a job of which
+even one simulation does not fit is refused. A stack of dense states larger than the
+spill threshold is memory-mapped to disk, so only the working memory of its chunks
+counts against the budget.
+
+The estimates are rough, they count the amplitudes updated and the bytes held, and
+convert them with throughputs which can be tuned on the planner.
+"""
+
+from __future__ import annotations
+
+import typing
+
+import numpy as np
+
+from .._lazy import isinstance_of
+from ..interface.circuit import CircuitDescriptor
+from ..interface.compiler import CompiledCircuit
+from .fusion import DEFAULT_FUSION_WIDTH, FusedCircuit
+from .mps_simulator import DEFAULT_CUTOFF, DEFAULT_MAX_BOND_DIMENSION
+from .parallel import ShardPool, sharding_available
+from .stabilizer import is_clifford_gate
+from .statevector import precision_dtype
+from .trajectories import DEFAULT_TRAJECTORIES
+
+ENGINES = ("dense", "batched", "density_matrix", "trajectories", "mps", "stabilizer")
+# Engines which return the dense state vectors or density matrices
+DENSE_ENGINES = ("dense", "batched", "density_matrix")
+# Engines which simulate a chunk of the batch at once, the others one circuit at a time
+BATCHED_ENGINES = ("batched", "trajectories", "stabilizer")
+
+DEFAULT_MEMORY_BUDGET = 4 * 2**30
+
+# Number of qubits whose operator Schmidt rank across a cut is bounded by 2^k, log2 of it
+_SCHMIDT_BITS = {"cx": 1, "cp": 1, "swap": 2, "ccx": 1}
+
+
+class CircuitProfile(typing.NamedTuple):
+    """The properties of a circuit which decide how it is best simulated."""
+
+    num_qubits: int
+    num_gates: int
+    num_params: int
+    max_gate_width: int
+    noisy: bool
+    clifford: bool
+    opaque: bool
+    cut_entanglement: typing.Tuple[int, ...]
+
+    @property
+    def entanglement_depth(self) -> int:
+        """Upper bound on the entanglement across the worst cut of the chain of qubits
+        :returns: log2 of the largest Schmidt rank the circuit can create across a cut
+        :rtype: int
+        """
+        return max(self.cut_entanglement, default=0)
+
+
+def profile_circuit(compiled: CompiledCircuit, noisy: bool = False) -> CircuitProfile:
+    """Profiles the compiled circuit.
+
+    The entanglement across the cut between qubits k and k + 1 is bounded by the sum of
+    the log2 of the operator Schmidt ranks of the gates acting on both sides of the cut,
+    and by the number of qubits on the smaller side.
+
+    :type compiled: CompiledCircuit
+    :param compiled: The compiled circuit
+    :type noisy: bool
+    :param noisy: Whether the circuit is simulated with a noise model
+    :returns: the profile
+    :rtype: CircuitProfile
+    """
+    num_qubits = compiled.num_qubits
+    cuts = np.zeros(max(num_qubits - 1, 0), dtype=np.int64)
+    for gate in compiled.gates:
+        if len(gate.qubits) > 1:
+            low, high = min(gate.qubits), max(gate.qubits)
+            cuts[low:high] += _SCHMIDT_BITS.get(gate.name, 2 * (len(gate.qubits) - 1))
+    sides = np.minimum(np.arange(1, num_qubits), np.arange(num_qubits - 1, 0, -1))
+    return CircuitProfile(
+        num_qubits=num_qubits,
+        num_gates=sum(gate.name != "measure" for gate in compiled.gates),
+        num_params=compiled.num_params,
+        max_gate_width=max((len(gate.qubits) for gate in compiled.gates), default=0),
+        noisy=noisy or any(gate.name == "channel" for gate in compiled.gates),
+        clifford=all(is_clifford_gate(gate) for gate in compiled.gates),
+        opaque=compiled.opaque,
+        cut_entanglement=tuple(int(bits) for bits in np.minimum(cuts, sides)),
+    )
+
+
+class Plan(typing.NamedTuple):
+    """The engine chosen for a batch of simulations, and what it is expected to cost."""
+
+    engine: str
+    memory: int
+    time: float
+    chunk_size: int
+    profile: CircuitProfile
+
+
+class SimulationPlanner:
+    """Chooses the engine to simulate a batch of circuits with, under a memory budget."""
+
+    # Amplitudes updated per second by numpy, and by the framework simulators
+    throughput = 2e8
+    framework_throughput = 5e7
+    # Seconds spent per gate applied, and per simulation run by a framework
+    gate_overhead = 2e-5
+    simulation_overhead = 2e-3
+
+    def __init__(
+        self,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        engines: typing.Optional[typing.Sequence[str]] = None,
+        itemsize: typing.Optional[int] = None,
+        max_bond_dimension: typing.Optional[int] = DEFAULT_MAX_BOND_DIMENSION,
+        cutoff: float = DEFAULT_CUTOFF,
+        trajectories: int = DEFAULT_TRAJECTORIES,
+        fusion_width: typing.Optional[int] = DEFAULT_FUSION_WIDTH,
+        precision: str = "double",
+        spill_threshold: typing.Optional[int] = None,
+        spill_directory: typing.Optional[str] = None,
+        workers: int = 1,
+        chunk_size: typing.Optional[int] = None,
+        blas_threads: typing.Optional[int] = 1,
+    ) -> None:
+        """Constructs the planner.
+
+        :type memory_budget: int
+        :param memory_budget: Maximum number of bytes the simulations may hold at once
+        :type engines: Sequence of str, optional
+        :param engines: The engines to choose from, all the available ones by default
+        :type itemsize: int, optional
+        :param itemsize: Bytes per amplitude, by default the size of the dtype of the
+            precision
+        :type max_bond_dimension: int, optional
+        :param max_bond_dimension: Largest bond dimension of the matrix product states,
+            None to never truncate them
+        :type cutoff: float
+        :param cutoff: Largest relative weight of the singular values dropped at a bond
+            of the matrix product states
+        :type trajectories: int
+        :param trajectories: Number of trajectories averaged per simulation of a noisy
+            circuit by the trajectories engine
+        :type fusion_width: int, optional
+        :param fusion_width: Largest number of qubits of the blocks the gates are fused
+            into before the batched engines apply them, None to apply every gate alone
+        :type precision: str
+        :param precision: Precision of the amplitudes, "double" for complex128 or
+            "single" for complex64, which halves the memory of the states
+        :type spill_threshold: int, optional
+        :param spill_threshold: Largest number of bytes of a stack of dense states held
+            in memory, larger stacks are memory-mapped to a temporary file and do not
+            count against the budget, None to always hold them in memory
+        :type spill_directory: str, optional
+        :param spill_directory: Directory of the files of the spilled stacks, the
+            default temporary directory if None
+        :type workers: int
+        :param workers: Number of worker processes the batched engine shards a batch
+            across, one to simulate it in the calling process, the processes are kept
+            between batches until the planner is closed, the batch is never sharded
+            before Python 3.8
+        :type chunk_size: int, optional
+        :param chunk_size: Largest number of simulations run at once, by a worker if
+            the batch is sharded, as many as fit in the budget if None
+        :type blas_threads: int, optional
+        :param blas_threads: Number of threads of the BLAS library of every worker
+            process, None to leave it unlimited
+        :raises ValueError: if an engine or the precision is unknown, or there are no
+            workers
+        """
+        self.memory_budget = memory_budget
+        self.engines = tuple(ENGINES if engines is None else engines)
+        for engine in self.engines:
+            if engine not in ENGINES:
+                raise ValueError(f"Unknown engine {engine}, choose from {ENGINES}")
+        self.precision = precision
+        self.dtype = precision_dtype(precision)
+        self.itemsize = self.dtype.itemsize if itemsize is None else itemsize
+        self.max_bond_dimension = max_bond_dimension
+        self.cutoff = cutoff
+        self.trajectories = trajectories
+        self.fusion_width = fusion_width
+        self.spill_threshold = spill_threshold
+        self.spill_directory = spill_directory
+        if workers < 1:
+            raise ValueError(f"At least one worker is needed, got {workers}")
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.blas_threads = blas_threads
+        self._fused: typing.Dict[str, FusedCircuit] = {}
+        self._pool: typing.Optional[ShardPool] = None
+        self._pool_key: typing.Optional[typing.Tuple[str, str, bool]] = None
+
+    def __enter__(self) -> "SimulationPlanner":
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops the worker processes of the shard pool, if it was started."""
+        if self._pool is not None:
+            self._pool.close()
+        self._pool, self._pool_key = None, None
+
+    def applicable(
+        self, profile: CircuitProfile, dense: bool = True
+    ) -> typing.List[str]:
+        """The engines which can simulate the circuit.
+
+        :type profile: CircuitProfile
+        :param profile: The profile of the circuit
+        :type dense: bool
+        :param dense: Whether the dense state vectors or density matrices are needed
+        :returns: the names of the engines
+        :rtype: list of str
+        """
+        engines = []
+        for engine in self.engines:
+            if dense and engine not in DENSE_ENGINES:
+                continue
+            if profile.noisy and engine in ("dense", "batched", "mps", "stabilizer"):
+                continue
+            if not profile.noisy and engine in ("density_matrix", "trajectories"):
+                continue
+            if engine == "stabilizer" and not profile.clifford:
+                continue
+            # Gates with no standard form are only simulated by the frameworks
+            if profile.opaque and engine not in ("dense", "density_matrix"):
+                continue
+            engines.append(engine)
+        return engines
+
+    def estimate(
+        self, engine: str, profile: CircuitProfile, batch_size: int
+    ) -> typing.Tuple[int, int, float]:
+        """Estimates the resources an engine needs for the batch.
+
+        :type engine: str
+        :param engine: The name of the engine
+        :type profile: CircuitProfile
+        :param profile: The profile of the circuit
+        :type batch_size: int
+        :param batch_size: The number of simulations
+        :returns: the bytes of the results, the bytes of the working memory of one
+            simulation, and the seconds the whole batch takes
+        :rtype: tuple of int, int and float
+        """
+        dimension = 2**profile.num_qubits
+        gates = profile.num_gates
+        if engine == "dense":
+            result, working = dimension * self.itemsize, 2 * dimension * self.itemsize
+            per_simulation = self.simulation_overhead + gates * (
+                self.gate_overhead + dimension / self.framework_throughput
+            )
+            return batch_size * result, working, batch_size * per_simulation
+        if engine == "batched":
+            result = working = dimension * self.itemsize
+            time = gates * (
+                self.gate_overhead + batch_size * dimension / self.throughput
+            )
+            return batch_size * result, working, time
+        if engine == "density_matrix":
+            result, working = (
+                dimension**2 * self.itemsize,
+                2 * dimension**2 * self.itemsize,
+            )
+            per_simulation = self.simulation_overhead + gates * (
+                self.gate_overhead + 2 * dimension**2 / self.framework_throughput
+            )
+            return batch_size * result, working, batch_size * per_simulation
+        if engine == "trajectories":
+            # The states of all the trajectories are held, and a chunk holds its states,
+            # the states after a channel and the branch of one of its Kraus operators
+            result = self.trajectories * dimension * self.itemsize
+            working = 3 * result
+            time = gates * (
+                self.gate_overhead
+                + batch_size * self.trajectories * dimension / self.throughput
+            )
+            return batch_size * result, working, time
+        if engine == "mps":
+            bonds = [1] + [2**bits for bits in profile.cut_entanglement] + [1]
+            if self.max_bond_dimension is not None:
+                bonds = [min(bond, self.max_bond_dimension) for bond in bonds]
+            tensors = sum(
+                2 * left * right for left, right in zip(bonds[:-1], bonds[1:])
+            )
+            # The states are simulated one at a time, the gates are applied to each
+            per_simulation = gates * (
+                self.gate_overhead + max(bonds) ** 3 * 8 / self.throughput
+            )
+            result = tensors * self.itemsize
+            return batch_size * result, 2 * result, batch_size * per_simulation
+        if engine == "stabilizer":
+            # The X and Z bits of the n stabilizers of every state, a byte per bit
+            result = working = 2 * profile.num_qubits**2
+            time = gates * (
+                self.gate_overhead + batch_size * profile.num_qubits / self.throughput
+            )
+            return batch_size * result, working, time
+        raise ValueError(f"Unknown engine {engine}")
+
+    def fuse(self, compiled: CompiledCircuit) -> CompiledCircuit:
+        """Fuses the gates of the circuit into blocks of at most `fusion_width` qubits.
+        The fused circuits are kept by fingerprint, so the products of their fixed gates
+        are computed once for all the batches simulated with the planner.
+
+        :type compiled: CompiledCircuit
+        :param compiled: The compiled circuit
+        :returns: the fused circuit, or the compiled circuit if fusion is disabled
+        :rtype: CompiledCircuit
+        """
+        if self.fusion_width is None:
+            return compiled
+        if compiled.fingerprint not in self._fused:
+            self._fused[compiled.fingerprint] = FusedCircuit(
+                compiled, self.fusion_width
+            )
+        return self._fused[compiled.fingerprint]
+
+    def shard_pool(
+        self, compiled: CompiledCircuit, dtype: typing.Any, reverse: bool
+    ) -> ShardPool:
+        """The pool of worker processes which shard the batches of the circuit.
+        The pool is kept for the next batches of the same circuit, and only restarted
+        when the circuit changes, close the planner to stop its workers.
+
+        :type compiled: CompiledCircuit
+        :param compiled: The compiled circuit, as it is simulated
+        :type dtype: np.dtype
+        :param dtype: The dtype of the amplitudes
+        :type reverse: bool
+        :param reverse: Whether the states are returned in the little-endian order of
+            qiskit
+        :returns: the pool of `workers` processes
+        :rtype: ShardPool
+        """
+        key = (compiled.fingerprint, np.dtype(dtype).str, reverse)
+        if self._pool is None or self._pool_key != key:
+            self.close()
+            self._pool = ShardPool(
+                compiled, self.workers, dtype, reverse, self.blas_threads
+            )
+            self._pool_key = key
+        return self._pool
+
+    def spills(self, nbytes: int) -> bool:
+        """Checks if a stack of dense states is memory-mapped to disk.
+
+        :type nbytes: int
+        :param nbytes: The number of bytes of the stack
+        :returns: whether the stack is over the spill threshold
+        :rtype: bool
+        """
+        return self.spill_threshold is not None and nbytes > self.spill_threshold
+
+    def plan(
+        self,
+        circuit: typing.Union[CircuitDescriptor, CompiledCircuit],
+        batch_size: int = 1,
+        noise_model: typing.Any = None,
+        dense: bool = True,
+        mixed_fidelities: bool = False,
+        pinned_engine: typing.Optional[str] = None,
+    ) -> Plan:
+        """Chooses the fastest engine which fits in the memory budget.
+
+        :type circuit: CircuitDescriptor or CompiledCircuit
+        :param circuit: The circuit to simulate
+        :type batch_size: int
+        :param batch_size: The number of simulations in the batch
+        :type noise_model: Noise model in any supported library, or None
+        :param noise_model: The noise model the circuit is simulated with
+        :type dense: bool
+        :param dense: Whether the dense state vectors or density matrices are needed
+        :type mixed_fidelities: bool
+        :param mixed_fidelities: Whether the Uhlmann fidelities of the noisy states are
+            needed, trajectory ensembles only give their overlaps Tr(rho sigma), so they
+            are then only planned if the planner can not simulate density matrices
+        :type pinned_engine: str, optional
+        :param pinned_engine: The engine to plan the batch with, instead of choosing one
+        :returns: the plan, with the number of simulations to run at once
+        :rtype: Plan
+        :raises ValueError: if the batch is empty, or no engine can simulate the circuit
+        :raises MemoryError: if no engine can simulate the batch within the budget
+        """
+        if batch_size < 1:
+            raise ValueError(f"At least one simulation is needed, got {batch_size}")
+        compiled = (
+            circuit.compiled if isinstance(circuit, CircuitDescriptor) else circuit
+        )
+        profile = profile_circuit(compiled, noise_model is not None)
+        engines = self.applicable(profile, dense)
+        if noise_model is not None and not isinstance_of(
+            noise_model, "cirq.devices.noise_model", "NoiseModel"
+        ):
+            # Trajectories only insert the channels of cirq noise models
+            engines = [engine for engine in engines if engine != "trajectories"]
+        if mixed_fidelities and "density_matrix" in engines:
+            engines = [engine for engine in engines if engine != "trajectories"]
+        if pinned_engine is not None:
+            engines = [engine for engine in engines if engine == pinned_engine]
+        if not engines:
+            raise ValueError(
+                f"None of the engines {self.engines} can simulate the circuit"
+            )
+        plans = []
+        for engine in engines:
+            result, working, time = self.estimate(engine, profile, batch_size)
+            # The results of the whole batch are held, along with the working memory
+            # of one chunk of simulations, unless the stack of states spills to disk
+            if engine in DENSE_ENGINES and self.spills(result):
+                result = 0
+            # The workers which shard the batch each hold the working memory of a chunk
+            workers = (
+                self.workers if engine == "batched" and sharding_available() else 1
+            )
+            chunk_size = (self.memory_budget - result) // max(workers * working, 1)
+            if chunk_size < 1:
+                continue
+            if engine not in BATCHED_ENGINES:
+                chunk_size = 1
+            if self.chunk_size is not None:
+                chunk_size = min(chunk_size, self.chunk_size)
+            chunk_size = int(min(chunk_size, batch_size))
+            # Every chunk pays the overhead of applying the gates once more
+            chunks = -(-batch_size // chunk_size)
+            workers = min(workers, chunks)
+            memory = result + workers * chunk_size * working
+            if engine in BATCHED_ENGINES:
+                time += (chunks - 1) * profile.num_gates * self.gate_overhead
+            time /= workers
+            plans.append(Plan(engine, memory, time, chunk_size, profile))
+        if not plans:
+            result, working, _time = self.estimate(engines[0], profile, batch_size)
+            raise MemoryError(
+                f"Simulating {batch_size} circuits of {profile.num_qubits} qubits needs "
+                f"{result + working} bytes, over the budget of {self.memory_budget} bytes"
+            )
+        return min(plans, key=lambda plan: plan.time)
@@ -1,20 +1,27 @@
 """The module which houses the Parametrized Quantum Circuit trainer class.
 
 It generates the TensorFlow Quantum model, and allows Keras like API to
-train and evaluate a model.
+train and evaluate a model. Several independently initialized models can
+be trained in parallel with the multi-start trainer.
 """
 
+import concurrent.futures
+import multiprocessing
 import typing
 import warnings
 
 import cirq
+import numpy as np
+import sympy
 import tqdm.auto as tqdm
 
 import tensorflow as tf
 import tensorflow_quantum as tfq
 
-from ..interface.metas import AnalyzerList
+from ..interface.metas import AnalyzerList, MetaLogger
 from ..interface.circuit import CircuitDescriptor
+from ..interface.checkpoint import Checkpointer
+from ..interface.instrumentation import span
 
 warnings.filterwarnings("ignore")
 
@@ -24,51 +31,118 @@ class PQCSimulatedTrainer:
     Uses gradient descent over the provided parameters, using the TFQ Adjoin differentiator.
     """
 
-    def __init__(self, circuit: CircuitDescriptor):
+    def __init__(self, circuit: CircuitDescriptor, seed: typing.Optional[int] = None):
         """Constructs a PQC Trainer object to train the circuit.
         :type circuit: CircuitDescriptor
         :param circuit: The circuit object to train on the loss function
+        :type seed: int, optional
+        :param seed: Seed for the random initialization of the circuit parameters
         """
         self.optimizer = tf.keras.optimizers.Adam(lr=0.01)
         self.pqc_layer = tfq.layers.PQC(
             circuit.cirq_circuit,
             circuit.cirq_cost,
             differentiator=tfq.differentiators.Adjoint(),
+            initializer=tf.keras.initializers.RandomUniform(0, 2 * np.pi, seed=seed),
         )
         self.model = tf.keras.models.Sequential(
             [tf.keras.layers.Input(shape=(), dtype=tf.dtypes.string), self.pqc_layer]
         )
         self.circuit = circuit
+        self.seed = seed
+        # TFQ sorts the symbols by name, this is the position of each of them in the circuit
+        names = [str(param) for param in circuit.parameters]
+        self._positions = np.array(
+            [names.index(str(symbol)) for symbol in self.pqc_layer.symbols], dtype=int
+        )
+
+    @property
+    def parameters(self) -> np.ndarray:
+        """The present values of the trainable parameters of the circuit.
+        :returns: The parameter values, in the order of the circuit's parameters
+        :rtype: np.ndarray
+        """
+        values = self.model.trainable_variables[0].numpy()
+        parameters = np.empty_like(values)
+        parameters[self._positions] = values
+        return parameters
 
     def train(
-        self, n_samples=100, loggers: typing.Optional[AnalyzerList] = None
+        self,
+        n_samples=100,
+        loggers: typing.Optional[AnalyzerList] = None,
+        checkpoint: typing.Optional[Checkpointer] = None,
     ) -> tf.keras.Model:
         """Trains the parameter of the circuit to minimize the loss.
         :type n_samples: int
         :param n_samples: Number of samples to train the circuit over
         :type loggers: `AnalyzerList`
         :param loggers: The AnalyzerList that tracks the training of the model
+        :type checkpoint: Checkpointer, optional
+        :param checkpoint: Saves the model and optimizer state every `checkpoint.interval`
+            steps, training resumes from the last saved step if there is one
         :returns: The trained model
         :rtype: tf.keras.Model
+
+        When resuming, only the steps after the checkpoint are logged to the loggers.
         """
         dummy_input = tfq.convert_to_tensor([cirq.Circuit()])
-        total_error = 0.0
-        with tqdm.trange(n_samples) as iterator:
+        total_error, start = 0.0, 0
+        if checkpoint is not None:
+            state = checkpoint.load("trainer")
+            if state is not None:
+                self._restore_state(state)
+                total_error, start = state["total_error"], state["step"]
+        with tqdm.trange(start, n_samples) as iterator:
             iterator.set_description("QAOA Optimization Loop")
             for step in iterator:
-                with tf.GradientTape() as tape:
-                    error = self.model(dummy_input)
-                grads = tape.gradient(error, self.model.trainable_variables)
-                self.optimizer.apply_gradients(
-                    zip(grads, self.model.trainable_variables)
-                )
-                error = error.numpy()[0][0]
+                with span("trainer.step"):
+                    with tf.GradientTape() as tape:
+                        error = self.model(dummy_input)
+                    grads = tape.gradient(error, self.model.trainable_variables)
+                    self.optimizer.apply_gradients(
+                        zip(grads, self.model.trainable_variables)
+                    )
+                    error = error.numpy()[0][0]
                 if loggers is not None:
                     loggers.log(self, error)
                 total_error += error
                 iterator.set_postfix(error=total_error / (step + 1))
+                if checkpoint is not None and (
+                    (step + 1) % checkpoint.interval == 0 or step + 1 == n_samples
+                ):
+                    checkpoint.save("trainer", self._state(step + 1, total_error))
         return self.model
 
+    def _state(self, step: int, total_error: float) -> typing.Dict[str, typing.Any]:
+        """Collects the training state which is needed to resume training.
+        :type step: int
+        :param step: Number of training steps completed
+        :type total_error: float
+        :param total_error: Sum of the losses over the completed steps
+        :returns: The model variables, optimizer state and progress of training
+        :rtype: dict
+        """
+        return {
+            "step": step,
+            "total_error": total_error,
+            "variables": self.model.get_weights(),
+            "optimizer": self.optimizer.get_weights(),
+        }
+
+    def _restore_state(self, state: typing.Dict[str, typing.Any]) -> None:
+        """Restores the model and optimizer from a saved training state.
+        :type state: dict
+        :param state: The state generated by `_state`
+        """
+        variables = self.model.trainable_variables
+        # Applying zero gradients creates the optimizer slots without moving the variables
+        self.optimizer.apply_gradients(
+            zip([tf.zeros_like(var) for var in variables], variables)
+        )
+        self.optimizer.set_weights(state["optimizer"])
+        self.model.set_weights(state["variables"])
+
     def evaluate(self, n_samples: int = 1000) -> float:
         """Evaluates the Parametrized Quantum Circuit.
         :type n_samples: int
@@ -86,3 +160,186 @@ class PQCSimulatedTrainer:
                 total_error += error
                 iterator.set_postfix(error=total_error / (step + 1))
         return total_error / n_samples
+
+
+class _TrajectoryRecorder(MetaLogger):
+    """Logger which records the raw parameters and losses of a single training run.
+    Used inside the worker processes of the `MultiStartTrainer`, the recorded
+    trajectory is shipped back to the parent process and replayed there.
+    """
+
+    def log(self, solver: "PQCSimulatedTrainer", loss: float) -> None:
+        """Records the parameters of the solver and the loss at the current step.
+
+        :type solver: PQCSimulatedTrainer
+        :param solver: The trainer whose parameters are to be recorded
+        :type loss: float
+        :param loss: The loss at the current step
+        """
+        self.record(solver.parameters, loss)
+
+    def plot(self):
+        """The recorder only collects data, plot using the replayed loggers instead.
+
+        :raises NotImplementedError: always, the recorder has nothing to plot
+        """
+        raise NotImplementedError("Trajectory recorders can not be plotted")
+
+
+class _ReplayedStep:
+    """Stand-in for a trainer at one step of a run which was trained in another process.
+    Exposes the same attributes the loggers read from a `PQCSimulatedTrainer`.
+    """
+
+    def __init__(self, circuit: CircuitDescriptor, parameters: np.ndarray):
+        """Constructs the replayed step.
+
+        :type circuit: CircuitDescriptor
+        :param circuit: The circuit which was being trained
+        :type parameters: np.ndarray
+        :param parameters: The values of the parameters at this step
+        """
+        self.circuit = circuit
+        self.parameters = parameters
+
+
+CircuitPayload = typing.Tuple[str, str, typing.List[str]]
+
+
+def _circuit_payload(circuit: CircuitDescriptor) -> CircuitPayload:
+    """Serializes the cirq circuit and cost the trainer needs, to send them to the worker
+    processes. Cirq objects like PauliSums hold local functions and can not be pickled.
+
+    :type circuit: CircuitDescriptor
+    :param circuit: The circuit to train
+    :returns: the cirq circuit and the cirq cost, as JSON, and the names of the
+        parameters in the order of the descriptor
+    :rtype: tuple of str, str and list of str
+    """
+    return (
+        cirq.to_json(circuit.cirq_circuit),
+        cirq.to_json(circuit.cirq_cost),
+        [str(param) for param in circuit.parameters],
+    )
+
+
+def _circuit_from_payload(payload: CircuitPayload) -> CircuitDescriptor:
+    """Rebuilds the circuit to train inside a worker process, see `_circuit_payload`.
+
+    :type payload: tuple of str, str and list of str
+    :param payload: The cirq circuit and the cirq cost, as JSON, and the names of the
+        parameters in order
+    :returns: the circuit descriptor of the cirq circuit
+    :rtype: CircuitDescriptor
+    """
+    circuit = cirq.read_json(json_text=payload[0])
+    params = [sympy.Symbol(name) for name in payload[2]]
+    return CircuitDescriptor(circuit, params, cirq.read_json(json_text=payload[1]))
+
+
+def _train_single_start(
+    payload: CircuitPayload,
+    trainer_class: typing.Type[PQCSimulatedTrainer],
+    seed: int,
+    n_samples: int,
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Trains one independently initialized model, runs inside a worker process.
+
+    :type payload: tuple of str
+    :param payload: The circuit to train, serialized by `_circuit_payload`
+    :type trainer_class: type
+    :param trainer_class: The class of the trainer, PQCSimulatedTrainer or a subclass
+    :type seed: int
+    :param seed: The seed for the initial parameters of this run
+    :type n_samples: int
+    :param n_samples: Number of training steps
+    :returns: The logged parameters, shape (n_samples, n_params), and losses, shape (n_samples,)
+    :rtype: tuple of np.ndarray
+    """
+    recorder = _TrajectoryRecorder()
+    trainer = trainer_class(_circuit_from_payload(payload), seed=seed)
+    trainer.train(n_samples=n_samples, loggers=AnalyzerList(recorder))
+    return recorder.data, recorder.loss
+
+
+class MultiStartTrainer:
+    """Trains several independently initialized copies of a circuit across a process pool.
+
+    Every start gets its own seed, derived deterministically from the seed of the
+    multi-start trainer, so the same seed always reproduces the same set of runs. The
+    trajectories logged in the workers are replayed into the loggers of the parent process
+    in the order of the starts, one trial per start, independent of which worker finished
+    first.
+    """
+
+    def __init__(
+        self,
+        circuit: CircuitDescriptor,
+        n_starts: int = 5,
+        seed: typing.Optional[int] = None,
+        max_workers: typing.Optional[int] = None,
+        trainer_class: typing.Type[PQCSimulatedTrainer] = PQCSimulatedTrainer,
+    ):
+        """Constructs the multi-start trainer.
+
+        :type circuit: CircuitDescriptor
+        :param circuit: The circuit object to train on the loss function
+        :type n_starts: int
+        :param n_starts: Number of independent runs to train
+        :type seed: int, optional
+        :param seed: Seed from which the seeds of all the runs are derived
+        :type max_workers: int, optional
+        :param max_workers: Size of the process pool, defaults to the number of processors
+        :type trainer_class: type
+        :param trainer_class: The class of the trainer of every run, PQCSimulatedTrainer
+            or a subclass constructed from the circuit and a seed, defined at the top
+            level of a module so that the worker processes can import it
+        :raises ValueError: if there are no starts to train
+        """
+        if n_starts < 1:
+            raise ValueError(f"At least one start is needed, got {n_starts}")
+        self.circuit = circuit
+        self.trainer_class = trainer_class
+        self.n_starts = n_starts
+        self.max_workers = max_workers
+        self.seeds: typing.List[int] = [
+            int(run_seed)
+            for run_seed in np.random.SeedSequence(seed).generate_state(n_starts)
+        ]
+        self.losses: typing.Optional[np.ndarray] = None
+
+    def train(
+        self, n_samples: int = 100, loggers: typing.Optional[AnalyzerList] = None
+    ) -> np.ndarray:
+        """Trains all the starts in parallel and replays their trajectories into the loggers.
+
+        :type n_samples: int
+        :param n_samples: Number of training steps of each run
+        :type loggers: `AnalyzerList`
+        :param loggers: The AnalyzerList that tracks the training of the models
+        :returns: The final parameters of every run, shape (n_starts, n_params)
+        :rtype: np.ndarray
+        """
+        trajectories = []
+        payload = _circuit_payload(self.circuit)
+        # TensorFlow is not fork-safe, so the workers are always freshly spawned
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=context
+        ) as executor:
+            # Runs are replayed as soon as they and all the runs before them are done
+            for parameters, losses in executor.map(
+                _train_single_start,
+                [payload] * self.n_starts,
+                [self.trainer_class] * self.n_starts,
+                self.seeds,
+                [n_samples] * self.n_starts,
+            ):
+                trajectories.append((parameters, losses))
+                if loggers is not None:
+                    for step_parameters, loss in zip(parameters, losses):
+                        step = _ReplayedStep(self.circuit, step_parameters)
+                        loggers.log(typing.cast(PQCSimulatedTrainer, step), loss)
+                    loggers.next()
+        self.losses = np.stack([losses for _parameters, losses in trajectories])
+        return np.stack([parameters[-1] for parameters, _losses in trajectories])
@@ -0,0 +1,293 @@
+"""Module to simulate Clifford circuits with stabilizer tableaus.
+
+A circuit of Clifford gates maps |0...0> to a stabilizer state, which is described by the
+n Pauli strings that stabilize it instead of 2^n amplitudes. Every Pauli string is kept
+as two rows of bits, whether it has an X and whether it has a Z on every qubit, so a
+Clifford gate only permutes and xors a few columns of the tableau. The signs of the
+Pauli strings are not tracked, the entanglement of a stabilizer state does not depend on
+them, and without them the Pauli gates and the S and S^dagger gates act the same.
+
+The entanglement entropy of a subsystem A of a stabilizer state is, in bits,
+`rank(stabilizers restricted to A) - |A|`, the rank being over GF(2), and the state of
+the subsystem is maximally mixed over 2^entropy states. Its purity is thus 2^-entropy,
+which is what the entanglement analyzers need, computed in polynomial time for circuits
+of any width.
+
+Parametrized circuits are Clifford circuits for some values of their parameters, when
+every angle is a multiple of pi/2 for the rotations and of pi for the controlled phase.
+Such samples are detected on the compiled circuit and simulated with tableaus as well.
+"""
+
+import typing
+
+import numpy as np
+
+from ..interface.compiler import CompiledCircuit, Gate
+from ..interface.instrumentation import count, timed
+
+# Angles at which the standard gates are Clifford gates, as the period of the angle
+CLIFFORD_PERIODS = {
+    "rx": np.pi / 2,
+    "ry": np.pi / 2,
+    "rz": np.pi / 2,
+    "p": np.pi / 2,
+    "u": np.pi / 2,
+    "xpow": 0.5,
+    "ypow": 0.5,
+    "cp": np.pi,
+}
+# Gates which are Clifford gates without any parameter
+CLIFFORD_GATES = ("h", "cx", "swap", "measure")
+
+
+def _clifford_steps(
+    gate: Gate, params: typing.Sequence[typing.Any], batch: int
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Counts how many periods of the gate its angles are.
+
+    :type gate: Gate
+    :param gate: The gate, with a period in `CLIFFORD_PERIODS`
+    :type params: Sequence of float or np.ndarray
+    :param params: The values of its angles, numbers or arrays over the batch
+    :type batch: int
+    :param batch: The size of the batch
+    :returns: the number of periods of every angle rounded to the nearest integer, of
+        shape (len(params), batch), and whether all the angles were whole periods
+    :rtype: tuple of np.ndarray
+    """
+    steps = (
+        np.array(
+            [np.broadcast_to(value, (batch,)) for value in params], dtype=np.float64
+        )
+        / CLIFFORD_PERIODS[gate.name]
+    )
+    rounded = np.round(steps)
+    whole = np.asarray(np.isclose(steps, rounded, atol=1e-9).all(axis=0))
+    return rounded.astype(np.int64), whole
+
+
+def is_clifford_gate(gate: Gate) -> bool:
+    """Checks if a gate of the gate stream is a Clifford gate.
+    Parametrized gates are not, whatever the values of their parameters may be.
+
+    :type gate: Gate
+    :param gate: The gate
+    :returns: whether the gate maps Pauli strings to Pauli strings
+    :rtype: bool
+    """
+    if gate.name in CLIFFORD_GATES:
+        return True
+    if gate.name not in CLIFFORD_PERIODS:
+        return False
+    if not all(isinstance(param, (int, float)) for param in gate.params):
+        return False
+    return bool(_clifford_steps(gate, gate.params, 1)[1][0])
+
+
+def clifford_samples(compiled: CompiledCircuit, values: np.ndarray) -> np.ndarray:
+    """Finds the rows of parameter values for which every gate is a Clifford gate.
+
+    :type compiled: CompiledCircuit
+    :param compiled: The compiled circuit
+    :type values: np.ndarray
+    :param values: The values of the parameters, shape (batch, num_params)
+    :returns: whether the circuit is a Clifford circuit for every row, shape (batch,)
+    :rtype: np.ndarray
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    clifford = np.ones(len(values), dtype=bool)
+    for gate, params in compiled.bind_params(values):
+        if gate.name in CLIFFORD_GATES:
+            continue
+        if gate.name not in CLIFFORD_PERIODS:
+            return np.zeros(len(values), dtype=bool)
+        clifford &= _clifford_steps(gate, params, len(values))[1]
+    return clifford
+
+
+def gf2_rank(matrix: np.ndarray) -> int:
+    """Rank of a matrix of bits over GF(2), by Gaussian elimination.
+
+    :type matrix: np.ndarray
+    :param matrix: The boolean matrix
+    :returns: the rank
+    :rtype: int
+    """
+    matrix = np.array(matrix, dtype=bool)
+    rank = 0
+    for column in range(matrix.shape[1]):
+        pivots = np.flatnonzero(matrix[rank:, column])
+        if len(pivots) == 0:
+            continue
+        pivot = rank + pivots[0]
+        matrix[[rank, pivot]] = matrix[[pivot, rank]]
+        rows = np.flatnonzero(matrix[:, column])
+        rows = rows[rows != rank]
+        matrix[rows] ^= matrix[rank]
+        rank += 1
+        if rank == matrix.shape[0]:
+            break
+    return rank
+
+
+class StabilizerState:
+    """The stabilizer state of n qubits, as the X and Z bits of its n stabilizers."""
+
+    def __init__(self, x_bits: np.ndarray, z_bits: np.ndarray) -> None:
+        """Constructs the state.
+
+        :type x_bits: np.ndarray
+        :param x_bits: Whether every stabilizer has an X or Y on every qubit, shape (n, n)
+        :type z_bits: np.ndarray
+        :param z_bits: Whether every stabilizer has a Z or Y on every qubit, shape (n, n)
+        """
+        self.x_bits = x_bits
+        self.z_bits = z_bits
+
+    @property
+    def num_qubits(self) -> int:
+        """Number of qubits of the state
+        :returns: the number of qubits
+        :rtype: int
+        """
+        return self.x_bits.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the tableau
+        :returns: the number of bytes
+        :rtype: int
+        """
+        return self.x_bits.nbytes + self.z_bits.nbytes
+
+    def entanglement_entropy(self, qubits: typing.Sequence[int]) -> int:
+        """The entanglement entropy of a subsystem, in bits.
+
+        :type qubits: Sequence of int
+        :param qubits: The qubits of the subsystem
+        :returns: the von Neumann entropy of the reduced density matrix, in bits
+        :rtype: int
+        """
+        qubits = list(qubits)
+        restricted = np.concatenate(
+            [self.x_bits[:, qubits], self.z_bits[:, qubits]], axis=1
+        )
+        return gf2_rank(restricted) - len(qubits)
+
+    def purity(self, qubits: typing.Sequence[int]) -> float:
+        """The purity Tr(rho^2) of the reduced density matrix of a subsystem.
+
+        :type qubits: Sequence of int
+        :param qubits: The qubits of the subsystem
+        :returns: the purity, 2^-entropy
+        :rtype: float
+        """
+        return 2.0 ** -self.entanglement_entropy(qubits)
+
+
+class _Tableaus:
+    """The tableaus of a batch of stabilizer states, updated gate by gate."""
+
+    def __init__(self, batch: int, num_qubits: int) -> None:
+        """Starts every state of the batch in |0...0>, stabilized by the Z of every qubit."""
+        identity = np.eye(num_qubits, dtype=bool)
+        self.x_bits = np.zeros((batch, num_qubits, num_qubits), dtype=bool)
+        self.z_bits = np.repeat(identity[np.newaxis], batch, axis=0)
+
+    def hadamard(self, qubit: int, mask: np.ndarray) -> None:
+        """Applies H to the states of the mask, it swaps X and Z."""
+        x_column = self.x_bits[mask, :, qubit]
+        self.x_bits[mask, :, qubit] = self.z_bits[mask, :, qubit]
+        self.z_bits[mask, :, qubit] = x_column
+
+    def phase(self, qubit: int, mask: np.ndarray) -> None:
+        """Applies S to the states of the mask, it maps X to Y."""
+        self.z_bits[mask, :, qubit] ^= self.x_bits[mask, :, qubit]
+
+    def cnot(self, control: int, target: int) -> None:
+        """Applies CNOT to all the states, X spreads to the target and Z to the control."""
+        self.x_bits[:, :, target] ^= self.x_bits[:, :, control]
+        self.z_bits[:, :, control] ^= self.z_bits[:, :, target]
+
+    def cz(self, first: int, second: int, mask: np.ndarray) -> None:
+        """Applies CZ to the states of the mask, X on a qubit gains a Z on the other."""
+        x_first = self.x_bits[mask, :, first]
+        self.z_bits[mask, :, first] ^= self.x_bits[mask, :, second]
+        self.z_bits[mask, :, second] ^= x_first
+
+    def swap(self, first: int, second: int) -> None:
+        """Swaps two qubits of all the states."""
+        for bits in (self.x_bits, self.z_bits):
+            bits[:, :, [first, second]] = bits[:, :, [second, first]]
+
+    def rotation(self, axis: str, qubit: int, steps: np.ndarray) -> None:
+        """Rotates a qubit of every state by its number of quarter turns around an axis.
+        Up to signs, rz(pi/2) is S, rx(pi/2) is H S H and ry(pi/2) is H, and half turns
+        are Pauli gates, which only change signs.
+        """
+        odd = steps % 2 == 1
+        if axis == "z":
+            self.phase(qubit, odd)
+        elif axis == "x":
+            self.hadamard(qubit, odd)
+            self.phase(qubit, odd)
+            self.hadamard(qubit, odd)
+        else:
+            self.hadamard(qubit, odd)
+
+
+@timed("stabilizer.simulate")
+def simulate_stabilizers(
+    compiled: CompiledCircuit, values: np.ndarray
+) -> typing.List[StabilizerState]:
+    """Simulates the Clifford circuit with tableaus for every row of parameter values.
+
+    :type compiled: CompiledCircuit
+    :param compiled: The compiled circuit
+    :type values: np.ndarray
+    :param values: The values of the parameters, shape (batch, num_params), for which
+        every gate of the circuit is a Clifford gate
+    :returns: the states, with the qubits in the order of the compiled circuit
+    :rtype: list of StabilizerState
+    :raises ValueError: if a gate is not a Clifford gate for some row of values
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    batch = len(values)
+    tableaus = _Tableaus(batch, compiled.num_qubits)
+    everywhere = np.ones(batch, dtype=bool)
+    for gate, params in compiled.bind_params(values):
+        name, qubits = gate.name, gate.qubits
+        if name == "measure":
+            continue
+        if name not in CLIFFORD_GATES:
+            if name not in CLIFFORD_PERIODS:
+                raise ValueError(f"Gate {name} is not a Clifford gate")
+            steps, whole = _clifford_steps(gate, params, batch)
+            if not whole.all():
+                raise ValueError(f"Gate {name} is not a Clifford gate at these angles")
+        if name == "h":
+            tableaus.hadamard(qubits[0], everywhere)
+        elif name == "cx":
+            tableaus.cnot(*qubits)
+        elif name == "swap":
+            tableaus.swap(*qubits)
+        elif name == "cp":
+            tableaus.cz(qubits[0], qubits[1], steps[0] % 2 == 1)
+        elif name in ("rz", "p"):
+            tableaus.rotation("z", qubits[0], steps[0])
+        elif name in ("rx", "xpow"):
+            tableaus.rotation("x", qubits[0], steps[0])
+        elif name in ("ry", "ypow"):
+            tableaus.rotation("y", qubits[0], steps[0])
+        else:
+            # u(theta, phi, lambda) is rz(phi) ry(theta) rz(lambda) up to a phase
+            tableaus.rotation("z", qubits[0], steps[2])
+            tableaus.rotation("y", qubits[0], steps[0])
+            tableaus.rotation("z", qubits[0], steps[1])
+    states = [
+        StabilizerState(x_bits, z_bits)
+        for x_bits, z_bits in zip(tableaus.x_bits, tableaus.z_bits)
+    ]
+    count("simulator.simulations", batch)
+    count("simulator.bytes_allocated", tableaus.x_bits.nbytes + tableaus.z_bits.nbytes)
+    return states
@@ -0,0 +1,185 @@
+"""Module to hold large stacks of simulated states, and to compute measures over them.
+
+The analyzers compare every pair of the states sampled for two sets of parameters, so
+every state is held until all of them are simulated. For wide circuits, or density
+matrices, the stacks outgrow the memory long before the number of samples is large
+enough, so a stack larger than the spill threshold is allocated as a contiguous array
+memory-mapped to a temporary file instead. The file is unlinked as soon as it is created,
+so its space is given back to the disk once the array is garbage collected, even if the
+process is killed.
+
+The fidelities and the purities are then computed block by block, so only a block of
+states is paged in at a time and the number of samples is limited by the disk rather
+than by the memory. The functions work the same on stacks in memory.
+"""
+
+import tempfile
+import typing
+
+import numpy as np
+
+from ..interface.instrumentation import count
+
+# Bytes of states paged in at once by the streaming measures
+DEFAULT_BLOCK_BYTES = 64 * 2**20
+
+
+def allocate_states(
+    shape: typing.Tuple[int, ...],
+    dtype: typing.Any = np.complex128,
+    spill_threshold: typing.Optional[int] = None,
+    directory: typing.Optional[str] = None,
+) -> np.ndarray:
+    """Allocates a stack of states, memory-mapped to disk if it is too large.
+
+    :type shape: tuple of int
+    :param shape: The shape of the stack, (N, 2^n) or (N, 2^n, 2^n)
+    :type dtype: np.dtype
+    :param dtype: The dtype of the amplitudes
+    :type spill_threshold: int, optional
+    :param spill_threshold: Largest number of bytes of a stack held in memory, larger
+        stacks are memory-mapped, None to always hold it in memory
+    :type directory: str, optional
+    :param directory: The directory of the temporary file, the default temporary
+        directory if None
+    :returns: the uninitialized stack, an np.memmap if it spilled to disk
+    :rtype: np.ndarray
+    """
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if spill_threshold is None or nbytes <= spill_threshold:
+        return np.empty(shape, dtype=dtype)
+    count("simulator.bytes_spilled", nbytes)
+    with tempfile.TemporaryFile(dir=directory, prefix="qleet-states-") as file:
+        # The mapping keeps the unlinked file alive after it is closed
+        return np.memmap(file, dtype=dtype, mode="w+", shape=shape)
+
+
+def block_length(states: np.ndarray, block_bytes: int = DEFAULT_BLOCK_BYTES) -> int:
+    """Number of states of the stack which fit in a block.
+
+    :type states: np.ndarray
+    :param states: The stack of states
+    :type block_bytes: int
+    :param block_bytes: The number of bytes of a block
+    :returns: the number of states per block, at least one
+    :rtype: int
+    """
+    state_bytes = max(states[0].nbytes if len(states) else 1, 1)
+    return max(1, block_bytes // state_bytes)
+
+
+def iter_blocks(
+    states: np.ndarray, block_bytes: int = DEFAULT_BLOCK_BYTES
+) -> typing.Iterator[typing.Tuple[int, np.ndarray]]:
+    """Iterates over the stack a block at a time.
+
+    :type states: np.ndarray
+    :param states: The stack of states
+    :type block_bytes: int
+    :param block_bytes: The number of bytes of a block
+    :returns: the index of the first state of every block, and the block read in memory
+    :rtype: Iterator of tuples of int and np.ndarray
+    """
+    length = block_length(states, block_bytes)
+    for start in range(0, len(states), length):
+        yield start, np.asarray(states[start : start + length])
+
+
+def _sqrt_density_matrices(rhos: np.ndarray) -> np.ndarray:
+    """Square roots of a batch of density matrices, from their eigendecompositions."""
+    eigenvalues, vectors = np.linalg.eigh(rhos)
+    roots = np.sqrt(np.clip(eigenvalues, 0, None))
+    return (vectors * roots[..., np.newaxis, :]) @ np.conj(np.swapaxes(vectors, -1, -2))
+
+
+def stream_fidelities(
+    states_a: np.ndarray,
+    states_b: np.ndarray,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+) -> np.ndarray:
+    """Fidelities between every state of a stack and every state of another one.
+
+    For state vectors the fidelity is |<a|b>|^2, and for density matrices it is the
+    Uhlmann fidelity (Tr sqrt(sqrt(a) b sqrt(a)))^2, like `qiskit.quantum_info`.
+
+    :type states_a: np.ndarray
+    :param states_a: The first stack, (Na, 2^n) or (Na, 2^n, 2^n)
+    :type states_b: np.ndarray
+    :param states_b: The second stack, of states of the same kind
+    :type block_bytes: int
+    :param block_bytes: The number of bytes of the blocks paged in at once
+    :returns: the fidelities of all the pairs, in the order of
+        `itertools.product(states_a, states_b)`, of shape (Na * Nb,)
+    :rtype: np.ndarray
+    """
+    fidelities = np.empty((len(states_a), len(states_b)))
+    for start_a, block_a in iter_blocks(states_a, block_bytes):
+        if block_a.ndim == 3:
+            roots = _sqrt_density_matrices(block_a)
+        for start_b, block_b in iter_blocks(states_b, block_bytes):
+            stop_a, stop_b = start_a + len(block_a), start_b + len(block_b)
+            if block_a.ndim == 2:
+                overlaps = np.conj(block_a) @ block_b.T
+                fidelities[start_a:stop_a, start_b:stop_b] = np.abs(overlaps) ** 2
+                continue
+            for idx, rho in enumerate(block_b):
+                products = roots @ rho @ roots
+                eigenvalues = np.clip(np.linalg.eigvalsh(products), 0, None)
+                fidelities[start_a:stop_a, start_b + idx] = (
+                    np.sum(np.sqrt(eigenvalues), axis=-1) ** 2
+                )
+    return fidelities.ravel()
+
+
+def _reduced_purities(
+    block: np.ndarray, qubits: typing.Sequence[int], num_qubits: int
+) -> np.ndarray:
+    """Purities of the reduced states of a block of states on some of their qubits."""
+    kept = list(qubits)
+    rest = [qubit for qubit in range(num_qubits) if qubit not in kept]
+    batch = len(block)
+    if block.ndim == 2:
+        tensor = block.reshape((batch,) + (2,) * num_qubits)
+        matrix: np.ndarray = np.transpose(
+            tensor, [0] + [1 + q for q in kept + rest]
+        ).reshape(batch, 2 ** len(kept), 2 ** len(rest))
+        # The reduced states of both sides of the cut have the same purity, the
+        # smaller of the two Gram matrices is computed
+        if len(kept) > len(rest):
+            matrix = np.swapaxes(matrix, 1, 2)
+        rho = matrix @ np.conj(np.swapaxes(matrix, 1, 2))
+    else:
+        tensor = block.reshape((batch,) + (2,) * (2 * num_qubits))
+        order = kept + rest
+        tensor = np.transpose(
+            tensor, [0] + [1 + q for q in order] + [1 + num_qubits + q for q in order]
+        ).reshape(batch, 2 ** len(kept), 2 ** len(rest), 2 ** len(kept), -1)
+        rho = np.einsum("birjr->bij", tensor)
+    return np.sum(np.abs(rho) ** 2, axis=(1, 2))
+
+
+def stream_purities(
+    states: np.ndarray,
+    subsystems: typing.Sequence[typing.Sequence[int]],
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+) -> np.ndarray:
+    """Purities Tr(rho^2) of the reduced states of every state of a stack.
+
+    :type states: np.ndarray
+    :param states: The stack, (N, 2^n) or (N, 2^n, 2^n)
+    :type subsystems: Sequence of Sequence of int
+    :param subsystems: The qubits kept by every reduced state, the first qubit being the
+        most significant bit of the index of an amplitude
+    :type block_bytes: int
+    :param block_bytes: The number of bytes of the blocks paged in at once
+    :returns: the purities, of shape (N, len(subsystems))
+    :rtype: np.ndarray
+    """
+    num_qubits = int(np.log2(states.shape[-1]))
+    purities = np.empty((len(states), len(subsystems)))
+    for start, block in iter_blocks(states, block_bytes):
+        for idx, qubits in enumerate(subsystems):
+            purities[start : start + len(block), idx] = _reduced_purities(
+                block, qubits, num_qubits
+            )
+    return purities
@@ -0,0 +1,332 @@
+"""Module to simulate noisy circuits with Monte Carlo quantum trajectories.
+
+A density matrix of n qubits holds 4^n amplitudes, which limits the simulation of noisy
+circuits to a dozen qubits. A trajectory instead evolves a state vector of 2^n amplitudes,
+and at every noise channel picks one of its Kraus operators at random, with the
+probability of the branch it leads to. The density matrix of the noisy circuit is the
+average of the projectors on the trajectories, so the quantities which are linear in it,
+like expectation values, are the averages over the trajectories, and those which are
+quadratic in it, like purities and overlap fidelities, are the averages over the pairs of
+distinct trajectories. Both come with the standard error of the average, which shrinks
+as one over the square root of the number of trajectories.
+
+The trajectories of a batch of circuits are simulated a chunk of circuits at a time on
+the batched state vector engine, the random branches are drawn from a seeded generator
+so the simulation is reproducible.
+"""
+
+import typing
+
+import numpy as np
+
+from ..interface.compiler import CompiledCircuit
+from ..interface.instrumentation import count, timed
+from ..interface.pauli import PauliSumOperator
+from .sampling import Seed
+from .statevector import apply_gate, zero_states
+
+DEFAULT_TRAJECTORIES = 100
+
+
+class Estimate(typing.NamedTuple):
+    """A quantity estimated from the trajectories, with its standard error."""
+
+    value: typing.Any
+    error: typing.Any
+
+
+def _mean_with_error(samples: np.ndarray) -> Estimate:
+    """Averages samples along the first axis.
+
+    :type samples: np.ndarray
+    :param samples: The samples
+    :returns: the mean, and its standard error, infinite for a single sample
+    :rtype: Estimate
+    """
+    if len(samples) < 2:
+        return Estimate(samples.mean(axis=0), np.full(samples.shape[1:], np.inf))
+    error = samples.std(axis=0, ddof=1) / np.sqrt(len(samples))
+    return Estimate(samples.mean(axis=0), error)
+
+
+def _pair_average(gram: np.ndarray) -> Estimate:
+    """Averages the overlaps between distinct trajectories of the same ensemble.
+
+    :type gram: np.ndarray
+    :param gram: The real overlaps between every pair of trajectories, shape (T, T)
+    :returns: the mean of the off-diagonal overlaps, an unbiased estimate of the same
+        quantity for the averaged density matrix, with the standard error of a U-statistic
+    :rtype: Estimate
+    """
+    size = len(gram)
+    if size < 2:
+        return Estimate(float(gram.sum()), np.inf)
+    rows = (gram.sum(axis=1) - np.diagonal(gram)) / (size - 1)
+    return Estimate(float(rows.mean()), float(2 * rows.std(ddof=1) / np.sqrt(size)))
+
+
+def apply_channel(
+    states: np.ndarray,
+    kraus: np.ndarray,
+    qubits: typing.Sequence[int],
+    num_qubits: int,
+    draws: np.ndarray,
+) -> np.ndarray:
+    """Applies a noise channel to a batch of trajectories, picking a Kraus operator for
+    every trajectory with the probability of the branch it leads to.
+
+    :type states: np.ndarray
+    :param states: The states of the trajectories, of shape (batch, 2^num_qubits)
+    :type kraus: np.ndarray
+    :param kraus: The stacked Kraus operators of the channel, of shape (m, 2^k, 2^k)
+    :type qubits: Sequence of int
+    :param qubits: The k qubits the channel acts on
+    :type num_qubits: int
+    :param num_qubits: The number of qubits of the states
+    :type draws: np.ndarray
+    :param draws: Uniform random numbers in [0, 1) which pick the branches, one per
+        trajectory
+    :returns: the normalized states after the channel
+    :rtype: np.ndarray
+    """
+    weights = np.empty((len(kraus), len(states)))
+    for idx, operator in enumerate(kraus):
+        branch = apply_gate(states, operator, qubits, num_qubits)
+        weights[idx] = np.sum(np.abs(branch) ** 2, axis=1)
+    cumulative = np.cumsum(weights, axis=0)
+    draws = draws * cumulative[-1]
+    choices = np.minimum((draws >= cumulative).sum(axis=0), len(kraus) - 1)
+    result = np.empty_like(states)
+    for idx in np.unique(choices):
+        picked = choices == idx
+        branch = apply_gate(states[picked], kraus[idx], qubits, num_qubits)
+        result[picked] = branch / np.sqrt(weights[idx, picked])[:, np.newaxis]
+    return result
+
+
+@timed("trajectories.simulate")
+def simulate_trajectories(
+    compiled: CompiledCircuit,
+    values: np.ndarray,
+    trajectories: int = DEFAULT_TRAJECTORIES,
+    seed: Seed = None,
+    dtype: typing.Any = np.complex128,
+    chunk_size: typing.Optional[int] = None,
+    out: typing.Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Simulates trajectories of the noisy circuit for every row of parameter values.
+
+    :type compiled: CompiledCircuit
+    :param compiled: The compiled circuit, with its noise channels
+    :type values: np.ndarray
+    :param values: The values of the parameters, shape (batch, num_params)
+    :type trajectories: int
+    :param trajectories: The number of trajectories of every circuit
+    :type seed: int or np.random.Generator, optional
+    :param seed: Seed of the random branches, or the generator to draw them from
+    :type dtype: np.dtype
+    :param dtype: The dtype of the amplitudes, complex64 or complex128
+    :type chunk_size: int, optional
+    :param chunk_size: Number of circuits whose trajectories are simulated at once, all
+        of them by default
+    :type out: np.ndarray, optional
+    :param out: The stack the states are written to, allocated if not given
+    :returns: the big-endian states of the trajectories, of shape
+        (batch, trajectories, 2^num_qubits)
+    :rtype: np.ndarray
+
+    The branches of all the trajectories are drawn up front, so the states do not
+    depend on the chunk size.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    rng = np.random.default_rng(seed)
+    num_qubits = compiled.num_qubits
+    channels = sum(gate.name == "channel" for gate in compiled.gates)
+    draws = rng.random((channels, len(values), trajectories))
+    if out is None:
+        out = np.empty((len(values), trajectories, 2**num_qubits), dtype=dtype)
+    step = max(len(values) if chunk_size is None else chunk_size, 1)
+    for start in range(0, len(values), step):
+        stop = min(start + step, len(values))
+        states = zero_states((stop - start) * trajectories, num_qubits, dtype)
+        bound = compiled.bind(np.repeat(values[start:stop], trajectories, axis=0))
+        channel = 0
+        for gate, matrix in bound:
+            matrix = matrix.astype(dtype, copy=False)
+            if gate.name == "channel":
+                branches = draws[channel, start:stop].reshape(-1)
+                states = apply_channel(
+                    states, matrix, gate.qubits, num_qubits, branches
+                )
+                channel += 1
+            else:
+                states = apply_gate(states, matrix, gate.qubits, num_qubits)
+        out[start:stop] = states.reshape(stop - start, trajectories, -1)
+    count("simulator.simulations", len(values))
+    count("simulator.bytes_allocated", out.nbytes)
+    return out
+
+
+class TrajectoryEnsemble:
+    """The trajectories of one noisy circuit, standing for their averaged density matrix."""
+
+    def __init__(self, states: np.ndarray) -> None:
+        """Constructs the ensemble.
+
+        :type states: np.ndarray
+        :param states: The big-endian states of the trajectories, shape (T, 2^n)
+        """
+        self.states = states
+        self._num_qubits = int(np.log2(states.shape[1]))
+
+    @property
+    def num_qubits(self) -> int:
+        """Number of qubits of the states
+        :returns: the number of qubits
+        :rtype: int
+        """
+        return self._num_qubits
+
+    @property
+    def num_trajectories(self) -> int:
+        """Number of trajectories averaged
+        :returns: the number of trajectories
+        :rtype: int
+        """
+        return len(self.states)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the states of the trajectories
+        :returns: the number of bytes
+        :rtype: int
+        """
+        return self.states.nbytes
+
+    def _reduced_density_matrices(self, qubits: typing.Sequence[int]) -> np.ndarray:
+        """The reduced density matrices of every trajectory.
+
+        :type qubits: Sequence of int
+        :param qubits: The qubits kept, the others are traced out
+        :returns: the matrices, of shape (T, 2^k, 2^k), with the kept qubits in sorted order
+        :rtype: np.ndarray
+        """
+        kept = sorted(qubits)
+        rest = [qubit for qubit in range(self.num_qubits) if qubit not in kept]
+        tensor = self.states.reshape((len(self.states),) + (2,) * self.num_qubits)
+        tensor = tensor.transpose([0] + [1 + qubit for qubit in kept + rest])
+        matrices = tensor.reshape(len(self.states), 2 ** len(kept), -1)
+        return matrices @ matrices.conj().transpose(0, 2, 1)
+
+    def density_matrix(self) -> np.ndarray:
+        """The density matrix of the ensemble, only affordable for a few qubits.
+
+        :returns: the average of the projectors on the trajectories
+        :rtype: np.ndarray
+        """
+        return np.einsum("ti,tj->ij", self.states, self.states.conj()) / len(
+            self.states
+        )
+
+    def reduced_density_matrix(self, qubits: typing.Sequence[int]) -> np.ndarray:
+        """The reduced density matrix of the ensemble on a few qubits.
+
+        :type qubits: Sequence of int
+        :param qubits: The qubits kept, the others are traced out
+        :returns: the matrix, with the kept qubits in sorted order
+        :rtype: np.ndarray
+        """
+        return self._reduced_density_matrices(qubits).mean(axis=0)
+
+    def estimate_purity(
+        self, qubits: typing.Optional[typing.Sequence[int]] = None
+    ) -> Estimate:
+        """Estimates the purity Tr(rho^2) of the ensemble, or of its reduced density matrix.
+
+        :type qubits: Sequence of int, optional
+        :param qubits: The qubits kept, all of them if None
+        :returns: the purity, with its standard error
+        :rtype: Estimate
+        """
+        if qubits is None or len(qubits) == self.num_qubits:
+            gram = np.abs(self.states.conj() @ self.states.T) ** 2
+        else:
+            matrices = self._reduced_density_matrices(qubits)
+            gram = np.einsum("iab,jab->ij", matrices, matrices.conj()).real
+        return _pair_average(gram)
+
+    def purity(self, qubits: typing.Optional[typing.Sequence[int]] = None) -> float:
+        """Estimates the purity Tr(rho^2) of the ensemble, see `estimate_purity`.
+
+        :type qubits: Sequence of int, optional
+        :param qubits: The qubits kept, all of them if None
+        :returns: the purity
+        :rtype: float
+        """
+        return self.estimate_purity(qubits).value
+
+    def estimate_fidelity(self, other: "TrajectoryEnsemble") -> Estimate:
+        """Estimates the overlap fidelity Tr(rho sigma) with another ensemble, which is
+        the fidelity of the states if either of them is pure.
+
+        :type other: TrajectoryEnsemble
+        :param other: The other ensemble
+        :returns: the overlap, with its standard error
+        :rtype: Estimate
+        """
+        gram = np.abs(self.states.conj() @ other.states.T) ** 2
+        value = float(gram.mean())
+        if min(gram.shape) < 2:
+            return Estimate(value, np.inf)
+        variance = (
+            gram.mean(axis=1).var(ddof=1) / gram.shape[0]
+            + gram.mean(axis=0).var(ddof=1) / gram.shape[1]
+        )
+        return Estimate(value, float(np.sqrt(variance)))
+
+    def fidelity(self, other: "TrajectoryEnsemble") -> float:
+        """Estimates the overlap fidelity with another ensemble, see `estimate_fidelity`.
+
+        :type other: TrajectoryEnsemble
+        :param other: The other ensemble
+        :returns: the overlap
+        :rtype: float
+        """
+        return self.estimate_fidelity(other).value
+
+    def expectation(self, operator: PauliSumOperator) -> Estimate:
+        """Estimates the expectation value of an operator.
+
+        :type operator: PauliSumOperator
+        :param operator: The big-endian operator
+        :returns: the expectation value, with its standard error
+        :rtype: Estimate
+        """
+        return _mean_with_error(operator.expectation(self.states))
+
+
+def ensemble_fidelities(
+    ensembles_a: typing.Sequence[TrajectoryEnsemble],
+    ensembles_b: typing.Sequence[TrajectoryEnsemble],
+) -> np.ndarray:
+    """Estimates the overlap fidelities between every pair of ensembles of two batches,
+    with one matrix product per ensemble of the first batch.
+
+    :type ensembles_a: Sequence of TrajectoryEnsemble
+    :param ensembles_a: The first batch
+    :type ensembles_b: Sequence of TrajectoryEnsemble
+    :param ensembles_b: The second batch, of ensembles with the same number of trajectories
+    :returns: the fidelities, of shape (len(ensembles_a), len(ensembles_b))
+    :rtype: np.ndarray
+    """
+    fidelities = np.empty((len(ensembles_a), len(ensembles_b)))
+    if not ensembles_b:
+        return fidelities
+    stacked = np.concatenate([ensemble.states for ensemble in ensembles_b])
+    trajectories = ensembles_b[0].num_trajectories
+    for idx, ensemble in enumerate(ensembles_a):
+        gram = np.abs(ensemble.states.conj() @ stacked.T) ** 2
+        fidelities[idx] = gram.reshape(
+            ensemble.num_trajectories, len(ensembles_b), trajectories
+        ).mean(axis=(0, 2))
+    return fidelities
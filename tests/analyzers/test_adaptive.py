@@ -0,0 +1,182 @@
+import numpy as np
+import pytest
+
+import qleet
+
+
+def test_intervals_of_the_mean():
+    """Test the confidence intervals of a mean"""
+    adaptive = qleet.analyzers.adaptive
+    values = np.random.default_rng(0).normal(size=400)
+
+    def statistic(indices):
+        return np.mean(values[indices])
+
+    low, high = adaptive.jackknife_interval(statistic, len(values), 0.95)
+    half_width = 1.959964 * np.std(values, ddof=1) / np.sqrt(len(values))
+    assert np.isclose(high - low, 2 * half_width)
+    assert np.isclose((low + high) / 2, np.mean(values))
+    low, high = adaptive.bootstrap_interval(statistic, len(values), 0.95, seed=1)
+    assert np.isclose(high - low, 2 * half_width, rtol=0.2)
+    with pytest.raises(ValueError):
+        adaptive.confidence_interval(statistic, len(values), method="bayes")
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "jackknife"])
+def test_adaptive_estimate_stops_at_the_tolerance(method):
+    """Test adaptive estimates stop once the interval is narrow enough"""
+    adaptive = qleet.analyzers.adaptive
+    rng = np.random.default_rng(2)
+    values = []
+    batches = []
+
+    def sample(num_samples):
+        batches.append(num_samples)
+        values.extend(rng.normal(size=num_samples))
+
+    def statistic(indices):
+        return np.mean(np.asarray(values)[indices])
+
+    estimate = adaptive.adaptive_estimate(
+        sample, statistic, 0.3, 10, 1000, method=method, seed=3
+    )
+    assert estimate.converged and estimate.width <= 0.3
+    assert estimate.samples == len(values) == sum(batches)
+    assert batches[:3] == [10, 10, 20]
+    assert estimate.low <= estimate.value <= estimate.high
+
+    capped = adaptive.adaptive_estimate(
+        sample, statistic, 1e-3, 10, 50, method=method, seed=3
+    )
+    assert not capped.converged and capped.samples == 50
+
+
+def test_adaptive_analyzers_match_fixed_runs(ladder_circuit):
+    """Test the adaptive analyzers match runs of a fixed sample count"""
+    descriptor = ladder_circuit(4)
+    planner = qleet.simulators.planner.SimulationPlanner(engines=["mps"])
+    analyzers = qleet.analyzers
+    for analyzer, fixed, adaptive, measure in [
+        (
+            analyzers.expressibility.Expressibility,
+            "expressibility",
+            "estimate_expressibility",
+            "kld",
+        ),
+        (
+            analyzers.entanglement.EntanglementCapability,
+            "entanglement_capability",
+            "estimate_entanglement_capability",
+            "meyer-wallach",
+        ),
+        (
+            analyzers.entanglement_spectrum.EntanglementSpectrum,
+            "entanglement_spectrum",
+            "estimate_entanglement_spectrum",
+            "jsd",
+        ),
+    ]:
+        value = getattr(
+            analyzer(descriptor, samples=12, planner=planner, seed=4), fixed
+        )(measure)
+        if isinstance(value, tuple):
+            value = value[0]
+        # A first batch precise enough is the fixed run
+        estimate = getattr(
+            analyzer(descriptor, samples=12, planner=planner, seed=4), adaptive
+        )(measure, tolerance=np.inf)
+        assert estimate.samples == 12 and estimate.converged
+        assert np.isclose(estimate.value, value)
+
+        instance = analyzer(descriptor, samples=8, planner=planner, seed=4)
+        estimate = getattr(instance, adaptive)(
+            measure, tolerance=1e-9, max_samples=32, interval="jackknife"
+        )
+        assert estimate.samples == 32 and instance.num_samples == 8
+        assert not estimate.converged and estimate.width > 0
+        with pytest.raises(ValueError):
+            getattr(instance, adaptive)("hellinger")
+
+
+def test_adaptive_estimate_within_budget():
+    """Test adaptive estimates stop within their budget"""
+    adaptive = qleet.analyzers.adaptive
+    rng = np.random.default_rng(5)
+    values = []
+
+    def sample(num_samples):
+        values.extend(rng.normal(size=num_samples))
+
+    def statistic(indices):
+        return np.mean(np.asarray(values)[indices])
+
+    budget = qleet.interface.budget.Budget(evaluations=50)
+    estimate = adaptive.adaptive_estimate(
+        sample, statistic, 0.0, 10, 1000, seed=3, budget=budget
+    )
+    # Batches of 10, 10, 20 and the 10 samples left
+    assert estimate.samples == len(values) == budget.spent == 50
+    assert not estimate.converged and estimate.width > 0
+
+    # Every sample takes an eighth of a second on the clock of the budget
+    now = [0.0]
+
+    def slow_sample(num_samples):
+        now[0] += 0.125 * num_samples
+        sample(num_samples)
+
+    budget = qleet.interface.budget.Budget(seconds=8.0, clock=lambda: now[0])
+    estimate = adaptive.adaptive_estimate(
+        slow_sample, statistic, 0.0, 5, 10**6, seed=3, budget=budget
+    )
+    # A pilot batch of 2, then batches of 3, 5, 10, 20 and the 24 samples left
+    assert estimate.samples == budget.spent == 64
+    assert budget.elapsed == 8.0 and budget.exhausted
+
+    # A pilot batch times the samples, the first full batch does not overrun the deadline
+    now = [0.0]
+    budget = qleet.interface.budget.Budget(seconds=4.0, clock=lambda: now[0])
+    estimate = adaptive.adaptive_estimate(
+        slow_sample, statistic, 0.0, 1000, 10**6, seed=3, budget=budget
+    )
+    assert estimate.samples == budget.spent == 32
+    assert budget.elapsed == 4.0
+
+
+def test_adaptive_estimate_exhausted_budget():
+    """Test adaptive estimates draw no samples when the budget cannot afford two"""
+    adaptive = qleet.analyzers.adaptive
+    values = []
+
+    def sample(num_samples):
+        values.extend(np.ones(num_samples))
+
+    def statistic(indices):
+        return np.mean(np.asarray(values)[indices])
+
+    now = [0.0]
+    exhausted = qleet.interface.budget.Budget(seconds=1.0, clock=lambda: now[0])
+    exhausted.start()
+    now[0] += 2.0
+    for budget in [exhausted, qleet.interface.budget.Budget(evaluations=1)]:
+        estimate = adaptive.adaptive_estimate(
+            sample, statistic, 0.0, 10, 1000, seed=3, budget=budget
+        )
+        assert estimate.samples == budget.spent == len(values) == 0
+        assert not estimate.converged and np.isnan(estimate.value)
+
+
+def test_anytime_analyzers(ladder_circuit):
+    """Test the anytime estimates of the analyzers"""
+    descriptor = ladder_circuit()
+    planner = qleet.simulators.planner.SimulationPlanner(engines=["mps"])
+    for analyzer, measure in [
+        (qleet.analyzers.expressibility.Expressibility, "jsd"),
+        (qleet.analyzers.entanglement.EntanglementCapability, "scott"),
+        (qleet.analyzers.entanglement_spectrum.EntanglementSpectrum, "kld"),
+    ]:
+        budget = qleet.interface.budget.Budget(evaluations=40)
+        estimate = analyzer(descriptor, samples=8, planner=planner, seed=6).estimate(
+            budget, measure=measure, max_samples=1000
+        )
+        assert estimate.samples == budget.spent == 40 and not estimate.converged
@@ -84,3 +84,24 @@ def test_exceptions_expressibility(noise_model, metric, plot, msg_match):
         if plot:
             qiskit_expressibility.plot()
         qiskit_expressibility.expressibility(metric)
+
+
+def test_expressibility_resume(tmp_path):
+    """Test that a checkpointed expressibility run resumes with the same samples"""
+    params = [qiskit.circuit.Parameter(r"$θ_1$"), qiskit.circuit.Parameter(r"$θ_2$")]
+    qiskit_circuit = qiskit.QuantumCircuit(2)
+    qiskit_circuit.rx(params[0], 0)
+    qiskit_circuit.rz(params[1], 0)
+    qiskit_circuit.cx(0, 1)
+    qiskit_descriptor = qleet.interface.circuit.CircuitDescriptor(
+        circuit=qiskit_circuit, params=params, cost_function=None
+    )
+    checkpoint = qleet.interface.checkpoint.Checkpointer(str(tmp_path), interval=20)
+    expr = qleet.analyzers.expressibility.Expressibility(
+        qiskit_descriptor, samples=50, checkpoint=checkpoint
+    ).expressibility("jsd")
+    assert len(checkpoint.load_rows("theta_states")) == 50
+    resumed_expr = qleet.analyzers.expressibility.Expressibility(
+        qiskit_descriptor, samples=50, checkpoint=checkpoint
+    ).expressibility("jsd")
+    assert np.isclose(expr, resumed_expr), "Resumed run used different samples."
@@ -65,3 +65,58 @@ def test_landscape_plotting_contour():
         NotImplementedError, match="This plotting mode has not been implemented yet"
     ):
         fig = plot.plot(mode="line")
+
+
+def test_landscape_iter_scan():
+    origin = trainer.model.trainable_variables[0]
+    partial = dict(plot.iter_scan(points=3, distance=np.pi / 4, origin=origin))
+    assert sorted(partial) == list(range(9)), "Every grid point should be yielded."
+    assert plot.grid(points=3, distance=np.pi / 4).shape == (9, 2)
+
+
+def test_landscape_anytime_scan():
+    origin = trainer.model.trainable_variables[0]
+    coords = plot.grid(points=5, distance=np.pi / 4)
+    # The 3 x 3 grid is completed, and the 16 new points of the 5 x 5 one not started
+    budget = qleet.interface.budget.Budget(evaluations=24)
+    values, partial = plot.scan(5, np.pi / 4, origin, budget=budget)
+    assert plot.scanned_points == 3 and budget.spent == 9
+    assert values.shape == (9,) and np.allclose(
+        partial, coords.reshape(5, 5, 2)[::2, ::2].reshape(-1, 2)
+    )
+    budget = qleet.interface.budget.Budget(evaluations=25)
+    values, refined = plot.scan(5, np.pi / 4, origin, budget=budget)
+    assert plot.scanned_points == 5 and budget.spent == 25
+    assert values.shape == (25,) and np.allclose(refined, coords)
+
+
+def test_landscape_cache():
+    origin = trainer.model.trainable_variables[0]
+    cache = qleet.simulators.cache.SimulationCache()
+    seeded = qleet.LossLandscapePlotter(trainer, metric, cache=cache, seed=3)
+    values, _coords = seeded.scan(3, np.pi / 4, origin)
+    assert not values.flags.writeable, "The seeded scan should have been cached."
+    assert np.array_equal(seeded.scan(3, np.pi / 4, origin)[0], values)
+
+    other = qleet.LossLandscapePlotter(
+        trainer, qleet.MaxCutMetric(nx.empty_graph(4)), cache=cache, seed=3
+    )
+    other.axes = seeded.axes
+    assert np.all(
+        other.scan(3, np.pi / 4, origin)[0] == 0
+    ), "A metric on another graph should not reuse the cached landscape."
+
+    unseeded = qleet.LossLandscapePlotter(trainer, metric, cache=cache)
+    unseeded.axes = seeded.axes
+    assert unseeded.scan(3, np.pi / 4, origin)[
+        0
+    ].flags.writeable, "Scans of unseeded samples should not be cached."
+
+
+def test_landscape_anytime_levels_nest():
+    origin = trainer.model.trainable_variables[0]
+    # The 5 x 5 grid is skipped, as its points are not on the 7 x 7 one
+    budget = qleet.interface.budget.Budget(evaluations=100)
+    values, coords = plot.scan(7, np.pi / 4, origin, budget=budget)
+    assert plot.scanned_points == 7 and budget.spent == 49
+    assert values.shape == (49,) and coords.shape == (49, 2)
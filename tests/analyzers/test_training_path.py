@@ -1,4 +1,8 @@
+import types
+
 import networkx as nx
+import numpy as np
+import pytest
 import plotly.graph_objects as pg
 
 import qleet
@@ -30,3 +34,58 @@ def test_plot_path():
     assert isinstance(
         fig_training_trace, pg.Figure
     ), "Plot of incorrect type was returned"
+
+
+@pytest.mark.parametrize("mode", ["tSNE", "PCA", "IncrementalPCA", "random", "graph"])
+def test_streaming_embedding(mode):
+    plotter = qleet.analyzers.training_path.OptimizationPathPlotter(
+        mode=mode, subsample=60, batch_size=16, seed=0
+    )
+    for run in range(3):
+        for _step in range(40):
+            plotter.record(np.random.random(6) + run, 0.0)
+        plotter.next()
+    embedding = plotter.embed().copy()
+    assert embedding.shape == (120, 2), "Every logged point should be embedded."
+
+    for _step in range(10):
+        plotter.record(np.random.random(6), 0.0)
+    extended = plotter.embed()
+    assert extended.shape == (130, 2), "New points were not embedded."
+    if mode != "IncrementalPCA":
+        assert np.allclose(
+            embedding, extended[:120]
+        ), "The cached embedding should be reused for the old points."
+    assert isinstance(plotter.plot(), pg.Figure), "Plot of incorrect type was returned"
+
+
+@pytest.mark.parametrize("mode", ["tSNE", "PCA", "IncrementalPCA", "random", "graph"])
+def test_single_step_embedding(mode):
+    plotter = qleet.analyzers.training_path.OptimizationPathPlotter(mode=mode, seed=0)
+    plotter.record(np.random.random(6), 0.0)
+    plotter.next()
+    embedding = plotter.embed()
+    assert embedding.shape == (1, 2), "A single logged point should be embedded."
+    assert isinstance(plotter.plot(), pg.Figure), "Plot of incorrect type was returned"
+    if mode == "IncrementalPCA":
+        plotter.record(np.random.random(6), 0.0)
+        assert plotter.embed().shape == (2, 2), "The projection was not fit."
+
+
+@pytest.mark.parametrize("mode", ["tSNE", "PCA", "IncrementalPCA", "random", "graph"])
+def test_single_parameter_embedding(mode):
+    plotter = qleet.analyzers.training_path.OptimizationPathPlotter(
+        mode=mode, batch_size=4, seed=0
+    )
+    for _step in range(40):
+        plotter.log(types.SimpleNamespace(parameters=np.random.random(1)), 0.0)
+    assert plotter.embed().shape == (40, 2), "A single parameter should be embedded."
+
+
+def test_downsample():
+    item = np.tile(np.arange(1000), 3)
+    shown = qleet.analyzers.training_path.downsample(item, max_points=300)
+    assert len(shown) < 400, "Too many points were kept."
+    final_steps = np.nonzero(item > 994)[0]
+    assert np.all(np.isin(final_steps, shown)), "Final steps were dropped."
+    assert len(qleet.analyzers.training_path.downsample(item, None)) == len(item)
@@ -0,0 +1,79 @@
+"""Fixtures shared by the tests of the simulators and the analyzers."""
+
+import numpy as np
+import pytest
+import sympy
+import cirq
+
+import qleet
+
+
+def _ladder_circuit(
+    num_qubits=3,
+    rotations=(cirq.ry, cirq.rx),
+    entangler=cirq.CNOT,
+    layers=1,
+    ring=None,
+    closing=None,
+    cost=None,
+):
+    """Layers of a rotation of every qubit, a ladder of entanglers and the other rotations"""
+    qubits = cirq.LineQubit.range(num_qubits)
+    params = sympy.symbols("param:%d" % (len(rotations) * num_qubits * layers))
+    symbols = iter(params)
+    circuit = cirq.Circuit()
+    for _layer in range(layers):
+        circuit.append([rotations[0](next(symbols)).on(qubit) for qubit in qubits])
+        circuit.append(
+            [entangler(qubits[idx], qubits[idx + 1]) for idx in range(num_qubits - 1)]
+        )
+        if ring is not None:
+            circuit.append(ring(qubits[0], qubits[-1]))
+        for rotation in rotations[1:]:
+            circuit.append([rotation(next(symbols)).on(qubit) for qubit in qubits])
+    if closing is not None:
+        circuit.append(closing(qubits))
+    return qleet.interface.circuit.CircuitDescriptor(
+        circuit, list(params), None if cost is None else cost(qubits)
+    )
+
+
+def _random_resolvers(descriptor, count):
+    """Resolvers of the parameters of the circuit to uniformly random angles"""
+    return [
+        {p: np.random.random() * 2 * np.pi for p in descriptor.parameters}
+        for _ in range(count)
+    ]
+
+
+def _reduced_density_matrix(state, qubits, num_qubits):
+    """Reduced density matrix of a state vector or density matrix on some qubits"""
+    rest = [qubit for qubit in range(num_qubits) if qubit not in qubits]
+    if state.ndim == 1:
+        state = np.outer(state, state.conj())
+    tensor = np.transpose(
+        state.reshape((2,) * 2 * num_qubits),
+        list(qubits) + rest + [num_qubits + q for q in list(qubits) + rest],
+    )
+    dimension = 2 ** len(qubits)
+    return np.trace(
+        tensor.reshape(dimension, -1, dimension, 2 ** len(rest)), axis1=1, axis2=3
+    )
+
+
+@pytest.fixture
+def ladder_circuit():
+    """Factory of parametrized cirq circuits with a ladder of entangling gates"""
+    return _ladder_circuit
+
+
+@pytest.fixture
+def random_resolvers():
+    """Factory of random parameter resolvers of a circuit"""
+    return _random_resolvers
+
+
+@pytest.fixture
+def reduced_density_matrix():
+    """Function tracing out all but some qubits of a state"""
+    return _reduced_density_matrix
@@ -0,0 +1,26 @@
+import qleet
+
+
+def test_evaluation_budget():
+    budget = qleet.interface.budget.Budget(evaluations=10)
+    assert budget.remaining_seconds == float("inf")
+    assert budget.affordable(4) == 4 and not budget.exhausted
+    budget.spend(7)
+    assert budget.remaining_evaluations == 3
+    assert budget.affordable(4) == 3
+    budget.spend(3)
+    assert budget.exhausted and budget.affordable(4) == 0
+
+
+def test_deadline_budget():
+    now = [0.0]
+    budget = qleet.interface.budget.Budget(seconds=2.0, clock=lambda: now[0])
+    now[0] += 1.0
+    # The clock starts at the first use of the budget
+    assert budget.elapsed == 0.0
+    assert budget.affordable(1000) == 1000
+    now[0] += 0.5
+    assert budget.remaining_seconds == 1.5
+    assert budget.affordable(1000, seconds_each=0.25) == 6
+    now[0] += 1.5
+    assert budget.exhausted and budget.affordable(1000) == 0
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+
+import qleet
+
+
+def test_checkpoint_save_load(tmp_path):
+    checkpoint = qleet.interface.checkpoint.Checkpointer(str(tmp_path), interval=10)
+    assert checkpoint.load("states") is None, "Loaded a checkpoint never saved."
+
+    states = np.random.random((5, 4)) + 1j * np.random.random((5, 4))
+    checkpoint.save("states", {"states": states, "step": 5})
+    loaded = checkpoint.load("states")
+    assert loaded["step"] == 5
+    assert np.array_equal(loaded["states"], states), "Checkpoint did not round trip."
+    assert sorted(os.listdir(tmp_path)) == [
+        "states.ckpt"
+    ], "Temporary files were left behind by the atomic write."
+
+    checkpoint.clear("states")
+    assert checkpoint.load("states") is None, "Checkpoint was not cleared."
+
+
+def test_checkpoint_load_or_create(tmp_path):
+    checkpoint = qleet.interface.checkpoint.Checkpointer(str(tmp_path))
+    np.random.seed(0)
+    created = checkpoint.load_or_create("params", lambda: np.random.random(3))
+    following_draw = np.random.random()
+
+    np.random.seed(1)
+    resumed = checkpoint.load_or_create("params", lambda: np.random.random(3))
+    assert np.array_equal(created, resumed), "Resumed value differs from the saved one."
+    assert np.random.random() == following_draw, "RNG state was not restored."
+
+
+def test_checkpoint_rows(tmp_path):
+    checkpoint = qleet.interface.checkpoint.Checkpointer(str(tmp_path))
+    assert checkpoint.load_rows("states") is None
+    states = np.random.random((7, 4)) + 1j * np.random.random((7, 4))
+    checkpoint.append_rows("states", states[:3])
+    checkpoint.append_rows("states", states[3:])
+    loaded = checkpoint.load_rows("states")
+    assert isinstance(loaded, np.memmap) and not loaded.flags.writeable
+    assert np.array_equal(loaded, states), "Appended rows did not round trip."
+
+    # Rows written by an append which did not save their count are overwritten
+    with open(checkpoint.rows_path("states"), "ab") as file:
+        file.write(b"partial")
+    checkpoint.append_rows("states", states[:1])
+    assert np.array_equal(checkpoint.load_rows("states"), states[[*range(7), 0]])
+    with pytest.raises(ValueError):
+        checkpoint.append_rows("states", np.zeros((1, 3)))
+
+    checkpoint.clear("states")
+    assert checkpoint.load_rows("states") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_checkpoint_metadata_mismatch(tmp_path):
+    checkpoint = qleet.interface.checkpoint.Checkpointer(str(tmp_path))
+    created = checkpoint.load_or_create(
+        "params", lambda: np.random.random(3), {"samples": 3, "seed": 1}
+    )
+    resumed = checkpoint.load_or_create(
+        "params", lambda: np.random.random(3), {"samples": 3, "seed": 1}
+    )
+    assert np.array_equal(created, resumed)
+    with pytest.raises(ValueError, match="samples"):
+        checkpoint.load_or_create(
+            "params", lambda: np.random.random(4), {"samples": 4, "seed": 1}
+        )
@@ -246,31 +246,29 @@ def test_circuit_descriptor_backend():
 
 
 def test_circuit_cost():
-    """Tests circuit descriptor's cost property and exceptions"""
+    """Tests circuit descriptor's cost property and its conversion to cirq"""
 
     qiskit_descriptor = qleet.interface.circuit.CircuitDescriptor(
         circuit=qiskit_circuit,
         params=[],
-        cost_function=qiskit.quantum_info.PauliList(["III"]),
+        cost_function=qiskit.quantum_info.PauliList(["IIZ"]),
     )
     cirq_descriptor = qleet.interface.circuit.CircuitDescriptor(
         circuit=cirq_circuit, params=[], cost_function=cirq.PauliSum()
     )
     pyquil_decriptor = qleet.interface.circuit.CircuitDescriptor(
-        circuit=pyquil_circuit, params=[], cost_function=pyquil.paulis.PauliSum([])
+        circuit=pyquil_circuit, params=[], cost_function=pyquil.paulis.sZ(1)
     )
 
     assert cirq_descriptor.cirq_cost is not None
 
-    with pytest.raises(
-        NotImplementedError, match="Qiskit PauliString support is not implemented"
-    ):
-        assert qiskit_descriptor.cirq_cost is not None
-
-    with pytest.raises(
-        NotImplementedError, match="PyQuil PauliString support is not implemented"
-    ):
-        assert pyquil_decriptor.cirq_cost is not None
+    # The qubits of the costs are those of the circuits converted to cirq
+    assert qiskit_descriptor.cirq_cost == cirq.PauliSum.from_pauli_strings(
+        cirq.Z(cirq.NamedQubit("q_0"))
+    )
+    assert pyquil_decriptor.cirq_cost == cirq.PauliSum.from_pauli_strings(
+        cirq.Z(cirq.LineQubit(1))
+    )
 
 
 def test_exceptions_circuit_descriptor():
@@ -298,5 +296,55 @@ def test_exceptions_circuit_descriptor():
     with pytest.raises(ValueError, match="Unsupported framework of circuit"):
         assert circuit_descriptor.num_qubits is not None
 
+    with pytest.raises(ValueError, match="Unsupported framework of circuit"):
+        assert circuit_descriptor.cirq_cost is not None
+
+    circuit_descriptor = qleet.interface.circuit.CircuitDescriptor(
+        cirq_circuit, [], "ZZI"
+    )
     with pytest.raises(ValueError, match="Cost object should be a Pauli-Sum object"):
         assert circuit_descriptor.cirq_cost is not None
+
+
+def test_circuit_descriptor_fingerprint():
+    """Tests that the fingerprint is the same for the same circuit in every framework"""
+    descriptors = [
+        qleet.interface.circuit.CircuitDescriptor(circuit, [], None)
+        for circuit in [cirq_circuit, cirq_circuit_qasm, qiskit_circuit, pyquil_circuit]
+    ]
+    assert len({descriptor.fingerprint for descriptor in descriptors}) == 1
+    assert len(set(descriptors)) == 3, "Descriptors should be hashable per framework"
+
+    theta = qiskit.circuit.Parameter("theta")
+    parametrized_qiskit = qiskit.QuantumCircuit(2)
+    parametrized_qiskit.rx(theta, 0)
+    parametrized_qiskit.cz(0, 1)
+    symbol = sympy.Symbol("phi")
+    parametrized_cirq = cirq.Circuit(
+        [cirq.rx(symbol).on(cirq.LineQubit(0)), cirq.CZ(*cirq.LineQubit.range(2))]
+    )
+    qiskit_descriptor = qleet.interface.circuit.CircuitDescriptor(
+        parametrized_qiskit, [theta], None
+    )
+    cirq_descriptor = qleet.interface.circuit.CircuitDescriptor(
+        parametrized_cirq, [symbol], None
+    )
+    assert qiskit_descriptor.fingerprint == cirq_descriptor.fingerprint
+    assert cirq_descriptor.fingerprint != descriptors[0].fingerprint
+
+
+def test_qiskit_parameters_are_not_parsed():
+    """Tests that qiskit parameters are compiled by name, and non standard gates hash"""
+
+    def descriptor(name):
+        theta = qiskit.circuit.Parameter(name)
+        circuit = qiskit.QuantumCircuit(2)
+        circuit.rx(2 * theta, 0)
+        circuit.crx(theta, 0, 1)
+        circuit.rzz(theta + 1, 0, 1)
+        return qleet.interface.circuit.CircuitDescriptor(circuit, [theta], None)
+
+    latex, plain = descriptor("$θ_1$"), descriptor("theta")
+    assert latex.compiled.opaque
+    assert latex == plain and hash(latex) == hash(plain)
+    assert latex.compiled.gates[0].params == (2 * sympy.Symbol("p0"),)
@@ -0,0 +1,124 @@
+import numpy as np
+import sympy
+import cirq
+
+import qleet
+
+
+def _apply(bound, num_qubits):
+    state = np.zeros((2,) * num_qubits, dtype=np.complex128)
+    state[(0,) * num_qubits] = 1
+    for gate, matrix in bound:
+        size = len(gate.qubits)
+        tensor = matrix.reshape((2,) * 2 * size)
+        state = np.tensordot(tensor, state, axes=(range(size, 2 * size), gate.qubits))
+        state = np.moveaxis(state, range(size), gate.qubits)
+    return state.reshape(-1)
+
+
+def test_compiled_circuit_matches_cirq():
+    params = sympy.symbols("param:%d" % 3)
+    qubits = cirq.LineQubit.range(3)
+    circuit = cirq.Circuit(
+        [
+            cirq.H(qubits[0]),
+            cirq.rx(params[0]).on(qubits[1]),
+            cirq.X(qubits[2]) ** params[1],
+            cirq.CZ(qubits[0], qubits[1]),
+            cirq.S(qubits[2]),
+            cirq.CNOT(qubits[2], qubits[0]),
+            cirq.rz(2 * params[2] + params[0]).on(qubits[1]),
+            cirq.ISWAP(qubits[1], qubits[2]),
+        ]
+    )
+    descriptor = qleet.interface.circuit.CircuitDescriptor(circuit, list(params))
+    values = np.random.random((4, 3)) * 2 * np.pi
+    batch = descriptor.compiled.bind(values)
+    for idx, row in enumerate(values):
+        expected = (
+            cirq.Simulator()
+            .simulate(circuit, dict(zip(params, row)))
+            .final_state_vector
+        )
+        single = _apply(descriptor.compiled.bind(row), 3)
+        batched = _apply(
+            [
+                (gate, matrix[idx] if matrix.ndim == 3 else matrix)
+                for gate, matrix in batch
+            ],
+            3,
+        )
+        assert np.allclose(single, expected, atol=1e-6)
+        assert np.allclose(batched, expected, atol=1e-6)
+
+
+def test_canonical_gate_order():
+    qubits = cirq.LineQubit.range(2)
+    ordered = cirq.Circuit([cirq.H(qubits[0]), cirq.H(qubits[1])])
+    reordered = cirq.Circuit([cirq.H(qubits[1])])
+    reordered.append(cirq.H(qubits[0]), strategy=cirq.InsertStrategy.NEW)
+    assert (
+        qleet.interface.circuit.CircuitDescriptor(ordered, []).fingerprint
+        == qleet.interface.circuit.CircuitDescriptor(reordered, []).fingerprint
+    ), "Gates on disjoint qubits should not be ordered by how they were appended"
+
+
+def test_opaque_parametrized_gates():
+    def descriptor(symbol, exponent=1):
+        qubits = cirq.LineQubit.range(2)
+        circuit = cirq.Circuit(
+            [
+                cirq.H.on_each(*qubits),
+                cirq.ZZ(*qubits) ** (exponent * symbol),
+                cirq.PhasedXPowGate(phase_exponent=symbol).on(qubits[0]),
+            ]
+        )
+        return qleet.interface.circuit.CircuitDescriptor(circuit, [symbol])
+
+    first, renamed = descriptor(sympy.Symbol("a")), descriptor(sympy.Symbol("b"))
+    assert first.compiled.opaque
+    assert first == renamed and hash(first) == hash(renamed)
+    assert first != descriptor(sympy.Symbol("a"), 2)
+    assert len({first, renamed}) == 1
+
+    planner = qleet.simulators.planner.SimulationPlanner()
+    assert planner.plan(first, 8).engine == "dense"
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(
+        first, planner=planner
+    )
+    values = np.random.random((3, 1))
+    for row, state in zip(values, simulator.simulate_batch(values)):
+        expected = (
+            cirq.Simulator(dtype=np.complex128)
+            .simulate(first.cirq_circuit, {"a": row[0]})
+            .final_state_vector
+        )
+        assert np.allclose(state, expected, atol=1e-6)
+
+
+def test_swapped_canonical_symbol_names():
+    def descriptor(first, second):
+        qubits = cirq.LineQubit.range(2)
+        circuit = cirq.Circuit(
+            [
+                cirq.H.on_each(*qubits),
+                cirq.rz(first + 2 * second).on(qubits[0]),
+                cirq.ZZ(*qubits) ** (first - second),
+            ]
+        )
+        return qleet.interface.circuit.CircuitDescriptor(circuit, [first, second])
+
+    swapped = descriptor(*sympy.symbols("p1 p0"))
+    renamed = descriptor(*sympy.symbols("a b"))
+    assert swapped.fingerprint == renamed.fingerprint
+    assert swapped.compiled.gates[2].params[0] == sympy.sympify("p0 + 2*p1")
+
+    values = np.random.random((3, 2))
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(swapped)
+    for row, state in zip(values, simulator.simulate_batch(values)):
+        expected = (
+            cirq.Simulator(dtype=np.complex128)
+            .simulate(swapped.cirq_circuit, {"p1": row[0], "p0": row[1]})
+            .final_state_vector
+        )
+        assert np.allclose(state, expected, atol=1e-6)
@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import sympy
+import cirq
+
+import qleet
+
+
+def test_instrumentation_disabled_by_default():
+    instrumentation = qleet.interface.instrumentation
+    instrumentation.reset()
+    assert not instrumentation.is_enabled(), "Instrumentation should be off by default"
+    with instrumentation.span("test.block"):
+        instrumentation.count("test.counter")
+    assert instrumentation.stats() == {"spans": {}, "counters": {}}
+
+
+def test_instrumentation_recording(tmp_path):
+    instrumentation = qleet.interface.instrumentation
+    params = sympy.symbols("param:%d" % 2)
+    circuit = cirq.Circuit(
+        [
+            cirq.rx(params[0]).on(cirq.NamedQubit("q_0")),
+            cirq.CX(cirq.NamedQubit("q_0"), cirq.NamedQubit("q_1")),
+            cirq.rx(params[1]).on(cirq.NamedQubit("q_1")),
+        ]
+    )
+    descriptor = qleet.interface.circuit.CircuitDescriptor(
+        circuit=circuit, params=params, cost_function=cirq.PauliSum()
+    )
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(descriptor)
+    resolvers = [{p: np.random.random() for p in params} for _ in range(3)]
+
+    with instrumentation.recording():
+        simulator.simulate_batch(resolvers)
+    simulator.simulate(resolvers[0])
+
+    recorded = instrumentation.stats()
+    assert recorded["spans"]["simulator.simulate"]["calls"] == 3
+    assert recorded["spans"]["simulator.simulate_batch"]["calls"] == 1
+    assert recorded["counters"]["simulator.simulations"] == 3
+    # Double precision amplitudes without a planner
+    assert recorded["counters"]["simulator.bytes_allocated"] == 3 * 4 * 16
+    assert "simulator.simulate" in instrumentation.summary()
+
+    trace_file = tmp_path / "trace.json"
+    instrumentation.export_chrome_trace(str(trace_file))
+    with open(trace_file) as file:
+        events = json.load(file)["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    assert len(spans) == sum(
+        entry["calls"] for entry in recorded["spans"].values()
+    ), "Every recorded span should be a complete event"
+    assert all(event["dur"] >= 0 and event["ts"] >= 0 for event in spans)
@@ -0,0 +1,49 @@
+import numpy as np
+
+import qleet
+
+
+def test_log_store_growth():
+    store = qleet.interface.log_store.LogStore(initial_size=4)
+    for step in range(10):
+        store.append(np.full(3, step), loss=-step, run=step // 5, step=step % 5)
+    assert len(store) == 10, "Rows were lost while growing the store."
+    assert store.params.shape == (10, 3)
+    assert np.array_equal(store.params[:, 0], np.arange(10))
+    assert np.array_equal(store.loss, -np.arange(10))
+    assert np.array_equal(store.run, [0] * 5 + [1] * 5)
+    assert store.params.base is not None, "Columns should be views, not copies."
+
+
+def test_log_store_stride():
+    store = qleet.interface.log_store.LogStore(stride=3)
+    stored = [store.append(np.zeros(2), 0.0, run=0, step=step) for step in range(7)]
+    assert stored == [True, False, False, True, False, False, True]
+    assert np.array_equal(store.step, [0, 3, 6])
+
+
+def test_log_store_ring_buffer():
+    store = qleet.interface.log_store.LogStore(capacity=4)
+    for step in range(6):
+        store.append(np.array([step]), loss=step, run=0, step=step)
+    assert len(store) == 4, "Ring buffer grew beyond its capacity."
+    assert sorted(store.step) == [2, 3, 4, 5], "Oldest rows should be overwritten."
+    order = store.chronological_order()
+    assert np.array_equal(store.step[order], [2, 3, 4, 5])
+
+
+def test_logger_stride():
+    logger = qleet.analyzers.training_path.OptimizationPathPlotter(stride=2)
+    for _ in range(5):
+        logger.record(np.random.random(4), 1.0)
+    logger.next()
+    logger.record(np.random.random(4), 1.0)
+    assert np.array_equal(logger.runs, [0, 0, 0, 1])
+    assert np.array_equal(logger.item, [0, 2, 4, 0])
+
+
+def test_log_store_array_loss():
+    store = qleet.interface.log_store.LogStore()
+    store.append(np.zeros(2), np.array([1.0, 2.0, 6.0]), run=0, step=0)
+    store.append(np.zeros(2), np.array(4.0), run=0, step=1)
+    assert np.array_equal(store.loss, [3.0, 4.0])
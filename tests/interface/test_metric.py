@@ -31,3 +31,28 @@ def test_metric():
             parameters=np.random.random(size=len(circuit.parameters)),
             mode="something_else",
         )
+
+
+def test_metric_from_histogram():
+    graph = nx.gnm_random_graph(n=5, m=7, seed=2)
+    metric = qleet.examples.qaoa_maxcut.MaxCutMetric(graph)
+    bitstrings, counts = np.array([0, 5, 19, 31]), np.array([3, 1, 4, 2])
+    samples = qleet.simulators.sampling.unpack_bitstrings(
+        np.repeat(bitstrings, counts), 5
+    )
+    assert np.isclose(
+        metric.from_histogram(bitstrings, counts, 5),
+        metric.from_samples_vector(samples),
+    )
+
+    qaoa = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut(graph, p=1)
+    circuit = qleet.interface.circuit.CircuitDescriptor(
+        qaoa.qaoa_circuit, qaoa.params, qaoa.qaoa_cost
+    )
+    values = np.random.random(size=(4, len(circuit.parameters)))
+    batch = metric.from_circuit(circuit, values, seed=3)
+    assert batch.shape == (4,)
+    single = metric.from_circuit(circuit, values[0], seed=3)
+    assert np.isclose(single, batch[0], atol=0.05)
+    empty = metric.from_circuit(circuit, values[:0], seed=3)
+    assert empty.shape == (0,), "An empty batch should give no metrics."
@@ -0,0 +1,61 @@
+import numpy as np
+
+import cirq
+import qiskit.quantum_info
+
+import qleet
+
+
+def _random_states(num_states, num_qubits, seed=0):
+    rng = np.random.default_rng(seed)
+    states = rng.normal(size=(num_states, 2**num_qubits)) + 1j * rng.normal(
+        size=(num_states, 2**num_qubits)
+    )
+    return states / np.linalg.norm(states, axis=1, keepdims=True)
+
+
+def test_cirq_pauli_sum_expectation():
+    qubits = cirq.LineQubit.range(3)
+    cost = (
+        1.5 * cirq.X(qubits[0]) * cirq.Y(qubits[2])
+        - 0.7 * cirq.Z(qubits[1])
+        + 0.3 * cirq.Y(qubits[0]) * cirq.Y(qubits[1]) * cirq.Z(qubits[2])
+        + 2.0 * cirq.PauliString()
+    )
+    operator = qleet.interface.pauli.compile_pauli_sum(cost, qubits)
+    states = _random_states(5, 3)
+    matrix = cost.matrix(qubits)
+    expected = np.array([np.vdot(state, matrix @ state).real for state in states])
+    assert np.allclose(operator.expectation(states), expected)
+    density_matrices = np.einsum("bi,bj->bij", states, states.conj())
+    assert np.allclose(operator.density_expectation(density_matrices), expected)
+    assert operator.to_cirq(qubits) == cost
+
+
+def test_diagonal_fast_path():
+    qubits = cirq.LineQubit.range(3)
+    cost = cirq.PauliSum.from_pauli_strings(
+        [cirq.Z(qubits[0]) * cirq.Z(qubits[1]), cirq.Z(qubits[1]) * cirq.Z(qubits[2])]
+    )
+    operator = qleet.interface.pauli.compile_pauli_sum(cost, qubits)
+    assert operator.is_diagonal
+    assert len(operator.groups) == 1, "Z-only terms should share one diagonal"
+    assert np.allclose(operator.diagonal, np.diag(cost.matrix(qubits)).real)
+    states = _random_states(4, 3)
+    assert np.allclose(
+        operator.expectation(states), np.abs(states) ** 2 @ operator.diagonal
+    )
+
+
+def test_qiskit_pauli_list_expectation():
+    paulis = qiskit.quantum_info.PauliList(["XYZ", "-iZZI", "IXI"])
+    operator = qleet.interface.pauli.compile_pauli_sum(
+        paulis, list(range(3)), big_endian=False
+    )
+    states = _random_states(3, 3)
+    expected = sum(
+        np.array([np.vdot(state, pauli.to_matrix() @ state) for state in states])
+        for pauli in paulis
+    )
+    assert np.allclose(operator.expectation(states), expected)
+    assert not operator.is_hermitian
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import cirq
+
+import qleet
+
+
+def test_cache_memory_tier():
+    """Test the least recently used results are evicted from memory"""
+    cache = qleet.simulators.cache.SimulationCache(memory_limit=3 * 8 * 10)
+    for idx in range(4):
+        cache.put(f"key{idx}", np.full(10, idx, dtype=np.float64))
+    assert cache.get("key0") is None, "Least recently used result was not evicted."
+    assert np.all(cache.get("key3") == 3)
+    assert not cache.get("key3").flags.writeable, "Cached results should be read-only."
+
+
+def test_cache_disk_tier(tmp_path):
+    """Test the results stored on disk are memory-mapped and evicted by age"""
+    cache = qleet.simulators.cache.SimulationCache(str(tmp_path), disk_limit=2 * 1000)
+    states = np.random.random((10, 10))
+    cache.put("first", states.copy())
+    fresh = qleet.simulators.cache.SimulationCache(str(tmp_path))
+    loaded = fresh.get("first")
+    assert isinstance(loaded, np.memmap), "Disk tier should be memory-mapped."
+    assert np.array_equal(loaded, states), "Disk tier did not round trip."
+
+    os.utime(tmp_path / "first.npy", (0, 0))
+    cache.put("second", states.copy())
+    cache.put("third", states.copy())
+    assert sorted(os.listdir(tmp_path)) == ["second.npy", "third.npy"]
+
+
+def test_cached_simulation(ladder_circuit, random_resolvers):
+    """Test equal circuits share the cached simulations"""
+    descriptor = ladder_circuit(2, rotations=(cirq.rx,))
+    cache = qleet.simulators.cache.SimulationCache()
+    resolvers = random_resolvers(descriptor, 5)
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, cache=cache
+    )
+    with qleet.interface.instrumentation.recording():
+        states = simulator.simulate_batch(resolvers)
+        other = qleet.simulators.circuit_simulators.CircuitSimulator(
+            ladder_circuit(2, rotations=(cirq.rx,)), cache=cache
+        )
+        cached = other.simulate_batch(resolvers)
+    counters = qleet.interface.instrumentation.stats()["counters"]
+    assert counters["simulator.simulations"] == 5, "Cached batch was simulated again."
+    assert counters["cache.hits"] == 1
+    assert np.array_equal(states, cached)
@@ -0,0 +1,64 @@
+import numpy as np
+import networkx as nx
+import pytest
+import cirq
+
+import qleet
+
+
+@pytest.mark.parametrize("max_width", [1, 2, 3])
+def test_fused_circuit_matches_gates(max_width):
+    graph = nx.random_regular_graph(3, 8, seed=2)
+    qaoa = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut(graph, p=2)
+    compiled = qleet.interface.circuit.CircuitDescriptor(
+        qaoa.qaoa_circuit, qaoa.params
+    ).compiled
+    fused = qleet.simulators.fusion.FusedCircuit(compiled, max_width)
+    assert fused.fingerprint == compiled.fingerprint
+    assert all(len(block.qubits) <= max(max_width, 2) for block in fused.blocks)
+    if max_width > 1:
+        assert fused.num_passes < len(compiled.gates) // 2
+
+    values = np.random.random(size=(5, len(qaoa.params))) * 2 * np.pi
+    expected = qleet.simulators.statevector.simulate_states(compiled, values)
+    states = qleet.simulators.statevector.simulate_states(fused, values)
+    assert np.allclose(states, expected)
+    assert np.allclose(
+        qleet.simulators.statevector.simulate_states(fused, values[0]), expected[:1]
+    )
+
+
+def test_fusion_keeps_order_and_channels():
+    qubits = cirq.LineQubit.range(4)
+    circuit = cirq.testing.random_circuit(qubits, n_moments=20, op_density=0.9)
+    circuit.append(cirq.depolarize(0.1).on(qubits[1]))
+    circuit.append(cirq.CNOT(qubits[1], qubits[2]))
+    compiled = qleet.interface.circuit.CircuitDescriptor(circuit, []).compiled
+    fused = qleet.simulators.fusion.FusedCircuit(compiled, 3)
+    indices = [index for block in fused.blocks for index in block.indices]
+    assert sorted(indices) == list(range(len(indices)))
+    assert ("channel", (1,)) in [
+        (gate.name, gate.qubits) for gate, _matrix in fused.bind(np.zeros(0))
+    ]
+
+
+def test_planner_fuses_batched_simulations():
+    graph = nx.random_regular_graph(3, 6, seed=1)
+    qaoa = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut(graph, p=1)
+    descriptor = qleet.interface.circuit.CircuitDescriptor(
+        qaoa.qaoa_circuit, qaoa.params
+    )
+    resolvers = [
+        {p: np.random.random() * 2 * np.pi for p in descriptor.parameters}
+        for _ in range(4)
+    ]
+    planner = qleet.simulators.planner.SimulationPlanner(fusion_width=3)
+    assert planner.fuse(descriptor.compiled) is planner.fuse(descriptor.compiled)
+    states = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, planner=planner
+    ).simulate_batch(resolvers)
+    unfused = qleet.simulators.planner.SimulationPlanner(fusion_width=None)
+    expected = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, planner=unfused
+    ).simulate_batch(resolvers)
+    assert np.allclose(states, expected)
@@ -0,0 +1,78 @@
+import numpy as np
+import cirq
+
+import qleet
+
+
+def test_mps_matches_state_vectors(ladder_circuit, reduced_density_matrix):
+    """Test the matrix product states match the state vectors"""
+    descriptor = ladder_circuit(5, entangler=cirq.CZ, ring=cirq.CNOT)
+    values = np.random.random(size=(4, len(descriptor.parameters))) * 2 * np.pi
+    expected = qleet.simulators.statevector.simulate_states(descriptor.compiled, values)
+    states = qleet.simulators.mps_simulator.simulate_mps(descriptor.compiled, values)
+    for state, dense in zip(states, expected):
+        assert np.allclose(state.state_vector(), dense, atol=1e-8)
+        assert np.isclose(state.truncation_error, 0)
+        assert np.allclose(
+            state.reduced_density_matrix([1, 3]),
+            reduced_density_matrix(dense, [1, 3], 5),
+            atol=1e-8,
+        )
+        singular = np.linalg.svd(dense.reshape(4, 8), compute_uv=False)
+        schmidt = state.schmidt_values(2)
+        assert np.allclose(schmidt, singular[: len(schmidt)], atol=1e-8)
+        rho = reduced_density_matrix(dense, [0, 4], 5)
+        assert np.isclose(state.purity([0, 4]), np.trace(rho @ rho).real)
+    assert np.isclose(
+        abs(states[0].overlap(states[1])), abs(np.vdot(expected[0], expected[1]))
+    )
+
+
+def test_truncated_bond_dimension(ladder_circuit):
+    """Test the bond dimension is truncated to its maximum"""
+    descriptor = ladder_circuit(6, entangler=cirq.CZ, ring=cirq.CNOT)
+    values = np.random.random(size=(1, len(descriptor.parameters))) * 2 * np.pi
+    (state,) = qleet.simulators.mps_simulator.simulate_mps(
+        descriptor.compiled, values, max_bond_dimension=2
+    )
+    assert max(state.bond_dimensions) <= 2
+    assert 0 <= state.truncation_error < 1
+    assert np.isclose(np.linalg.norm(state.state_vector()), 1)
+
+
+def test_planner_picks_mps_for_wide_circuits(ladder_circuit):
+    """Test wide circuits are simulated as matrix product states"""
+    descriptor = ladder_circuit(40, entangler=cirq.CZ, ring=cirq.CNOT)
+    planner = qleet.simulators.planner.SimulationPlanner(max_bond_dimension=16)
+    plan = planner.plan(descriptor, batch_size=3, dense=False)
+    assert plan.engine == "mps"
+    states = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, planner=planner
+    ).simulate_mps([{p: 0.3 * idx for idx, p in enumerate(descriptor.parameters)}] * 3)
+    assert len(states) == 3 and states[0].num_qubits == 40
+
+
+def test_entanglement_capability_with_mps(ladder_circuit, reduced_density_matrix):
+    """Test the entanglement capability from matrix product states"""
+    descriptor = ladder_circuit(5, entangler=cirq.CZ, ring=cirq.CNOT)
+    planner = qleet.simulators.planner.SimulationPlanner(engines=["mps"])
+    capability = qleet.analyzers.entanglement.EntanglementCapability(
+        descriptor, samples=10, planner=planner
+    )
+    np.random.seed(3)
+    value = capability.entanglement_capability("meyer-wallach")
+    np.random.seed(3)
+    theta, phi = capability.gen_params()
+    states = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor
+    ).simulate_batch(np.concatenate([theta, phi]))
+    purities = [
+        np.mean(
+            [
+                np.trace(np.linalg.matrix_power(reduced_density_matrix(s, [k], 5), 2))
+                for k in range(5)
+            ]
+        ).real
+        for s in states
+    ]
+    assert np.isclose(value, np.mean([2 * (1 - purity) for purity in purities]))
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import cirq
+
+import qleet
+
+
+def test_shards_are_reproducible(ladder_circuit):
+    """Test the sharded states do not depend on the number of workers"""
+    descriptor = ladder_circuit(5, rotations=(cirq.ry, cirq.rz))
+    values = np.random.random(size=(23, len(descriptor.parameters))) * 2 * np.pi
+    expected = qleet.simulators.statevector.simulate_states(descriptor.compiled, values)
+    results = []
+    for workers in (1, 2, 3):
+        with qleet.simulators.parallel.ShardPool(descriptor.compiled, workers) as pool:
+            done = []
+            results.append(pool.simulate(values, 4, callback=done.append))
+        assert done[-1] == len(values)
+    assert np.allclose(results[0], expected)
+    assert np.array_equal(results[0], results[1])
+    assert np.array_equal(results[0], results[2])
+
+
+def test_simulator_shards_batches(tmp_path, ladder_circuit, random_resolvers):
+    """Test the simulator shards batches across the pool of the planner"""
+    descriptor = ladder_circuit(5, rotations=(cirq.ry, cirq.rz))
+    resolvers = random_resolvers(descriptor, 10)
+    planner = qleet.simulators.planner.SimulationPlanner(
+        engines=["batched"], workers=2, chunk_size=3, precision="single"
+    )
+    plan = planner.plan(descriptor, len(resolvers))
+    assert plan.chunk_size == 3
+    checkpoint = qleet.interface.checkpoint.Checkpointer(str(tmp_path))
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, planner=planner
+    )
+    compiled = planner.fuse(descriptor.compiled)
+    with planner:
+        states = simulator.simulate_batch(resolvers, checkpoint=checkpoint)
+        pool = planner.shard_pool(compiled, np.complex64, False)
+        again = simulator.simulate_batch(resolvers)
+        assert (
+            planner.shard_pool(compiled, np.complex64, False) is pool
+        ), "The pool should be kept for the same circuit."
+    assert np.array_equal(states, again)
+    with pytest.raises(ValueError):
+        # The workers are stopped once the planner is closed
+        pool.simulate(simulator.parameter_matrix(resolvers), 3)
+    assert states.dtype == np.complex64
+    assert len(checkpoint.load_rows("states")) == len(resolvers)
+    expected = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor,
+        planner=qleet.simulators.planner.SimulationPlanner(
+            engines=["batched"], chunk_size=3, precision="single"
+        ),
+    ).simulate_batch(resolvers)
+    assert np.array_equal(states, expected)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+import qleet
+
+
+@pytest.mark.parametrize("method", ["random", "sobol", "halton"])
+def test_sample_parameters(method):
+    """Test the seeded parameter samplers"""
+    sample = qleet.simulators.parameters.sample_parameters
+    values = sample(64, 5, seed=3, method=method)
+    assert values.shape == (64, 5)
+    assert np.all(values >= 0) and np.all(values < 2 * np.pi)
+    assert np.array_equal(values, sample(64, 5, seed=3, method=method))
+    assert not np.array_equal(values, sample(64, 5, seed=4, method=method))
+    np.random.seed(2)
+    values = sample(10, 5, method=method)
+    np.random.seed(2)
+    assert np.array_equal(values, sample(10, 5, method=method))
+    with pytest.raises(ValueError):
+        sample(10, 5, method="lattice")
+
+
+def test_quasi_random_samples_are_more_uniform():
+    """Test the quasi-random samples have a lower discrepancy"""
+    qmc = pytest.importorskip("scipy.stats.qmc")
+    sample = qleet.simulators.parameters.sample_parameters
+    discrepancies = {
+        method: qmc.discrepancy(sample(256, 4, 0, method, scale=1))
+        for method in ("random", "sobol", "halton")
+    }
+    assert discrepancies["sobol"] < discrepancies["random"] / 5
+    assert discrepancies["halton"] < discrepancies["random"] / 5
+
+
+def test_global_seed_reproduces_the_resolvers(ladder_circuit):
+    """Test the global seed gives the resolvers of earlier versions"""
+    descriptor = ladder_circuit()
+    np.random.seed(11)
+    resolvers = [
+        {p: 2 * np.random.random() * np.pi for p in descriptor.parameters}
+        for _ in range(4)
+    ]
+    np.random.seed(11)
+    theta, _phi = qleet.analyzers.entanglement.EntanglementCapability(
+        descriptor, samples=4
+    ).gen_params()
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(descriptor)
+    assert np.allclose(theta, simulator.parameter_matrix(resolvers))
+    assert np.allclose(
+        simulator.simulate_batch(theta), simulator.simulate_batch(resolvers)
+    )
+    assert np.allclose(simulator.simulate(theta[2]), simulator.simulate(resolvers[2]))
+    assert simulator.resolvers(theta)[1] == pytest.approx(resolvers[1])
+
+
+@pytest.mark.parametrize("sampler", ["random", "sobol"])
+def test_seeded_analyzers(sampler, ladder_circuit):
+    """Test the analyzers are reproducible from their seed"""
+    descriptor = ladder_circuit()
+    planner = qleet.simulators.planner.SimulationPlanner(engines=["batched"])
+    values = [
+        (
+            qleet.analyzers.expressibility.Expressibility(
+                descriptor, samples=16, planner=planner, seed=seed, sampler=sampler
+            ).expressibility("kld"),
+            qleet.analyzers.entanglement.EntanglementCapability(
+                descriptor, samples=16, planner=planner, seed=seed, sampler=sampler
+            ).entanglement_capability("meyer-wallach"),
+        )
+        for seed in (1, 1, 2)
+    ]
+    assert values[0] == values[1]
+    assert values[0] != values[2]
+
+    spectrum = qleet.analyzers.entanglement_spectrum.EntanglementSpectrum(
+        descriptor, samples=8, seed=1, sampler=sampler
+    )
+    assert spectrum.gen_params().shape == (8, len(descriptor.parameters))
+    with pytest.raises(ValueError):
+        qleet.analyzers.expressibility.Expressibility(descriptor, sampler="grid")
@@ -1,3 +1,8 @@
+import pickle
+
+import numpy as np
+import pytest
+
 import qleet
 
 
@@ -31,3 +36,87 @@ def test_evaluation():
     pqc_trainer.train(10000, loggers=logger)
     loss_2 = pqc_trainer.evaluate(1000)
     assert loss_1 >= loss_2, "Training worsened the output accuracy."
+
+
+def test_multistart_trainer():
+    qaoa_maxcut = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut()
+    circuit_descriptor = qleet.interface.circuit.CircuitDescriptor(
+        circuit=qaoa_maxcut.qaoa_circuit,
+        params=qaoa_maxcut.params,
+        cost_function=qaoa_maxcut.qaoa_cost,
+    )
+    logger = qleet.analyzers.training_path.OptimizationPathPlotter()
+    trainer = qleet.simulators.pqc_trainer.MultiStartTrainer(
+        circuit_descriptor, n_starts=3, seed=42, max_workers=2
+    )
+    final_params = trainer.train(5, loggers=qleet.interface.metas.AnalyzerList(logger))
+    assert final_params.shape == (3, len(circuit_descriptor)), "Wrong final shape."
+    assert logger.trial == 3, "Each start should be logged as its own trial."
+    assert np.array_equal(
+        logger.runs, [0] * 5 + [1] * 5 + [2] * 5
+    ), "Runs replayed out of order."
+
+    repeated = qleet.simulators.pqc_trainer.MultiStartTrainer(
+        circuit_descriptor, n_starts=3, seed=42, max_workers=3
+    ).train(5)
+    assert np.allclose(final_params, repeated), "Seeded multi-start not reproducible."
+    with pytest.raises(ValueError):
+        qleet.simulators.pqc_trainer.MultiStartTrainer(circuit_descriptor, n_starts=0)
+
+
+def test_multistart_payload_pickles():
+    qaoa_maxcut = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut()
+    circuit_descriptor = qleet.interface.circuit.CircuitDescriptor(
+        circuit=qaoa_maxcut.qaoa_circuit,
+        params=list(reversed(qaoa_maxcut.params)),
+        cost_function=qaoa_maxcut.qaoa_cost,
+    )
+    pqc_trainer = qleet.simulators.pqc_trainer
+    payload = pickle.loads(
+        pickle.dumps(pqc_trainer._circuit_payload(circuit_descriptor))
+    )
+    rebuilt = pqc_trainer._circuit_from_payload(payload)
+    assert rebuilt.cirq_circuit == circuit_descriptor.cirq_circuit
+    assert rebuilt.cirq_cost == circuit_descriptor.cirq_cost
+    assert list(rebuilt.parameters) == list(
+        circuit_descriptor.parameters
+    ), "The workers should train the parameters in the order of the descriptor."
+
+
+def test_trainer_resume(tmp_path):
+    qaoa_maxcut = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut()
+    circuit = qleet.interface.circuit.CircuitDescriptor(
+        circuit=qaoa_maxcut.qaoa_circuit,
+        params=qaoa_maxcut.params,
+        cost_function=qaoa_maxcut.qaoa_cost,
+    )
+    checkpoint = qleet.interface.checkpoint.Checkpointer(str(tmp_path), interval=5)
+    trainer = qleet.simulators.pqc_trainer.PQCSimulatedTrainer(circuit, seed=3)
+    trainer.train(n_samples=10, checkpoint=checkpoint)
+
+    resumed = qleet.simulators.pqc_trainer.PQCSimulatedTrainer(circuit, seed=4)
+    logger = qleet.analyzers.training_path.OptimizationPathPlotter()
+    resumed.train(
+        n_samples=12,
+        loggers=qleet.interface.metas.AnalyzerList(logger),
+        checkpoint=checkpoint,
+    )
+    assert len(logger.data) == 2, "Training did not resume from the checkpoint."
+    assert checkpoint.load("trainer")["step"] == 12
+
+
+def test_trainer_parameter_order():
+    qaoa_maxcut = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut(p=6)
+    circuit = qleet.interface.circuit.CircuitDescriptor(
+        circuit=qaoa_maxcut.qaoa_circuit,
+        params=qaoa_maxcut.params,
+        cost_function=qaoa_maxcut.qaoa_cost,
+    )
+    trainer = qleet.simulators.pqc_trainer.PQCSimulatedTrainer(circuit, seed=1)
+    values = trainer.model.trainable_variables[0].numpy()
+    by_name = {
+        str(symbol): value for symbol, value in zip(trainer.pqc_layer.symbols, values)
+    }
+    assert np.allclose(
+        trainer.parameters, [by_name[str(param)] for param in circuit.parameters]
+    ), "The parameters should be in the order of the circuit's parameters."
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import cirq
+
+import qleet
+
+
+def test_profile_circuit(ladder_circuit):
+    """Test the profile of the clifford gates and the entanglement of the cuts"""
+    qubits = cirq.LineQubit.range(3)
+    clifford = cirq.Circuit(
+        [cirq.H(qubits[0]), cirq.CNOT(qubits[0], qubits[2]), cirq.S(qubits[1])]
+    )
+    profile = qleet.simulators.planner.profile_circuit(
+        qleet.interface.circuit.CircuitDescriptor(clifford, []).compiled
+    )
+    assert profile.clifford and not profile.noisy
+    assert profile.cut_entanglement == (1, 1)
+    assert not qleet.simulators.planner.profile_circuit(
+        ladder_circuit(4, rotations=(cirq.rx, cirq.ry)).compiled
+    ).clifford
+
+
+def test_planner_chunks_and_refuses(ladder_circuit):
+    """Test the batch is chunked to the budget and refused over it"""
+    descriptor = ladder_circuit(4, rotations=(cirq.rx, cirq.ry))
+    planner = qleet.simulators.planner.SimulationPlanner()
+    plan = planner.plan(descriptor, batch_size=20)
+    assert plan.engine == "batched" and plan.chunk_size == 20
+
+    state_bytes = 16 * 2**4
+    tight = qleet.simulators.planner.SimulationPlanner(
+        memory_budget=20 * state_bytes + 5 * state_bytes
+    )
+    assert tight.plan(descriptor, batch_size=20).chunk_size == 5
+    with pytest.raises(MemoryError):
+        qleet.simulators.planner.SimulationPlanner(memory_budget=state_bytes).plan(
+            descriptor, batch_size=20
+        )
+    with pytest.raises(ValueError):
+        qleet.simulators.planner.SimulationPlanner(engines=["tensor_network"])
+    with pytest.raises(ValueError):
+        qleet.simulators.planner.SimulationPlanner(workers=0)
+    with pytest.raises(ValueError):
+        planner.plan(descriptor, batch_size=0)
+
+    noisy = planner.plan(
+        descriptor, noise_model=cirq.ConstantQubitNoiseModel(cirq.depolarize(0.01))
+    )
+    assert noisy.engine == "density_matrix"
+
+
+def test_planned_simulation_matches_framework(ladder_circuit, random_resolvers):
+    """Test the planned simulation gives the states of the framework"""
+    descriptor = ladder_circuit(4, rotations=(cirq.rx, cirq.ry))
+    resolvers = random_resolvers(descriptor, 7)
+    expected = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor
+    ).simulate_batch(resolvers)
+    planner = qleet.simulators.planner.SimulationPlanner(memory_budget=10 * 16 * 2**4)
+    states = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, planner=planner
+    ).simulate_batch(resolvers)
+    assert np.allclose(states, expected, atol=1e-5)
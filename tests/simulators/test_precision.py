@@ -0,0 +1,134 @@
+"""Single precision against double precision.
+
+The amplitudes of single precision are accurate to about 1e-7 per gate, so the states of
+these circuits, of a few dozen gates, agree to 1e-5 and the quantities derived from
+them, fidelities, purities and the analyzers built on them, to 1e-4. The expressibility
+bins its fidelities, so a fidelity at the edge of a bin may move by one bin, and the
+divergences are compared to 1e-3.
+"""
+
+import numpy as np
+import pytest
+import cirq
+
+import qleet
+
+
+def _planners(**options):
+    return (
+        qleet.simulators.planner.SimulationPlanner(precision="single", **options),
+        qleet.simulators.planner.SimulationPlanner(precision="double", **options),
+    )
+
+
+def test_single_precision_states(ladder_circuit):
+    """Test single precision states agree with double precision ones"""
+    descriptor = ladder_circuit(4, rotations=(cirq.ry, cirq.rz), layers=2)
+    values = np.random.random(size=(8, len(descriptor.parameters))) * 2 * np.pi
+    statevector = qleet.simulators.statevector
+    single = statevector.simulate_states(descriptor.compiled, values, np.complex64)
+    double = statevector.simulate_states(descriptor.compiled, values)
+    assert single.dtype == np.complex64 and double.dtype == np.complex128
+    assert single.nbytes * 2 == double.nbytes
+    assert np.allclose(single, double, atol=1e-5)
+    assert np.allclose(np.linalg.norm(single, axis=1), 1, atol=1e-5)
+
+    fused = qleet.simulators.fusion.FusedCircuit(descriptor.compiled, 3)
+    assert np.allclose(
+        statevector.simulate_states(fused, values, np.complex64), double, atol=1e-5
+    )
+
+
+def test_planner_precision(ladder_circuit):
+    """Test the planner budgets the amplitudes of its precision"""
+    single, double = _planners()
+    assert single.dtype == np.complex64 and single.itemsize == 8
+    assert double.dtype == np.complex128 and double.itemsize == 16
+    descriptor = ladder_circuit(4, rotations=(cirq.ry, cirq.rz), layers=2)
+    profile = qleet.simulators.planner.profile_circuit(descriptor.compiled)
+    result, working, _seconds = single.estimate("batched", profile, 10)
+    assert (2 * result, 2 * working) == double.estimate("batched", profile, 10)[:2]
+    with pytest.raises(ValueError):
+        qleet.simulators.planner.SimulationPlanner(precision="half")
+
+
+def test_single_precision_batches(ladder_circuit, random_resolvers):
+    """Test batches simulated in single precision"""
+    descriptor = ladder_circuit(4, rotations=(cirq.ry, cirq.rz), layers=2)
+    resolvers = random_resolvers(descriptor, 6)
+    single, double = (
+        qleet.simulators.circuit_simulators.CircuitSimulator(
+            descriptor, planner=planner
+        ).simulate_batch(resolvers)
+        for planner in _planners()
+    )
+    assert single.dtype == np.complex64
+    assert np.allclose(single, double, atol=1e-5)
+    fidelities = np.abs(single @ single.conj().T) ** 2
+    expected = np.abs(double @ double.conj().T) ** 2
+    assert np.allclose(fidelities, expected, atol=1e-4)
+
+
+def test_framework_precision_matches_the_cache_keys(ladder_circuit):
+    """Test the framework simulates at the precision of the simulator"""
+    descriptor = ladder_circuit(3, rotations=(cirq.ry, cirq.rz))
+    values = np.random.random(size=(2, len(descriptor.parameters))) * 2 * np.pi
+    for planner, dtype in [(None, np.complex128), (_planners()[0], np.complex64)]:
+        simulator = qleet.simulators.circuit_simulators.CircuitSimulator(
+            descriptor, planner=planner
+        )
+        assert simulator.dtype == dtype
+        assert simulator.simulate(values[0]).dtype == dtype
+        assert simulator.simulate_batch(values).dtype == dtype
+
+
+def test_single_precision_mps_and_trajectories(ladder_circuit):
+    """Test matrix product states and trajectories in single precision"""
+    descriptor = ladder_circuit(5, rotations=(cirq.ry, cirq.rz), layers=2)
+    values = np.random.random(size=(3, len(descriptor.parameters))) * 2 * np.pi
+    expected = qleet.simulators.statevector.simulate_states(descriptor.compiled, values)
+    states = qleet.simulators.mps_simulator.simulate_mps(
+        descriptor.compiled, values, dtype=np.complex64
+    )
+    for state, dense in zip(states, expected):
+        assert state.tensors[0].dtype == np.complex64
+        assert np.allclose(state.state_vector(), dense, atol=1e-5)
+
+    noisy = qleet.interface.compiler.compile_circuit(
+        descriptor.cirq_circuit.with_noise(cirq.depolarize(0.05)), descriptor.parameters
+    )
+    trajectories = qleet.simulators.trajectories
+    single = trajectories.simulate_trajectories(
+        noisy, values, 50, seed=1, dtype=np.complex64
+    )
+    double = trajectories.simulate_trajectories(noisy, values, 50, seed=1)
+    assert single.dtype == np.complex64
+    for ensembles in zip(single, double):
+        purities = [
+            trajectories.TrajectoryEnsemble(states).purity([0]) for states in ensembles
+        ]
+        assert np.isclose(*purities, atol=1e-4)
+
+
+def test_single_precision_analyzers(ladder_circuit):
+    """Test the analyzers agree in single and double precision"""
+    descriptor = ladder_circuit(3, rotations=(cirq.ry, cirq.rz), layers=2)
+    values = []
+    for planner in _planners(engines=["mps"]):
+        np.random.seed(7)
+        values.append(
+            qleet.analyzers.entanglement.EntanglementCapability(
+                descriptor, samples=20, planner=planner
+            ).entanglement_capability("meyer-wallach")
+        )
+    assert np.isclose(*values, atol=1e-4)
+
+    values = []
+    for planner in _planners(engines=["mps"]):
+        np.random.seed(7)
+        values.append(
+            qleet.analyzers.expressibility.Expressibility(
+                descriptor, samples=50, planner=planner
+            ).expressibility("kld")
+        )
+    assert np.isclose(*values, atol=1e-3)
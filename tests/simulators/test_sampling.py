@@ -0,0 +1,65 @@
+import numpy as np
+import networkx as nx
+import pytest
+
+import qleet
+
+
+@pytest.mark.parametrize("method", ["cumsum", "alias"])
+def test_sample_bitstrings(method):
+    sampling = qleet.simulators.sampling
+    probs = np.array([[0.1, 0.0, 0.6, 0.3], [0.25, 0.25, 0.25, 0.25]])
+    shots = sampling.sample_bitstrings(probs, 100000, seed=7, method=method)
+    assert shots.shape == (2, 100000)
+    for row, expected in zip(shots, probs):
+        assert np.allclose(np.bincount(row, minlength=4) / 100000, expected, atol=0.01)
+    assert np.array_equal(
+        shots, sampling.sample_bitstrings(probs, 100000, seed=7, method=method)
+    ), "Sampling with the same seed should be reproducible"
+
+
+def test_histograms_and_unpacking():
+    sampling = qleet.simulators.sampling
+    state = np.array([0, 1, 0, 1j]) / np.sqrt(2)
+    probs = sampling.probabilities(state[np.newaxis])
+    ((bitstrings, counts),) = sampling.sample_histograms(probs, 1000, seed=1)
+    assert list(bitstrings) == [1, 3] and counts.sum() == 1000
+    assert np.array_equal(
+        sampling.probabilities(np.outer(state, state.conj()), density_matrix=True),
+        probs[0],
+    )
+    assert sampling.unpack_bitstrings(np.array([1, 2]), 2).tolist() == [
+        [False, True],
+        [True, False],
+    ]
+
+
+def test_sample_solutions():
+    graph = nx.gnm_random_graph(n=6, m=9, seed=3)
+    qaoa = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut(graph, p=1)
+    values = np.random.random(size=(3, len(qaoa.params)))
+    samples = qleet.interface.metric_spec.sample_solutions(
+        qaoa.qaoa_circuit, qaoa.params, values, samples=50, seed=5
+    )
+    assert samples.shape == (3, 50, 6)
+    single = qleet.interface.metric_spec.sample_solutions(
+        qaoa.qaoa_circuit, qaoa.params, values[0], samples=50, seed=5
+    )
+    assert np.array_equal(single, samples[0])
+    empty = qleet.interface.metric_spec.sample_solutions(
+        qaoa.qaoa_circuit, qaoa.params, values[:0], samples=50
+    )
+    assert empty.shape == (0, 50, 6), "An empty batch should give no samples."
+
+
+def test_sample_solution_histograms():
+    graph = nx.gnm_random_graph(n=5, m=7, seed=1)
+    qaoa = qleet.examples.qaoa_maxcut.QAOACircuitMaxCut(graph, p=1)
+    values = np.random.random(size=(2, len(qaoa.params)))
+    histograms = qleet.interface.metric_spec.sample_solutions(
+        qaoa.qaoa_circuit, qaoa.params, values, samples=200, seed=5, histogram=True
+    )
+    assert len(histograms) == 2
+    for bitstrings, counts in histograms:
+        assert np.all(np.diff(bitstrings) > 0) and np.sum(counts) == 200
+        assert np.all((0 <= bitstrings) & (bitstrings < 2**5))
@@ -0,0 +1,63 @@
+import numpy as np
+import cirq
+
+import qleet
+
+
+def _closing(qubits):
+    return [cirq.CZ(qubits[0], qubits[-1]), cirq.S(qubits[1])]
+
+
+def _purity(rho):
+    return np.trace(rho @ rho).real
+
+
+def test_stabilizer_purities_match_state_vectors(
+    ladder_circuit, reduced_density_matrix
+):
+    """Test the stabilizer purities match the state vectors"""
+    descriptor = ladder_circuit(4, closing=_closing)
+    values = np.random.randint(0, 4, size=(6, len(descriptor.parameters))) * np.pi / 2
+    stabilizer = qleet.simulators.stabilizer
+    assert stabilizer.clifford_samples(descriptor.compiled, values).all()
+    expected = qleet.simulators.statevector.simulate_states(descriptor.compiled, values)
+    states = stabilizer.simulate_stabilizers(descriptor.compiled, values)
+    for state, dense in zip(states, expected):
+        for qubits in ([0], [1, 2], [0, 3], [0, 1, 3]):
+            rho = reduced_density_matrix(dense, qubits, 4)
+            assert np.isclose(state.purity(qubits), _purity(rho))
+
+
+def test_clifford_samples(ladder_circuit):
+    """Test the samples at Clifford points are found"""
+    descriptor = ladder_circuit(4, closing=_closing)
+    values = np.full((3, len(descriptor.parameters)), np.pi)
+    values[1, 2] = 0.3
+    mask = qleet.simulators.stabilizer.clifford_samples(descriptor.compiled, values)
+    assert mask.tolist() == [True, False, True]
+    profile = qleet.simulators.planner.profile_circuit(descriptor.compiled)
+    assert not profile.clifford
+
+
+def test_entanglement_capability_with_stabilizers(
+    ladder_circuit, reduced_density_matrix
+):
+    """Test the entanglement capability from stabilizer states"""
+    descriptor = ladder_circuit(4, closing=_closing)
+    planner = qleet.simulators.planner.SimulationPlanner(engines=["stabilizer", "mps"])
+    capability = qleet.analyzers.entanglement.EntanglementCapability(
+        descriptor, samples=4, planner=planner
+    )
+    values = np.random.randint(0, 4, size=(8, len(descriptor.parameters))) * np.pi / 2
+    values[3] = np.random.random(len(descriptor.parameters))
+    resolvers = [dict(zip(descriptor.parameters, row)) for row in values]
+    capability.gen_params = lambda: (resolvers[:4], resolvers[4:])
+    value = capability.entanglement_capability("meyer-wallach")
+
+    states = qleet.simulators.statevector.simulate_states(descriptor.compiled, values)
+    purities = [
+        _purity(reduced_density_matrix(state, [qubit], 4))
+        for state in states
+        for qubit in range(4)
+    ]
+    assert np.isclose(value, 2 * (1 - np.mean(purities)))
@@ -56,6 +56,35 @@ def test_cirq_simulator_density_matrix():
     ), "State vector is not of right shape"
 
 
+def test_cirq_batch_as_one_sweep():
+    params = sympy.symbols("param:%d" % 2)
+    qubits = cirq.LineQubit.range(2)
+    cirq_circuit = cirq.Circuit(
+        [
+            cirq.ry(params[0]).on(qubits[0]),
+            cirq.CX(*qubits),
+            cirq.rx(params[1]).on(qubits[1]),
+        ]
+    )
+    resolvers = [{p: np.random.random() * 2 * np.pi for p in params} for _ in range(6)]
+    for channel in (None, cirq.depolarize(0.1).on(qubits[0])):
+        circuit = cirq_circuit if channel is None else cirq_circuit + channel
+        cirq_descriptor = qleet.interface.circuit.CircuitDescriptor(
+            circuit=circuit, params=list(params), cost_function=cirq.PauliSum()
+        )
+        assert cirq_descriptor.has_channels == (channel is not None)
+        simulator = qleet.simulators.circuit_simulators.CircuitSimulator(
+            cirq_descriptor
+        )
+        states = simulator.simulate_batch(resolvers)
+        assert states.shape == ((6, 4) if channel is None else (6, 4, 4))
+        empty = simulator.simulate_batch([])
+        assert empty.shape == ((0, 4) if channel is None else (0, 4, 4))
+        assert simulator.cirq_simulator is simulator.cirq_simulator
+        for resolver, state in zip(resolvers, states):
+            assert np.allclose(simulator.simulate(resolver), state, atol=1e-6)
+
+
 def test_qiskit_simulator():
     params = [qiskit.circuit.Parameter(r"$θ_1$"), qiskit.circuit.Parameter(r"$θ_2$")]
     qiskit_circuit = qiskit.QuantumCircuit(2)
@@ -73,3 +102,30 @@ def test_qiskit_simulator():
     assert (
         len(state_vector.shape) == 1 and state_vector.shape[0] == 4
     ), "State vector is not of right shape"
+
+
+def test_qiskit_batch_in_one_job():
+    params = [qiskit.circuit.Parameter(r"$θ_1$"), qiskit.circuit.Parameter(r"$θ_2$")]
+    qiskit_circuit = qiskit.QuantumCircuit(2)
+    qiskit_circuit.ry(params[0], 0)
+    qiskit_circuit.cx(0, 1)
+    qiskit_circuit.rx(params[1], 1)
+    qiskit_descriptor = qleet.interface.circuit.CircuitDescriptor(
+        circuit=qiskit_circuit, params=params, cost_function=cirq.PauliSum()
+    )
+    resolvers = [
+        {p: np.random.random() * 2 * np.pi for p in qiskit_descriptor.parameters}
+        for _ in range(5)
+    ]
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(qiskit_descriptor)
+    states = simulator.simulate_batch(resolvers)
+    assert states.shape == (5, 4)
+    for resolver, state in zip(resolvers, states):
+        assert np.allclose(simulator.simulate(resolver), state)
+    expected = qleet.simulators.statevector.reverse_state_order(
+        qleet.simulators.statevector.simulate_states(
+            qiskit_descriptor.compiled, simulator.parameter_matrix(resolvers)
+        ),
+        2,
+    )
+    assert np.allclose(np.abs(np.sum(states.conj() * expected, axis=1)), 1)
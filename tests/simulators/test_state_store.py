@@ -0,0 +1,104 @@
+import itertools
+
+import numpy as np
+import pytest
+import cirq
+
+import qleet
+
+
+def test_allocate_states_spills():
+    """Test stacks over the spill threshold are memory-mapped"""
+    store = qleet.simulators.state_store
+    in_memory = store.allocate_states((4, 8), np.complex128, spill_threshold=1024)
+    assert not isinstance(in_memory, np.memmap)
+    spilled = store.allocate_states((40, 8), np.complex128, spill_threshold=1024)
+    assert isinstance(spilled, np.memmap)
+    spilled[:] = 1j
+    assert np.all(spilled[::7] == 1j)
+
+
+def test_streamed_measures_match_direct_ones(reduced_density_matrix):
+    """Test the streamed fidelities and purities match direct ones"""
+    store = qleet.simulators.state_store
+    states = np.random.normal(size=(7, 8)) + 1j * np.random.normal(size=(7, 8))
+    states /= np.linalg.norm(states, axis=1, keepdims=True)
+    rhos = np.stack(
+        [0.8 * np.outer(state, state.conj()) + 0.2 * np.eye(8) / 8 for state in states]
+    )
+    for stack in (states, rhos):
+        # Blocks of a couple of states, so the pairs cross the blocks
+        fidelities = store.stream_fidelities(stack[:4], stack[4:], block_bytes=300)
+        expected = [
+            cirq.fidelity(a, b, qid_shape=(2,) * 3)
+            for a, b in itertools.product(stack[:4], stack[4:])
+        ]
+        assert np.allclose(fidelities, expected, atol=1e-6)
+
+        subsystems = [[0], [1, 2], [0, 2]]
+        purities = store.stream_purities(stack, subsystems, block_bytes=300)
+        for state, row in zip(stack, purities):
+            for qubits, purity in zip(subsystems, row):
+                rho = reduced_density_matrix(state, qubits, 3)
+                assert np.isclose(purity, np.trace(rho @ rho).real)
+
+
+def test_simulations_spill_to_disk(ladder_circuit, random_resolvers):
+    """Test spilled simulations are off the memory budget"""
+    descriptor = ladder_circuit()
+    resolvers = random_resolvers(descriptor, 12)
+    spilling = qleet.simulators.planner.SimulationPlanner(
+        engines=["batched"], spill_threshold=256
+    )
+    states = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, planner=spilling
+    ).simulate_batch(resolvers)
+    assert isinstance(states, np.memmap)
+    expected = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, planner=qleet.simulators.planner.SimulationPlanner()
+    ).simulate_batch(resolvers)
+    assert np.allclose(states, expected)
+
+    # The spilled results do not count against the memory budget
+    tight = qleet.simulators.planner.SimulationPlanner(
+        memory_budget=4096, engines=["batched"]
+    )
+    with pytest.raises(MemoryError):
+        tight.plan(descriptor, 100)
+    spilling.memory_budget = 4096
+    assert spilling.plan(descriptor, 100).memory <= 4096
+
+
+def test_analyzers_stream_spilled_states(ladder_circuit, reduced_density_matrix):
+    """Test the analyzers stream the spilled states"""
+    descriptor = ladder_circuit()
+    values = []
+    for threshold in (None, 0):
+        planner = qleet.simulators.planner.SimulationPlanner(
+            engines=["batched"], spill_threshold=threshold
+        )
+        np.random.seed(5)
+        expressibility = qleet.analyzers.expressibility.Expressibility(
+            descriptor, samples=15, planner=planner
+        ).expressibility("kld")
+        np.random.seed(5)
+        capability = qleet.analyzers.entanglement.EntanglementCapability(
+            descriptor, samples=15, planner=planner
+        )
+        thetas, phis = capability.gen_params()
+        np.random.seed(5)
+        values.append(
+            (expressibility, capability.entanglement_capability("meyer-wallach"))
+        )
+    assert np.allclose(values[0], values[1])
+
+    states = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor
+    ).simulate_batch(np.concatenate([thetas, phis]))
+    reduced = [
+        reduced_density_matrix(state, [qubit], 3)
+        for state in states
+        for qubit in range(3)
+    ]
+    purities = [np.trace(rho @ rho).real for rho in reduced]
+    assert np.isclose(values[0][1], 2 * (1 - np.mean(purities)))
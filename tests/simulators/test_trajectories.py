@@ -0,0 +1,121 @@
+import numpy as np
+import cirq
+
+import qleet
+
+
+def _cost(qubits):
+    return cirq.Z(qubits[0]) * cirq.Z(qubits[1]) + 0.5 * cirq.X(qubits[-1])
+
+
+def _within(estimate, expected, sigmas=5):
+    return abs(estimate.value - expected) <= sigmas * estimate.error + 1e-3
+
+
+def test_trajectories_match_density_matrices(
+    ladder_circuit, random_resolvers, reduced_density_matrix
+):
+    """Test the trajectory estimates match the density matrices"""
+    descriptor = ladder_circuit(3, rotations=(cirq.ry,), cost=_cost)
+    noise = cirq.ConstantQubitNoiseModel(cirq.depolarize(0.05))
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(descriptor, noise)
+    resolvers = random_resolvers(descriptor, 2)
+    rhos = simulator.simulate_batch(resolvers)
+    ensembles = simulator.simulate_trajectories(resolvers, trajectories=1000, seed=3)
+    expectations = descriptor.cost_operator.density_expectation(rhos)
+    for rho, ensemble, expectation in zip(rhos, ensembles, expectations):
+        assert np.allclose(ensemble.density_matrix(), rho, atol=0.05)
+        assert _within(ensemble.estimate_purity(), np.trace(rho @ rho).real)
+        reduced = reduced_density_matrix(rho, [0], 3)
+        assert _within(ensemble.estimate_purity([0]), np.trace(reduced @ reduced).real)
+        assert _within(ensemble.expectation(descriptor.cost_operator), expectation)
+    assert _within(
+        ensembles[0].estimate_fidelity(ensembles[1]), np.trace(rhos[0] @ rhos[1]).real
+    )
+    fidelities = qleet.simulators.trajectories.ensemble_fidelities(ensembles, ensembles)
+    assert np.isclose(fidelities[0, 1], ensembles[0].fidelity(ensembles[1]))
+
+    again = simulator.simulate_trajectories(resolvers, trajectories=1000, seed=3)
+    assert np.array_equal(again[0].states, ensembles[0].states)
+
+
+def test_planner_picks_trajectories(ladder_circuit, random_resolvers):
+    """Test the planner simulates noisy circuits with trajectories"""
+    descriptor = ladder_circuit(3, rotations=(cirq.ry,), cost=_cost)
+    noise = cirq.ConstantQubitNoiseModel(cirq.depolarize(0.05))
+    planner = qleet.simulators.planner.SimulationPlanner(
+        engines=["density_matrix", "trajectories"], trajectories=500
+    )
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, noise, planner=planner
+    )
+    assert simulator.plan(10, dense=False).engine in ("density_matrix", "trajectories")
+    assert simulator.plan(10, dense=True).engine == "density_matrix"
+    assert simulator.plan(10, dense=False, mixed_fidelities=True).engine == (
+        "density_matrix"
+    ), "Trajectories do not give the Uhlmann fidelities of the noisy states."
+
+    trajectories_only = qleet.simulators.planner.SimulationPlanner(
+        engines=["trajectories"], trajectories=500
+    )
+    pinned = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, noise, planner=trajectories_only
+    )
+    assert pinned.plan(10, dense=False, mixed_fidelities=True).engine == "trajectories"
+    resolvers = random_resolvers(descriptor, 3)
+    expected = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, noise
+    ).expectation(resolvers)
+    estimated = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, noise, planner=trajectories_only
+    ).expectation(resolvers)
+    assert np.allclose(estimated, expected, atol=0.15)
+
+
+def test_entanglement_capability_with_trajectories(
+    ladder_circuit, reduced_density_matrix
+):
+    """Test the entanglement capability from trajectory ensembles"""
+    descriptor = ladder_circuit(3, rotations=(cirq.ry,), cost=_cost)
+    noise = cirq.ConstantQubitNoiseModel(cirq.depolarize(0.02))
+    planner = qleet.simulators.planner.SimulationPlanner(
+        engines=["trajectories"], trajectories=200
+    )
+    capability = qleet.analyzers.entanglement.EntanglementCapability(
+        descriptor, noise, samples=5, planner=planner
+    )
+    np.random.seed(4)
+    value = capability.entanglement_capability("meyer-wallach")
+    np.random.seed(4)
+    theta, phi = capability.gen_params()
+    rhos = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, noise
+    ).simulate_batch(np.concatenate([theta, phi]))
+    purities = []
+    for rho in rhos:
+        for qubit in range(3):
+            reduced = reduced_density_matrix(rho, [qubit], 3)
+            purities.append(np.trace(reduced @ reduced).real)
+    assert np.isclose(value, 2 * (1 - np.mean(purities)), atol=0.05)
+
+
+def test_trajectories_chunks(ladder_circuit, random_resolvers):
+    """Test the trajectories do not depend on the chunks of the batch"""
+    descriptor = ladder_circuit(3, rotations=(cirq.ry,), cost=_cost)
+    noise = cirq.ConstantQubitNoiseModel(cirq.depolarize(0.05))
+    resolvers = random_resolvers(descriptor, 5)
+    whole = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, noise
+    ).simulate_trajectories(resolvers, trajectories=20, seed=2)
+    planner = qleet.simulators.planner.SimulationPlanner(
+        engines=["trajectories"], trajectories=20, chunk_size=2
+    )
+    simulator = qleet.simulators.circuit_simulators.CircuitSimulator(
+        descriptor, noise, planner=planner
+    )
+    assert simulator.plan(5, dense=False).chunk_size == 2
+    chunked = simulator.simulate_trajectories(resolvers, seed=2)
+    for ensemble, other in zip(whole, chunked):
+        assert np.allclose(
+            ensemble.states, other.states
+        ), "The trajectories should not depend on the chunks they are simulated in."
@@ -1,3 +1,6 @@
+import subprocess
+import sys
+
 import qleet
 
 
@@ -6,3 +9,20 @@ def test_version():
     assert (
         len(qleet.__version__.split(".")) >= 3
     ), "Version number doesn't have at least 3 dot separated values"
+
+
+def test_lazy_import():
+    frameworks = ["cirq", "qiskit", "pyquil", "tensorflow", "sklearn", "plotly"]
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, qleet; "
+            f"print([name for name in {frameworks!r} if name in sys.modules])",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    assert loaded == "[]", f"Importing qleet should not import {loaded}"
+    assert "CircuitDescriptor" in dir(qleet), "Exports should be listed by dir"